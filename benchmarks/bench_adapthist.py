@@ -0,0 +1,39 @@
+"""Time adaptive histogram equalization on a 4k frame and a 3D stack.
+
+Usage::
+
+    python benchmarks/bench_adapthist.py
+
+"""
+import cupy as cp
+
+from cupyimg.skimage import exposure
+from cupyimg.time import repeat
+
+
+def run():
+    rstate = cp.random.RandomState(0)
+    cases = [
+        ((2160, 3840), None),
+        ((2160, 3840), 64),
+        ((64, 512, 512), 32),
+    ]
+    for shape, kernel_size in cases:
+        image = rstate.rand(*shape).astype(cp.float32)
+        for nbins in [256, 4096]:
+            perf = repeat(
+                exposure.equalize_adapthist,
+                (image,),
+                dict(kernel_size=kernel_size, nbins=nbins),
+                n_repeat=5,
+                n_warmup=1,
+            )
+            print(
+                "shape={}, kernel_size={}, nbins={}: {:8.3f} ms".format(
+                    shape, kernel_size, nbins, 1e3 * perf.gpu_times.mean()
+                )
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,64 @@
+"""Time the fused color space conversions on a 4k RGB frame.
+
+The previous (unfused) RGB -> Lab conversion, which launched a separate
+kernel per intermediate operation, is reproduced here for reference only.
+
+Usage::
+
+    python benchmarks/bench_colorconv.py
+
+"""
+import cupy as cp
+
+from cupyimg.skimage import color
+from cupyimg.skimage.color import colorconv
+from cupyimg.time import repeat
+
+
+def legacy_rgb2lab(rgb):
+    arr = rgb.copy()
+    mask = arr > 0.04045
+    arr[mask] = cp.power((arr[mask] + 0.055) / 1.055, 2.4)
+    arr[~mask] /= 12.92
+    arr = arr @ cp.asarray(colorconv.xyz_from_rgb, dtype=arr.dtype).T
+    arr /= cp.asarray(colorconv.lab_ref_white, dtype=arr.dtype)
+    mask = arr > 0.008856
+    arr[mask] = cp.cbrt(arr[mask])
+    arr[~mask] = 7.787 * arr[~mask] + 16.0 / 116.0
+    x, y, z = arr[..., 0], arr[..., 1], arr[..., 2]
+    L = (116.0 * y) - 16.0
+    a = 500.0 * (x - y)
+    b = 200.0 * (y - z)
+    return cp.stack([L, a, b], axis=-1)
+
+
+def run(shape=(2160, 3840, 3)):
+    rstate = cp.random.RandomState(0)
+    for dtype in [cp.float32, cp.float64]:
+        rgb = rstate.rand(*shape).astype(dtype)
+        print("shape={}, dtype={}".format(shape, rgb.dtype.name))
+        cases = [
+            ("rgb2lab (legacy)", legacy_rgb2lab, (rgb,)),
+            ("rgb2lab", color.rgb2lab, (rgb,)),
+            ("lab2rgb", color.lab2rgb, (color.rgb2lab(rgb),)),
+            ("rgb2luv", color.rgb2luv, (rgb,)),
+            ("rgb2hsv", color.rgb2hsv, (rgb,)),
+            ("rgb2hed", color.rgb2hed, (rgb,)),
+            ("rgb2ycbcr", color.rgb2ycbcr, (rgb,)),
+            (
+                "convert_colorspace(XYZ -> HSV)",
+                color.convert_colorspace,
+                (rgb, "XYZ", "HSV"),
+            ),
+        ]
+        for name, func, args in cases:
+            perf = repeat(func, args, n_repeat=10, n_warmup=1)
+            print(
+                "    {:32s} {:8.3f} ms".format(
+                    name, 1e3 * perf.gpu_times.mean()
+                )
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,60 @@
+"""Time the color difference kernels on a pair of 4k frames.
+
+For each formula, the Lab inputs and the direct sRGB inputs (with the
+conversion to Lab fused in the kernel) are compared to converting the
+frames with ``rgb2lab`` first.
+
+Usage::
+
+    python benchmarks/bench_delta_e.py
+
+"""
+import warnings
+
+import cupy as cp
+
+from cupyimg.skimage import color
+from cupyimg.time import repeat
+
+
+def two_pass(func, rgb1, rgb2):
+    return func(color.rgb2lab(rgb1), color.rgb2lab(rgb2))
+
+
+def run(shape=(2160, 3840, 3)):
+    rstate = cp.random.RandomState(0)
+    warnings.simplefilter("ignore", UserWarning)
+    for dtype in [cp.uint8, cp.float32, cp.float64]:
+        rgb1 = rstate.rand(*shape)
+        rgb2 = rstate.rand(*shape)
+        if dtype == cp.uint8:
+            rgb1 = (255 * rgb1).astype(dtype)
+            rgb2 = (255 * rgb2).astype(dtype)
+        else:
+            rgb1 = rgb1.astype(dtype)
+            rgb2 = rgb2.astype(dtype)
+        lab1 = color.rgb2lab(rgb1)
+        lab2 = color.rgb2lab(rgb2)
+        print("shape={}, dtype={}".format(shape, rgb1.dtype.name))
+        for func in [
+            color.deltaE_cie76,
+            color.deltaE_ciede94,
+            color.deltaE_ciede2000,
+            color.deltaE_cmc,
+        ]:
+            times = []
+            for f, args, kwargs in [
+                (func, (lab1, lab2), {}),
+                (func, (rgb1, rgb2), dict(colorspace="rgb")),
+                (two_pass, (func, rgb1, rgb2), {}),
+            ]:
+                perf = repeat(f, args, kwargs, n_repeat=10, n_warmup=1)
+                times.append(1e3 * perf.gpu_times.mean())
+            print(
+                "    {:18s} lab={:8.3f} ms, rgb={:8.3f} ms, "
+                "rgb2lab + lab={:8.3f} ms".format(func.__name__, *times)
+            )
+
+
+if __name__ == "__main__":
+    run()
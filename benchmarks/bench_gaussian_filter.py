@@ -0,0 +1,56 @@
+"""Compare direct and recursive (IIR) Gaussian filters.
+
+The crossover sigma is where the recursive approximation becomes faster
+than correlating with the sampled Gaussian kernel.
+
+Usage::
+
+    python benchmarks/bench_gaussian_filter.py
+
+"""
+import cupy as cp
+
+from cupyimg.scipy import ndimage as ndi
+from cupyimg.time import repeat
+
+
+def run(
+    shapes=((2048, 2048), (128, 256, 256)),
+    sigmas=(1, 2, 3, 4, 6, 8, 12, 16, 24),
+):
+    rstate = cp.random.RandomState(0)
+    for shape in shapes:
+        x = rstate.rand(*shape).astype(cp.float32)
+        for order in [0, 2]:
+            print(
+                "shape={}, dtype={}, order={}".format(
+                    shape, x.dtype.name, order
+                )
+            )
+            crossover = None
+            for sigma in sigmas:
+                times = {}
+                for method in ["direct", "recursive"]:
+                    perf = repeat(
+                        ndi.gaussian_filter,
+                        (x, sigma),
+                        dict(order=order, method=method),
+                        n_repeat=10,
+                        n_warmup=1,
+                    )
+                    times[method] = perf.gpu_times.mean()
+                if crossover is None and times["recursive"] < times["direct"]:
+                    crossover = sigma
+                print(
+                    "    sigma={:2d}: direct={:8.3f} ms, "
+                    "recursive={:8.3f} ms".format(
+                        sigma,
+                        1e3 * times["direct"],
+                        1e3 * times["recursive"],
+                    )
+                )
+            print("    crossover at sigma {}".format(crossover))
+
+
+if __name__ == "__main__":
+    run()
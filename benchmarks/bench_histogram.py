@@ -0,0 +1,73 @@
+"""Time histograms over uniform bins of 4k frames and 3D point clouds, and
+integer histograms of 16-bit and 32-bit volumes.
+
+The previous implementation of ``histogramdd`` (one ``searchsorted`` per
+dimension followed by ``bincount``) is timed for reference.
+
+Usage::
+
+    python benchmarks/bench_histogram.py
+
+"""
+import cupy as cp
+
+from cupyimg import numpy as cnp
+from cupyimg.numpy.lib import histograms
+from cupyimg.skimage import exposure
+from cupyimg.time import repeat
+
+
+def legacy_histogramdd(sample, bins):
+    edges = [
+        cp.linspace(float(s.min()), float(s.max()), bins + 1)
+        for s in sample.T
+    ]
+    nbin = (bins + 2,) * sample.shape[1]
+    return histograms._histogramdd_search(sample, edges, nbin, None)
+
+
+def run():
+    rstate = cp.random.RandomState(0)
+    for dtype in [cp.float32, cp.float64]:
+        image = rstate.rand(2160, 3840).astype(dtype)
+        for nbins in [256, 4096, 65536]:
+            perf = repeat(
+                cnp.histogram, (image,), dict(bins=nbins), n_repeat=10
+            )
+            print(
+                "histogram dtype={}, nbins={}: {:8.3f} ms".format(
+                    image.dtype.name, nbins, 1e3 * perf.gpu_times.mean()
+                )
+            )
+    sample = rstate.standard_normal((1 << 22, 3))
+    for bins in [16, 64]:
+        times = []
+        for func in [cnp.histogramdd, legacy_histogramdd]:
+            perf = repeat(func, (sample, bins), n_repeat=10, n_warmup=1)
+            times.append(1e3 * perf.gpu_times.mean())
+        print(
+            "histogramdd bins={}: {:8.3f} ms (search: {:8.3f} ms)".format(
+                (bins,) * 3, *times
+            )
+        )
+    for dtype, high in [(cp.uint16, 4096), (cp.int32, 1 << 20)]:
+        volume = rstate.randint(-high // 2, high, (256, 512, 512))
+        volume = cp.clip(volume, 0, None).astype(dtype)
+        for rebin in [False, True]:
+            perf = repeat(
+                exposure.histogram,
+                (volume,),
+                dict(rebin_integers=rebin),
+                n_repeat=10,
+                n_warmup=1,
+            )
+            print(
+                "exposure.histogram dtype={}, rebin_integers={}: "
+                "{:8.3f} ms".format(
+                    volume.dtype.name, rebin, 1e3 * perf.gpu_times.mean()
+                )
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,169 @@
+"""Compare union-find labeling with the previous labeling kernels.
+
+The previous implementation linked neighbors with per-direction index
+arithmetic and numbered the features by sorting the roots followed by a
+binary search per element. It is reproduced here for reference only.
+
+Usage::
+
+    python benchmarks/bench_label.py
+
+"""
+import cupy as cp
+import numpy as np
+
+from cupyimg.scipy import ndimage as ndi
+from cupyimg.time import repeat
+
+
+_legacy_connect = cp.ElementwiseKernel(
+    "raw int32 shape, raw int32 dirs, int32 ndirs, int32 ndim",
+    "raw Y y",
+    """
+    if (y[i] < 0) continue;
+    for (int dr = 0; dr < ndirs; dr++) {
+        int j = i;
+        int rest = j;
+        int stride = 1;
+        int k = 0;
+        for (int dm = ndim-1; dm >= 0; dm--) {
+            int pos = rest % shape[dm] + dirs[dm + dr * ndim];
+            if (pos < 0 || pos >= shape[dm]) {
+                k = -1;
+                break;
+            }
+            k += pos * stride;
+            rest /= shape[dm];
+            stride *= shape[dm];
+        }
+        if (k < 0) continue;
+        if (y[k] < 0) continue;
+        while (1) {
+            while (j != y[j]) { j = y[j]; }
+            while (k != y[k]) { k = y[k]; }
+            if (j == k) break;
+            if (j < k) {
+                int old = atomicCAS( &y[k], (Y)k, (Y)j );
+                if (old == k) break;
+                k = old;
+            }
+            else {
+                int old = atomicCAS( &y[j], (Y)j, (Y)k );
+                if (old == j) break;
+                j = old;
+            }
+        }
+    }
+    """,
+    "bench_legacy_label_connect",
+)
+
+_legacy_count = cp.ElementwiseKernel(
+    "",
+    "raw Y y, raw int32 count",
+    """
+    if (y[i] < 0) continue;
+    int j = i;
+    while (j != y[j]) { j = y[j]; }
+    if (j != i) y[i] = j;
+    else atomicAdd(&count[0], 1);
+    """,
+    "bench_legacy_label_count",
+)
+
+_legacy_labels = cp.ElementwiseKernel(
+    "",
+    "raw Y y, raw int32 count, raw int32 labels",
+    """
+    if (y[i] != i) continue;
+    int j = atomicAdd(&count[1], 1);
+    labels[j] = i;
+    """,
+    "bench_legacy_label_labels",
+)
+
+_legacy_finalize = cp.ElementwiseKernel(
+    "int32 maxlabel",
+    "raw int32 labels, raw Y y",
+    """
+    if (y[i] < 0) {
+        y[i] = 0;
+        continue;
+    }
+    int yi = y[i];
+    int j_min = 0;
+    int j_max = maxlabel - 1;
+    int j = (j_min + j_max) / 2;
+    while (j_min < j_max) {
+        if (yi == labels[j]) break;
+        if (yi < labels[j]) j_max = j - 1;
+        else j_min = j + 1;
+        j = (j_min + j_max) / 2;
+    }
+    y[i] = j + 1;
+    """,
+    "bench_legacy_label_finalize",
+)
+
+
+def legacy_label(x, structure):
+    y = cp.empty(x.shape, dtype=cp.int32)
+    elems = np.where(structure != 0)
+    vecs = [elems[dm] - 1 for dm in range(x.ndim)]
+    offset = vecs[0]
+    for dm in range(1, x.ndim):
+        offset = offset * 3 + vecs[dm]
+    indxs = np.where(offset < 0)[0]
+    dirs = [[vecs[dm][dr] for dm in range(x.ndim)] for dr in indxs]
+    dirs = cp.array(dirs, dtype=np.int32)
+    y_shape = cp.array(y.shape, dtype=np.int32)
+    count = cp.zeros(2, dtype=np.int32)
+    cp.ElementwiseKernel(
+        "X x", "Y y", "if (x == 0) { y = -1; } else { y = i; }", "bench_init"
+    )(x, y)
+    _legacy_connect(y_shape, dirs, indxs.shape[0], x.ndim, y, size=y.size)
+    _legacy_count(y, count, size=y.size)
+    maxlabel = int(count[0])
+    labels = cp.empty(maxlabel, dtype=np.int32)
+    _legacy_labels(y, count, labels, size=y.size)
+    _legacy_finalize(maxlabel, cp.sort(labels), y, size=y.size)
+    return y, maxlabel
+
+
+def run(shapes=((4096, 4096), (256, 256, 256)), fractions=(0.3, 0.5, 0.7)):
+    rstate = cp.random.RandomState(0)
+    for shape in shapes:
+        ndim = len(shape)
+        for connectivity in [1, ndim]:
+            structure = ndi.generate_binary_structure(ndim, connectivity)
+            structure = cp.asnumpy(structure)
+            print("shape={}, connectivity={}".format(shape, connectivity))
+            for fraction in fractions:
+                x = rstate.rand(*shape) < fraction
+                times = {}
+                for name, func, kwargs in [
+                    ("legacy", legacy_label, {}),
+                    ("int32", ndi.label, dict(output=cp.int32)),
+                    ("int64", ndi.label, dict(output=cp.int64)),
+                ]:
+                    perf = repeat(
+                        func,
+                        (x, structure),
+                        kwargs,
+                        n_repeat=5,
+                        n_warmup=1,
+                    )
+                    times[name] = perf.gpu_times.mean()
+                print(
+                    "    fraction={:.1f}: legacy={:8.3f} ms, "
+                    "union-find int32={:8.3f} ms, int64={:8.3f} ms".format(
+                        fraction,
+                        1e3 * times["legacy"],
+                        1e3 * times["int32"],
+                        1e3 * times["int64"],
+                    )
+                )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+"""Compare direct and van Herk/Gil-Werman 1D minimum/maximum filters.
+
+The crossover filter length is where the van Herk/Gil-Werman algorithm
+becomes faster than the direct kernel. It is used to set
+``cupyimg.scipy.ndimage.filters._VAN_HERK_MIN_SIZE``.
+
+Usage::
+
+    python benchmarks/bench_min_max_filter.py
+
+"""
+import cupy as cp
+
+from cupyimg.scipy.ndimage import filters
+from cupyimg.time import repeat
+
+
+def run(shape=(2048, 2048), sizes=(3, 5, 7, 9, 11, 15, 21, 31, 51, 101)):
+    rstate = cp.random.RandomState(0)
+    for dtype in [cp.uint8, cp.float32]:
+        x = (255 * rstate.rand(*shape)).astype(dtype)
+        for axis in range(x.ndim):
+            print(
+                "shape={}, dtype={}, axis={}".format(
+                    shape, x.dtype.name, axis
+                )
+            )
+            crossover = None
+            for size in sizes:
+                times = {}
+                for algorithm in ["direct", "van_herk"]:
+                    perf = repeat(
+                        filters._min_or_max_1d,
+                        (x, size, axis),
+                        dict(func="min", algorithm=algorithm),
+                        n_repeat=10,
+                        n_warmup=1,
+                    )
+                    times[algorithm] = perf.gpu_times.mean()
+                if crossover is None and times["van_herk"] < times["direct"]:
+                    crossover = size
+                print(
+                    "    size={:3d}: direct={:8.3f} ms, "
+                    "van_herk={:8.3f} ms".format(
+                        size, 1e3 * times["direct"], 1e3 * times["van_herk"]
+                    )
+                )
+            print("    crossover at size {}".format(crossover))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,54 @@
+"""Compare sorting and histogram-based rank selection in rank filters.
+
+The crossover footprint size is where the histogram approach becomes faster
+than the sorting approach. It is used to set
+``cupyimg.scipy.ndimage.filters._RANK_HISTOGRAM_MIN_SIZE``.
+
+Usage::
+
+    python benchmarks/bench_rank_filter.py
+
+"""
+import cupy as cp
+
+from cupyimg.scipy.ndimage import filters
+from cupyimg.time import repeat
+
+
+def _median_rank(fs):
+    return fs // 2
+
+
+def run(shape=(1024, 1024), sizes=(3, 5, 7, 9, 11, 15, 21, 31)):
+    rstate = cp.random.RandomState(0)
+    for dtype in [cp.uint8, cp.uint16]:
+        x = rstate.randint(0, 256, shape).astype(dtype)
+        print("shape={}, dtype={}".format(shape, x.dtype.name))
+        crossover = None
+        for size in sizes:
+            times = {}
+            for algorithm in ["sort", "histogram"]:
+                perf = repeat(
+                    filters._rank_filter,
+                    (x, _median_rank),
+                    dict(size=size, algorithm=algorithm),
+                    n_repeat=5,
+                    n_warmup=1,
+                )
+                times[algorithm] = perf.gpu_times.mean()
+            if crossover is None and times["histogram"] < times["sort"]:
+                crossover = size ** x.ndim
+            print(
+                "    size={:3d} ({:5d} elements): sort={:9.3f} ms, "
+                "histogram={:9.3f} ms".format(
+                    size,
+                    size ** x.ndim,
+                    1e3 * times["sort"],
+                    1e3 * times["histogram"],
+                )
+            )
+        print("    crossover at {} footprint elements".format(crossover))
+
+
+if __name__ == "__main__":
+    run()
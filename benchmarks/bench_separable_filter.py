@@ -0,0 +1,59 @@
+"""Compare fused and per-axis separable filters.
+
+The fused kernel filters all axes of a tile held in shared memory, while
+the per-axis path calls a 1D filter once per axis. The tile shapes and the
+largest halo tried by the fused kernel are set by
+``cupyimg.scipy.ndimage._filters_core._SEPARABLE_TILES`` and
+``_SEPARABLE_MAX_HALO_RATIO``.
+
+Usage::
+
+    python benchmarks/bench_separable_filter.py
+
+"""
+import cupy as cp
+
+from cupyimg.scipy import ndimage as ndi
+from cupyimg.time import repeat
+
+
+def gaussian_per_axis(x, sigma):
+    out = x
+    for axis in range(x.ndim):
+        out = ndi.gaussian_filter1d(out, sigma, axis)
+    return out
+
+
+def uniform_per_axis(x, size):
+    out = x
+    for axis in range(x.ndim):
+        out = ndi.uniform_filter1d(out, size, axis)
+    return out
+
+
+def run(shapes=((4096, 4096), (256, 256, 256))):
+    rstate = cp.random.RandomState(0)
+    for shape in shapes:
+        x = rstate.rand(*shape).astype(cp.float32)
+        print("shape={}, dtype={}".format(shape, x.dtype.name))
+        cases = []
+        for sigma in (0.5, 1, 2, 4):
+            name = "gaussian, sigma={}".format(sigma)
+            cases.append((name, ndi.gaussian_filter, gaussian_per_axis, sigma))
+        for size in (3, 5, 9):
+            name = "uniform, size={}".format(size)
+            cases.append((name, ndi.uniform_filter, uniform_per_axis, size))
+        for name, fused, per_axis, arg in cases:
+            times = {}
+            for label, func in [("fused", fused), ("per-axis", per_axis)]:
+                perf = repeat(func, (x, arg), n_repeat=10, n_warmup=1)
+                times[label] = perf.gpu_times.mean()
+            print(
+                "    {:20s}: fused={:8.3f} ms, per-axis={:8.3f} ms".format(
+                    name, 1e3 * times["fused"], 1e3 * times["per-axis"]
+                )
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,56 @@
+"""Time the batched histogram thresholds on a stack of tiles.
+
+Each method is timed on 1024 tiles of 128 x 128 pixels, both for the
+batched implementation and for a loop over the tiles calling the
+corresponding single image function.
+
+Usage::
+
+    python benchmarks/bench_threshold_batch.py
+
+"""
+import cupy as cp
+from skimage import data
+
+from cupyimg.skimage import filters
+from cupyimg.time import repeat
+
+
+def loop(func, tiles):
+    return [func(tile) for tile in tiles]
+
+
+def run(n_tiles=1024, tile_shape=(128, 128)):
+    camera = cp.asarray(data.camera())
+    rstate = cp.random.RandomState(0)
+    i = rstate.randint(0, camera.shape[0] - tile_shape[0], n_tiles)
+    j = rstate.randint(0, camera.shape[1] - tile_shape[1], n_tiles)
+    tiles = cp.stack(
+        [
+            camera[a : a + tile_shape[0], b : b + tile_shape[1]]
+            for a, b in zip(i.tolist(), j.tolist())
+        ]
+    )
+    for dtype in [cp.uint8, cp.float32]:
+        stack = tiles if dtype == cp.uint8 else tiles.astype(dtype) / 255
+        print("tiles={}, dtype={}".format(stack.shape, stack.dtype.name))
+        for method in ["otsu", "yen", "isodata", "li", "minimum", "triangle"]:
+            func = getattr(filters, "threshold_" + method)
+            perf_loop = repeat(loop, (func, stack), n_repeat=3, n_warmup=1)
+            perf = repeat(
+                filters.threshold_batch,
+                (stack, method),
+                n_repeat=10,
+                n_warmup=1,
+            )
+            print(
+                "    {:10s} loop={:9.3f} ms, batch={:8.3f} ms".format(
+                    method,
+                    1e3 * perf_loop.gpu_times.mean(),
+                    1e3 * perf.gpu_times.mean(),
+                )
+            )
+
+
+if __name__ == "__main__":
+    run()
@@ -73,6 +73,35 @@ def convolve_separable(x, w, axes=None, **kwargs):
     for ax, w0 in zip(axes, w):
         if not isinstance(w0, cupy.ndarray) or w0.ndim != 1:
             raise ValueError("w must be a 1d array (or sequence of 1d arrays)")
+
+    axes = tuple(ax % ndim for ax in axes)
+    if len(set(axes)) == len(axes) and set(kwargs) <= {
+        "mode",
+        "cval",
+        "origin",
+        "dtype_mode",
+    }:
+        # filter all axes at once, as a correlation with the flipped weights
+        from cupyimg.scipy.ndimage import _util, filters
+
+        origin = kwargs.get("origin", 0)
+        origins = [0] * ndim
+        for ax, w0 in zip(axes, w):
+            origins[ax] = -origin - (1 - len(w0) % 2)
+        out = filters._correlate1d_fused(
+            x,
+            axes,
+            [w0[::-1] for w0 in w],
+            _util._get_output(None, x),
+            [kwargs.get("mode", "reflect")] * ndim,
+            kwargs.get("cval", 0),
+            origins,
+            kwargs.get("dtype_mode", "float"),
+        )
+        if out is not None:
+            return out
+
+    for ax, w0 in zip(axes, w):
         x = convolve1d(x, w0, axis=ax, **kwargs)
     return x
 
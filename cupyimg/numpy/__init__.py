@@ -18,6 +18,7 @@ from .lib import (
     histogram,
     histogram2d,
     histogramdd,
+    interp,
 )
 
 __all__ = [
@@ -28,6 +29,7 @@ __all__ = [
     "histogram",
     "histogram2d",
     "histogramdd",
+    "interp",
     "ndim",
     "ravel_multi_index",
 ]
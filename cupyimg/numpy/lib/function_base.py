@@ -3,6 +3,7 @@ import numpy as np
 
 from cupyimg._misc import _normalize_axis_indices
 
+from cupyimg import memoize
 from cupyimg import numpy as cnp
 
 
@@ -358,3 +359,170 @@ def gradient(f, *varargs, axis=None, edge_order=1):
         return outvals[0]
     else:
         return outvals
+
+
+@memoize(for_each_device=True)
+def _get_interp_kernel():
+    # The arithmetic (including the handling of non-finite interpolants)
+    # follows NumPy's compiled interp. Explicit rounding prevents the
+    # contraction into a fused multiply-add, which NumPy does not use.
+    code = """
+    const double xv = (double)x;
+    if (n == 1) {
+        // NaN is not propagated in this case
+        if (xv < xp[0]) {
+            y = has_left ? left : fp[0];
+        } else if (xv > xp[0]) {
+            y = has_right ? right : fp[0];
+        } else {
+            y = fp[0];
+        }
+    } else if (isnan(xv)) {
+        y = xv;
+    } else if (xv < xp[0]) {
+        y = has_left ? left : fp[0];
+    } else if (xv > xp[n - 1]) {
+        y = has_right ? right : fp[n - 1];
+    } else if (xv == xp[n - 1]) {
+        y = fp[n - 1];
+    } else {
+        // binary search for j such that xp[j] <= xv < xp[j + 1]
+        ptrdiff_t j = 0, hi = n - 1;
+        while (hi - j > 1) {
+            ptrdiff_t mid = (j + hi) / 2;
+            if (xp[mid] <= xv) {
+                j = mid;
+            } else {
+                hi = mid;
+            }
+        }
+        if (xp[j] == xv) {
+            y = fp[j];
+        } else {
+            const double slope = (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j]);
+            double r = __dadd_rn(__dmul_rn(slope, xv - xp[j]), fp[j]);
+            if (isnan(r)) {
+                r = __dadd_rn(__dmul_rn(slope, xv - xp[j + 1]), fp[j + 1]);
+                if (isnan(r) && fp[j] == fp[j + 1]) {
+                    r = fp[j];
+                }
+            }
+            y = r;
+        }
+    }
+    """
+    return cupy.ElementwiseKernel(
+        "X x, raw float64 xp, raw float64 fp, int64 n, float64 left, "
+        "bool has_left, float64 right, bool has_right",
+        "float64 y",
+        code,
+        "cupyimg_interp",
+    )
+
+
+def interp(x, xp, fp, left=None, right=None, period=None):
+    """
+    One-dimensional linear interpolation.
+
+    Returns the one-dimensional piecewise linear interpolant to a function
+    with given discrete data points (`xp`, `fp`), evaluated at `x`.
+
+    Parameters
+    ----------
+    x : array_like
+        The x-coordinates at which to evaluate the interpolated values.
+    xp : 1-D sequence of floats
+        The x-coordinates of the data points, must be increasing if argument
+        `period` is not specified. Otherwise, `xp` is internally sorted after
+        normalizing the periodic boundaries with ``xp = xp % period``.
+    fp : 1-D sequence of float or complex
+        The y-coordinates of the data points, same length as `xp`.
+    left : optional float or complex corresponding to fp
+        Value to return for `x < xp[0]`, default is `fp[0]`.
+    right : optional float or complex corresponding to fp
+        Value to return for `x > xp[-1]`, default is `fp[-1]`.
+    period : None or float, optional
+        A period for the x-coordinates. This parameter allows the proper
+        interpolation of angular x-coordinates. Parameters `left` and `right`
+        are ignored if `period` is specified.
+
+    Returns
+    -------
+    y : ndarray
+        The interpolated values, same shape as `x`.
+
+    Raises
+    ------
+    ValueError
+        If `xp` and `fp` have different length
+        If `xp` or `fp` are not 1-D sequences
+        If `period == 0`
+
+    Notes
+    -----
+    Each value of `x` is located in `xp` by a binary search within the
+    kernel, so `xp` is not checked to be increasing. The results are
+    meaningless if it is not.
+
+    Examples
+    --------
+    >>> from cupyimg.numpy import interp
+    >>> xp = cupy.asarray([1, 2, 3])
+    >>> fp = cupy.asarray([3, 2, 0])
+    >>> interp(cupy.asarray([0, 1, 1.5, 2.72, 3.14]), xp, fp)
+    array([3.  , 3.  , 2.5 , 0.56, 0.  ])
+    >>> interp(cupy.asarray([3.14]), xp, fp, right=-99.0)
+    array([-99.])
+    """
+    x = cupy.asarray(x)
+    xp = cupy.asarray(xp)
+    fp = cupy.asarray(fp)
+    if xp.ndim != 1 or fp.ndim != 1:
+        raise ValueError("Data points must be 1-D sequences")
+    if xp.shape[0] != fp.shape[0]:
+        raise ValueError("fp and xp are not of the same length")
+    if xp.size == 0:
+        raise ValueError("array of sample points is empty")
+    if fp.dtype.kind == "c":
+        # interpolate the real and imaginary parts separately
+        left_re = left_im = right_re = right_im = None
+        if left is not None:
+            left_re, left_im = complex(left).real, complex(left).imag
+        if right is not None:
+            right_re, right_im = complex(right).real, complex(right).imag
+        real = interp(x, xp, fp.real, left_re, right_re, period)
+        imag = interp(x, xp, fp.imag, left_im, right_im, period)
+        return real + 1j * imag
+    if x.dtype.kind == "c":
+        raise TypeError("x must be real")
+
+    xp = xp.astype(cupy.float64, copy=False)
+    fp = fp.astype(cupy.float64, copy=False)
+    if period is not None:
+        if period == 0:
+            raise ValueError("period must be a non-zero value")
+        period = abs(period)
+        left = None
+        right = None
+        # normalizing periodic boundaries
+        x = x.astype(cupy.float64, copy=False) % period
+        xp = xp % period
+        asort_xp = cupy.argsort(xp)
+        xp = xp[asort_xp]
+        fp = fp[asort_xp]
+        xp = cupy.concatenate((xp[-1:] - period, xp, xp[0:1] + period))
+        fp = cupy.concatenate((fp[-1:], fp, fp[0:1]))
+
+    xp = cupy.ascontiguousarray(xp)
+    fp = cupy.ascontiguousarray(fp)
+    kern = _get_interp_kernel()
+    return kern(
+        x,
+        xp,
+        fp,
+        xp.size,
+        0.0 if left is None else float(left),
+        left is not None,
+        0.0 if right is None else float(right),
+        right is not None,
+    )
@@ -4,7 +4,9 @@ import warnings
 import numpy
 
 import cupy
+from cupyimg import memoize
 from cupyimg import numpy as cnp
+from cupyimg._misc import get_typename
 
 from cupy import core
 
@@ -68,6 +70,185 @@ _weighted_histogram_kernel = core.ElementwiseKernel(
 )
 
 
+_UNIFORM_BLOCK_SIZE = 256
+
+# largest number of bins accumulated in shared memory by each block
+_UNIFORM_MAX_SHARED_BINS = 4096
+
+
+@memoize(for_each_device=True)
+def _get_uniform_histogram_kernel(ndim, x_type, w_type, y_type, shared):
+    """Kernel accumulating a histogram over uniform bins.
+
+    The bin along each of the ``ndim`` dimensions is computed directly from
+    the value, then corrected against the bin edges so that the result is
+    the same as a search in the edges: bin ``j`` holds the values in
+    ``[edges[j], edges[j + 1])`` and the last bin includes its right edge.
+    Values outside of the edges (or NaN) are ignored. When ``shared`` is
+    True, each block accumulates a private histogram in shared memory that
+    is merged into ``y`` by atomics at the end. ``w_type`` is None for an
+    unweighted histogram.
+    """
+    name = "cupyimg_histogram_uniform_{}d".format(ndim)
+    if w_type is None:
+        value = "1"
+        acc_type = "unsigned int" if shared else y_type
+    else:
+        name += "_weighted"
+        value = "w[i]"
+        acc_type = y_type
+    if shared:
+        hist_init = """
+    extern __shared__ unsigned char _smem[];
+    A* hist = reinterpret_cast<A*>(_smem);
+    for (int j = threadIdx.x; j < n_bins; j += blockDim.x) {
+        hist[j] = 0;
+    }
+    __syncthreads();"""
+        hist_merge = """
+    __syncthreads();
+    for (int j = threadIdx.x; j < n_bins; j += blockDim.x) {
+        if (hist[j] != 0) {
+            atomicAdd(&y[j], (Y)hist[j]);
+        }
+    }"""
+    else:
+        name += "_global"
+        hist_init = """
+    A* hist = y;"""
+        hist_merge = ""
+    code = """
+#include "cupy/carray.cuh"
+{preamble}
+typedef {x_type} X;
+typedef {acc_type} A;
+typedef {y_type} Y;
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const X* x, {w_arg}const double* edges, const int* offsets,
+            const double* scale, Y* y, const long long n,
+            const long long n_bins)
+{{
+    {hist_init}
+    for (long long i = (long long)blockIdx.x * blockDim.x + threadIdx.x;
+         i < n; i += (long long)blockDim.x * gridDim.x) {{
+        long long bin = 0;
+        bool inside = true;
+        for (int d = 0; d < {ndim}; d++) {{
+            const double* e = edges + offsets[d];
+            int nb = offsets[d + 1] - offsets[d] - 1;
+            double v = (double)x[i * {ndim} + d];
+            if (!(v >= e[0] && v <= e[nb])) {{
+                inside = false;
+                break;
+            }}
+            double f = (v - e[0]) * scale[d];
+            int b = (f < nb) ? (int)f : nb - 1;
+            // the computed bin may be off by one close to the edges
+            while (b > 0 && v < e[b]) {{
+                b--;
+            }}
+            while (b < nb - 1 && v >= e[b + 1]) {{
+                b++;
+            }}
+            bin = bin * nb + b;
+        }}
+        if (inside) {{
+            atomicAdd(&hist[bin], (A){value});
+        }}
+    }}
+    {hist_merge}
+}}
+""".format(
+        preamble=_preamble,
+        x_type=x_type,
+        w_arg="" if w_type is None else "const {}* w, ".format(w_type),
+        acc_type=acc_type,
+        y_type=y_type,
+        block_size=_UNIFORM_BLOCK_SIZE,
+        name=name,
+        ndim=ndim,
+        hist_init=hist_init,
+        hist_merge=hist_merge,
+        value=value,
+    )
+    return cupy.RawKernel(code, name)
+
+
+@memoize(for_each_device=True)
+def _uniform_max_blocks():
+    """Number of blocks keeping all multiprocessors busy."""
+    n_sm = cupy.cuda.Device().attributes["MultiProcessorCount"]
+    return 8 * n_sm
+
+
+def _uniform_histogram(sample, edges, scale, weights=None):
+    """Histogram of samples over uniform bins.
+
+    Args:
+        sample (cupy.ndarray): Samples, of shape ``(N, D)`` or ``(N,)`` for
+            a single dimension.
+        edges (list of cupy.ndarray): Equally spaced bin edges along each of
+            the ``D`` dimensions.
+        scale (list of float): Number of bins divided by the width of the
+            range along each dimension.
+        weights (cupy.ndarray, optional): Real weights of the ``N`` samples.
+
+    Returns:
+        cupy.ndarray: The flattened histogram, of dtype int64 when
+        ``weights`` is None or integer and float64 otherwise.
+    """
+    sample = cupy.ascontiguousarray(sample)
+    ndim = 1 if sample.ndim == 1 else sample.shape[1]
+    n = sample.shape[0]
+    n_bins = [e.size - 1 for e in edges]
+    n_total = int(numpy.prod(n_bins))
+    if weights is None:
+        w_type = None
+        y_dtype = cupy.int64
+    else:
+        weights = cupy.ascontiguousarray(weights)
+        w_type = get_typename(weights.dtype)
+        if weights.dtype.kind in "bui":
+            y_dtype = cupy.int64
+        else:
+            y_dtype = cupy.float64
+    y = cupy.zeros(n_total, dtype=y_dtype)
+    if n == 0:
+        return y
+    shared = n_total <= _UNIFORM_MAX_SHARED_BINS
+    kern = _get_uniform_histogram_kernel(
+        ndim, get_typename(sample.dtype), w_type, get_typename(y_dtype), shared
+    )
+    offsets = numpy.cumsum([0] + [nb + 1 for nb in n_bins])
+    if shared:
+        if weights is None:
+            shared_mem = 4 * n_total
+        else:
+            shared_mem = y.itemsize * n_total
+    else:
+        shared_mem = 0
+    n_blocks = min(-(-n // _UNIFORM_BLOCK_SIZE), _uniform_max_blocks())
+    args = (
+        cupy.concatenate([e.astype(cupy.float64) for e in edges]),
+        cupy.asarray(offsets, dtype=cupy.int32),
+        cupy.asarray(scale, dtype=cupy.float64),
+        y,
+        numpy.int64(n),
+        numpy.int64(n_total),
+    )
+    if weights is not None:
+        args = (weights,) + args
+    kern(
+        (n_blocks,),
+        (_UNIFORM_BLOCK_SIZE,),
+        (sample,) + args,
+        shared_mem=shared_mem,
+    )
+    return y
+
+
 def _ravel_and_check_weights(a, weights):
     """ Check a and weights have matching shapes, and ravel both """
 
@@ -240,10 +421,7 @@ def histogram(x, bins=10, range=None, weights=None, density=False):
     x, weights = _ravel_and_check_weights(x, weights)
     bin_edges, uniform_bins = _get_bin_edges(x, bins, range)
 
-    if weights is None:
-        y = cupy.zeros(bin_edges.size - 1, dtype="l")
-        _histogram_kernel(x, bin_edges, bin_edges.size, y)
-    else:
+    if weights is not None:
         simple_weights = cupy.can_cast(
             weights.dtype, cupy.double
         ) or cupy.can_cast(weights.dtype, complex)
@@ -253,20 +431,34 @@ def histogram(x, bins=10, range=None, weights=None, density=False):
                 "only weights with dtype that can be cast to float or complex "
                 "are supported"
             )
-        if weights.dtype.kind == "c":
-            y = cupy.zeros(bin_edges.size - 1, dtype=complex)
-            _weighted_histogram_kernel(
-                x, bin_edges, bin_edges.size, weights.real, y.real
-            )
-            _weighted_histogram_kernel(
-                x, bin_edges, bin_edges.size, weights.imag, y.imag
-            )
+
+    if uniform_bins is not None:
+        # equal width bins are found by direct index arithmetic
+        first_edge, last_edge, n_equal_bins = uniform_bins
+        edges = [bin_edges]
+        scale = [n_equal_bins / (float(last_edge) - float(first_edge))]
+        if weights is not None and weights.dtype.kind == "c":
+            y = _uniform_histogram(x, edges, scale, weights.real)
+            y = y + 1j * _uniform_histogram(x, edges, scale, weights.imag)
+        else:
+            y = _uniform_histogram(x, edges, scale, weights)
+    elif weights is None:
+        y = cupy.zeros(bin_edges.size - 1, dtype="l")
+        _histogram_kernel(x, bin_edges, bin_edges.size, y)
+    elif weights.dtype.kind == "c":
+        y = cupy.zeros(bin_edges.size - 1, dtype=complex)
+        _weighted_histogram_kernel(
+            x, bin_edges, bin_edges.size, weights.real, y.real
+        )
+        _weighted_histogram_kernel(
+            x, bin_edges, bin_edges.size, weights.imag, y.imag
+        )
+    else:
+        if weights.dtype.kind in "bui":
+            y = cupy.zeros(bin_edges.size - 1, dtype=int)
         else:
-            if weights.dtype.kind in "bui":
-                y = cupy.zeros(bin_edges.size - 1, dtype=int)
-            else:
-                y = cupy.zeros(bin_edges.size - 1, dtype=float)
-            _weighted_histogram_kernel(x, bin_edges, bin_edges.size, weights, y)
+            y = cupy.zeros(bin_edges.size - 1, dtype=float)
+        _weighted_histogram_kernel(x, bin_edges, bin_edges.size, weights, y)
 
     if density:
         db = cupy.array(cupy.diff(bin_edges), float)
@@ -274,6 +466,44 @@ def histogram(x, bins=10, range=None, weights=None, density=False):
     return y, bin_edges
 
 
+def _histogramdd_search(sample, edges, nbin, weights):
+    """Histogram of ``sample`` over arbitrary ``edges`` for `histogramdd`."""
+    ndim = len(edges)
+    # Compute the bin number each sample falls into.
+    ncount = tuple(
+        # avoid cupy.digitize to work around gh-11022
+        cupy.searchsorted(edges[i], sample[:, i], side="right")
+        for i in _range(ndim)
+    )
+
+    # Using digitize, values that fall on an edge are put in the right bin.
+    # For the rightmost bin, we want values equal to the right edge to be
+    # counted in the last bin, and not as an outlier.
+    for i in _range(ndim):
+        # Find which points are on the rightmost edge.
+        on_edge = sample[:, i] == edges[i][-1]
+        # Shift these points one bin to the left.
+        ncount[i][on_edge] -= 1
+
+    # Compute the sample indices in the flattened histogram matrix.
+    # This raises an error if the array is too large.
+    xy = cnp.ravel_multi_index(ncount, nbin)
+
+    # Compute the number of repetitions in xy and assign it to the
+    # flattened histmat.
+    hist = cupy.bincount(xy, weights, minlength=numpy.prod(nbin))
+
+    # Shape into a proper matrix
+    hist = hist.reshape(nbin)
+
+    # This preserves the (bad) behavior observed in gh-7845, for now.
+    hist = hist.astype(float)  # Note: NumPy uses casting='safe' here too
+
+    # Remove outliers (indices 0 and -1 for each dimension).
+    core = ndim * (slice(1, -1),)
+    return hist[core]
+
+
 def histogramdd(sample, bins=10, range=None, weights=None, density=False):
     """
     Compute the multidimensional histogram of some data.
@@ -349,8 +579,11 @@ def histogramdd(sample, bins=10, range=None, weights=None, density=False):
     nbin = numpy.empty(ndim, int)
     edges = ndim * [None]
     dedges = ndim * [None]
+    scale = ndim * [None]
     if weights is not None:
         weights = cupy.asarray(weights)
+        if weights.shape != (nsamples,):
+            raise ValueError("weights should have one value per sample.")
 
     try:
         nbins = len(bins)
@@ -379,6 +612,7 @@ def histogramdd(sample, bins=10, range=None, weights=None, density=False):
             smin, smax = _get_outer_edges(sample[:, i], range[i])
             num = int(bins[i] + 1)  # synchronize!
             edges[i] = cupy.linspace(smin, smax, num)
+            scale[i] = (num - 1) / (float(smax) - float(smin))
         elif cnp.ndim(bins[i]) == 1:
             edges[i] = cupy.asarray(bins[i])
             if (edges[i][:-1] > edges[i][1:]).any():
@@ -395,39 +629,15 @@ def histogramdd(sample, bins=10, range=None, weights=None, density=False):
         nbin[i] = len(edges[i]) + 1  # includes an outlier on each end
         dedges[i] = cupy.diff(edges[i])
 
-    # Compute the bin number each sample falls into.
-    ncount = tuple(
-        # avoid cupy.digitize to work around gh-11022
-        cupy.searchsorted(edges[i], sample[:, i], side="right")
-        for i in _range(ndim)
-    )
-
-    # Using digitize, values that fall on an edge are put in the right bin.
-    # For the rightmost bin, we want values equal to the right edge to be
-    # counted in the last bin, and not as an outlier.
-    for i in _range(ndim):
-        # Find which points are on the rightmost edge.
-        on_edge = sample[:, i] == edges[i][-1]
-        # Shift these points one bin to the left.
-        ncount[i][on_edge] -= 1
-
-    # Compute the sample indices in the flattened histogram matrix.
-    # This raises an error if the array is too large.
-    xy = cnp.ravel_multi_index(ncount, nbin)
-
-    # Compute the number of repetitions in xy and assign it to the
-    # flattened histmat.
-    hist = cupy.bincount(xy, weights, minlength=numpy.prod(nbin))
-
-    # Shape into a proper matrix
-    hist = hist.reshape(nbin)
-
-    # This preserves the (bad) behavior observed in gh-7845, for now.
-    hist = hist.astype(float)  # Note: NumPy uses casting='safe' here too
-
-    # Remove outliers (indices 0 and -1 for each dimension).
-    core = ndim * (slice(1, -1),)
-    hist = hist[core]
+    if all(sc is not None for sc in scale) and (
+        weights is None or weights.dtype.kind != "c"
+    ):
+        # equal width bins along all dimensions are found by direct index
+        # arithmetic, without outliers
+        hist = _uniform_histogram(sample, edges, scale, weights)
+        hist = hist.reshape(tuple(nbin - 2)).astype(float)
+    else:
+        hist = _histogramdd_search(sample, edges, nbin, weights)
 
     if density:
         # calculate the probability density function
@@ -4,7 +4,7 @@ import pytest
 from cupy.testing import assert_array_equal, assert_array_almost_equal
 from numpy.testing import assert_raises_regex, assert_raises, assert_equal
 
-from cupyimg.numpy.lib import gradient
+from cupyimg.numpy.lib import gradient, interp
 
 
 class TestGradient(object):
@@ -247,3 +247,102 @@ class TestGradient(object):
         assert_raises(ValueError, gradient, cp.arange(1), edge_order=1)
         assert_raises(ValueError, gradient, cp.arange(1), edge_order=2)
         assert_raises(ValueError, gradient, cp.arange(2), edge_order=2)
+
+
+class TestInterp(object):
+    def test_exceptions(self):
+        assert_raises(ValueError, interp, 0, [], [])
+        assert_raises(ValueError, interp, 0, [0], [1, 2])
+        assert_raises(ValueError, interp, 0, [0, 1], [1, 2], period=0)
+        assert_raises(ValueError, interp, 0, [], [], period=360)
+        assert_raises(ValueError, interp, 0, [0], [1, 2], period=360)
+
+    def test_basic(self):
+        x = cp.linspace(0, 1, 5)
+        y = cp.linspace(0, 1, 5)
+        x0 = cp.linspace(0, 1, 50)
+        assert_array_almost_equal(interp(x0, x, y), x0)
+
+    def test_right_left_behavior(self):
+        # Needs range of sizes to test different code paths.
+        # size ==1 is special cased, 1 < size < 5 is linear search, and
+        # size >= 5 goes through local search and possibly binary search.
+        for size in range(1, 10):
+            xp = cp.arange(size, dtype=np.double)
+            yp = cp.ones(size, dtype=np.double)
+            incpts = cp.asarray([-1, 0, size - 1, size], dtype=np.double)
+            decpts = incpts[::-1]
+
+            incres = interp(incpts, xp, yp)
+            decres = interp(decpts, xp, yp)
+            inctgt = cp.asarray([1, 1, 1, 1], dtype=float)
+            dectgt = inctgt[::-1]
+            assert_array_equal(incres, inctgt)
+            assert_array_equal(decres, dectgt)
+
+            incres = interp(incpts, xp, yp, left=0)
+            decres = interp(decpts, xp, yp, left=0)
+            inctgt = cp.asarray([0, 1, 1, 1], dtype=float)
+            dectgt = inctgt[::-1]
+            assert_array_equal(incres, inctgt)
+            assert_array_equal(decres, dectgt)
+
+            incres = interp(incpts, xp, yp, right=2)
+            decres = interp(decpts, xp, yp, right=2)
+            inctgt = cp.asarray([1, 1, 1, 2], dtype=float)
+            dectgt = inctgt[::-1]
+            assert_array_equal(incres, inctgt)
+            assert_array_equal(decres, dectgt)
+
+    def test_scalar_interpolation_point(self):
+        x = cp.linspace(0, 1, 5)
+        y = cp.linspace(0, 1, 5)
+        for x0 in [0, 0.3, np.float32(0.3), np.float64(0.3), np.nan]:
+            assert_array_almost_equal(interp(x0, x, y), np.float64(x0))
+
+    def test_non_finite_behavior(self):
+        # gh-11120 in numpy
+        x = [1, 2, 2.5, 3, 4]
+        xp = [1, 2, 3, 4]
+        fp = [1, 2, np.inf, 4]
+        assert_array_almost_equal(
+            interp(x, xp, fp), [1, 2, np.inf, np.inf, 4]
+        )
+        fp = [1, 2, np.nan, 4]
+        assert_array_almost_equal(interp(x, xp, fp), [1, 2, np.nan, np.nan, 4])
+
+    def test_complex_interp(self):
+        # test complex interpolation
+        x = cp.linspace(0, 1, 5)
+        y = cp.linspace(0, 1, 5) + (1 + cp.linspace(0, 1, 5)) * 1.0j
+        x0 = 0.3
+        y0 = x0 + (1 + x0) * 1.0j
+        assert_array_almost_equal(interp(x0, x, y), y0)
+        # test complex left and right
+        x0 = -1
+        left = 2 + 3.0j
+        assert_array_almost_equal(interp(x0, x, y, left=left), left)
+        x0 = 2.0
+        right = 2 + 3.0j
+        assert_array_almost_equal(interp(x0, x, y, right=right), right)
+
+    def test_period(self):
+        x = [-180, -170, -185, 185, -10, -5, 0, 365]
+        xp = [190, -190, 350, -350]
+        fp = [5, 10, 3, 4]
+        y = [7.5, 5.0, 8.75, 6.25, 3.0, 3.25, 3.5, 3.75]
+        assert_array_almost_equal(interp(x, xp, fp, period=360), y)
+        x = cp.asarray(x, order="F").reshape(2, -1)
+        y = cp.asarray(y, order="C").reshape(2, -1)
+        assert_array_almost_equal(interp(x, xp, fp, period=360), y)
+
+    @pytest.mark.parametrize("dtype", [np.uint8, np.float32, np.float64])
+    def test_vs_numpy(self, dtype):
+        rng = np.random.RandomState(0)
+        xp = np.unique(rng.randint(0, 200, 40)).astype(float)
+        fp = rng.standard_normal(xp.size)
+        x = (250 * rng.rand(30, 20) - 25).clip(0, 255).astype(dtype)
+        expected = np.interp(x, xp, fp, left=-1.0)
+        res = interp(cp.asarray(x), cp.asarray(xp), cp.asarray(fp), left=-1.0)
+        assert res.shape == x.shape
+        assert_array_almost_equal(res, expected, decimal=14)
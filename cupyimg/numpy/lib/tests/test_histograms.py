@@ -0,0 +1,94 @@
+import cupy as cp
+import numpy as np
+import pytest
+from cupy.testing import assert_array_equal, assert_allclose
+
+from cupyimg.numpy.lib import histograms
+
+
+@pytest.mark.parametrize(
+    "dtype", [np.uint8, np.int16, np.int64, np.float32, np.float64]
+)
+@pytest.mark.parametrize("bins", [1, 7, 256, 5000])
+@pytest.mark.parametrize("value_range", [None, (10, 60)])
+def test_histogram_uniform(dtype, bins, value_range):
+    x = np.random.RandomState(0).randint(0, 100, 10000).astype(dtype)
+    if x.dtype.kind == "f":
+        # values on the bin edges
+        x[:1000] = np.linspace(10, 60, 1000)
+    expected, expected_edges = np.histogram(x, bins, range=value_range)
+    hist, edges = histograms.histogram(cp.asarray(x), bins, range=value_range)
+    assert hist.dtype == expected.dtype
+    assert_array_equal(hist, expected)
+    assert_allclose(edges, expected_edges)
+
+
+@pytest.mark.parametrize("wdtype", [np.int32, np.float32, np.complex128])
+@pytest.mark.parametrize("density", [False, True])
+def test_histogram_uniform_weights(wdtype, density):
+    rstate = np.random.RandomState(0)
+    x = rstate.standard_normal(10000)
+    w = (100 * rstate.rand(x.size)).astype(wdtype)
+    if w.dtype.kind == "c":
+        w = w + 1j * rstate.rand(x.size)
+    kwargs = dict(bins=50, range=(-2, 2), density=density)
+    expected, _ = np.histogram(x, weights=w, **kwargs)
+    hist, _ = histograms.histogram(
+        cp.asarray(x), weights=cp.asarray(w), **kwargs
+    )
+    assert_allclose(hist, expected, rtol=1e-6)
+
+
+def test_histogram_uniform_nan():
+    x = cp.asarray([0.5, np.nan, 1.5, 2.5])
+    hist, _ = histograms.histogram(x, bins=3, range=(0, 3))
+    assert_array_equal(hist, [1, 1, 1])
+
+
+@pytest.mark.parametrize("ndim", [1, 2, 3])
+@pytest.mark.parametrize("bins", [5, 40])
+@pytest.mark.parametrize("weighted", [False, True])
+@pytest.mark.parametrize("density", [False, True])
+def test_histogramdd_uniform(ndim, bins, weighted, density):
+    rstate = np.random.RandomState(0)
+    sample = rstate.standard_normal((5000, ndim)).astype(np.float32)
+    sample[:100] = 0.5
+    w = rstate.rand(sample.shape[0]) if weighted else None
+    for value_range in [None, [(-1, 1)] * ndim]:
+        expected, expected_edges = np.histogramdd(
+            sample, bins, range=value_range, weights=w, density=density
+        )
+        hist, edges = histograms.histogramdd(
+            cp.asarray(sample),
+            bins,
+            range=value_range,
+            weights=None if w is None else cp.asarray(w),
+            density=density,
+        )
+        assert hist.dtype == expected.dtype
+        assert_allclose(hist, expected, rtol=1e-6)
+        for e, expected_e in zip(edges, expected_edges):
+            assert_allclose(e, expected_e)
+
+
+def test_histogram2d_mixed_bins():
+    rstate = np.random.RandomState(0)
+    x = rstate.rand(1000)
+    y = rstate.rand(1000)
+    # uniform bins along one axis only use the search
+    bins = [10, np.asarray([0, 0.1, 0.5, 1])]
+    expected = np.histogram2d(x, y, bins)[0]
+    hist = histograms.histogram2d(
+        cp.asarray(x), cp.asarray(y), [10, cp.asarray(bins[1])]
+    )[0]
+    assert_array_equal(hist, expected)
+    expected = np.histogram2d(x, y, (4, 6), density=True)[0]
+    hist = histograms.histogram2d(
+        cp.asarray(x), cp.asarray(y), (4, 6), density=True
+    )[0]
+    assert_allclose(hist, expected)
+
+
+def test_histogramdd_weights_mismatch():
+    with pytest.raises(ValueError):
+        histograms.histogramdd(cp.zeros((10, 2)), weights=cp.ones(9))
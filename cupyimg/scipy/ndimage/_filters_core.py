@@ -228,6 +228,7 @@ def _generate_nd_kernel(
     has_mask=False,
     binary_morphology=False,
     all_weights_nonzero=False,
+    has_changed_flag=False,
 ):
     # Currently this code uses CArray for weights but avoids using CArray for
     # the input data and instead does the indexing itself since it is faster.
@@ -243,6 +244,11 @@ def _generate_nd_kernel(
     if has_mask:
         in_params += ", raw M mask"
     out_params = "Y y"
+    if has_changed_flag:
+        # kernels can record the iteration number "it" in "changed" when any
+        # output value differs from its input (used for early-exit iteration)
+        in_params += ", int32 it"
+        out_params += ", raw int32 changed"
 
     # CArray: remove xstride_{j}=... from string
     size = (
@@ -354,6 +360,8 @@ def _generate_nd_kernel(
         name += "_with_structure"
     if has_mask:
         name += "_with_mask"
+    if has_changed_flag:
+        name += "_with_changed_flag"
     preamble = math_constants_preamble + _CAST_FUNCTION + preamble
     return cupy.ElementwiseKernel(
         in_params,
@@ -364,3 +372,310 @@ def _generate_nd_kernel(
         preamble=preamble,
         options=("--std=c++11",) + options,
     )
+
+
+# Output tiles tried (in order) by the fused separable filter, for each number
+# of tiled axes: the filtered axes and the last (fastest varying) axis. The
+# tile has size 1 along the other axes.
+_SEPARABLE_TILES = {
+    2: ((32, 32), (16, 32)),
+    3: ((8, 8, 32), (8, 8, 16), (4, 8, 16)),
+}
+
+# Shared memory available to a block of the fused separable filter.
+_SEPARABLE_SHARED_MEMORY = 48 * 1024
+
+# Largest ratio between the number of input samples loaded for a tile
+# (including the halo) and the number of outputs in the tile. Beyond it, the
+# redundant loads and operations in the halo outweigh the saved passes. See
+# benchmarks/bench_separable_filter.py.
+_SEPARABLE_MAX_HALO_RATIO = 8
+
+_SEPARABLE_BLOCK_SIZE = 256
+
+
+def _separable_regions(tile, axes, sizes):
+    """Shapes of the regions held in shared memory by the fused filter.
+
+    The first region is the tile extended by the halo of every filtered axis.
+    Each filtered axis (in order) removes its halo from the next region.
+    """
+    region = list(tile)
+    for axis, size in zip(axes, sizes):
+        region[axis] += size - 1
+    regions = [tuple(region)]
+    for axis in axes:
+        region[axis] = tile[axis]
+        regions.append(tuple(region))
+    return regions
+
+
+def _get_separable_tile(ndim, axes, sizes, itemsize):
+    """Returns the tile shape for the fused separable filter.
+
+    ``None`` is returned when no tile of ``_SEPARABLE_TILES`` fits in shared
+    memory with the given filter sizes, or when the halo is too large.
+    """
+    tiled = [a for a in range(ndim) if a in axes or a == ndim - 1]
+    for shape in _SEPARABLE_TILES.get(len(tiled), ()):
+        tile = [1] * ndim
+        for axis, size in zip(tiled, shape):
+            tile[axis] = size
+        tile = tuple(tile)
+        regions = _separable_regions(tile, axes, sizes)
+        n_loaded = _misc._prod(regions[0])
+        if n_loaded > _SEPARABLE_MAX_HALO_RATIO * _misc._prod(tile):
+            continue
+        n_shared = n_loaded + _misc._prod(regions[1]) + sum(sizes)
+        if n_shared * itemsize <= _SEPARABLE_SHARED_MEMORY:
+            return tile
+    return None
+
+
+def _separable_unravel(var, shape):
+    """Code unravelling ``var`` into ``r_0, r_1, ...`` for a constant shape."""
+    ndim = len(shape)
+    code = ["int _r = {};".format(var)]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "int r_{j} = _r % {n}; _r /= {n};".format(j=j, n=shape[j])
+        )
+    code.append("int r_0 = _r;")
+    return "\n        ".join(code)
+
+
+def _separable_ravel(shape):
+    """Code for the flat index of ``r_0, r_1, ...`` in a constant shape."""
+    index = "r_0"
+    for j in range(1, len(shape)):
+        index = "({}) * {} + r_{}".format(index, shape[j], j)
+    return index
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_separable_kernel(
+    tile, axes, sizes, offsets, modes, x_type, y_type, w_type, int_type
+):
+    """Kernel correlating with 1D weights along several axes at once.
+
+    Each block loads a tile of the input and its halo into shared memory and
+    then filters along ``axes`` in order, ping-ponging between two shared
+    buffers, so that the intermediate results never reach global memory.
+
+    As with a sequence of ``correlate1d`` calls, intermediate results are
+    rounded to the output type, and with ``'constant'`` modes the samples
+    past the edges take the value ``cval`` for the pass that reads them.
+    The weights of all axes are concatenated in ``w``.
+    """
+    ndim = len(tile)
+    regions = _separable_regions(tile, axes, sizes)
+    w_offsets = numpy.cumsum((0,) + sizes[:-1])
+    halo = [0] * ndim
+    for axis, offset in zip(axes, offsets):
+        halo[axis] = offset
+
+    def is_constant(axis):
+        return modes[axis] in ["constant", "grid-constant"]
+
+    # global coordinates of the first tile element
+    code = ["idx_t _b = blockIdx.x;"]
+    for j in range(ndim - 1, -1, -1):
+        code.append(
+            "idx_t n_{j} = shape[{j}];\n"
+            "    idx_t nt_{j} = (n_{j} + {t} - 1) / {t};\n"
+            "    idx_t t_{j} = (_b % nt_{j}) * {t}; _b /= nt_{j};".format(
+                j=j, t=tile[j]
+            )
+        )
+    code.append(
+        """
+    W* buf0 = reinterpret_cast<W*>(_smem);
+    W* buf1 = buf0 + {n0};
+    W* ws = buf1 + {n1};
+    for (int e = threadIdx.x; e < {nw}; e += blockDim.x) {{
+        ws[e] = w[e];
+    }}""".format(
+            n0=_misc._prod(regions[0]),
+            n1=_misc._prod(regions[1]),
+            nw=sum(sizes),
+        )
+    )
+
+    # load the tile with its halo, applying the boundary conditions
+    load = []
+    for j in range(ndim):
+        load.append("ix = t_{j} - {h} + r_{j};".format(j=j, h=halo[j]))
+        if j not in axes:
+            # only reached past the end of partial tiles
+            load.append("ix = min(max(ix, (idx_t)0), n_{j} - 1);".format(j=j))
+        elif is_constant(j):
+            load.append(
+                "if ((ix < 0) || (ix >= n_{j})) is_cval = true;".format(j=j)
+            )
+        else:
+            load.append(
+                _util._generate_boundary_condition_ops(
+                    modes[j], "ix", "n_{}".format(j), "idx_t"
+                )
+            )
+        load.append("pos = pos * n_{j} + ix;".format(j=j))
+    code.append(
+        """
+    for (int e = threadIdx.x; e < {n}; e += blockDim.x) {{
+        {unravel}
+        bool is_cval = false;
+        idx_t ix, pos = 0;
+        {load}
+        buf0[e] = is_cval ? cval : cast<W>(x[pos]);
+    }}""".format(
+            n=_misc._prod(regions[0]),
+            unravel=_separable_unravel("e", regions[0]),
+            load="\n        ".join(load),
+        )
+    )
+
+    # filter along each axis in turn
+    for k, axis in enumerate(axes):
+        src = "buf{}".format(k % 2)
+        dst = "buf{}".format((k + 1) % 2)
+        shape_in = regions[k]
+        shape_out = regions[k + 1]
+        stride = _misc._prod(shape_in[axis + 1 :])
+        taps = []
+        for j in range(sizes[k]):
+            taps.append(
+                "wv = ws[{w}]; if (wv != (W)0) "
+                "sum += wv * {src}[i_in + {offset}];".format(
+                    w=w_offsets[k] + j, src=src, offset=j * stride
+                )
+            )
+        if k < len(axes) - 1:
+            # samples past a 'constant' edge of an axis filtered later
+            later = [
+                "(t_{j} - {h} + r_{j} < 0) || (t_{j} - {h} + r_{j} >= n_{j})"
+                "".format(j=j, h=halo[j])
+                for j in axes[k + 1 :]
+                if is_constant(j)
+            ]
+            if later:
+                store = "{dst}[e] = ({cond}) ? cval : (W)cast<Y>(sum);"
+            else:
+                store = "{dst}[e] = (W)cast<Y>(sum);"
+            store = store.format(dst=dst, cond=" || ".join(later))
+        else:
+            inside = " && ".join(
+                "(t_{j} + r_{j} < n_{j})".format(j=j) for j in range(ndim)
+            )
+            index = "t_0 + r_0"
+            for j in range(1, ndim):
+                index = "({}) * n_{} + t_{} + r_{}".format(index, j, j, j)
+            store = "if ({}) y[{}] = cast<Y>(sum);".format(inside, index)
+        code.append(
+            """
+    __syncthreads();
+    for (int e = threadIdx.x; e < {n}; e += blockDim.x) {{
+        {unravel}
+        int i_in = {i_in};
+        W sum = (W)0, wv;
+        {taps}
+        {store}
+    }}""".format(
+                n=_misc._prod(shape_out),
+                unravel=_separable_unravel("e", shape_out),
+                i_in=_separable_ravel(shape_in),
+                taps="\n        ".join(taps),
+                store=store,
+            )
+        )
+
+    name = "cupyimg_ndimage_separable_{}d".format(ndim)
+    source = """
+#include "cupy/carray.cuh"
+#include "cupy/complex.cuh"
+{math_constants}
+{cast}
+typedef {x_type} X;
+typedef {y_type} Y;
+typedef {w_type} W;
+typedef {int_type} idx_t;
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const X* __restrict__ x, Y* __restrict__ y,
+            const W* __restrict__ w, const idx_t* __restrict__ shape,
+            const W cval)
+{{
+    extern __shared__ double _smem[];
+    {code}
+}}
+""".format(
+        math_constants=math_constants_preamble,
+        cast=_CAST_FUNCTION,
+        x_type=x_type,
+        y_type=y_type,
+        w_type=w_type,
+        int_type=int_type,
+        block_size=_SEPARABLE_BLOCK_SIZE,
+        name=name,
+        code="\n    ".join(code),
+    )
+    return cupy.RawKernel(source, name, options=("--std=c++11",))
+
+
+def _run_separable_filter(
+    input, axes, weights, output, modes, cval, origins, weights_dtype, tile
+):
+    """Correlates ``input`` with ``weights[k]`` along ``axes[k]`` in order.
+
+    All axes are processed by a single launch of the kernel from
+    ``_get_separable_kernel`` using the given ``tile`` shape (see
+    ``_get_separable_tile``). ``output`` must be an array.
+    """
+    if input.size == 0:
+        return output
+    weights_dtype = cupy.dtype(weights_dtype)
+    sizes = tuple(int(w.size) for w in weights)
+    offsets = tuple(
+        _util._check_origin(origin, size) + size // 2
+        for origin, size in zip(origins, sizes)
+    )
+    w = cupy.concatenate(
+        [cupy.asarray(w, dtype=weights_dtype).ravel() for w in weights]
+    )
+    input = cupy.ascontiguousarray(input)
+    if output.flags.c_contiguous and not cupy.shares_memory(
+        output, input, "MAY_SHARE_BOUNDS"
+    ):
+        y = output
+    else:
+        y = cupy.empty(output.shape, dtype=output.dtype)
+    int_type = _util._get_inttype(input)
+    index_dtype = cupy.int32 if int_type == "int" else cupy.int64
+    shape = cupy.asarray(input.shape, dtype=index_dtype)
+    kernel = _get_separable_kernel(
+        tile,
+        tuple(axes),
+        sizes,
+        offsets,
+        tuple(modes),
+        _misc.get_typename(input.dtype),
+        _misc.get_typename(output.dtype),
+        _misc.get_typename(weights_dtype),
+        int_type,
+    )
+    regions = _separable_regions(tile, axes, sizes)
+    shared_mem = (
+        _misc._prod(regions[0]) + _misc._prod(regions[1]) + sum(sizes)
+    ) * weights_dtype.itemsize
+    n_tiles = _misc._prod(
+        -(-n // t) for n, t in zip(input.shape, tile)
+    )
+    kernel(
+        (n_tiles,),
+        (_SEPARABLE_BLOCK_SIZE,),
+        (input, y, w, shape, weights_dtype.type(cval)),
+        shared_mem=shared_mem,
+    )
+    if y is not output:
+        output[...] = y
+    return output
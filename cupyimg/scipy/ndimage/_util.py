@@ -119,6 +119,28 @@ def _check_mode(mode):
     return mode
 
 
+_CUSTOM_REDUCTION_KEYS = {
+    "map_expr",
+    "reduce_expr",
+    "post_map_expr",
+    "identity",
+}
+
+
+def _check_custom_reduction(reduction):
+    # custom reductions are dicts mirroring the arguments of ReductionKernel
+    unknown = set(reduction) - _CUSTOM_REDUCTION_KEYS
+    if unknown:
+        raise ValueError(
+            "unknown custom reduction keys: {}".format(sorted(unknown))
+        )
+    if "reduce_expr" not in reduction or "identity" not in reduction:
+        raise ValueError(
+            "custom reductions require 'reduce_expr' and 'identity'"
+        )
+    return reduction
+
+
 def _get_inttype(input):
     # The integer type to use for indices in the input array
     # The indices actually use byte positions and we can't just use
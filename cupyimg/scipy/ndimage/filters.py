@@ -57,9 +57,10 @@ __all__ = [
     "rank_filter",
     "median_filter",
     "percentile_filter",
+    "generic_filter",
 ]
 
-# TODO: grlee77: 'generic_filter1d', 'generic_filter'
+# TODO: grlee77: 'generic_filter1d'
 
 
 def correlate(
@@ -545,6 +546,55 @@ def _run_1d_correlates(
     )
 
 
+def _correlate1d_fused(
+    input, axes, weights, output, modes, cval, origins, dtype_mode
+):
+    """Correlates with ``weights[k]`` along ``axes[k]``, in that order.
+
+    All axes are filtered by a single kernel that keeps tiles of the array in
+    shared memory, giving the same result as calling :func:`correlate1d` for
+    each axis in turn. ``modes`` and ``origins`` have one entry per dimension
+    of ``input`` and ``output`` must be an array.
+
+    Returns ``None`` without filtering when the fused kernel does not apply:
+    fewer than two axes, complex values, or filters that do not fit in the
+    tiles of ``_filters_core._SEPARABLE_TILES``.
+    """
+    if len(axes) < 2 or dtype_mode == "numpy":
+        return None
+    if input.dtype.kind not in "biuf" or output.dtype.kind not in "biuf":
+        return None
+    if any(w.dtype.kind == "c" for w in weights):
+        return None
+    weights_dtype = _util._get_weights_dtype(input, weights[0], dtype_mode)
+    if dtype_mode == "float":
+        # the passes after the first one read the output dtype
+        weights_dtype = cupy.promote_types(
+            weights_dtype,
+            _util._get_weights_dtype(output, weights[0], dtype_mode),
+        )
+    sizes = tuple(w.size for w in weights)
+    tile = _filters_core._get_separable_tile(
+        input.ndim, tuple(axes), sizes, weights_dtype.itemsize
+    )
+    if tile is None:
+        return None
+    integer_output = _util._is_integer_output(output, input)
+    for axis in axes:
+        _util._check_cval(modes[axis], cval, integer_output)
+    return _filters_core._run_separable_filter(
+        input,
+        axes,
+        weights,
+        output,
+        modes,
+        cval,
+        [origins[axis] for axis in axes],
+        weights_dtype,
+        tile,
+    )
+
+
 # TODO: grlee77: incorporate https://github.com/scipy/scipy/pull/7516
 def uniform_filter1d(
     input,
@@ -586,19 +636,199 @@ def uniform_filter1d(
         When the output data type is integral (or when no output is provided
         and input is integral) the results may not perfectly match the results
         from SciPy due to floating-point rounding of intermediate results.
+
+        For larger filter sizes, a running sum is used so that the cost per
+        output does not depend on ``size``. Sums are then accumulated exactly
+        for integer inputs and with compensated double precision otherwise.
     """
-    dtype_weights = numpy.promote_types(input.real.dtype, numpy.float32)
+    return _uniform_filter1d(
+        input, size, axis, output, mode, cval, origin, dtype_mode=dtype_mode
+    )
+
+
+def _uniform_filter1d(
+    input,
+    size,
+    axis=-1,
+    output=None,
+    mode="reflect",
+    cval=0.0,
+    origin=0,
+    dtype_mode="ndimage",
+    algorithm=None,
+):
     if size < 1:
         raise RuntimeError("incorrect filter size")
     output = _util._get_output(output, input)
-    if (size // 2 + origin < 0) or (size // 2 + origin >= size):
+    offset = size // 2 + origin
+    if (offset < 0) or (offset >= size):
         raise ValueError("invalid origin")
+    if algorithm is None:
+        algorithm = "direct"
+        if size >= _RUNNING_SUM_MIN_SIZE and _running_sum_supported(input):
+            algorithm = "running_sum"
+    if algorithm == "running_sum":
+        axis = _misc._normalize_axis_index(axis, input.ndim)
+        return _uniform_filter1d_running_sum(
+            input, size, axis, output, mode, cval, offset
+        )
+    elif algorithm != "direct":
+        raise ValueError("unknown algorithm: {}".format(algorithm))
+    dtype_weights = numpy.promote_types(input.real.dtype, numpy.float32)
     weights = cupy.full((size,), 1 / size, dtype=dtype_weights)
     return correlate1d(
         input, weights, axis, output, mode, cval, origin, dtype_mode=dtype_mode
     )
 
 
+# Filter length above which 1D uniform filters use a running sum. Its cost per
+# sample does not depend on the filter length, but each thread processes a
+# whole chunk of a line serially. The crossover point can be measured with
+# benchmarks/bench_uniform_filter.py.
+_RUNNING_SUM_MIN_SIZE = 12
+
+# Number of consecutive outputs computed by each thread of the running sum.
+# The window sum is recomputed from scratch at the start of each chunk, which
+# also bounds the accumulation of rounding errors.
+_RUNNING_SUM_CHUNK = 256
+
+
+def _running_sum_supported(input):
+    return input.dtype.kind in "biuf"
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_running_sum_kernel(mode, size, offset, chunk, cval, acc, int_type):
+    """Kernel for the running-sum uniform filter.
+
+    Arrays are processed as shape ``(n_pre, n, n_post)`` where the filtered
+    axis has length ``n``. Each thread computes ``chunk`` consecutive outputs
+    of a line. After summing the first window, each further output only adds
+    the sample entering the window and subtracts the one leaving it.
+
+    Integer inputs of up to 32 bits are summed exactly in a ``long long``
+    accumulator (``acc``). Other inputs use a ``double`` accumulator with
+    Neumaier's compensated summation.
+    """
+    boundary = _util._generate_boundary_condition_ops(
+        mode, "ix", "n", int_type
+    )
+    if mode in ["constant", "grid-constant"]:
+        value = "((ix < 0) ? ({acc}){cval} : ({acc})x[base + ix * n_post])"
+    else:
+        value = "(({acc})x[base + ix * n_post])"
+    value = value.format(acc=acc, cval=cval)
+    if acc == "double":
+        add = """
+        {
+            const double t = sum + d;
+            if (fabs(sum) >= fabs(d)) comp += (sum - t) + d;
+            else comp += (d - t) + sum;
+            sum = t;
+        }"""
+        result = "(sum + comp) / {size}.0".format(size=size)
+    else:
+        add = "sum += d;"
+        result = "(double)sum / {size}.0".format(size=size)
+    code = """
+    {int_t} c = i % n_post;
+    {int_t} t = i / n_post;
+    {int_t} start = (t % n_chunks) * {chunk};
+    {int_t} base = (t / n_chunks) * n * n_post + c;
+    {int_t} stop = min(start + {chunk}, ({int_t})n);
+    {int_t} ix;
+    {acc} d, sum = 0, comp = 0;
+    for (int k = 0; k < {size}; k++) {{
+        ix = start + k - {offset};
+        {boundary}
+        d = {value};
+        {add}
+    }}
+    y[base + start * n_post] = cast<Y>({result});
+    for ({int_t} j = start + 1; j < stop; j++) {{
+        ix = j + {size} - 1 - {offset};
+        {boundary}
+        d = {value};
+        ix = j - 1 - {offset};
+        {boundary}
+        d -= {value};
+        {add}
+        y[base + j * n_post] = cast<Y>({result});
+    }}
+    """.format(
+        int_t=int_type,
+        chunk=chunk,
+        size=size,
+        offset=offset,
+        boundary=boundary,
+        value=value,
+        add=add,
+        acc=acc,
+        result=result,
+    )
+    name = "cupyimg_ndimage_uniform_running_sum_{}_{}_{}_{}".format(
+        mode, size, offset, "f" if acc == "double" else "i"
+    )
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    preamble = (
+        _filters_core.math_constants_preamble + _filters_core._CAST_FUNCTION
+    )
+    # scalar arguments share the index type (avoids ambiguous min calls)
+    idx = "int32" if int_type == "int" else "int64"
+    return cupy.ElementwiseKernel(
+        "raw X x, {idx} n, {idx} n_post, {idx} n_chunks".format(idx=idx),
+        "raw Y y",
+        code,
+        name,
+        preamble=preamble,
+        options=("--std=c++11",),
+    )
+
+
+def _uniform_filter1d_running_sum(
+    input, size, axis, output, mode, cval, offset
+):
+    """1D uniform filter with a running sum.
+
+    Only two samples are read per output, independent of ``size``.
+    """
+    if input.size == 0:
+        return output
+    input = cupy.ascontiguousarray(input)
+    n = input.shape[axis]
+    n_pre = _misc._prod(input.shape[:axis])
+    n_post = _misc._prod(input.shape[axis + 1 :])
+    chunk = max(_RUNNING_SUM_CHUNK, size)
+    n_chunks = -(-n // chunk)
+
+    if input.dtype.kind in "biu" and input.dtype.itemsize <= 4:
+        exact = mode not in ["constant", "grid-constant"] or float(
+            cval
+        ).is_integer()
+    else:
+        exact = False
+    acc = "long long" if exact else "double"
+    cval = int(cval) if exact else float(cval)
+
+    # outputs are written to the (n_pre, n, n_post) C-contiguous layout and
+    # may be written before the input samples at the same location are read
+    if output.flags.c_contiguous and not cupy.shares_memory(
+        output, input, "MAY_SHARE_BOUNDS"
+    ):
+        y = output
+    else:
+        y = cupy.empty(output.shape, dtype=output.dtype)
+    int_type = _util._get_inttype(input)
+    kernel = _get_running_sum_kernel(
+        mode, size, offset, chunk, cval, acc, int_type
+    )
+    kernel(input, n, n_post, n_chunks, y, size=n_pre * n_chunks * n_post)
+    if y is not output:
+        output[...] = y
+    return output
+
+
 def uniform_filter(
     input,
     size=3,
@@ -647,6 +877,27 @@ def uniform_filter(
         for ii in range(len(axes))
         if sizes[ii] > 1
     ]
+    # the running sum of large filters is faster than a fused kernel
+    if not _running_sum_supported(input) or all(
+        size < _RUNNING_SUM_MIN_SIZE for _, size, _, _ in axes
+    ):
+        dtype_weights = numpy.promote_types(input.real.dtype, numpy.float32)
+        weights = [
+            cupy.full((size,), 1 / size, dtype=dtype_weights)
+            for _, size, _, _ in axes
+        ]
+        fused = _correlate1d_fused(
+            input,
+            [axis for axis, _, _, _ in axes],
+            weights,
+            output,
+            modes,
+            cval,
+            origins,
+            dtype_mode,
+        )
+        if fused is not None:
+            return fused
     if len(axes) > 0:
         for axis, size, origin, mode in axes:
             uniform_filter1d(
@@ -676,6 +927,7 @@ def gaussian_filter1d(
     truncate=4.0,
     *,
     dtype_mode="ndimage",
+    method="direct",
 ):
     """One-dimensional Gaussian filter along the given axis.
 
@@ -698,6 +950,10 @@ def gaussian_filter1d(
             ``'constant'``. Default is ``0.0``.
         truncate (float): Truncate the filter at this many standard deviations.
             Default is ``4.0``.
+        method (str): ``'direct'``, the default, correlates with the sampled
+            Gaussian kernel, so the cost per sample grows with ``sigma``.
+            ``'recursive'`` uses a recursive (IIR) approximation whose cost
+            per sample does not depend on ``sigma`` (see the note below).
 
     Returns:
         cupy.ndarray: The result of the filtering.
@@ -708,15 +964,33 @@ def gaussian_filter1d(
         When the output data type is integral (or when no output is provided
         and input is integral) the results may not perfectly match the results
         from SciPy due to floating-point rounding of intermediate results.
-    """
-    dtype_weights = numpy.promote_types(input.real.dtype, numpy.float32)
 
+    .. note::
+        ``method='recursive'`` supports orders up to 2 and real-valued inputs.
+        The Gaussian or its derivative is approximated by a sum of damped
+        complex exponentials as proposed by Deriche [1]_ and applied as a
+        causal and an anti-causal fourth order recursion in double precision.
+        The lines are extended by ``truncate * sigma`` samples according to
+        ``mode`` before filtering. The largest absolute difference between
+        the impulse responses of the two methods is about 0.06% of the peak
+        of the direct response for order 0, 0.4% for order 1 and 1% for
+        order 2, independent of ``sigma`` above about 2. The direct method is
+        more accurate and faster for small ``sigma``.
+
+    References:
+        .. [1] R. Deriche. Recursively implementing the Gaussian and its
+           derivatives. INRIA Research Report RR-1893, 1993.
+    """
     sd = float(sigma)
     # make the radius of the filter equal to truncate standard deviations
     lw = int(truncate * sd + 0.5)
-    # Since we are calling correlate, not convolve, revert the kernel
-    weights = _gaussian_kernel1d(sigma, order, lw)[::-1]
-    weights = cupy.asarray(weights, dtype=dtype_weights)
+    if method == "recursive":
+        return _gaussian_filter1d_recursive(
+            input, sd, axis, order, output, mode, cval, lw
+        )
+    elif method != "direct":
+        raise ValueError("unknown method: {}".format(method))
+    weights = _get_gaussian_weights(input, sd, order, lw)
     return correlate1d(
         input, weights, axis, output, mode, cval, 0, dtype_mode=dtype_mode
     )
@@ -732,6 +1006,7 @@ def gaussian_filter(
     truncate=4.0,
     *,
     dtype_mode="ndimage",
+    method="direct",
 ):
     """Multi-dimensional Gaussian filter.
 
@@ -752,6 +1027,8 @@ def gaussian_filter(
             ``'constant'``. Default is ``0.0``.
         truncate (float): Truncate the filter at this many standard deviations.
             Default is ``4.0``.
+        method (str): ``'direct'``, the default, or ``'recursive'``. See
+            :func:`gaussian_filter1d`.
 
     Returns:
         cupy.ndarray: The result of the filtering.
@@ -773,6 +1050,25 @@ def gaussian_filter(
         for ii in range(len(axes))
         if sigmas[ii] > 1e-15
     ]
+    if method == "direct":
+        weights = [
+            _get_gaussian_weights(
+                input, float(sigma), order, int(truncate * float(sigma) + 0.5)
+            )
+            for _, sigma, order, _ in axes
+        ]
+        fused = _correlate1d_fused(
+            input,
+            [axis for axis, _, _, _ in axes],
+            weights,
+            output,
+            modes,
+            cval,
+            [0] * input.ndim,
+            dtype_mode,
+        )
+        if fused is not None:
+            return fused
     if len(axes) > 0:
         for axis, sigma, order, mode in axes:
             gaussian_filter1d(
@@ -785,6 +1081,7 @@ def gaussian_filter(
                 cval,
                 truncate,
                 dtype_mode=dtype_mode,
+                method=method,
             )
             input = output
     else:
@@ -792,6 +1089,14 @@ def gaussian_filter(
     return output
 
 
+def _get_gaussian_weights(input, sigma, order, radius):
+    """Weights for correlating ``input`` with a Gaussian (derivative)."""
+    dtype_weights = numpy.promote_types(input.real.dtype, numpy.float32)
+    # Since we are calling correlate, not convolve, revert the kernel
+    weights = _gaussian_kernel1d(sigma, order, radius)[::-1]
+    return cupy.asarray(weights, dtype=dtype_weights)
+
+
 def _gaussian_kernel1d(sigma, order, radius):
     """
     Computes a 1D Gaussian convolution kernel.
@@ -825,6 +1130,199 @@ def _gaussian_kernel1d(sigma, order, radius):
         return q * phi_x
 
 
+# Parameters (a_0, a_1, b_0, b_1, w_0, w_1, l_0, l_1) of the approximations
+#     sum_j (a_j cos(w_j t) + b_j sin(w_j t)) exp(-l_j t),  t >= 0
+# of the unit-variance Gaussian and of its first and second derivatives, in
+# the form proposed by Deriche. They were fitted by least squares to the
+# continuous functions on 0 <= t <= 10.
+_RECURSIVE_GAUSSIAN_PARAMS = {
+    0: (0.670387, -0.271687, 1.49659, -0.105287,
+        0.631953, 1.997369, 1.785218, 1.724938),
+    1: (-0.257275, 0.25823, -1.81593, 0.383636,
+        0.672001, 2.072318, 1.528859, 1.518088),
+    2: (-0.534368, 0.131662, 1.468339, -0.695308,
+        0.74793, 2.166, 1.242404, 1.315899),
+}
+
+
+@cupy._util.memoize()
+def _get_recursive_gaussian_coefficients(sigma, order, radius):
+    """Coefficients of the recursive Gaussian filter.
+
+    Returns ``[n_0, ..., n_3, m_1, ..., m_4, d_1, ..., d_4]`` for the causal
+    and anti-causal recursions::
+
+        y+[k] = sum_i n_i x[k - i] - sum_i d_i y+[k - i]
+        y-[k] = sum_i m_i x[k + i] - sum_i d_i y-[k + i]
+
+    whose sum ``y+ + y-`` approximates the convolution with the kernel of
+    ``_gaussian_kernel1d(sigma, order, radius)``. The impulse response is
+    scaled to that kernel in the least-squares sense.
+    """
+    a0, a1, b0, b1, w0, w1, l0, l1 = _RECURSIVE_GAUSSIAN_PARAMS[order]
+    poles = []
+    residues = []
+    for a, b, w, l in [(a0, b0, w0, l0), (a1, b1, w1, l1)]:
+        p = numpy.exp((-l + 1j * w) / sigma)
+        poles += [p, p.conjugate()]
+        residues += [(a - 1j * b) / 2, (a + 1j * b) / 2]
+    poles = numpy.asarray(poles)
+    residues = numpy.asarray(residues)
+
+    # partial fractions sum_j r_j / (1 - p_j u) as polynomials in u
+    d = numpy.poly(poles).real
+    n = numpy.zeros(4, dtype=complex)
+    m = numpy.zeros(4, dtype=complex)
+    for j in range(4):
+        others = numpy.poly(numpy.delete(poles, j))
+        n += residues[j] * others
+        m += residues[j] * poles[j] * others
+    n = n.real
+    m = m.real
+    if order % 2:
+        m = -m
+
+    k = numpy.arange(1, radius + 1)
+    h = (residues[:, None] * poles[:, None] ** k).sum(0).real
+    h = numpy.concatenate([(-1) ** order * h[::-1], [residues.sum().real], h])
+    kernel = _gaussian_kernel1d(sigma, order, radius)
+    scale = numpy.dot(h, kernel) / numpy.dot(h, h)
+    return numpy.concatenate([scale * n, scale * m, d[1:]])
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_recursive_gaussian_kernel(mode, int_type):
+    """Kernel for the recursive Gaussian filter.
+
+    Arrays are processed as shape ``(n_pre, n, n_post)`` where the filtered
+    axis has length ``n``, with one thread per line. Both recursions start
+    from the steady state for a constant signal, ``radius`` samples beyond
+    the ends of the line.
+    """
+    boundary = _util._generate_boundary_condition_ops(
+        mode, "ix", "n", int_type
+    )
+    if mode in ["constant", "grid-constant"]:
+        value = "((ix < 0) ? cval : (double)x[base + ix * n_post])"
+    else:
+        value = "((double)x[base + ix * n_post])"
+    code = """
+    {int_t} base = (i / n_post) * n * n_post + i % n_post;
+    {int_t} ix;
+    double x0, x1, x2, x3, x4, y0, y1, y2, y3, y4;
+    double denom = 1.0 + c[8] + c[9] + c[10] + c[11];
+
+    ix = -radius;
+    {boundary}
+    x1 = x2 = x3 = {value};
+    y1 = y2 = y3 = y4 = x1 * (c[0] + c[1] + c[2] + c[3]) / denom;
+    for ({int_t} k = -radius; k < n; k++) {{
+        ix = k;
+        {boundary}
+        x0 = {value};
+        y0 = (c[0] * x0 + c[1] * x1 + c[2] * x2 + c[3] * x3
+              - c[8] * y1 - c[9] * y2 - c[10] * y3 - c[11] * y4);
+        x3 = x2; x2 = x1; x1 = x0;
+        y4 = y3; y3 = y2; y2 = y1; y1 = y0;
+        if (k >= 0) {{
+            tmp[base + k * n_post] = y0;
+        }}
+    }}
+
+    // x[k] is read before y[k] is written, so y may be the same array as x
+    ix = n - 1 + radius;
+    {boundary}
+    x1 = x2 = x3 = x4 = {value};
+    y1 = y2 = y3 = y4 = x1 * (c[4] + c[5] + c[6] + c[7]) / denom;
+    for ({int_t} k = n - 1 + radius; k >= 0; k--) {{
+        y0 = (c[4] * x1 + c[5] * x2 + c[6] * x3 + c[7] * x4
+              - c[8] * y1 - c[9] * y2 - c[10] * y3 - c[11] * y4);
+        ix = k;
+        {boundary}
+        x0 = {value};
+        x4 = x3; x3 = x2; x2 = x1; x1 = x0;
+        y4 = y3; y3 = y2; y2 = y1; y1 = y0;
+        if (k < n) {{
+            y[base + k * n_post] = cast<Y>(tmp[base + k * n_post] + y0);
+        }}
+    }}
+    """.format(
+        int_t=int_type, boundary=boundary, value=value
+    )
+    name = "cupyimg_ndimage_gaussian_recursive_{}".format(mode)
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    preamble = (
+        _filters_core.math_constants_preamble + _filters_core._CAST_FUNCTION
+    )
+    idx = "int32" if int_type == "int" else "int64"
+    return cupy.ElementwiseKernel(
+        "raw X x, raw float64 c, {idx} n, {idx} n_post, {idx} radius, "
+        "float64 cval".format(idx=idx),
+        "raw Y y, raw float64 tmp",
+        code,
+        name,
+        preamble=preamble,
+        options=("--std=c++11",),
+    )
+
+
+def _gaussian_filter1d_recursive(
+    input, sigma, axis, order, output, mode, cval, radius
+):
+    """1D Gaussian filter with a recursive (IIR) approximation.
+
+    The number of operations per sample does not depend on ``sigma``.
+    """
+    if order < 0:
+        raise ValueError("order must be non-negative")
+    if order > 2:
+        raise ValueError("method='recursive' supports orders up to 2")
+    if input.dtype.kind == "c":
+        raise TypeError(
+            "method='recursive' does not support complex-valued inputs"
+        )
+    _util._check_mode(mode)
+    output = _util._get_output(output, input)
+    if input.size == 0:
+        return output
+    axis = _misc._normalize_axis_index(axis, input.ndim)
+    input = cupy.ascontiguousarray(input)
+    n = input.shape[axis]
+    n_pre = _misc._prod(input.shape[:axis])
+    n_post = _misc._prod(input.shape[axis + 1 :])
+    coefficients = cupy.asarray(
+        _get_recursive_gaussian_coefficients(sigma, order, radius)
+    )
+
+    # the kernel supports output being the same array as input, but not
+    # other overlaps
+    if output.flags.c_contiguous and (
+        output is input
+        or not cupy.shares_memory(output, input, "MAY_SHARE_BOUNDS")
+    ):
+        y = output
+    else:
+        y = cupy.empty(output.shape, dtype=output.dtype)
+    tmp = cupy.empty(input.shape, dtype=cupy.float64)
+    int_type = _util._get_inttype(input)
+    kernel = _get_recursive_gaussian_kernel(mode, int_type)
+    kernel(
+        input,
+        coefficients,
+        n,
+        n_post,
+        radius,
+        float(cval),
+        y,
+        tmp,
+        size=n_pre * n_post,
+    )
+    if y is not output:
+        output[...] = y
+    return output
+
+
 def prewitt(
     input,
     axis=-1,
@@ -872,10 +1370,22 @@ def prewitt(
         raise ValueError("invalid axis")
     axis = axis % ndim
 
+    axes = [ii for ii in range(input.ndim) if ii != axis]
+    fused = _correlate1d_fused(
+        input,
+        [axis] + axes,
+        [filt1] + [filt2] * len(axes),
+        output,
+        modes,
+        cval,
+        [0] * ndim,
+        dtype_mode,
+    )
+    if fused is not None:
+        return fused
     correlate1d(
         input, filt1, axis, output, modes[axis], cval, 0, dtype_mode=dtype_mode
     )
-    axes = [ii for ii in range(input.ndim) if ii != axis]
     for ii in axes:
         correlate1d(
             output, filt2, ii, output, modes[ii], cval, 0, dtype_mode=dtype_mode
@@ -930,10 +1440,22 @@ def sobel(
     if axis < -ndim or axis >= ndim:
         raise ValueError("invalid axis")
     axis = axis % ndim
+    axes = [ii for ii in range(input.ndim) if ii != axis]
+    fused = _correlate1d_fused(
+        input,
+        [axis] + axes,
+        [filt1] + [filt2] * len(axes),
+        output,
+        modes,
+        cval,
+        [0] * ndim,
+        dtype_mode,
+    )
+    if fused is not None:
+        return fused
     correlate1d(
         input, filt1, axis, output, modes[axis], cval, 0, dtype_mode=dtype_mode
     )
-    axes = [ii for ii in range(input.ndim) if ii != axis]
     for ii in axes:
         correlate1d(
             output, filt2, ii, output, modes[ii], cval, 0, dtype_mode=dtype_mode
@@ -1484,6 +2006,7 @@ def _min_or_max_1d(
     cval=0.0,
     origin=0,
     func="min",
+    algorithm=None,
 ):
     ftprnt = cupy.ones(size, dtype=bool)
     ftprnt, origin = _filters_core._convert_1d_args(
@@ -1493,6 +2016,19 @@ def _min_or_max_1d(
         input, ftprnt, mode, origin, "footprint"
     )
     offsets = _filters_core._origins_to_offsets(origins, ftprnt.shape)
+    if algorithm is None:
+        algorithm = "direct"
+        if size >= _VAN_HERK_MIN_SIZE and _van_herk_supported(
+            input, mode, cval
+        ):
+            algorithm = "van_herk"
+    if algorithm == "van_herk":
+        axis = _misc._normalize_axis_index(axis, input.ndim)
+        return _min_or_max_1d_van_herk(
+            input, size, axis, output, mode, cval, offsets[axis], func
+        )
+    elif algorithm != "direct":
+        raise ValueError("unknown algorithm: {}".format(algorithm))
     kernel = _get_min_or_max_kernel(
         mode,
         ftprnt.shape,
@@ -1507,6 +2043,144 @@ def _min_or_max_1d(
     )
 
 
+# Filter length above which 1D minimum/maximum filters use the van Herk/Gil-Werman
+# algorithm. Its cost per sample does not depend on the filter length, but it
+# needs two intermediate arrays. The crossover point can be measured with
+# benchmarks/bench_min_max_filter.py.
+_VAN_HERK_MIN_SIZE = 12
+
+
+def _van_herk_supported(input, mode, cval):
+    if input.dtype.kind not in "biuf" or input.dtype.char == "e":
+        return False
+    if mode in ["constant", "grid-constant"]:
+        # the padded values are stored in the input dtype
+        return bool(numpy.asarray(cval).astype(input.dtype) == cval)
+    return True
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_van_herk_kernels(mode, size, offset, func, cval, int_type):
+    """Kernels for the van Herk/Gil-Werman running minimum or maximum.
+
+    The (boundary extended) input line is split into blocks of ``size``
+    samples. The first kernel computes the running minimum (or maximum) from
+    the start of each block (``g``) and from its end (``h``), with one thread
+    per block. Any window of ``size`` samples spans at most two blocks, so the
+    second kernel obtains each output from a single comparison of ``h`` at
+    the start of the window and ``g`` at its end.
+
+    Arrays are processed as shape ``(n_pre, n, n_post)`` where the filtered
+    axis has length ``n``.
+    """
+    boundary = _util._generate_boundary_condition_ops(
+        mode, "ix", "n", int_type
+    )
+    if mode in ["constant", "grid-constant"]:
+        value = "(ix < 0) ? cast<X>({cval}) : x[base_in + ix * n_post]".format(
+            cval=cval
+        )
+    else:
+        value = "x[base_in + ix * n_post]"
+    blocks_code = """
+    {int_t} c = i % n_post;
+    {int_t} t = i / n_post;
+    {int_t} blk = t % n_blocks;
+    {int_t} base_in = (t / n_blocks) * n * n_post + c;
+    {int_t} base_tmp = (t / n_blocks) * n_pad * n_post + c;
+    {int_t} p, ix;
+    X v, acc;
+    for (int k = 0; k < {size}; k++) {{
+        p = blk * {size} + k;
+        ix = p - {offset};
+        {boundary}
+        v = {value};
+        acc = (k == 0) ? v : {func}(acc, v);
+        g[base_tmp + p * n_post] = acc;
+    }}
+    for (int k = {size} - 1; k >= 0; k--) {{
+        p = blk * {size} + k;
+        ix = p - {offset};
+        {boundary}
+        v = {value};
+        acc = (k == {size} - 1) ? v : {func}(acc, v);
+        h[base_tmp + p * n_post] = acc;
+    }}
+    """.format(
+        int_t=int_type,
+        size=size,
+        offset=offset,
+        boundary=boundary,
+        value=value,
+        func=func,
+    )
+    merge_code = """
+    {int_t} c = i % n_post;
+    {int_t} t = i / n_post;
+    {int_t} base = (t / n) * n_pad * n_post + c + (t % n) * n_post;
+    y = cast<Y>({func}(h[base], g[base + {last} * n_post]));
+    """.format(
+        int_t=int_type, func=func, last=size - 1
+    )
+    name = "cupyimg_ndimage_{}_van_herk_{}_{}_{}".format(
+        func, mode, size, offset
+    )
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    preamble = (
+        _filters_core.math_constants_preamble + _filters_core._CAST_FUNCTION
+    )
+    # scalar arguments share the index type (avoids ambiguous min/max calls)
+    idx = "int32" if int_type == "int" else "int64"
+    blocks_kernel = cupy.ElementwiseKernel(
+        "raw X x, {idx} n, {idx} n_post, {idx} n_pad, {idx} n_blocks".format(
+            idx=idx
+        ),
+        "raw X g, raw X h",
+        blocks_code,
+        name + "_blocks",
+        preamble=preamble,
+        options=("--std=c++11",),
+    )
+    merge_kernel = cupy.ElementwiseKernel(
+        "raw X g, raw X h, {idx} n, {idx} n_post, {idx} n_pad".format(idx=idx),
+        "Y y",
+        merge_code,
+        name + "_merge",
+        preamble=preamble,
+        options=("--std=c++11",),
+    )
+    return blocks_kernel, merge_kernel
+
+
+def _min_or_max_1d_van_herk(input, size, axis, output, mode, cval, offset, func):
+    """1D minimum or maximum filter using the van Herk/Gil-Werman algorithm.
+
+    Only 3 comparisons per sample are needed, independent of ``size``.
+    """
+    output = _util._get_output(output, input)
+    if input.size == 0:
+        return output
+    input = cupy.ascontiguousarray(input)
+    n = input.shape[axis]
+    n_pre = _misc._prod(input.shape[:axis])
+    n_post = _misc._prod(input.shape[axis + 1 :])
+    n_blocks = -(-(n + size - 1) // size)
+    n_pad = n_blocks * size
+    g = cupy.empty((n_pre, n_pad, n_post), dtype=input.dtype)
+    h = cupy.empty_like(g)
+    int_type = _util._get_inttype(g)
+    blocks_kernel, merge_kernel = _get_van_herk_kernels(
+        mode, size, offset, func, float(cval), int_type
+    )
+    blocks_kernel(
+        input, n, n_post, n_pad, n_blocks, g, h, size=n_pre * n_blocks * n_post
+    )
+    # the merge kernel only reads g and h, so output may overlap the input
+    merge_kernel(g, h, n, n_post, n_pad, output)
+    return output
+
+
 @cupy._util.memoize(for_each_device=True)
 def _get_min_or_max_kernel(
     mode,
@@ -1718,7 +2392,16 @@ def _rank_filter(
     mode="reflect",
     cval=0.0,
     origin=0,
+    algorithm=None,
 ):
+    """Rank filter (shared implementation of the public rank filters).
+
+    ``algorithm`` may be ``'sort'`` (select the rank after sorting the values
+    in the footprint), ``'histogram'`` (select the rank from a histogram of the
+    footprint values slid along the last axis; only for 8 and 16-bit integer
+    inputs) or None, in which case the histogram is used for integer inputs
+    with footprints larger than ``_RANK_HISTOGRAM_MIN_SIZE``.
+    """
     _, footprint, _ = _filters_core._check_size_footprint_structure(
         input.ndim, size, footprint, None, force_footprint=True
     )
@@ -1742,9 +2425,36 @@ def _rank_filter(
             input, None, footprint, None, output, mode, cval, origins, "max"
         )
     offsets = _filters_core._origins_to_offsets(origins, footprint.shape)
-    kernel = _get_rank_kernel(
-        filter_size, rank, mode, footprint.shape, offsets, float(cval), int_type
+    histogram_supported = (
+        input.dtype.kind in "iu" and input.dtype.itemsize <= 2
     )
+    if algorithm is None:
+        algorithm = "sort"
+        if histogram_supported:
+            min_size = _RANK_HISTOGRAM_MIN_SIZE[input.dtype.itemsize]
+            if filter_size >= min_size:
+                algorithm = "histogram"
+    if algorithm == "histogram":
+        if not histogram_supported:
+            raise ValueError(
+                "histogram-based rank filtering requires an 8 or 16-bit "
+                "integer input"
+            )
+        return _rank_filter_histogram(
+            input, rank, footprint, output, mode, cval, offsets, int_type
+        )
+    elif algorithm == "sort":
+        kernel = _get_rank_kernel(
+            filter_size,
+            rank,
+            mode,
+            footprint.shape,
+            offsets,
+            float(cval),
+            int_type,
+        )
+    else:
+        raise ValueError("unknown algorithm: {}".format(algorithm))
     return _filters_core._call_kernel(
         kernel, input, footprint, output, weights_dtype=bool
     )
@@ -1846,3 +2556,451 @@ def _get_rank_kernel(filter_size, rank, mode, w_shape, offsets, cval, int_type):
         cval,
         preamble=sorter,
     )
+
+
+# Minimum number of footprint elements (by input itemsize) above which the
+# histogram-based rank selection is used by default for integer inputs. The
+# histogram is slid along the last axis, so its cost per pixel is roughly
+# proportional to the extent of the footprint across the last axis, while
+# sorting costs O(n log n) or O(n * rank) with all n values kept in registers
+# (which spill for large footprints).
+# The crossover point can be measured with benchmarks/bench_rank_filter.py.
+_RANK_HISTOGRAM_MIN_SIZE = {1: 64, 2: 256}
+
+# Number of consecutive outputs along the last axis computed by each thread of
+# the sliding histogram kernel. The full footprint is only counted once per
+# run, so longer runs amortize it better but launch fewer threads.
+_RANK_HISTOGRAM_RUN = 64
+
+
+def _rank_filter_histogram(
+    input, rank, footprint, output, mode, cval, offsets, int_type
+):
+    """Rank filter sliding a histogram along the last axis (Huang's method).
+
+    Each thread computes ``_RANK_HISTOGRAM_RUN`` consecutive outputs along
+    the last axis. The histogram of the first footprint is counted in full.
+    Moving one element along the last axis then only removes the values at
+    the first element of each run of the footprint along that axis and adds
+    those past its last element.
+    """
+    fp = cupy.asnumpy(footprint).astype(bool)
+    # footprint elements preceded (followed) by an element outside of it
+    first = fp.copy()
+    first[..., 1:] &= ~fp[..., :-1]
+    last = fp.copy()
+    last[..., :-1] &= ~fp[..., 1:]
+
+    def relative_positions(mask):
+        pos = numpy.stack(numpy.nonzero(mask), axis=1) - numpy.asarray(offsets)
+        return cupy.asarray(pos.astype(numpy.int32).ravel())
+
+    filter_size = int(fp.sum())
+    kernel = _get_rank_histogram_kernel(
+        input.ndim,
+        mode,
+        float(cval),
+        int_type,
+        input.dtype.char,
+        filter_size < (1 << 16),
+    )
+    output = _util._get_output(output, input)
+    needs_temp = cupy.shares_memory(output, input, "MAY_SHARE_BOUNDS")
+    if needs_temp:
+        output, temp = _util._get_output(output.dtype, input), output
+    if input.size:
+        n_last = input.shape[-1]
+        n_runs = -(-n_last // _RANK_HISTOGRAM_RUN)
+        kernel(
+            input,
+            relative_positions(fp),
+            relative_positions(first),
+            relative_positions(last),
+            filter_size,
+            int(first.sum()),
+            rank,
+            output,
+            size=input.size // n_last * n_runs,
+        )
+    if needs_temp:
+        temp[...] = output[...]
+        output = temp
+    return output
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_rank_histogram_kernel(
+    ndim, mode, cval, int_type, dtype_char, small_counts
+):
+    """Sliding histogram kernel of `_rank_filter_histogram`.
+
+    8-bit values are counted into 256 bins plus 16 coarse bins speeding up
+    the search for the bin containing the requested rank.
+
+    16-bit values are counted by their high byte (256 bins plus 16 coarse
+    bins). The low bytes are only counted for the values sharing the high
+    byte of the previous result. That histogram is updated along with the
+    other one, and recounted over the full footprint only when the high byte
+    of the result changes.
+    """
+    dtype = numpy.dtype(dtype_char)
+    nbits = 8 * dtype.itemsize
+    bias = 1 << (nbits - 1) if dtype.kind == "i" else 0
+    count_t = "unsigned short" if small_counts else "int"
+    last = ndim - 1
+
+    code = [
+        "{t} xsize_{j} = x.shape()[{j}], xstride_{j} = x.strides()[{j}];"
+        "".format(t=int_type, j=j)
+        for j in range(ndim)
+    ]
+    code.append(
+        """
+    const {t} n_runs = (xsize_{last} + {run} - 1) / {run};
+    {t} _i = i;
+    const {t} start = (_i % n_runs) * {run};
+    _i /= n_runs;
+    const {t} stop = min(start + {run}, xsize_{last});""".format(
+            t=int_type, last=last, run=_RANK_HISTOGRAM_RUN
+        )
+    )
+    for j in range(last - 1, 0, -1):
+        code.append(
+            "const {t} ind_{j} = _i % xsize_{j}; _i /= xsize_{j};".format(
+                t=int_type, j=j
+            )
+        )
+    if last > 0:
+        code.append("const {t} ind_0 = _i;".format(t=int_type))
+    y_base = "0"
+    for j in range(last):
+        y_base = "({}) * xsize_{} + ind_{}".format(y_base, j, j)
+    code.append(
+        """
+    const {t} y_base = {y_base};
+    const unsigned char* data = (const unsigned char*)&x[0];""".format(
+            t=int_type, y_base=y_base
+        )
+    )
+
+    def visit(positions, n, update):
+        """Loop applying ``update`` to the key of each element in the list.
+
+        The positions are relative to the output at ``ind_{last}``.
+        """
+        inds = []
+        for j in range(ndim):
+            boundary = _util._generate_boundary_condition_ops(
+                mode, "ix_{}".format(j), "xsize_{}".format(j), int_type
+            )
+            inds.append(
+                """
+            {t} ix_{j} = ind_{j} + {p}[k * {ndim} + {j}];
+            {boundary}""".format(
+                    t=int_type, j=j, p=positions, ndim=ndim, boundary=boundary
+                )
+            )
+        value = "*(X*)&data[{}]".format(
+            " + ".join("ix_{0} * xstride_{0}".format(j) for j in range(ndim))
+        )
+        if mode == "constant":
+            cond = " || ".join("(ix_{} < 0)".format(j) for j in range(ndim))
+            value = "(({}) ? cast<X>({}) : {})".format(cond, cval, value)
+        return """
+        for (int k = 0; k < {n}; k++) {{
+            {inds}
+            const unsigned int key = (unsigned int)((int){value} + {bias});
+            {update}
+        }}""".format(
+            n=n, inds="".join(inds), value=value, bias=bias, update=update
+        )
+
+    if nbits == 8:
+        code.append(
+            """
+    {c} hist[256];
+    {c} coarse[16];
+    for (int b = 0; b < 256; b++) hist[b] = 0;
+    for (int b = 0; b < 16; b++) coarse[b] = 0;""".format(
+                c=count_t
+            )
+        )
+        add = "hist[key]++; coarse[key >> 4]++;"
+        remove = "hist[key]--; coarse[key >> 4]--;"
+        select = """
+        int r = rank;
+        unsigned int b = 0;
+        while (r >= coarse[b]) {
+            r -= coarse[b];
+            b++;
+        }
+        b <<= 4;
+        while (r >= hist[b]) {
+            r -= hist[b];
+            b++;
+        }
+        const unsigned int key = b;"""
+    else:
+        code.append(
+            """
+    {c} hist_hi[256];
+    {c} coarse_hi[16];
+    {c} hist_lo[256];
+    {c} coarse_lo[16];
+    for (int b = 0; b < 256; b++) hist_hi[b] = 0;
+    for (int b = 0; b < 16; b++) coarse_hi[b] = 0;
+    // high byte of the values counted in hist_lo (none initially)
+    unsigned int hi_lo = 256;""".format(
+                c=count_t
+            )
+        )
+        add = """
+            hist_hi[key >> 8]++;
+            coarse_hi[key >> 12]++;
+            if ((key >> 8) == hi_lo) {
+                hist_lo[key & 255]++;
+                coarse_lo[(key >> 4) & 15]++;
+            }"""
+        remove = add.replace("++", "--")
+        recount = """
+            if ((key >> 8) == hi_lo) {
+                hist_lo[key & 255]++;
+                coarse_lo[(key >> 4) & 15]++;
+            }"""
+        select = """
+        int r = rank;
+        unsigned int hi = 0;
+        while (r >= coarse_hi[hi]) {{
+            r -= coarse_hi[hi];
+            hi++;
+        }}
+        hi <<= 4;
+        while (r >= hist_hi[hi]) {{
+            r -= hist_hi[hi];
+            hi++;
+        }}
+        if (hi != hi_lo) {{
+            hi_lo = hi;
+            for (int b = 0; b < 256; b++) hist_lo[b] = 0;
+            for (int b = 0; b < 16; b++) coarse_lo[b] = 0;
+            {recount}
+        }}
+        unsigned int lo = 0;
+        while (r >= coarse_lo[lo]) {{
+            r -= coarse_lo[lo];
+            lo++;
+        }}
+        lo <<= 4;
+        while (r >= hist_lo[lo]) {{
+            r -= hist_lo[lo];
+            lo++;
+        }}
+        const unsigned int key = (hi << 8) | lo;""".format(
+            recount=visit("fp", "n_fp", recount)
+        )
+
+    code.append(
+        """
+    {t} ind_{last} = start;
+    {count}
+    while (true) {{
+        {select}
+        y[y_base * xsize_{last} + ind_{last}] = cast<Y>((X)((int)key - {bias}));
+        if (ind_{last} + 1 >= stop) break;
+        {remove}
+        ind_{last}++;
+        {add}
+    }}""".format(
+            t=int_type,
+            last=last,
+            count=visit("fp", "n_fp", add),
+            select=select,
+            bias=bias,
+            remove=visit("first", "n_edge", remove),
+            add=visit("last", "n_edge", add),
+        )
+    )
+
+    name = "cupyimg_ndimage_rank_histogram_{}d_{}_{}".format(
+        ndim, mode, dtype.name
+    )
+    if not small_counts:
+        name += "_int_counts"
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cupy.ElementwiseKernel(
+        "raw X x, raw int32 fp, raw int32 first, raw int32 last, "
+        "int32 n_fp, int32 n_edge, int32 rank",
+        "raw Y y",
+        "\n".join(code),
+        name,
+        preamble=_filters_core._CAST_FUNCTION,
+        options=("--std=c++11",),
+    )
+
+
+def generic_filter(
+    input,
+    function,
+    size=None,
+    footprint=None,
+    output=None,
+    mode="reflect",
+    cval=0.0,
+    origin=0,
+):
+    """Compute a multi-dimensional filter using the provided CUDA function.
+
+    Unlike SciPy, ``function`` cannot be a Python callable. It is compiled
+    into the same kernel as the other footprint-based filters, so that the
+    boundary modes, footprints and origins behave identically. It is given
+    either as a string or as a dict (see ``function`` below). For example,
+    the mean of each neighborhood is given by::
+
+        dict(reduce_expr="a + b", post_map_expr="a / count", identity=0)
+
+    Args:
+        input (cupy.ndarray): The input array.
+        function (str or dict): If a string, the body of the CUDA device
+            function ``double f(const double* buffer, int filter_size)``,
+            which is called with the ``filter_size`` values within the
+            footprint (converted to ``double``) and returns the filtered
+            value. If a dict, a reduction with the keys ``'map_expr'``
+            (mapping each value ``x`` at position ``pos`` of the footprint,
+            defaults to ``'x'``), ``'reduce_expr'`` (combining two mapped
+            values ``a`` and ``b``), ``'post_map_expr'`` (computing the
+            filtered value from the reduced value ``a`` and the number of
+            values ``count``, defaults to ``'a'``) and ``'identity'``, as
+            in :func:`labeled_comprehension`. The reduction does not need a
+            buffer and should be preferred for large footprints.
+        size (int or sequence of int): One of ``size`` or ``footprint`` must be
+            provided. If ``footprint`` is given, ``size`` is ignored. Otherwise
+            ``footprint = cupy.ones(size)`` with ``size`` automatically made to
+            match the number of dimensions in ``input``.
+        footprint (cupy.ndarray): a boolean array which specifies which of the
+            elements within this shape will get passed to the filter function.
+        output (cupy.ndarray, dtype or None): The array in which to place the
+            output. Default is is same dtype as the input.
+        mode (str): The array borders are handled according to the given mode
+            (``'reflect'``, ``'constant'``, ``'nearest'``, ``'mirror'``,
+            ``'wrap'``). Default is ``'reflect'``.
+        cval (scalar): Value to fill past edges of input if mode is
+            ``'constant'``. Default is ``0.0``.
+        origin (int or sequence of int): The origin parameter controls the
+            placement of the filter, relative to the center of the current
+            element of the input. Default of 0 is equivalent to
+            ``(0,)*input.ndim``.
+
+    Returns:
+        cupy.ndarray: The result of the filtering.
+
+    .. seealso:: :func:`scipy.ndimage.generic_filter`
+    """
+    if isinstance(function, dict):
+        _util._check_custom_reduction(function)
+        # a hashable key for the kernel cache
+        function = tuple(sorted(function.items()))
+    elif not isinstance(function, str):
+        raise TypeError(
+            "function must be a string of CUDA code or a dict describing a "
+            "reduction (Python callables are not supported)"
+        )
+    if input.dtype.kind == "c":
+        raise TypeError("Complex type not supported")
+    _, footprint, _ = _filters_core._check_size_footprint_structure(
+        input.ndim, size, footprint, None, force_footprint=True
+    )
+    origins, int_type = _filters_core._check_nd_args(
+        input, footprint, mode, origin, "footprint"
+    )
+    if footprint.size == 0:
+        return cupy.zeros_like(input)
+    filter_size = int(cupy.count_nonzero(footprint))
+    if filter_size == 0:
+        raise RuntimeError("footprint has no nonzero elements")
+    offsets = _filters_core._origins_to_offsets(origins, footprint.shape)
+    kernel = _get_generic_filter_kernel(
+        function,
+        filter_size,
+        mode,
+        footprint.shape,
+        offsets,
+        float(cval),
+        int_type,
+    )
+    return _filters_core._call_kernel(
+        kernel, input, footprint, output, weights_dtype=bool
+    )
+
+
+def _escape_braces(code):
+    return code.replace("{", "{{").replace("}", "}}")
+
+
+def _double_literal(value):
+    value = float(value)
+    if numpy.isnan(value):
+        return "CUDART_NAN"
+    if numpy.isinf(value):
+        return "CUDART_INF" if value > 0 else "-CUDART_INF"
+    return repr(value)
+
+
+@cupy._util.memoize(for_each_device=True)
+def _get_generic_filter_kernel(
+    function, filter_size, mode, w_shape, offsets, cval, int_type
+):
+    """Kernel applying a user function or reduction to each footprint.
+
+    A string ``function`` is the body of a device function called with a
+    buffer of the values within the footprint. Otherwise ``function`` holds
+    the items of a reduction dict, which is evaluated on the fly without a
+    buffer.
+    """
+    if isinstance(function, str):
+        preamble = """
+__device__ double generic_filter_function(const double* buffer,
+                                          int filter_size)
+{{
+{body}
+}}""".format(
+            body=function
+        )
+        pre = "double buffer[{}];\nint iv = 0;".format(filter_size)
+        found = "buffer[iv++] = cast<double>({value});"
+        post = "y = cast<Y>(generic_filter_function(buffer, {}));".format(
+            filter_size
+        )
+    else:
+        reduction = dict(function)
+        preamble = ""
+        pre = "double a = {};\nint pos = 0;".format(
+            _double_literal(reduction["identity"])
+        )
+        # braces are doubled since ``found`` is formatted by
+        # _generate_nd_kernel
+        found = """
+        const double x = cast<double>({{value}});
+        const double b = ({map_expr});
+        a = ({reduce_expr});
+        pos++;""".format(
+            map_expr=_escape_braces(reduction.get("map_expr", "x")),
+            reduce_expr=_escape_braces(reduction["reduce_expr"]),
+        )
+        post = """
+        const unsigned long long count = {};
+        y = cast<Y>(({}));""".format(
+            filter_size, reduction.get("post_map_expr", "a")
+        )
+    return _filters_core._generate_nd_kernel(
+        "generic_{}".format(filter_size),
+        pre,
+        found,
+        post,
+        mode,
+        w_shape,
+        int_type,
+        offsets,
+        cval,
+        preamble=preamble,
+    )
@@ -1,10 +1,9 @@
-import warnings
-
 import cupy
 from cupy import core
 import numpy
 
-from cupyimg import _misc
+from cupyimg import memoize
+from cupyimg.scipy.ndimage import _util
 
 
 __all__ = [
@@ -22,9 +21,10 @@ __all__ = [
     "center_of_mass",
     "histogram",
     "label",
+    "find_objects",
 ]
 
-# TODO: grlee77: 'find_objects', 'watershed_ift'
+# TODO: grlee77: 'watershed_ift'
 
 
 def label(input, structure=None, output=None, *, greyscale_mode=False):
@@ -37,7 +37,8 @@ def label(input, structure=None, output=None, *, greyscale_mode=False):
             None, structure is automatically generated with a squared
             connectivity equal to one.
         output (cupy.ndarray, dtype or None): The array in which to place the
-            output.
+            output. Labels are computed as int32, or as int64 for arrays with
+            more than ``2**31 - 1`` elements and for 64-bit integer outputs.
         greyscale_mode (boolean): If True, the function will behave like
             ``skimage.measure.label`` where differening non-background values
             will receive different labels.
@@ -87,13 +88,28 @@ def label(input, structure=None, output=None, *, greyscale_mode=False):
         maxlabel = 0 if input.item() == 0 else 1  # synchronize
         output[...] = maxlabel
     else:
-        if output.dtype != numpy.int32:
-            y = cupy.empty(input.shape, numpy.int32)
+        label_dtype = _get_label_dtype(input.size)
+        if output.dtype.kind in "iu" and output.dtype.itemsize == 8:
+            label_dtype = numpy.int64
+        if (
+            output.dtype.kind in "iu"
+            and output.dtype.itemsize == numpy.dtype(label_dtype).itemsize
+            and output.flags.c_contiguous
+        ):
+            # labels are non-negative, so unsigned outputs can be used as-is
+            y = output.view(label_dtype)
         else:
-            y = output
+            y = cupy.empty(input.shape, label_dtype)
         maxlabel = _label(input, structure, y, greyscale_mode=greyscale_mode)
-        if output.dtype != numpy.int32:
-            output[...] = y[...]
+        if y.data.ptr != output.data.ptr:
+            if (
+                output.dtype.kind in "iu"
+                and maxlabel > numpy.iinfo(output.dtype).max
+            ):
+                raise RuntimeError(
+                    "insufficient bit-depth in requested output type"
+                )
+            output[...] = y
 
     if caller_provided_output:
         return maxlabel
@@ -111,40 +127,56 @@ def _generate_binary_structure(rank, connectivity):
     return output <= connectivity
 
 
+def _get_label_dtype(size):
+    """Label dtype needed to hold a flat index into an array of this size."""
+    if size > numpy.iinfo(numpy.int32).max:
+        return numpy.int64
+    return numpy.int32
+
+
 def _label(x, structure, y, greyscale_mode=False):
+    """Union-find labeling of ``x`` into the C-contiguous array ``y``.
+
+    ``y`` must be an int32 or int64 array large enough to hold a flat index
+    into ``x``. Returns the number of features.
+    """
+    if y.dtype not in (numpy.int32, numpy.int64):
+        raise ValueError("y must have int32 or int64 dtype")
+    if y.dtype == numpy.int32 and y.size > numpy.iinfo(numpy.int32).max:
+        raise ValueError("int64 labels are required for this many elements")
+    if not y.flags.c_contiguous:
+        raise ValueError("y must be C-contiguous")
+
+    # Only the neighbors preceding the center in raster order are merged. The
+    # other half is covered by the neighbors themselves (the structure is
+    # centrosymmetric).
     elems = numpy.where(structure != 0)
     vecs = [elems[dm] - 1 for dm in range(x.ndim)]
     offset = vecs[0]
     for dm in range(1, x.ndim):
         offset = offset * 3 + vecs[dm]
     indxs = numpy.where(offset < 0)[0]
-    dirs = [[vecs[dm][dr] for dm in range(x.ndim)] for dr in indxs]
-    dirs = cupy.array(dirs, dtype=numpy.int32)
-    ndirs = indxs.shape[0]
-    y_shape = cupy.array(y.shape, dtype=numpy.int32)
-    count = cupy.zeros(2, dtype=numpy.int32)
+    dirs = tuple(
+        tuple(int(vecs[dm][dr]) for dm in range(x.ndim)) for dr in indxs
+    )
+
+    int_t = "int" if y.dtype == numpy.int32 else "long long"
     _kernel_init()(x, y)
-    try:
-        int_t = int_types[y.dtype.char]
-    except KeyError:
-        raise ValueError("y must have int32, uint16, uint32 or uint64 dtype")
-    if int_t != "int":
-        raise NotImplementedError(
-            "Currently only 32-bit integer case is implemented"
-        )
-    if greyscale_mode:
-        _kernel_connect(True, int_t)(
-            x, y_shape, dirs, ndirs, x.ndim, y, size=y.size
-        )
-    else:
-        _kernel_connect(False, int_t)(
-            y_shape, dirs, ndirs, x.ndim, y, size=y.size
-        )
-    _kernel_count()(y, count, size=y.size)
-    maxlabel = int(count[0])  # synchronize
-    labels = cupy.empty(maxlabel, dtype=numpy.int32)
-    _kernel_labels()(y, count, labels, size=y.size)
-    _kernel_finalize()(maxlabel, cupy.sort(labels), y, size=y.size)
+    if dirs:
+        merge = _get_label_merge_kernel(dirs, greyscale_mode, int_t)
+        if greyscale_mode:
+            merge(x, y, size=y.size)
+        else:
+            merge(y, size=y.size)
+
+    # A root is the element with the smallest flat index of its component, so
+    # a cumulative sum over the roots numbers the features in raster order of
+    # their first element, exactly as scipy.ndimage.label does.
+    roots = cupy.empty(y.size, dtype=y.dtype)
+    _kernel_compress()(y, roots)
+    cupy.cumsum(roots, out=roots)
+    maxlabel = int(roots[-1])  # synchronize
+    _kernel_finalize()(roots, y)
     return maxlabel
 
 
@@ -152,6 +184,39 @@ def _label(x, structure, y, greyscale_mode=False):
 Elementwise kernels for use by label
 """
 
+_label_preamble = """
+__device__ int _uf_atomic_cas(int* address, int compare, int val) {
+    return atomicCAS(address, compare, val);
+}
+
+__device__ long long _uf_atomic_cas(long long* address, long long compare,
+                                    long long val) {
+    return (long long)atomicCAS((unsigned long long*)address,
+                                (unsigned long long)compare,
+                                (unsigned long long)val);
+}
+
+// Merge the trees containing j and k, always linking the larger root below
+// the smaller one so that the root of each tree stays its first element.
+template<typename T>
+__device__ void _uf_union(T* y, T j, T k) {
+    while (1) {
+        while (j != y[j]) { j = y[j]; }
+        while (k != y[k]) { k = y[k]; }
+        if (j == k) break;
+        if (j < k) {
+            T old = _uf_atomic_cas(&y[k], k, j);
+            if (old == k) break;
+            k = old;
+        } else {
+            T old = _uf_atomic_cas(&y[j], j, k);
+            if (old == j) break;
+            j = old;
+        }
+    }
+}
+"""
+
 
 def _kernel_init():
     return core.ElementwiseKernel(
@@ -162,139 +227,218 @@ def _kernel_init():
     )
 
 
-def _kernel_connect(greyscale_mode=False, int_t="int"):
-    """
+@memoize(for_each_device=True)
+def _get_label_merge_kernel(dirs, greyscale_mode=False, int_t="int"):
+    """Kernel uniting each element with its preceding neighbors.
+
     Notes
     -----
-    dirs is a (n_neig//2, ndim) of relative offsets to the neighboring voxels.
-    For example, for structure = np.ones((3, 3)):
-        dirs = array([[-1, -1],
-                      [-1,  0],
-                      [-1,  1],
-                      [ 0, -1]], dtype=int32)
-    (Implementation assumes a centro-symmetric structure)
-    ndirs = dirs.shape[0]
-
-    In the dirs loop below, there is a loop over the ndim neighbors:
-        Here, index j corresponds to the current pixel and k is the current
-        neighbor location.
+    ``dirs`` is a tuple of the relative offsets to the neighbors preceding the
+    center of the structuring element in raster order. For example, for
+    ``structure = np.ones((3, 3))``::
+
+        dirs = ((-1, -1), (-1, 0), (-1, 1), (0, -1))
+
+    The offsets are unrolled into the kernel, so the coordinates of each
+    element are computed only once and only the bounds of the axes a neighbor
+    moves along are checked.
     """
-    in_params = "raw int32 shape, raw int32 dirs, int32 ndirs, int32 ndim"
+    ndim = len(dirs[0])
+    code = [
+        "if (y[i] < 0) continue;",
+        "{int_t}* labels = &y[0];".format(int_t=int_t),
+        "const {int_t} idx = i;".format(int_t=int_t),
+        "{int_t} _i = i;".format(int_t=int_t),
+    ]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "const {int_t} ind_{j} = _i % y.shape()[{j}];"
+            " _i /= y.shape()[{j}];".format(int_t=int_t, j=j)
+        )
+    code.append("const {int_t} ind_0 = _i;".format(int_t=int_t))
+    # element strides of the C-contiguous label array
+    code.append("const {int_t} s_{j} = 1;".format(int_t=int_t, j=ndim - 1))
+    for j in range(ndim - 2, -1, -1):
+        code.append(
+            "const {int_t} s_{j} = s_{jp} * y.shape()[{jp}];".format(
+                int_t=int_t, j=j, jp=j + 1
+            )
+        )
+
     if greyscale_mode:
         # greyscale mode -> different values receive different labels
-        x_condition = "if (x[k] != x[j]) continue;"
-        in_params = "raw X x, " + in_params
+        x_condition = " && x[k] == x[i]"
     else:
         # binary mode -> all non-background voxels treated the same
         x_condition = ""
+    for d in dirs:
+        conds = []
+        offset = []
+        for j, dj in enumerate(d):
+            if dj < 0:
+                conds.append("ind_{j} > 0".format(j=j))
+                offset.append(" - s_{j}".format(j=j))
+            elif dj > 0:
+                conds.append("ind_{j} < y.shape()[{j}] - 1".format(j=j))
+                offset.append(" + s_{j}".format(j=j))
+        code.append(
+            """
+        if ({conds}) {{
+            const {int_t} k = idx{offset};
+            if (labels[k] >= 0{x_condition}) _uf_union(labels, idx, k);
+        }}""".format(
+                conds=" && ".join(conds),
+                int_t=int_t,
+                offset="".join(offset),
+                x_condition=x_condition,
+            )
+        )
 
-    # Note: atomicCAS is implemented for int, unsigned short, unsigned int, and
-    # unsigned long long
-
-    code = """
-        if (y[i] < 0) continue;
-        for (int dr = 0; dr < ndirs; dr++) {{
-            {int_t} j = i;
-            {int_t} rest = j;
-            {int_t} stride = 1;
-            {int_t} k = 0;
-            for (int dm = ndim-1; dm >= 0; dm--) {{
-                int pos = rest % shape[dm] + dirs[dm + dr * ndim];
-                if (pos < 0 || pos >= shape[dm]) {{
-                    k = -1;
-                    break;
-                }}
-                k += pos * stride;
-                rest /= shape[dm];
-                stride *= shape[dm];
-            }}
-            if (k < 0) continue;
-            if (y[k] < 0) continue;
-            {x_condition}
-            while (1) {{
-                while (j != y[j]) {{ j = y[j]; }}
-                while (k != y[k]) {{ k = y[k]; }}
-                if (j == k) break;
-                if (j < k) {{
-                    {int_t} old = atomicCAS( &y[k], (Y)k, (Y)j );
-                    if (old == k) break;
-                    k = old;
-                }}
-                else {{
-                    {int_t} old = atomicCAS( &y[j], (Y)j, (Y)k );
-                    if (old == j) break;
-                    j = old;
-                }}
-            }}
-        }}
-        """.format(
-        x_condition=x_condition, int_t=int_t
-    )
-
+    in_params = "raw X x" if greyscale_mode else ""
+    name = "cupyimg_nd_label_merge_{}d".format(ndim)
+    if greyscale_mode:
+        name += "_grey"
+    if int_t != "int":
+        name += "_i64"
     return core.ElementwiseKernel(
-        in_params, "raw Y y", code, "cupyimg_nd_label_connect",
+        in_params,
+        "raw Y y",
+        "\n".join(code),
+        name,
+        preamble=_label_preamble,
     )
 
 
-def _kernel_count():
+def _kernel_compress():
     return core.ElementwiseKernel(
         "",
-        "raw Y y, raw int32 count",
+        "raw Y y, Y roots",
         """
-        if (y[i] < 0) continue;
-        int j = i;
+        Y j = y[i];
+        if (j < 0) {
+            roots = 0;
+            continue;
+        }
+        roots = (j == i);
         while (j != y[j]) { j = y[j]; }
-        if (j != i) y[i] = j;
-        else atomicAdd(&count[0], 1);
+        y[i] = j;
         """,
-        "cupyimg_nd_label_count",
-    )
-
-
-def _kernel_labels():
-    return core.ElementwiseKernel(
-        "",
-        "raw Y y, raw int32 count, raw int32 labels",
-        """
-        if (y[i] != i) continue;
-        int j = atomicAdd(&count[1], 1);
-        labels[j] = i;
-        """,
-        "cupyimg_nd_label_labels",
+        "cupyimg_nd_label_compress",
     )
 
 
 def _kernel_finalize():
     return core.ElementwiseKernel(
-        "int32 maxlabel",
-        "raw int32 labels, raw Y y",
-        """
-        if (y[i] < 0) {
-            y[i] = 0;
-            continue;
-        }
-        int yi = y[i];
-        int j_min = 0;
-        int j_max = maxlabel - 1;
-        int j = (j_min + j_max) / 2;
-        while (j_min < j_max) {
-            if (yi == labels[j]) break;
-            if (yi < labels[j]) j_max = j - 1;
-            else j_min = j + 1;
-            j = (j_min + j_max) / 2;
-        }
-        y[i] = j + 1;
-        """,
+        "raw Y roots",
+        "Y y",
+        "y = (y < 0) ? 0 : roots[y];",
         "cupyimg_nd_label_finalize",
     )
 
 
-int_types = {
-    "i": "int",
-    "H": "unsigned short",
-    "I": "unsigned int",
-    "L": "unsigned long long",
-}
+def find_objects(input, max_label=0):
+    """Find objects in a labeled array.
+
+    Args:
+        input (cupy.ndarray): Array of integers containing the labels of
+            the objects. Values of 0 (or below) are taken as background.
+        max_label (int): Maximum label to be searched for in `input`. If
+            ``max_label`` is not given (or less than 1), the positions of all
+            objects are returned.
+
+    Returns:
+        object_slices (list of tuples): A list of tuples, with each tuple
+            containing N slices (with N the dimension of the input array).
+            Slices correspond to the minimal parallelepiped that contains the
+            object. If a number is missing, None is returned instead of a
+            slice.
+
+    .. note::
+
+        The bounding boxes are computed on the device with atomic min/max
+        reductions. Only the (``max_label``, ``2 * input.ndim``) array of
+        box corners is transferred to the host to build the slices.
+
+    .. warning::
+
+        This function synchronizes the device.
+
+    .. seealso:: :func:`scipy.ndimage.find_objects`
+    """
+    if not isinstance(input, cupy.ndarray):
+        raise TypeError("input must be cupy.ndarray")
+    if input.dtype.kind == "c":
+        raise TypeError("Complex type not supported")
+    if max_label < 1:
+        max_label = int(input.max()) if input.size else 0  # synchronize
+    max_label = int(max_label)
+    if max_label < 1:
+        return []
+    if input.ndim == 0:
+        lab = int(input)
+        return [() if lab == i + 1 else None for i in range(max_label)]
+
+    ndim = input.ndim
+    # columns 0:ndim hold the start and ndim:2*ndim the stop of each box
+    bbox = cupy.empty((max_label, 2 * ndim), dtype=cupy.int32)
+    bbox[:, :ndim] = numpy.iinfo(numpy.int32).max
+    bbox[:, ndim:] = 0
+    if input.size:
+        kern = _get_find_objects_kernel(ndim, _util._get_inttype(input))
+        kern(input, max_label, bbox, size=input.size)
+
+    bbox = cupy.asnumpy(bbox)
+    found = bbox[:, 0] != numpy.iinfo(numpy.int32).max
+    return [
+        tuple(
+            slice(int(start), int(stop))
+            for start, stop in zip(box[:ndim], box[ndim:])
+        )
+        if f
+        else None
+        for box, f in zip(bbox, found)
+    ]
+
+
+@memoize(for_each_device=True)
+def _get_find_objects_kernel(ndim, int_type):
+    """Kernel growing the bounding box of the label of each element.
+
+    The current bound is checked before issuing the atomic, so that most
+    elements of a large object do not touch the box in global memory at all.
+    """
+    code = ["{int_t} _i = i;".format(int_t=int_type)]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "const int ind_{j} = _i % input.shape()[{j}];"
+            " _i /= input.shape()[{j}];".format(j=j)
+        )
+    code.append("const int ind_0 = _i;")
+    code.append(
+        """
+        const long long lab = (long long)input[i];
+        if (lab <= 0 || lab > max_label) continue;
+        int* box = &bbox[(lab - 1) * {nbox}];""".format(
+            nbox=2 * ndim
+        )
+    )
+    for j in range(ndim):
+        code.append(
+            """
+        if (ind_{j} < box[{j}]) atomicMin(&box[{j}], ind_{j});
+        if (ind_{j} >= box[{k}]) atomicMax(&box[{k}], ind_{j} + 1);""".format(
+                j=j, k=ndim + j
+            )
+        )
+    name = "cupyimg_nd_find_objects_{}d".format(ndim)
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cupy.ElementwiseKernel(
+        "raw X input, int64 max_label",
+        "raw int32 bbox",
+        "\n".join(code),
+        name,
+    )
 
 
 def _safely_castable_to_int(dt):
@@ -306,94 +450,394 @@ def _safely_castable_to_int(dt):
     return safe
 
 
-_ndimage_variance_kernel = core.ElementwiseKernel(
-    "T input, R labels, raw X index, uint64 size, raw float64 mean",
-    "raw float64 out",
-    """
-    for (ptrdiff_t j = 0; j < size; j++) {
-      if (labels == index[j]) {
-        atomicAdd(&out[j], (input - mean[j]) * (input - mean[j]));
-        break;
-      }
-    }
-    """,
-)
+def _segment_labels(labels, index):
+    """Map `labels` to segment numbers and find the segment of each index.
 
+    Small non-negative integer labels are used as segment numbers directly.
+    Other labels are remapped to the position of their value in the sorted
+    unique labels.
 
-_ndimage_sum_kernel = core.ElementwiseKernel(
-    "T input, R labels, raw X index, uint64 size",
-    "raw float64 out",
+    Returns:
+        tuple: ``(segments, n_segments, idxs)`` where `segments` has the
+        shape of `labels` and `idxs` holds the segment of each value in
+        `index`. Values of `index` not found in `labels` are mapped to the
+        last segment, ``n_segments - 1``, which never receives any element.
     """
-    for (ptrdiff_t j = 0; j < size; j++) {
-      if (labels == index[j]) {
-        atomicAdd(&out[j], input);
-        break;
-      }
-    }
-    """,
-)
+    if labels.size:
+        min_label = int(labels.min())  # synchronize
+        max_label = int(labels.max())  # synchronize
+    else:
+        min_label = max_label = 0
+
+    if (
+        _safely_castable_to_int(labels.dtype) or labels.dtype.kind == "b"
+    ) and (min_label >= 0 and max_label <= labels.size):
+        segments = labels
+        n_segments = max_label + 2
+        idxs = index.astype(cupy.int64)
+        found = (idxs == index) & (idxs >= 0) & (idxs <= max_label)
+    else:
+        unique_labels, segments = cupy.unique(labels, return_inverse=True)
+        segments = segments.reshape(labels.shape)
+        n_segments = unique_labels.size + 1
+        idxs = cupy.searchsorted(unique_labels, index)
+        idxs[idxs >= unique_labels.size] = 0
+        found = unique_labels[idxs] == index
+    idxs = cupy.where(found, idxs, n_segments - 1)
+    return segments, n_segments, idxs
+
+
+# statistics computed by _labeled_reduce
+_LABELED_STATS = {
+    "count",
+    "sum",
+    "mean",
+    "variance",
+    "min",
+    "max",
+    "min_position",
+    "max_position",
+    "center_of_mass",
+}
+
+_KEY_SIGN = numpy.uint64(1 << 63)
+_UINT64_MAX = numpy.iinfo(numpy.uint64).max
 
 
-def _ndimage_sum_kernel_2(input, labels, index, sum_val, batch_size=4):
-    for i in range(0, index.size, batch_size):
-        matched = labels == index[i : i + batch_size].reshape(
-            (-1,) + (1,) * input.ndim
+def _labeled_reduce(input, labels, index, stats):
+    """Segmented reduction of `input` over the regions listed in `index`.
+
+    All statistics are computed for all labels at once by (at most) two
+    passes over the data, independently of the number of labels.
+
+    Args:
+        input (cupy.ndarray): Values to reduce.
+        labels (cupy.ndarray): Labels of the same shape as `input`.
+        index (cupy.ndarray): Labels for which to compute the statistics.
+        stats (sequence of str): Any of ``"count"``, ``"sum"``, ``"mean"``,
+            ``"variance"``, ``"min"``, ``"max"``, ``"min_position"``,
+            ``"max_position"`` and ``"center_of_mass"``.
+
+    Returns:
+        dict: The requested statistics, with the shape of `index` (and an
+        extra trailing axis of length ``input.ndim`` for
+        ``"center_of_mass"``). Labels without any element get a count,
+        sum, minimum, maximum and position of 0.
+    """
+    stats = set(stats)
+    unknown = stats - _LABELED_STATS
+    if unknown:
+        raise ValueError("unknown statistics: {}".format(sorted(unknown)))
+    segments, n_segments, idxs = _segment_labels(labels, index)
+
+    do_sum = bool(stats & {"sum", "mean", "variance", "center_of_mass"})
+    do_min = bool(stats & {"min", "min_position"})
+    do_max = bool(stats & {"max", "max_position"})
+    do_com = "center_of_mass" in stats
+    do_var = "variance" in stats
+    do_minpos = "min_position" in stats
+    do_maxpos = "max_position" in stats
+    if input.dtype.kind == "f":
+        key_kind = "f"
+    elif input.dtype.kind == "u":
+        key_kind = "u"
+    else:
+        key_kind = "i"
+    # input may be a broadcast view, so the element count is what matters
+    int_type = "int" if input.size < (1 << 31) else "ptrdiff_t"
+    ndim = input.ndim if do_com else 0
+
+    # only segments of the requested labels are reduced
+    wanted = cupy.zeros(n_segments, dtype=bool)
+    wanted[idxs] = True
+    wanted[-1] = False
+
+    count = cupy.zeros(n_segments, dtype=cupy.uint64)
+    args = [input, segments, wanted, count]
+    if do_sum:
+        sums = cupy.zeros(n_segments, dtype=cupy.float64)
+        args.append(sums)
+    if do_min:
+        minkey = cupy.full(n_segments, _UINT64_MAX, dtype=cupy.uint64)
+        args.append(minkey)
+    if do_max:
+        maxkey = cupy.zeros(n_segments, dtype=cupy.uint64)
+        args.append(maxkey)
+    if do_com:
+        com = cupy.zeros((n_segments, ndim), dtype=cupy.float64)
+        args.append(com)
+    if input.size:
+        kern = _get_labeled_reduce_kernel(
+            do_sum, do_min, do_max, ndim, key_kind, int_type
+        )
+        kern(*args, size=input.size)
+
+    if do_var or do_minpos or do_maxpos:
+        args = [input, segments, wanted]
+        if do_var:
+            seg_mean = sums / cupy.maximum(count, 1)
+            args.append(seg_mean)
+        if do_minpos:
+            args.append(minkey)
+        if do_maxpos:
+            args.append(maxkey)
+        if do_var:
+            ssd = cupy.zeros(n_segments, dtype=cupy.float64)
+            args.append(ssd)
+        if do_minpos:
+            minpos = cupy.full(n_segments, _UINT64_MAX, dtype=cupy.uint64)
+            args.append(minpos)
+        if do_maxpos:
+            maxpos = cupy.full(n_segments, _UINT64_MAX, dtype=cupy.uint64)
+            args.append(maxpos)
+        if input.size:
+            kern = _get_labeled_reduce2_kernel(
+                do_var, do_minpos, do_maxpos, key_kind, int_type
+            )
+            kern(*args, size=input.size)
+
+    count = count[idxs]
+    found = count > 0
+    result = {}
+    if "count" in stats:
+        result["count"] = count.astype(cupy.int64)
+    if "sum" in stats:
+        result["sum"] = sums[idxs]
+    if "mean" in stats:
+        result["mean"] = sums[idxs] / count
+    if do_var:
+        result["variance"] = ssd[idxs] / count
+    if "min" in stats:
+        vals = _decode_keys(minkey[idxs], input.dtype)
+        result["min"] = cupy.where(found, vals, 0).astype(input.dtype)
+    if "max" in stats:
+        vals = _decode_keys(maxkey[idxs], input.dtype)
+        result["max"] = cupy.where(found, vals, 0).astype(input.dtype)
+    if do_minpos:
+        result["min_position"] = cupy.where(found, minpos[idxs], 0).astype(
+            cupy.int64
         )
-        sum_axes = tuple(range(1, 1 + input.ndim))
-        sum_val[i : i + batch_size] = cupy.where(matched, input, 0).sum(
-            axis=sum_axes
+    if do_maxpos:
+        result["max_position"] = cupy.where(found, maxpos[idxs], 0).astype(
+            cupy.int64
         )
-    return sum_val
+    if do_com:
+        result["center_of_mass"] = com[idxs] / sums[idxs][..., cupy.newaxis]
+    return result
 
 
-_ndimage_mean_kernel = core.ElementwiseKernel(
-    "T input, R labels, raw X index, uint64 size",
-    "raw float64 out, raw uint64 count",
-    """
-    for (ptrdiff_t j = 0; j < size; j++) {
-      if (labels == index[j]) {
-        atomicAdd(&out[j], input);
-        atomicAdd(&count[j], 1);
-        break;
-      }
-    }
-    """,
-)
+def _decode_keys(keys, dtype):
+    """Values of `dtype` from the order-preserving keys of `_seg_key`."""
+    if dtype.kind == "u":
+        return keys.astype(dtype)
+    elif dtype.kind == "f":
+        negative = (keys & _KEY_SIGN) == 0
+        bits = cupy.where(negative, ~keys, keys ^ _KEY_SIGN)
+        return bits.view(cupy.float64).astype(dtype)
+    return (keys ^ _KEY_SIGN).view(cupy.int64).astype(dtype)
 
 
-def _ndimage_mean_kernel_2(
-    input, labels, index, batch_size=4, return_count=False
-):
-    sum_val = cupy.empty_like(index, dtype=cupy.float64)
-    count = cupy.empty_like(index, dtype=cupy.uint64)
-    for i in range(0, index.size, batch_size):
-        matched = labels == index[i : i + batch_size].reshape(
-            (-1,) + (1,) * input.ndim
+_labeled_reduce_preamble = """
+#define FULL_MASK 0xffffffffu
+
+__device__ double _seg_warp_sum(double v) {
+    for (int o = 16; o > 0; o >>= 1) v += __shfl_down_sync(FULL_MASK, v, o);
+    return v;
+}
+
+__device__ unsigned long long _seg_warp_min(unsigned long long v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = min(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+__device__ unsigned long long _seg_warp_max(unsigned long long v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = max(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+// Keys whose unsigned order matches the order of the values, so that the
+// minimum and maximum of any dtype can be found with 64-bit integer atomics.
+__device__ unsigned long long _seg_key(double v) {
+    unsigned long long b = (unsigned long long)__double_as_longlong(v);
+    return (b >> 63) ? ~b : (b | 0x8000000000000000ULL);
+}
+
+__device__ unsigned long long _seg_key(long long v) {
+    return (unsigned long long)v ^ 0x8000000000000000ULL;
+}
+
+__device__ unsigned long long _seg_key(unsigned long long v) {
+    return v;
+}
+"""
+
+_key_casts = {"f": "double", "i": "long long", "u": "unsigned long long"}
+
+
+# Reads the segment of element `i`. Sets ``uniform`` when all lanes of the
+# warp are active and share the same segment, in which case warp-level
+# reductions are used so that a single atomic per warp is issued.
+_segment_code = """
+        const long long s = (long long)seg[i];
+        const unsigned int active = __activemask();
+        const long long s0 = __shfl_sync(active, s, __ffs(active) - 1);
+        const bool uniform = (active == FULL_MASK
+                              && __all_sync(FULL_MASK, s == s0));
+        const bool lane0 = (threadIdx.x & 31) == 0;
+        if (!wanted[s]) continue;"""
+
+
+@memoize(for_each_device=True)
+def _get_labeled_reduce_kernel(do_sum, do_min, do_max, ndim, key_kind, int_t):
+    """Kernel accumulating the count, sum, extrema and weighted coordinates.
+
+    Extrema are accumulated as the order-preserving keys of `_seg_key`. When
+    ``ndim > 0``, ``com[s * ndim + d]`` accumulates the sum of the values
+    weighted by their coordinate along axis ``d``.
+    """
+    code = [_segment_code]
+    if do_sum:
+        code.append("const double v = (double)input[i];")
+    if do_min or do_max:
+        code.append(
+            "const unsigned long long key = _seg_key(({})input[i]);".format(
+                _key_casts[key_kind]
+            )
         )
-        mean_axes = tuple(range(1, 1 + input.ndim))
-        count[i : i + batch_size] = matched.sum(axis=mean_axes)
-        sum_val[i : i + batch_size] = cupy.where(matched, input, 0).sum(
-            axis=mean_axes
+    code.append(
+        """
+        {
+            unsigned long long c = uniform ? 32 : 1;
+            if (!uniform || lane0) atomicAdd(&count[s], c);
+        }"""
+    )
+    if do_sum:
+        code.append(
+            """
+        {
+            double t = uniform ? _seg_warp_sum(v) : v;
+            if (!uniform || lane0) atomicAdd(&sums[s], t);
+        }"""
         )
-    if return_count:
-        return sum_val / count, count
-    return sum_val / count
+    if do_min:
+        code.append(
+            """
+        {
+            unsigned long long t = uniform ? _seg_warp_min(key) : key;
+            if (!uniform || lane0) atomicMin(&minkey[s], t);
+        }"""
+        )
+    if do_max:
+        code.append(
+            """
+        {
+            unsigned long long t = uniform ? _seg_warp_max(key) : key;
+            if (!uniform || lane0) atomicMax(&maxkey[s], t);
+        }"""
+        )
+    if ndim:
+        code.append("{int_t} _i = i;".format(int_t=int_t))
+        for j in range(ndim - 1, 0, -1):
+            code.append(
+                "const double ind_{j} = _i % input.shape()[{j}];"
+                " _i /= input.shape()[{j}];".format(j=j)
+            )
+        code.append("const double ind_0 = _i;")
+        for j in range(ndim):
+            code.append(
+                """
+        {{
+            double t = uniform ? _seg_warp_sum(v * ind_{j}) : v * ind_{j};
+            if (!uniform || lane0) atomicAdd(&com[s * {ndim} + {j}], t);
+        }}""".format(
+                    j=j, ndim=ndim
+                )
+            )
 
+    out_params = ["raw uint64 count"]
+    if do_sum:
+        out_params.append("raw float64 sums")
+    if do_min:
+        out_params.append("raw uint64 minkey")
+    if do_max:
+        out_params.append("raw uint64 maxkey")
+    if ndim:
+        out_params.append("raw float64 com")
+    name = "cupyimg_nd_labeled_reduce_{}{}{}_{}d_{}".format(
+        int(do_sum), int(do_min), int(do_max), ndim, key_kind
+    )
+    if int_t == "ptrdiff_t":
+        name += "_i64"
+    return core.ElementwiseKernel(
+        "raw T input, raw L seg, raw bool wanted",
+        ", ".join(out_params),
+        "\n".join(code),
+        name,
+        preamble=_labeled_reduce_preamble,
+    )
+
+
+@memoize(for_each_device=True)
+def _get_labeled_reduce2_kernel(
+    do_var, do_minpos, do_maxpos, key_kind, int_t
+):
+    """Kernel for the statistics depending on the result of the first pass.
 
-def _mean_driver(input, labels, index, return_count=False, use_kern=False):
-    if use_kern:
-        return _ndimage_mean_kernel_2(
-            input, labels, index, return_count=return_count
+    Accumulates the sum of squared deviations from the mean of each segment
+    and the first (flat) position at which the extrema occur.
+    """
+    code = [_segment_code]
+    if do_var:
+        code.append(
+            """
+        {
+            const double d = (double)input[i] - mean[s];
+            double t = uniform ? _seg_warp_sum(d * d) : d * d;
+            if (!uniform || lane0) atomicAdd(&ssd[s], t);
+        }"""
+        )
+    if do_minpos or do_maxpos:
+        code.append(
+            "const unsigned long long key = _seg_key(({})input[i]);".format(
+                _key_casts[key_kind]
+            )
+        )
+    if do_minpos:
+        code.append(
+            "if (key == minkey[s])"
+            " atomicMin(&minpos[s], (unsigned long long)i);"
+        )
+    if do_maxpos:
+        code.append(
+            "if (key == maxkey[s])"
+            " atomicMin(&maxpos[s], (unsigned long long)i);"
         )
 
-    out = cupy.zeros_like(index, cupy.float64)
-    count = cupy.zeros_like(index, dtype=cupy.uint64)
-    sum, count = _ndimage_mean_kernel(
-        input, labels, index, index.size, out, count
+    in_params = ["raw T input", "raw L seg", "raw bool wanted"]
+    out_params = []
+    if do_var:
+        in_params.append("raw float64 mean")
+        out_params.append("raw float64 ssd")
+    if do_minpos:
+        in_params.append("raw uint64 minkey")
+        out_params.append("raw uint64 minpos")
+    if do_maxpos:
+        in_params.append("raw uint64 maxkey")
+        out_params.append("raw uint64 maxpos")
+    name = "cupyimg_nd_labeled_reduce2_{}{}{}_{}".format(
+        int(do_var), int(do_minpos), int(do_maxpos), key_kind
+    )
+    if int_t == "ptrdiff_t":
+        name += "_i64"
+    return core.ElementwiseKernel(
+        ", ".join(in_params),
+        ", ".join(out_params),
+        "\n".join(code),
+        name,
+        preamble=_labeled_reduce_preamble,
     )
-    if return_count:
-        return sum / count, count
-    return sum / count
 
 
 def variance(input, labels=None, index=None):
@@ -422,26 +866,6 @@ def variance(input, labels=None, index=None):
             "".format(input.dtype.type)
         )
 
-    use_kern = False
-    # There is constraints on types because of atomicAdd() in CUDA.
-    if input.dtype not in [
-        cupy.int32,
-        cupy.float16,
-        cupy.float32,
-        cupy.float64,
-        cupy.uint32,
-        cupy.uint64,
-        cupy.ulonglong,
-    ]:
-        warnings.warn(
-            "Using the slower implmentation as "
-            "cupyx.scipy.ndimage.sum supports int32, float16, "
-            "float32, float64, uint32, uint64 as data types"
-            "for the fast implmentation",
-            _misc.PerformanceWarning,
-        )
-        use_kern = True
-
     def calc_var_with_intermediate_float(input):
         vals_c = input - input.mean()
         count = vals_c.size
@@ -471,24 +895,7 @@ def variance(input, labels=None, index=None):
                 (input[labels == index]).var().astype(cupy.float64, copy=False)
             )
 
-    mean_val, count = _mean_driver(input, labels, index, True, use_kern)
-    if use_kern:
-        new_axis = (..., *(cupy.newaxis for _ in range(input.ndim)))
-        return (
-            cupy.where(
-                labels[None, ...] == index[new_axis],
-                cupy.square(input - mean_val[new_axis]),
-                0,
-            ).sum(tuple(range(1, input.ndim + 1)))
-            / count
-        )
-    out = cupy.zeros_like(index, dtype=cupy.float64)
-    return (
-        _ndimage_variance_kernel(
-            input, labels, index, index.size, mean_val, out
-        )
-        / count
-    )
+    return _labeled_reduce(input, labels, index, ("variance",))["variance"]
 
 
 def sum(input, labels=None, index=None):
@@ -518,26 +925,6 @@ def sum(input, labels=None, index=None):
             )
         )
 
-    use_kern = False
-    # There is constraints on types because of atomicAdd() in CUDA.
-    if input.dtype not in [
-        cupy.int32,
-        cupy.float16,
-        cupy.float32,
-        cupy.float64,
-        cupy.uint32,
-        cupy.uint64,
-        cupy.ulonglong,
-    ]:
-        warnings.warn(
-            "Using the slower implmentation as "
-            "cupyx.scipy.ndimage.sum supports int32, float16, "
-            "float32, float64, uint32, uint64 as data types"
-            "for the fast implmentation",
-            _misc.PerformanceWarning,
-        )
-        use_kern = True
-
     if labels is None:
         return input.sum()
 
@@ -558,12 +945,7 @@ def sum(input, labels=None, index=None):
     if index.size == 0:
         return cupy.array([], dtype=cupy.int64)
 
-    out = cupy.zeros_like(index, dtype=cupy.float64)
-
-    # The following parameters for sum where determined using a Tesla P100.
-    if (input.size >= 262144 and index.size <= 4) or use_kern:
-        return _ndimage_sum_kernel_2(input, labels, index, out)
-    return _ndimage_sum_kernel(input, labels, index, index.size, out)
+    return _labeled_reduce(input, labels, index, ("sum",))["sum"]
 
 
 def mean(input, labels=None, index=None):
@@ -594,26 +976,6 @@ def mean(input, labels=None, index=None):
             )
         )
 
-    use_kern = False
-    # There is constraints on types because of atomicAdd() in CUDA.
-    if input.dtype not in [
-        cupy.int32,
-        cupy.float16,
-        cupy.float32,
-        cupy.float64,
-        cupy.uint32,
-        cupy.uint64,
-        cupy.ulonglong,
-    ]:
-        warnings.warn(
-            "Using the slower implmentation as "
-            "cupyx.scipy.ndimage.mean supports int32, float16, "
-            "float32, float64, uint32, uint64 as data types "
-            "for the fast implmentation",
-            _misc.PerformanceWarning,
-        )
-        use_kern = True
-
     def calc_mean_with_intermediate_float(input):
         sum = input.sum()
         count = input.size
@@ -641,7 +1003,7 @@ def mean(input, labels=None, index=None):
         else:
             return (input[labels == index]).mean(dtype=cupy.float64)
 
-    return _mean_driver(input, labels, index, use_kern=use_kern)
+    return _labeled_reduce(input, labels, index, ("mean",))["mean"]
 
 
 def standard_deviation(input, labels=None, index=None):
@@ -664,77 +1026,38 @@ def standard_deviation(input, labels=None, index=None):
     return cupy.sqrt(variance(input, labels, index))
 
 
-def _get_values(arrays, func):
-    """Concatenated result of applying func to a list of arrays.
-
-    func should be cupy.min, cupy.max or cupy.median
-    """
-    dtype = arrays[0].dtype
-    return cupy.concatenate(
-        [
-            func(a, keepdims=True)
-            if a.size != 0
-            else cupy.asarray([0], dtype=dtype)
-            for a in arrays
-        ]
-    )
-
-
-def _get_positions(arrays, position_arrays, arg_func):
-    """Concatenated positions from applying arg_func to arrays.
+def _labeled_median(input, labels, index):
+    """Median of `input` over each of the regions of `labels` in `index`.
 
-    arg_func should be cupy.argmin or cupy.argmax
+    Unlike the other statistics, the median requires sorting the values.
+    They are sorted by segment and value at once, so the cost does not
+    depend on the number of labels either.
     """
-    return cupy.concatenate(
-        [
-            pos[arg_func(a, keepdims=True)]
-            if a.size != 0
-            else cupy.asarray([0], dtype=int)
-            for pos, a in zip(position_arrays, arrays)
-        ]
-    )
-
-
-def _select_via_looping(
-    input,
-    labels,
-    idxs,
-    positions,
-    find_min,
-    find_min_positions,
-    find_max,
-    find_max_positions,
-    find_median,
-):
-    """Internal helper routine for _select.
-
-    With relatively few labels it is faster to call this function rather than
-    using the implementation based on cupy.lexsort.
-    """
-    find_positions = find_min_positions or find_max_positions
-
-    # extract labeled regions into separate arrays
-    arrays = []
-    position_arrays = []
-    for i in idxs:
-        label_idx = labels == i
-        arrays.append(input[label_idx])
-        if find_positions:
-            position_arrays.append(positions[label_idx])
-
-    result = []
-    # the order below matches the order expected by cupy.ndimage.extrema
-    if find_min:
-        result += [_get_values(arrays, cupy.min)]
-    if find_min_positions:
-        result += [_get_positions(arrays, position_arrays, cupy.argmin)]
-    if find_max:
-        result += [_get_values(arrays, cupy.max)]
-    if find_max_positions:
-        result += [_get_positions(arrays, position_arrays, cupy.argmax)]
-    if find_median:
-        result += [_get_values(arrays, cupy.median)]
-    return result
+    segments, n_segments, idxs = _segment_labels(labels, index)
+    input = input.ravel()
+    segments = segments.ravel()
+    order = cupy.lexsort(cupy.stack((input, segments)))
+    input = input[order]
+    segments = segments[order]
+
+    # start of each segment in the sorted values
+    bounds = cupy.searchsorted(segments, cupy.arange(n_segments + 1))
+    lo = bounds[idxs]
+    hi = bounds[idxs + 1] - 1
+    found = hi >= lo
+    # lo is an index to the lowest value in input for each label,
+    # hi is an index to the largest value.
+    # move them to be either the same ((hi - lo) % 2 == 0) or next
+    # to each other ((hi - lo) % 2 == 1), then average.
+    step = (hi - lo) // 2
+    lo = cupy.where(found, lo + step, 0)
+    hi = cupy.where(found, hi - step, 0)
+    if input.dtype.kind in "iub":
+        # fix for https://github.com/scipy/scipy/issues/12836
+        median = (input[lo].astype(float) + input[hi].astype(float)) / 2.0
+    else:
+        median = (input[lo] + input[hi]) / 2.0
+    return cupy.where(found, median, 0)
 
 
 def _select(
@@ -799,118 +1122,21 @@ def _select(
 
     index = cupy.asarray(index)
 
-    safe_int = _safely_castable_to_int(labels.dtype)
-    min_label = labels.min()
-    max_label = labels.max()
-
-    # Remap labels to unique integers if necessary, or if the largest label is
-    # larger than the number of values.
-    if not safe_int or min_label < 0 or max_label > labels.size:
-        # Remap labels, and indexes
-        unique_labels, labels = cupy.unique(labels, return_inverse=True)
-        idxs = cupy.searchsorted(unique_labels, index)
-
-        # Make all of idxs valid
-        idxs[idxs >= unique_labels.size] = 0
-        found = unique_labels[idxs] == index
-    else:
-        # Labels are an integer type, and there aren't too many
-        idxs = cupy.asanyarray(index, cupy.int).copy()
-        found = (idxs >= 0) & (idxs <= max_label)
-
-    idxs[~found] = max_label + 1
-
-    input = input.ravel()
-    labels = labels.ravel()
-    if find_positions:
-        positions = positions.ravel()
-
-    using_cub = (
-        core._accelerator.ACCELERATOR_CUB
-        in cupy.core.get_routine_accelerators()
-    )
-
-    if using_cub:
-        # Cutoff values below were determined empirically for relatively large
-        # input arrays.
-        if find_positions or find_median:
-            n_label_cutoff = 15
-        else:
-            n_label_cutoff = 30
-    else:
-        n_label_cutoff = 0
-
-    if n_label_cutoff and len(idxs) <= n_label_cutoff:
-        return _select_via_looping(
-            input,
-            labels,
-            idxs,
-            positions,
-            find_min,
-            find_min_positions,
-            find_max,
-            find_max_positions,
-            find_median,
-        )
-
-    order = cupy.lexsort(cupy.stack((input.ravel(), labels.ravel())))
-    input = input[order]
-    labels = labels[order]
-    if find_positions:
-        positions = positions[order]
-
-    # Determine indices corresponding to the min or max value for each label
-    label_change_index = cupy.searchsorted(
-        labels, cupy.arange(1, max_label + 2)
-    )
-    if find_min or find_min_positions or find_median:
-        # index corresponding to the minimum value at each label
-        min_index = label_change_index[:-1]
-    if find_max or find_max_positions or find_median:
-        # index corresponding to the maximum value at each label
-        max_index = label_change_index[1:] - 1
-
-    result = []
-    # the order below matches the order expected by cupy.ndimage.extrema
+    stats = []
     if find_min:
-        mins = cupy.zeros(int(labels.max()) + 2, input.dtype)
-        mins[labels[min_index]] = input[min_index]
-        result += [mins[idxs]]
+        stats.append("min")
     if find_min_positions:
-        minpos = cupy.zeros(labels.max().item() + 2, int)
-        minpos[labels[min_index]] = positions[min_index]
-        result += [minpos[idxs]]
+        stats.append("min_position")
     if find_max:
-        maxs = cupy.zeros(int(labels.max()) + 2, input.dtype)
-        maxs[labels[max_index]] = input[max_index]
-        result += [maxs[idxs]]
+        stats.append("max")
     if find_max_positions:
-        maxpos = cupy.zeros(labels.max().item() + 2, int)
-        maxpos[labels[max_index]] = positions[max_index]
-        result += [maxpos[idxs]]
-    if find_median:
-        locs = cupy.arange(len(labels))
-        lo = cupy.zeros(int(labels.max()) + 2, cupy.int)
-        lo[labels[min_index]] = locs[min_index]
-        hi = cupy.zeros(int(labels.max()) + 2, cupy.int)
-        hi[labels[max_index]] = locs[max_index]
-        lo = lo[idxs]
-        hi = hi[idxs]
-        # lo is an index to the lowest value in input for each label,
-        # hi is an index to the largest value.
-        # move them to be either the same ((hi - lo) % 2 == 0) or next
-        # to each other ((hi - lo) % 2 == 1), then average.
-        step = (hi - lo) // 2
-        lo += step
-        hi -= step
-        if input.dtype.kind in "iub":
-            # fix for https://github.com/scipy/scipy/issues/12836
-            result += [
-                (input[lo].astype(float) + input[hi].astype(float)) / 2.0
-            ]
-        else:
-            result += [(input[lo] + input[hi]) / 2.0]
+        stats.append("max_position")
+    values = _labeled_reduce(input, labels, index, stats) if stats else {}
 
+    # the order below matches the order expected by cupy.ndimage.extrema
+    result = [values[stat] for stat in stats]
+    if find_median:
+        result += [_labeled_median(input, labels, index)]
     return result
 
 
@@ -1032,8 +1258,8 @@ def minimum_position(input, labels=None, index=None):
 
     .. note::
         When `input` has multiple identical minima within a labeled region,
-        the coordinates returned are not guaranteed to match those returned by
-        SciPy.
+        the coordinates of the first one (in C order) are returned. These
+        are not guaranteed to match those returned by SciPy.
 
     .. seealso:: :func:`scipy.ndimage.minimum_position`
     """
@@ -1089,8 +1315,8 @@ def maximum_position(input, labels=None, index=None):
 
     .. note::
         When `input` has multiple identical maxima within a labeled region,
-        the coordinates returned are not guaranteed to match those returned by
-        SciPy.
+        the coordinates of the first one (in C order) are returned. These
+        are not guaranteed to match those returned by SciPy.
 
     .. seealso:: :func:`scipy.ndimage.maximum_position`
     """
@@ -1235,26 +1461,27 @@ def center_of_mass(input, labels=None, index=None):
     >>> ndimage.measurements.center_of_mass(d)
     (inf,)
     """
-    normalizer = sum(input, labels, index)
-    grids = cupy.ogrid[[slice(0, i) for i in input.shape]]
-
-    results = [
-        sum(input * grids[dir].astype(float), labels, index) / normalizer
-        for dir in range(input.ndim)
-    ]
-
-    # have to transfer 0-dim array back to CPU?
-    # may want to modify to avoid this
-    is_0dim_array = (
-        isinstance(results[0], cupy.ndarray) and results[0].ndim == 0
+    if labels is None:
+        if index is not None:
+            raise ValueError("index without defined labels")
+        # a single segment covering the whole array
+        labels = cupy.ones((), dtype=bool)
+        index = True
+    elif index is None:
+        labels = labels > 0
+        index = True
+
+    as_scalar = numpy.isscalar(index) or (
+        isinstance(index, cupy.ndarray) and index.ndim == 0
     )
+    index = cupy.atleast_1d(cupy.asarray(index))
+    input, labels = cupy.broadcast_arrays(input, labels)
+    results = _labeled_reduce(input, labels, index, ("center_of_mass",))
+    results = cupy.asnumpy(results["center_of_mass"])  # synchronize
 
-    if cupy.isscalar(results[0]) or is_0dim_array:
-        return tuple(cupy.asnumpy(results))
-
-    results = [cupy.asnumpy(r) for r in results]
-    return [tuple(v) for v in numpy.array(results).T]
-    # return [tuple(v) for v in cupy.asnumpy(cupy.stack(results, axis=-1))]
+    if as_scalar:
+        return tuple(results[0])
+    return [tuple(v) for v in results]
 
 
 def labeled_comprehension(
@@ -1280,8 +1507,15 @@ def labeled_comprehension(
         Subset of `labels` to which to apply `func`.
         If a scalar, a single value is returned.
         If None, `func` is applied to all non-zero values of `labels`.
-    func : callable
-        Python function to apply to `labels` from `input`.
+    func : callable, str or dict
+        Python function to apply to `labels` from `input`. Alternatively,
+        the name of a reduction (``'count'``, ``'sum'``, ``'mean'``,
+        ``'variance'``, ``'standard_deviation'``, ``'minimum'``,
+        ``'maximum'`` or ``'median'``) or a dict of CUDA expressions
+        defining a custom reduction (see Notes). NumPy and CuPy functions
+        computing one of these reductions (e.g. ``cupy.mean``) are also
+        recognized when `pass_positions` is False. Such reductions are
+        evaluated for all labels at once on the device.
     out_dtype : dtype
         Dtype to use for `result`.
     default : int, float or None
@@ -1296,6 +1530,29 @@ def labeled_comprehension(
     result : ndarray
         Result of applying `func` to each of `labels` to `input` in `index`.
 
+    Notes
+    -----
+    A custom reduction is given as a dict with the following keys, which
+    mirror the arguments of ``cupy.ReductionKernel``:
+
+    ``'map_expr'``
+        Expression mapping each value ``x`` (a ``double``) at flat position
+        ``pos`` to the value being reduced. Defaults to ``'x'``.
+    ``'reduce_expr'``
+        Expression combining two mapped values ``a`` and ``b``. It must be
+        associative and commutative, since the order in which values are
+        combined is not defined.
+    ``'post_map_expr'``
+        Expression computing the result from the reduced value ``a`` and the
+        number of elements ``count``. Defaults to ``'a'``.
+    ``'identity'``
+        Identity value of the reduction.
+
+    All intermediate values are double precision. For example, the sum of
+    squares of each region is given by::
+
+        dict(map_expr="x * x", reduce_expr="a + b", identity=0)
+
     Examples
     --------
     >>> import cupy as cp
@@ -1329,6 +1586,12 @@ def labeled_comprehension(
 
     """
 
+    reduction = _get_device_reduction(func, pass_positions)
+    if reduction is not None:
+        return _labeled_comprehension_device(
+            input, labels, index, reduction, out_dtype, default
+        )
+
     as_scalar = cupy.isscalar(index)
     input = cupy.asarray(input)
 
@@ -1417,6 +1680,212 @@ def labeled_comprehension(
     return output
 
 
+# reduction names accepted by labeled_comprehension
+_REDUCTION_NAMES = {
+    "count": "count",
+    "sum": "sum",
+    "mean": "mean",
+    "variance": "variance",
+    "var": "variance",
+    "standard_deviation": "standard_deviation",
+    "std": "standard_deviation",
+    "minimum": "min",
+    "min": "min",
+    "amin": "min",
+    "maximum": "max",
+    "max": "max",
+    "amax": "max",
+    "median": "median",
+}
+
+# NumPy/CuPy functions recognized as reductions by labeled_comprehension
+_REDUCTION_FUNC_NAMES = {
+    "sum": "sum",
+    "mean": "mean",
+    "var": "variance",
+    "std": "standard_deviation",
+    "min": "min",
+    "amin": "min",
+    "max": "max",
+    "amax": "max",
+    "median": "median",
+}
+
+
+def _get_device_reduction(func, pass_positions):
+    """Reduction name or custom reduction dict that can replace `func`.
+
+    Returns None if `func` has to be called once per label.
+    """
+    if isinstance(func, str):
+        try:
+            return _REDUCTION_NAMES[func]
+        except KeyError:
+            raise ValueError("unknown reduction: {}".format(func))
+    if isinstance(func, dict):
+        return _util._check_custom_reduction(func)
+    if pass_positions:
+        return None
+    for name, reduction in _REDUCTION_FUNC_NAMES.items():
+        for module in (cupy, numpy):
+            if func is getattr(module, name, None):
+                return reduction
+    return None
+
+
+def _labeled_comprehension_device(
+    input, labels, index, reduction, out_dtype, default
+):
+    """labeled_comprehension for the reductions of `_get_device_reduction`.
+
+    The reduction is evaluated for all labels in a fixed number of kernel
+    launches.
+    """
+    input = cupy.asarray(input)
+    if labels is None:
+        if index is not None:
+            raise ValueError("index without defined labels")
+        # a single segment covering the whole array
+        labels = cupy.ones((), dtype=bool)
+        index = True
+    elif index is None:
+        labels = cupy.asarray(labels) > 0
+        index = True
+    labels = cupy.asarray(labels)
+    try:
+        input, labels = cupy.broadcast_arrays(input, labels)
+    except ValueError:
+        raise ValueError(
+            "input and labels must have the same shape "
+            "(excepting dimensions with width 1)"
+        )
+
+    as_scalar = numpy.isscalar(index) or (
+        isinstance(index, cupy.ndarray) and index.ndim == 0
+    )
+    index = cupy.atleast_1d(cupy.asarray(index))
+    if labels.dtype != bool and cupy.any(
+        index.astype(labels.dtype).astype(index.dtype) != index
+    ):
+        raise ValueError(
+            "Cannot convert index values from <%s> to <%s> "
+            "(labels' type) without loss of precision"
+            % (index.dtype, labels.dtype)
+        )
+
+    if isinstance(reduction, dict):
+        result, count = _labeled_custom_reduce(input, labels, index, reduction)
+    else:
+        stats = ["count"]
+        if reduction == "standard_deviation":
+            stats.append("variance")
+        elif reduction not in ("count", "median"):
+            stats.append(reduction)
+        values = _labeled_reduce(input, labels, index, stats)
+        count = values["count"]
+        if reduction == "median":
+            result = _labeled_median(input, labels, index)
+        elif reduction == "standard_deviation":
+            result = cupy.sqrt(values["variance"])
+        else:
+            result = values[reduction]
+
+    if default is None:
+        # as for the NumPy array filled by the generic path
+        default = numpy.nan
+    result = cupy.where(count > 0, result, default).astype(out_dtype)
+    # same return type as when func is called once per label
+    result = cupy.asnumpy(result)
+    if as_scalar:
+        result = result[0]
+    return result
+
+
+def _labeled_custom_reduce(input, labels, index, reduction):
+    """Evaluate a custom reduction of labeled_comprehension.
+
+    Returns:
+        tuple: The result and the number of elements for each value of
+        `index`.
+    """
+    segments, n_segments, idxs = _segment_labels(labels, index)
+    wanted = cupy.zeros(n_segments, dtype=bool)
+    wanted[idxs] = True
+    wanted[-1] = False
+
+    acc = cupy.full(n_segments, reduction["identity"], dtype=cupy.float64)
+    count = cupy.zeros(n_segments, dtype=cupy.uint64)
+    if input.size:
+        kern = _get_labeled_custom_reduce_kernel(
+            reduction.get("map_expr", "x"), reduction["reduce_expr"]
+        )
+        kern(input, segments, wanted, acc, count, size=input.size)
+    acc = acc[idxs]
+    count = count[idxs]
+    post_map_expr = reduction.get("post_map_expr", "a")
+    if post_map_expr != "a":
+        acc = _get_labeled_post_map_kernel(post_map_expr)(acc, count)
+    return acc, count
+
+
+@memoize(for_each_device=True)
+def _get_labeled_custom_reduce_kernel(map_expr, reduce_expr):
+    """Kernel reducing the mapped values of each segment.
+
+    Values are first reduced within a warp when all its lanes share a
+    segment. The reduced value is then combined with the accumulator of the
+    segment in a compare-and-swap loop, since `reduce_expr` is arbitrary.
+    """
+    code = """
+        {segment_code}
+        const double x = (double)input[i];
+        const long long pos = i;
+        double v = ({map_expr});
+        if (uniform) {{
+            for (int o = 16; o > 0; o >>= 1) {{
+                const double a = v;
+                const double b = __shfl_down_sync(FULL_MASK, v, o);
+                v = ({reduce_expr});
+            }}
+        }}
+        if (!uniform || lane0) {{
+            atomicAdd(&count[s], (unsigned long long)(uniform ? 32 : 1));
+            unsigned long long* address = (unsigned long long*)&acc[s];
+            unsigned long long old = *address, assumed;
+            do {{
+                assumed = old;
+                const double a = __longlong_as_double(assumed);
+                const double b = v;
+                const unsigned long long r = __double_as_longlong(
+                    ({reduce_expr}));
+                if (r == assumed) break;
+                old = atomicCAS(address, assumed, r);
+            }} while (old != assumed);
+        }}
+        """.format(
+        segment_code=_segment_code,
+        map_expr=map_expr,
+        reduce_expr=reduce_expr,
+    )
+    return core.ElementwiseKernel(
+        "raw T input, raw L seg, raw bool wanted",
+        "raw float64 acc, raw uint64 count",
+        code,
+        "cupyimg_nd_labeled_custom_reduce",
+        preamble=_labeled_reduce_preamble,
+    )
+
+
+@memoize(for_each_device=True)
+def _get_labeled_post_map_kernel(post_map_expr):
+    return core.ElementwiseKernel(
+        "float64 a, uint64 count",
+        "float64 y",
+        "y = ({});".format(post_map_expr),
+        "cupyimg_nd_labeled_custom_post_map",
+    )
+
+
 def histogram(input, min, max, bins, labels=None, index=None):
     """
     Calculate the histogram of the values of an array, optionally at labels.
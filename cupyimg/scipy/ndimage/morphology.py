@@ -27,16 +27,11 @@ __all__ = [
     "black_tophat",
     "generate_binary_structure",
     "iterate_structure",
+    "distance_transform_bf",
+    "distance_transform_cdt",
+    "distance_transform_edt",
 ]
 
-# TODO: grlee77: 'distance_transform_bf', 'distance_transform_cdt',
-#                'distance_transform_edt'
-#
-# see the following MIT-licensed code for euclidean distance transform
-# (PBA algorithm):
-#     https://github.com/orzzzjq/Parallel-Banding-Algorithm-plus
-# There is also a Jump-Flooding Centroidal Voronoi Code (BSD 3-clause) here:
-
 
 @cupy.memoize(for_each_device=True)
 def _get_binary_erosion_kernel(
@@ -48,6 +43,7 @@ def _get_binary_erosion_kernel(
     invert,
     masked,
     all_weights_nonzero,
+    changed_flag=False,
 ):
     if invert:
         border_value = int(not border_value)
@@ -87,23 +83,33 @@ def _get_binary_erosion_kernel(
         )
     )
 
+    if changed_flag:
+        # only the exits below can produce a value differing from the input
+        found_changed = "if (_in != {}) changed[0] = it;".format(false_val)
+        post = "if (_in != {}) changed[0] = it;".format(true_val)
+    else:
+        found_changed = post = ""
+
     # {{{{ required because format is called again within _generate_nd_kernel
     found = """
         if ({{cond}}) {{{{
             if (!{border_value}) {{{{
                 y = cast<Y>({false_val});
+                {found_changed}
                 return;
             }}}}
         }}}} else {{{{
             bool nn = {{value}} ? {true_val} : {false_val};
             if (!nn) {{{{
                 y = cast<Y>({false_val});
+                {found_changed}
                 return;
             }}}}
         }}}}""".format(
         true_val=int(true_val),
         false_val=int(false_val),
         border_value=int(border_value),
+        found_changed=found_changed,
     )
 
     name = "binary_erosion"
@@ -113,7 +119,7 @@ def _get_binary_erosion_kernel(
         name,
         pre,
         found,
-        "",
+        post,
         "constant",
         w_shape,
         int_type,
@@ -125,9 +131,271 @@ def _get_binary_erosion_kernel(
         has_mask=masked,
         binary_morphology=True,
         all_weights_nonzero=all_weights_nonzero,
+        has_changed_flag=changed_flag,
     )
 
 
+def _unravel_ops(ndim, var, arr, int_t):
+    """Code computing coordinates ind_0, ind_1, ... of flat index ``var``."""
+    code = ["{int_t} _p = {var};".format(int_t=int_t, var=var)]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "{int_t} ind_{j} = _p % {arr}.shape()[{j}]; "
+            "_p /= {arr}.shape()[{j}];".format(int_t=int_t, j=j, arr=arr)
+        )
+    code.append("{int_t} ind_0 = _p;".format(int_t=int_t))
+    return "\n".join(code)
+
+
+def _shifted_index_ops(offset, arr, sign="+"):
+    """Bounds condition and flat index of the coordinates ind_j +/- offset_j."""
+    ndim = len(offset)
+    conds = []
+    terms = []
+    for j in range(ndim):
+        o = offset[j] if sign == "+" else -offset[j]
+        if o < 0:
+            conds.append("ind_{j} >= {o}".format(j=j, o=-o))
+        elif o > 0:
+            conds.append(
+                "ind_{j} < {arr}.shape()[{j}] - {o}".format(j=j, o=o, arr=arr)
+            )
+        term = "(ind_{j} + ({o}))".format(j=j, o=o)
+        for k in range(j + 1, ndim):
+            term += " * {arr}.shape()[{k}]".format(arr=arr, k=k)
+        terms.append(term)
+    cond = " && ".join(conds) if conds else "true"
+    return cond, " + ".join(terms)
+
+
+@cupy.memoize(for_each_device=True)
+def _get_binary_erosion_front_kernels(
+    rel_offsets, int_t, border_value, invert, masked
+):
+    """Kernels for binary erosion restricted to a list of candidate pixels.
+
+    ``rel_offsets`` are the coordinates of the non-zero structure elements
+    relative to its origin. The origin itself must be among them (i.e. the
+    center of the structure is True).
+
+    The first kernel updates the ``counts[0]`` pixels listed in ``cand``,
+    reading ``x`` and writing ``y``. The indices of pixels whose value changed
+    are appended to ``changed`` (``counts[1]`` holds their number).
+
+    The second kernel builds the candidate list for the next iteration: all
+    pixels having one of the ``counts[1]`` changed pixels in their
+    neighborhood. Duplicates are avoided by stamping each pixel with the
+    iteration number ``it``.
+
+    Both kernels loop over the lists stored on the device, so they can be
+    launched with a fixed number of threads and no host synchronization.
+    """
+    ndim = len(rel_offsets[0])
+    if invert:
+        border_value = int(not border_value)
+        true_val = 0
+        false_val = 1
+    else:
+        true_val = 1
+        false_val = 0
+    # a neighbor "hits" if it forces the output to false_val
+    hit = "(bool)x[nb]" if invert else "!(bool)x[nb]"
+
+    checks = []
+    for offset in rel_offsets:
+        if not any(offset):
+            # center is handled separately (center_is_true)
+            continue
+        cond, idx = _shifted_index_ops(offset, "x", "+")
+        if border_value:
+            oob = ""
+        else:
+            oob = " else { hit = true; }"
+        checks.append(
+            """
+            if (!hit) {{
+                if ({cond}) {{
+                    nb = {idx};
+                    hit = {hit};
+                }}{oob}
+            }}""".format(
+                cond=cond, idx=idx, hit=hit, oob=oob
+            )
+        )
+
+    if masked:
+        mask_check = "if (!(bool)mask[p]) { y[p] = x[p]; continue; }"
+        mask_param = ", raw M mask"
+    else:
+        mask_check = ""
+        mask_param = ""
+
+    update_code = """
+    const I n = counts[0];
+    for (I c = i; c < n; c += _ind.size()) {{
+        const I p = cand[c];
+        const bool _in = (bool)x[p];
+        {mask_check}
+        bool val;
+        if (_in == {false_val}) {{
+            val = _in;
+        }} else {{
+            {unravel}
+            bool hit = false;
+            I nb;
+            {checks}
+            val = hit ? {false_val} : {true_val};
+        }}
+        y[p] = val;
+        if (val != _in) {{
+            I k = atomicAdd(&counts[1], (I)1);
+            changed[k] = p;
+        }}
+    }}
+    """.format(
+        mask_check=mask_check,
+        false_val=false_val,
+        true_val=true_val,
+        unravel=_unravel_ops(ndim, "p", "x", "I"),
+        checks="\n".join(checks),
+    )
+
+    cases = []
+    for r, offset in enumerate(rel_offsets):
+        # pixel p has q in its neighborhood if q = p + offset
+        cond, idx = _shifted_index_ops(offset, "stamp", "-")
+        cases.append(
+            """
+            case {r}:
+                if ({cond}) {{
+                    p = {idx};
+                    valid = true;
+                }}
+                break;""".format(
+                r=r, cond=cond, idx=idx
+            )
+        )
+
+    # the number of (changed pixel, neighbor) pairs may overflow I even when
+    # the pixel indices themselves fit
+    expand_code = """
+    const unsigned long long n = (unsigned long long)counts[1] * {nrel};
+    for (unsigned long long c = i; c < n; c += _ind.size()) {{
+        const I q = changed[c / {nrel}];
+        {unravel}
+        I p;
+        bool valid = false;
+        switch (c % {nrel}) {{
+            {cases}
+        }}
+        if (valid && atomicExch(&stamp[p], it) != it) {{
+            I k = atomicAdd(&counts[0], (I)1);
+            cand[k] = p;
+        }}
+    }}
+    """.format(
+        nrel=len(rel_offsets),
+        unravel=_unravel_ops(ndim, "q", "stamp", "I"),
+        cases="\n".join(cases),
+    )
+
+    name = "cupyimg_ndimage_binary_erosion_front_{}d_{}nb".format(
+        ndim, len(rel_offsets)
+    )
+    if invert:
+        name += "_invert"
+    if int_t != "int":
+        name += "_i64"
+    update = cupy.ElementwiseKernel(
+        "raw X x, raw I cand" + mask_param,
+        "raw Y y, raw I changed, raw I counts",
+        update_code,
+        name + "_update",
+    )
+    expand = cupy.ElementwiseKernel(
+        "raw I changed, int32 it",
+        "raw I cand, raw I counts, raw int32 stamp",
+        expand_code,
+        name + "_expand",
+    )
+    return update, expand
+
+
+# maximum number of threads launched for the candidate-list kernels
+_FRONT_MAX_THREADS = 1 << 18
+
+# number of iterations between host-side convergence checks
+_CONVERGENCE_CHECK_INTERVAL = 8
+
+
+def _binary_erosion_front(
+    input,
+    structure,
+    offsets,
+    iterations,
+    mask,
+    output,
+    border_value,
+    invert,
+):
+    """Iterated binary erosion, only revisiting pixels on the changing front.
+
+    All pixels are candidates in the first iteration. Afterwards, only
+    pixels having a changed pixel in their neighborhood are updated.
+    """
+    structure = cupy.asnumpy(structure)
+    rel_offsets = tuple(
+        tuple(int(c) - o for c, o in zip(coord, offsets))
+        for coord in zip(*numpy.nonzero(structure))
+    )
+    if input.size < (1 << 31):
+        int_t, idx_dtype = "int", numpy.int32
+    else:
+        int_t, idx_dtype = "unsigned long long", numpy.uint64
+    update_kernel, expand_kernel = _get_binary_erosion_front_kernels(
+        rel_offsets, int_t, border_value, invert, mask is not None
+    )
+
+    # Both buffers must hold the same values for all pixels that are not
+    # candidates, so each iteration only needs to write the candidates.
+    tmp_in = cupy.array(input, dtype=bool, order="C", copy=True)
+    tmp_out = tmp_in.copy()
+    cand = cupy.arange(input.size, dtype=idx_dtype)
+    changed = cupy.empty(input.size, dtype=idx_dtype)
+    stamp = cupy.zeros(input.shape, dtype=numpy.int32)
+    counts = cupy.asarray([input.size, 0], dtype=idx_dtype)
+    update_size = min(input.size, _FRONT_MAX_THREADS)
+    expand_size = min(input.size * len(rel_offsets), _FRONT_MAX_THREADS)
+    mask_args = () if mask is None else (mask,)
+
+    ii = 0
+    while ii < iterations or iterations < 1:
+        if (
+            iterations < 1
+            and ii > 0
+            and not ii % _CONVERGENCE_CHECK_INTERVAL
+            and int(counts[0]) == 0  # synchronize!
+        ):
+            # no candidates left: the result can no longer change
+            break
+        update_kernel(
+            tmp_in,
+            cand,
+            *mask_args,
+            tmp_out,
+            changed,
+            counts,
+            size=update_size,
+        )
+        counts[0] = 0
+        expand_kernel(changed, ii + 1, cand, counts, stamp, size=expand_size)
+        counts[1] = 0
+        tmp_in, tmp_out = tmp_out, tmp_in
+        ii += 1
+    output[...] = tmp_in
+    return output
+
+
 def _center_is_true(structure, origin):
     coor = tuple([oo + ss // 2 for ss, oo in zip(structure.shape, origin)])
     return bool(structure[coor])  # device synchronization
@@ -278,53 +546,71 @@ def _binary_erosion(
         else:
             center_is_true = _center_is_true(structure, origin)
 
-    erode_kernel = _get_binary_erosion_kernel(
-        structure.shape,
-        int_type,
-        offsets,
-        center_is_true,
-        border_value,
-        invert,
-        masked,
-        all_weights_nonzero,
-    )
-
     if iterations == 1:
+        erode_kernel = _get_binary_erosion_kernel(
+            structure.shape,
+            int_type,
+            offsets,
+            center_is_true,
+            border_value,
+            invert,
+            masked,
+            all_weights_nonzero,
+        )
         if masked:
             output = erode_kernel(input, structure, mask, output)
         else:
             output = erode_kernel(input, structure, output)
     elif center_is_true and not brute_force:
-        raise NotImplementedError(
-            "only brute_force iteration has been implemented"
+        output = _binary_erosion_front(
+            input,
+            structure,
+            offsets,
+            iterations,
+            mask,
+            output,
+            border_value,
+            invert,
         )
     else:
         if cupy.shares_memory(output, input, "MAY_SHARE_BOUNDS"):
             raise ValueError("output and input may not overlap in memory")
+        erode_kernel = _get_binary_erosion_kernel(
+            structure.shape,
+            int_type,
+            offsets,
+            center_is_true,
+            border_value,
+            invert,
+            masked,
+            all_weights_nonzero,
+            True,
+        )
+        args = (structure, mask) if masked else (structure,)
+        # The kernel stores the iteration number in changed[0] whenever a
+        # value changes, so the flag never needs to be reset and is only read
+        # back from the device every _CONVERGENCE_CHECK_INTERVAL iterations.
+        changed = cupy.zeros((1,), dtype=numpy.int32)
         tmp_in = cupy.empty_like(input, dtype=output.dtype)
         tmp_out = output
         if iterations >= 1 and not iterations & 1:
             tmp_in, tmp_out = tmp_out, tmp_in
-        if masked:
-            tmp_out = erode_kernel(input, structure, mask, tmp_out)
-        else:
-            tmp_out = erode_kernel(input, structure, tmp_out)
-        # TODO: kernel doesn't return the changed status, so determine it here
-        changed = not (input == tmp_out).all()  # synchronize!
+        erode_kernel(input, *args, 1, tmp_out, changed)
         ii = 1
-        while ii < iterations or ((iterations < 1) and changed):
+        while ii < iterations or iterations < 1:
+            if (
+                not ii % _CONVERGENCE_CHECK_INTERVAL
+                and int(changed[0]) < ii  # synchronize!
+            ):
+                # the last iteration did not change anything
+                break
             tmp_in, tmp_out = tmp_out, tmp_in
-            if masked:
-                tmp_out = erode_kernel(tmp_in, structure, mask, tmp_out)
-            else:
-                tmp_out = erode_kernel(tmp_in, structure, tmp_out)
-            changed = not (tmp_in == tmp_out).all()
+            erode_kernel(tmp_in, *args, ii + 1, tmp_out, changed)
             ii += 1
-            if not changed and (not ii & 1):  # synchronize!
-                # can exit early if nothing changed
-                # (only do this after even number of tmp_in/out swaps)
-                break
-        output = tmp_out
+        if tmp_out is not output:
+            # only possible after an early exit, where the result is the same
+            # as for any further iterations
+            output[...] = tmp_out
     if temp_needed:
         temp[...] = output
         output = temp
@@ -719,7 +1005,7 @@ def binary_propagation(
         output,
         border_value,
         origin,
-        brute_force=True,
+        brute_force=False,
     )
 
 
@@ -752,15 +1038,14 @@ def binary_fill_holes(input, structure=None, output=None, origin=0):
     mask = cupy.logical_not(input)
     tmp = cupy.zeros(mask.shape, bool)
     inplace = isinstance(output, cupy.ndarray)
-    # TODO (grlee77): set brute_force=False below once implemented
     if inplace:
         binary_dilation(
-            tmp, structure, -1, mask, output, 1, origin, brute_force=True
+            tmp, structure, -1, mask, output, 1, origin, brute_force=False
         )
         cupy.logical_not(output, output)
     else:
         output = binary_dilation(
-            tmp, structure, -1, mask, None, 1, origin, brute_force=True
+            tmp, structure, -1, mask, None, 1, origin, brute_force=False
         )
         cupy.logical_not(output, output)
         return output
@@ -1224,3 +1509,672 @@ def black_tophat(
     else:
         cupy.subtract(tmp, input, out=tmp)
     return tmp
+
+
+_DISTANCE_BLOCK_SIZE = 128
+
+# accumulation of the distance along one dimension for each metric
+_DISTANCE_ACCUMULATE = {
+    "euclidean": "r += delta * delta;",
+    "taxicab": "r += fabs(delta);",
+    "chessboard": "r = fmax(r, fabs(delta));",
+}
+
+# distance to site ``i`` from position ``x`` of a line, given the distance
+# ``g`` of the site to its feature, and first position past which site
+# ``u > i`` is closer than site ``i`` (minus one) [1]
+_DISTANCE_LINE_FUNCTIONS = {
+    "euclidean": """
+__device__ double _line_dist(idx_t x, idx_t i, double g, double s)
+{
+    double dx = (x - i) * s;
+    return dx * dx + g;
+}
+
+__device__ double _line_sep(idx_t i, idx_t u, double gi, double gu, double s)
+{
+    double num = ((double)u * u - (double)i * i) * s * s + gu - gi;
+    return floor(num / (2.0 * s * s * (u - i)));
+}
+""",
+    "taxicab": """
+__device__ double _line_dist(idx_t x, idx_t i, double g, double s)
+{
+    return fabs((double)(x - i)) + g;
+}
+
+__device__ double _line_sep(idx_t i, idx_t u, double gi, double gu, double s)
+{
+    if (gu >= gi + (u - i)) {
+        return CUDART_INF;
+    }
+    return floor((gu - gi + u + i) / 2.0);
+}
+""",
+    "chessboard": """
+__device__ double _line_dist(idx_t x, idx_t i, double g, double s)
+{
+    return fmax(fabs((double)(x - i)), g);
+}
+
+__device__ double _line_sep(idx_t i, idx_t u, double gi, double gu, double s)
+{
+    double mid = floor((i + u) / 2.0);
+    if (gi <= gu) {
+        return fmax(i + gu, mid);
+    }
+    return fmin(u - gi, mid);
+}
+""",
+}
+
+
+def _get_distance_preamble(ndim, metric, int_type):
+    """Code of ``_dist(p, f, shape, sampling)``, the distance between the
+    elements of flat indices ``p`` and ``f`` (squared for the euclidean
+    metric)."""
+    return """
+{math_constants}
+typedef {int_type} idx_t;
+
+__device__ double _dist(idx_t p, idx_t f, const idx_t* shape,
+                        const double* sampling)
+{{
+    double r = 0.0;
+    for (int d = {ndim} - 1; d >= 0; d--) {{
+        double delta = (double)(p % shape[d] - f % shape[d]) * sampling[d];
+        p /= shape[d];
+        f /= shape[d];
+        {accumulate}
+    }}
+    return r;
+}}
+""".format(
+        math_constants=_filters_core.math_constants_preamble,
+        int_type=int_type,
+        ndim=ndim,
+        accumulate=_DISTANCE_ACCUMULATE[metric],
+    )
+
+
+@cupy.memoize(for_each_device=True)
+def _get_feature_init_kernel():
+    """Kernel setting the feature of background elements to themselves and
+    of the other elements to -1."""
+    return cupy.ElementwiseKernel(
+        "X x",
+        "I f",
+        "f = (x == X(0)) ? (I)i : (I)(-1);",
+        "cupyimg_ndimage_feature_init",
+    )
+
+
+@cupy.memoize(for_each_device=True)
+def _get_feature_transform_kernel(ndim, axis, metric, int_type):
+    """Kernel updating the feature transform along ``axis``.
+
+    Each thread handles a line along ``axis`` with the lower envelope
+    algorithm of Meijster et al. [1]: the sites are the elements of the line
+    having a feature, at a distance ``g`` from it (in the axes processed so
+    far). The stack of sites of the envelope is kept in ``f_out`` (its
+    element ``k`` being overwritten only once it is no longer needed) and
+    their first positions in ``t``.
+
+    References
+    ----------
+    .. [1] A. Meijster, J.B.T.M. Roerdink and W.H. Hesselink, "A general
+           algorithm for computing distance transforms in linear time",
+           Mathematical Morphology and its Applications to Image and Signal
+           Processing, 2000.
+    """
+    name = "cupyimg_ndimage_feature_transform_{}_{}d_{}".format(
+        metric, ndim, axis
+    )
+    code = """
+{preamble}
+{line_functions}
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const idx_t* f_in, idx_t* f_out, idx_t* t, const idx_t* shape,
+            const double* sampling, const idx_t n_lines)
+{{
+    idx_t line = (idx_t)blockIdx.x * blockDim.x + threadIdx.x;
+    if (line >= n_lines) {{
+        return;
+    }}
+    // first element of the line and stride along the axis
+    idx_t base = 0, stride = 1, step = 1, rem = line;
+    for (int d = {ndim} - 1; d >= 0; d--) {{
+        if (d == {axis}) {{
+            step = stride;
+        }} else {{
+            base += (rem % shape[d]) * stride;
+            rem /= shape[d];
+        }}
+        stride *= shape[d];
+    }}
+    const idx_t n = shape[{axis}];
+    const double s = sampling[{axis}];
+    const idx_t* f = f_in + base;
+    idx_t* v = f_out + base;
+    t += base;
+
+    // lower envelope of the distances to the sites
+    idx_t q = -1;
+    for (idx_t u = 0; u < n; u++) {{
+        idx_t fu = f[u * step];
+        if (fu < 0) {{
+            continue;
+        }}
+        double gu = _dist(base + u * step, fu, shape, sampling);
+        idx_t vq = 0;
+        double gq = 0.0;
+        while (q >= 0) {{
+            vq = v[q * step];
+            gq = _dist(base + vq * step, f[vq * step], shape, sampling);
+            idx_t tq = t[q * step];
+            if (_line_dist(tq, vq, gq, s) <= _line_dist(tq, u, gu, s)) {{
+                break;
+            }}
+            q--;
+        }}
+        if (q < 0) {{
+            q = 0;
+            v[0] = u;
+            t[0] = 0;
+        }} else {{
+            double w = _line_sep(vq, u, gq, gu, s) + 1;
+            if (w < n) {{
+                // guard against rounding errors for non-unit sampling
+                w = fmax(w, (double)(t[q * step] + 1));
+                q++;
+                v[q * step] = u;
+                t[q * step] = (idx_t)w;
+            }}
+        }}
+    }}
+
+    // feature of the closest site (q <= t[q] <= u)
+    for (idx_t u = n - 1; u >= 0; u--) {{
+        idx_t fu = -1;
+        if (q >= 0) {{
+            fu = f[v[q * step] * step];
+            if (u == t[q * step]) {{
+                q--;
+            }}
+        }}
+        v[u * step] = fu;
+    }}
+}}
+""".format(
+        preamble=_get_distance_preamble(ndim, metric, int_type),
+        line_functions=_DISTANCE_LINE_FUNCTIONS[metric],
+        block_size=_DISTANCE_BLOCK_SIZE,
+        name=name,
+        ndim=ndim,
+        axis=axis,
+    )
+    return cupy.RawKernel(code, name)
+
+
+@cupy.memoize(for_each_device=True)
+def _get_brute_force_feature_kernel(ndim, metric, int_type):
+    """Kernel finding the closest of the ``n_bg`` background elements of
+    flat indices ``bg`` (the first one in case of ties)."""
+    code = """
+    if (x == X(0)) {
+        f = i;
+    } else {
+        double best = CUDART_INF;
+        idx_t best_f = -1;
+        for (idx_t j = 0; j < n_bg; j++) {
+            double r = _dist(i, bg[j], &shape[0], &sampling[0]);
+            if (r < best) {
+                best = r;
+                best_f = bg[j];
+            }
+        }
+        f = best_f;
+    }
+    """
+    return cupy.ElementwiseKernel(
+        "X x, raw I bg, I n_bg, raw I shape, raw float64 sampling",
+        "I f",
+        code,
+        "cupyimg_ndimage_brute_force_feature_{}_{}d".format(metric, ndim),
+        preamble=_get_distance_preamble(ndim, metric, int_type),
+    )
+
+
+@cupy.memoize(for_each_device=True)
+def _get_feature_distance_kernel(ndim, metric, int_type, missing):
+    """Kernel computing the distance of each element to its feature.
+
+    ``missing`` is the distance of the elements without feature.
+    """
+    if metric == "euclidean":
+        dist = "sqrt(_dist(i, f, &shape[0], &sampling[0]))"
+    else:
+        dist = "_dist(i, f, &shape[0], &sampling[0])"
+    code = "y = (f < 0) ? (Y)({missing}) : (Y){dist};".format(
+        missing=missing, dist=dist
+    )
+    return cupy.ElementwiseKernel(
+        "I f, raw I shape, raw float64 sampling",
+        "Y y",
+        code,
+        "cupyimg_ndimage_feature_distance_{}_{}d".format(metric, ndim),
+        preamble=_get_distance_preamble(ndim, metric, int_type),
+    )
+
+
+@cupy.memoize(for_each_device=True)
+def _get_feature_indices_kernel(ndim):
+    """Kernel unraveling the feature of each element into ``indices`` (-1
+    for the elements without feature)."""
+    code = """
+    I p = f;
+    for (int d = {ndim} - 1; d >= 0; d--) {{
+        indices[d * n + i] = (p < 0) ? -1 : (int)(p % shape[d]);
+        p /= shape[d];
+    }}
+    """.format(
+        ndim=ndim
+    )
+    return cupy.ElementwiseKernel(
+        "I f, raw I shape, int64 n",
+        "raw int32 indices",
+        code,
+        "cupyimg_ndimage_feature_indices_{}d".format(ndim),
+    )
+
+
+def _check_distance_transform_args(
+    input, distances, indices, return_distances, return_indices
+):
+    if input.ndim == 0:
+        raise RuntimeError("input must have at least one dimension")
+    error_msgs = []
+    if (not return_distances) and (not return_indices):
+        error_msgs.append(
+            "at least one of return_distances/return_indices must be True"
+        )
+    if distances is not None and not return_distances:
+        error_msgs.append(
+            "return_distances must be True if distances is supplied"
+        )
+    if indices is not None and not return_indices:
+        error_msgs.append("return_indices must be True if indices is supplied")
+    if error_msgs:
+        raise RuntimeError(", ".join(error_msgs))
+
+
+def _get_sampling(sampling, ndim):
+    if sampling is None:
+        return cupy.ones(ndim, dtype=cupy.float64)
+    sampling = _util._normalize_sequence(sampling, ndim)
+    return cupy.asarray(sampling, dtype=cupy.float64)
+
+
+def _feature_transform(input, metric, sampling):
+    """Flat index of the closest background element of each element of
+    ``input`` (-1 if there is none), along with the shape as an array of
+    indices.
+
+    The distance is minimized one axis at a time, so that the result is
+    exact for the euclidean, taxicab and chessboard metrics.
+    """
+    ndim = input.ndim
+    if input.size < 1 << 31:
+        int_type, index_dtype = "int", cupy.int32
+    else:
+        int_type, index_dtype = "long long", cupy.int64
+    shape = cupy.asarray(input.shape, dtype=index_dtype)
+    features = cupy.empty(input.shape, dtype=index_dtype)
+    if input.size == 0:
+        return features, shape, int_type
+    _get_feature_init_kernel()(input, features)
+    other = cupy.empty_like(features)
+    t = cupy.empty_like(features)
+    for axis in range(ndim):
+        n_lines = input.size // input.shape[axis]
+        kern = _get_feature_transform_kernel(ndim, axis, metric, int_type)
+        kern(
+            (-(-n_lines // _DISTANCE_BLOCK_SIZE),),
+            (_DISTANCE_BLOCK_SIZE,),
+            (features, other, t, shape, sampling, index_dtype(n_lines)),
+        )
+        features, other = other, features
+    return features, shape, int_type
+
+
+def _distance_transform_outputs(
+    features,
+    shape,
+    int_type,
+    metric,
+    sampling,
+    return_distances,
+    return_indices,
+    distances,
+    indices,
+    distances_dtype,
+    missing,
+):
+    """Distances and indices of the features of a distance transform, in
+    the form returned by the ``distance_transform_*`` functions."""
+    ndim = features.ndim
+    result = []
+    if return_distances:
+        kern = _get_feature_distance_kernel(ndim, metric, int_type, missing)
+        if distances is None:
+            dt = cupy.empty(features.shape, dtype=distances_dtype)
+            result.append(kern(features, shape, sampling, dt))
+        else:
+            kern(features, shape, sampling, distances)
+    if return_indices:
+        if indices is not None and indices.flags.c_contiguous:
+            ft = indices
+        else:
+            ft = cupy.empty((ndim,) + features.shape, dtype=cupy.int32)
+        _get_feature_indices_kernel(ndim)(features, shape, features.size, ft)
+        if indices is None:
+            result.append(ft)
+        elif ft is not indices:
+            indices[...] = ft
+    if len(result) == 2:
+        return tuple(result)
+    elif len(result) == 1:
+        return result[0]
+    return None
+
+
+def distance_transform_bf(
+    input,
+    metric="euclidean",
+    sampling=None,
+    return_distances=True,
+    return_indices=False,
+    distances=None,
+    indices=None,
+):
+    """Distance transform function by a brute force algorithm.
+
+    Each foreground (non-zero) element of ``input`` is replaced by its
+    distance to the closest background element, found by testing all of
+    them.
+
+    Args:
+        input (cupy.ndarray): The input array.
+        metric (str): ``'euclidean'``, ``'taxicab'`` (or ``'cityblock'``,
+            ``'manhattan'``) or ``'chessboard'``. Default is
+            ``'euclidean'``.
+        sampling (float or sequence of float, optional): Spacing of elements
+            along each dimension. If a sequence, must be of length equal to
+            the input rank; if a single number, this is used for all axes. If
+            not specified, a grid spacing of unity is implied. Only used by
+            the euclidean metric.
+        return_distances (bool): Whether to calculate the distance
+            transform. Default is ``True``.
+        return_indices (bool): Whether to calculate the feature transform.
+            Default is ``False``.
+        distances (cupy.ndarray, optional): An output array to store the
+            calculated distance transform, instead of returning it. Must be
+            of dtype float64 for the euclidean metric and uint32 otherwise.
+        indices (cupy.ndarray, optional): An int32 output array of shape
+            ``(input.ndim,) + input.shape`` to store the calculated feature
+            transform, instead of returning it.
+
+    Returns:
+        cupy.ndarray or tuple of cupy.ndarray: The distance transform
+        and/or the feature transform (the indices of the closest background
+        element along each axis), for those not supplied as arguments.
+
+    .. note::
+
+        The cost is proportional to the product of the numbers of
+        foreground and background elements: `distance_transform_edt` and
+        `distance_transform_cdt` are much faster for large inputs.
+
+    .. seealso:: :func:`scipy.ndimage.distance_transform_bf`
+    """
+    _check_distance_transform_args(
+        input, distances, indices, return_distances, return_indices
+    )
+    metric = metric.lower()
+    if metric in ["taxicab", "cityblock", "manhattan"]:
+        metric = "taxicab"
+    elif metric not in ["euclidean", "chessboard"]:
+        raise RuntimeError("distance metric not supported")
+    distances_dtype = cupy.float64 if metric == "euclidean" else cupy.uint32
+    if distances is not None:
+        if distances.shape != input.shape:
+            raise RuntimeError("distances array has wrong shape")
+        if distances.dtype != distances_dtype:
+            raise RuntimeError(
+                "distances array must be {}".format(
+                    numpy.dtype(distances_dtype).name
+                )
+            )
+    if indices is not None:
+        if indices.dtype != cupy.int32:
+            raise RuntimeError("indices array must be int32")
+        if indices.shape != (input.ndim,) + input.shape:
+            raise RuntimeError("indices array has wrong shape")
+    # as in SciPy, the sampling only affects the euclidean metric
+    if metric != "euclidean":
+        sampling = None
+    sampling = _get_sampling(sampling, input.ndim)
+
+    if input.size < 1 << 31:
+        int_type, index_dtype = "int", cupy.int32
+    else:
+        int_type, index_dtype = "long long", cupy.int64
+    shape = cupy.asarray(input.shape, dtype=index_dtype)
+    bg = cupy.flatnonzero(input == 0).astype(index_dtype)
+    kern = _get_brute_force_feature_kernel(input.ndim, metric, int_type)
+    features = cupy.empty(input.shape, dtype=index_dtype)
+    kern(input, bg, index_dtype(bg.size), shape, sampling, features)
+    return _distance_transform_outputs(
+        features,
+        shape,
+        int_type,
+        metric,
+        sampling,
+        return_distances,
+        return_indices,
+        distances,
+        indices,
+        distances_dtype,
+        "CUDART_INF" if metric == "euclidean" else "0xffffffff",
+    )
+
+
+def distance_transform_cdt(
+    input,
+    metric="chessboard",
+    return_distances=True,
+    return_indices=False,
+    distances=None,
+    indices=None,
+):
+    """Distance transform for chamfer type of transforms.
+
+    Each foreground (non-zero) element of ``input`` is replaced by its
+    taxicab or chessboard distance to the closest background element. The
+    distance is minimized along each axis in turn by the linear-time
+    algorithm of Meijster et al. [1]_, which is exact for both metrics.
+
+    Args:
+        input (cupy.ndarray): The input array.
+        metric (str or array_like): ``'chessboard'`` (default) or
+            ``'taxicab'`` (or ``'cityblock'``, ``'manhattan'``). A structure
+            of size 3 along all axes is also accepted if it is the
+            structure of connectivity one (taxicab) or of full connectivity
+            (chessboard) of ``generate_binary_structure``.
+        return_distances (bool): Whether to calculate the distance
+            transform. Default is ``True``.
+        return_indices (bool): Whether to calculate the feature transform.
+            Default is ``False``.
+        distances (cupy.ndarray, optional): An int32 output array to store
+            the calculated distance transform, instead of returning it.
+        indices (cupy.ndarray, optional): An int32 output array of shape
+            ``(input.ndim,) + input.shape`` to store the calculated feature
+            transform, instead of returning it.
+
+    Returns:
+        cupy.ndarray or tuple of cupy.ndarray: The distance transform
+        (-1 for all elements if there is no background) and/or the feature
+        transform (the indices of the closest background element along each
+        axis), for those not supplied as arguments.
+
+    References
+    ----------
+    .. [1] A. Meijster, J.B.T.M. Roerdink and W.H. Hesselink, "A general
+           algorithm for computing distance transforms in linear time",
+           Mathematical Morphology and its Applications to Image and Signal
+           Processing, 2000.
+
+    .. seealso:: :func:`scipy.ndimage.distance_transform_cdt`
+    """
+    _check_distance_transform_args(
+        input, distances, indices, return_distances, return_indices
+    )
+    rank = input.ndim
+    if isinstance(metric, str):
+        if metric in ["taxicab", "cityblock", "manhattan"]:
+            metric = "taxicab"
+        elif metric != "chessboard":
+            raise ValueError("invalid metric provided")
+    else:
+        structure = cupy.asnumpy(metric)
+        if any(s != 3 for s in structure.shape):
+            raise ValueError("metric sizes must be equal to 3")
+        if structure.ndim != rank:
+            raise NotImplementedError("metric rank must equal input rank")
+        structure = structure != 0
+        if numpy.array_equal(
+            structure, cupy.asnumpy(generate_binary_structure(rank, 1))
+        ):
+            metric = "taxicab"
+        elif structure.all():
+            metric = "chessboard"
+        else:
+            raise NotImplementedError(
+                "only the taxicab and chessboard structures are supported"
+            )
+    if distances is not None:
+        if distances.dtype != cupy.int32:
+            raise ValueError("distances must be of int32 type")
+        if distances.shape != input.shape:
+            raise ValueError("distances has wrong shape")
+    if indices is not None:
+        if indices.dtype != cupy.int32:
+            raise ValueError("indices array must be int32")
+        if indices.shape != (rank,) + input.shape:
+            raise ValueError("indices array has wrong shape")
+    sampling = _get_sampling(None, rank)
+    features, shape, int_type = _feature_transform(input, metric, sampling)
+    return _distance_transform_outputs(
+        features,
+        shape,
+        int_type,
+        metric,
+        sampling,
+        return_distances,
+        return_indices,
+        distances,
+        indices,
+        cupy.int32,
+        "-1",
+    )
+
+
+def distance_transform_edt(
+    input,
+    sampling=None,
+    return_distances=True,
+    return_indices=False,
+    distances=None,
+    indices=None,
+    *,
+    float64_distances=True,
+):
+    """Exact Euclidean distance transform.
+
+    Each foreground (non-zero) element of ``input`` is replaced by its
+    Euclidean distance to the closest background element. The squared
+    distance is separable: it is minimized along each axis in turn by the
+    linear-time lower envelope algorithm of Meijster et al. [1]_, with one
+    thread per line of the array.
+
+    Args:
+        input (cupy.ndarray): The input array.
+        sampling (float or sequence of float, optional): Spacing of elements
+            along each dimension. If a sequence, must be of length equal to
+            the input rank; if a single number, this is used for all axes. If
+            not specified, a grid spacing of unity is implied.
+        return_distances (bool): Whether to calculate the distance
+            transform. Default is ``True``.
+        return_indices (bool): Whether to calculate the feature transform.
+            Default is ``False``.
+        distances (cupy.ndarray, optional): An output array to store the
+            calculated distance transform, instead of returning it. Must be
+            of dtype float64 (float32 if ``float64_distances`` is False).
+        indices (cupy.ndarray, optional): An int32 output array of shape
+            ``(input.ndim,) + input.shape`` to store the calculated feature
+            transform, instead of returning it.
+        float64_distances (bool): If False, the distances are returned as
+            float32 instead of float64, halving the size of the output.
+
+    Returns:
+        cupy.ndarray or tuple of cupy.ndarray: The distance transform
+        (infinite for all elements if there is no background) and/or the
+        feature transform (the indices of the closest background element
+        along each axis), for those not supplied as arguments.
+
+    References
+    ----------
+    .. [1] A. Meijster, J.B.T.M. Roerdink and W.H. Hesselink, "A general
+           algorithm for computing distance transforms in linear time",
+           Mathematical Morphology and its Applications to Image and Signal
+           Processing, 2000.
+
+    .. seealso:: :func:`scipy.ndimage.distance_transform_edt`
+    """
+    _check_distance_transform_args(
+        input, distances, indices, return_distances, return_indices
+    )
+    distances_dtype = cupy.float64 if float64_distances else cupy.float32
+    if distances is not None:
+        if distances.shape != input.shape:
+            raise RuntimeError("distances array has wrong shape")
+        if distances.dtype != distances_dtype:
+            raise RuntimeError(
+                "distances array must be {}".format(
+                    numpy.dtype(distances_dtype).name
+                )
+            )
+    if indices is not None:
+        if indices.shape != (input.ndim,) + input.shape:
+            raise RuntimeError("indices array has wrong shape")
+        if indices.dtype != cupy.int32:
+            raise RuntimeError("indices array must be int32")
+    sampling = _get_sampling(sampling, input.ndim)
+    features, shape, int_type = _feature_transform(
+        input, "euclidean", sampling
+    )
+    return _distance_transform_outputs(
+        features,
+        shape,
+        int_type,
+        "euclidean",
+        sampling,
+        return_distances,
+        return_indices,
+        distances,
+        indices,
+        distances_dtype,
+        "CUDART_INF",
+    )
@@ -15,18 +15,91 @@ from cupy.testing import (
 from pytest import raises as assert_raises
 
 import cupyimg.scipy.ndimage as sndi
+from scipy import ndimage
 from scipy.ndimage.filters import _gaussian_kernel1d
 
 # from scipy._lib._numpy_compat import suppress_warnings
 
-# def test_ticket_701():
-#     # Test generic filter sizes
-#     arr = cp.arange(4).reshape((2,2))
-#     func = lambda x: cp.min(x)
-#     res = sndi.generic_filter(arr, func, size=(1,1))
-#     # The following raises an error unless ticket 701 is fixed
-#     res2 = sndi.generic_filter(arr, func, size=1)
-#     assert_equal(res, res2)
+_GENERIC_MIN = dict(reduce_expr="min(a, b)", identity=np.inf)
+_GENERIC_MEAN = dict(
+    reduce_expr="a + b", post_map_expr="a / count", identity=0
+)
+_GENERIC_MEAN_CODE = """
+    double s = 0.0;
+    for (int j = 0; j < filter_size; j++) {
+        s += buffer[j];
+    }
+    return s / filter_size;
+"""
+
+
+def test_ticket_701():
+    # Test generic filter sizes
+    arr = cp.arange(4).reshape((2, 2))
+    res = sndi.generic_filter(arr, _GENERIC_MIN, size=(1, 1))
+    # The following raises an error unless ticket 701 is fixed
+    res2 = sndi.generic_filter(arr, _GENERIC_MIN, size=1)
+    assert_array_equal(res, res2)
+
+
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "mirror"])
+@pytest.mark.parametrize("function", [_GENERIC_MEAN, _GENERIC_MEAN_CODE])
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32, np.float64])
+def test_generic_filter_vs_scipy(mode, function, dtype):
+    rstate = np.random.RandomState(0)
+    arr = (100 * rstate.rand(24, 31)).astype(dtype)
+    footprint = np.array([[0, 1, 1], [1, 1, 0], [1, 1, 1]], dtype=bool)
+    kwargs = dict(mode=mode, cval=3.0, origin=(0, 1))
+    expected = ndimage.generic_filter(
+        arr.astype(np.float64), np.mean, footprint=footprint, **kwargs
+    ).astype(dtype)
+    res = sndi.generic_filter(
+        cp.asarray(arr), function, footprint=cp.asarray(footprint), **kwargs
+    )
+    assert res.dtype == dtype
+    if dtype == np.uint8:
+        # the float to integer conversion truncates in both cases
+        assert_array_equal(res, expected)
+    else:
+        assert_allclose(res, expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "mode", ["reflect", "constant", "nearest", "mirror", "wrap"]
+)
+def test_generic_filter_vs_minimum_filter(mode):
+    # the boundary handling is shared with the other footprint filters
+    arr = cp.asarray(np.random.RandomState(0).rand(17, 23))
+    footprint = cp.asarray([[1, 0, 1], [0, 1, 1], [1, 1, 0]], dtype=bool)
+    kwargs = dict(footprint=footprint, mode=mode, cval=-1.0, origin=(1, 0))
+    res = sndi.generic_filter(arr, _GENERIC_MIN, **kwargs)
+    assert_array_equal(res, sndi.minimum_filter(arr, **kwargs))
+
+
+def test_generic_filter_map_expr():
+    # a weighted sum through the footprint position
+    arr = cp.arange(30, dtype=cp.float64).reshape(5, 6)
+    weights = cp.asarray([[1, 2, 3], [4, 5, 6], [7, 8, 9]], dtype=cp.float64)
+    reduction = dict(map_expr="x * (pos + 1)", reduce_expr="a + b", identity=0)
+    res = sndi.generic_filter(arr, reduction, size=3, mode="nearest")
+    expected = sndi.correlate(arr, weights, mode="nearest")
+    assert_allclose(res, expected)
+
+
+def test_generic_filter_invalid():
+    arr = cp.ones((5, 5))
+    with assert_raises(TypeError):
+        sndi.generic_filter(arr, np.mean, size=3)
+    with assert_raises(ValueError):
+        sndi.generic_filter(arr, dict(reduce_expr="a + b"), size=3)
+    with assert_raises(ValueError):
+        sndi.generic_filter(arr, dict(_GENERIC_MEAN, bad="x"), size=3)
+    with assert_raises(TypeError):
+        sndi.generic_filter(arr.astype(cp.complex64), _GENERIC_MEAN, size=3)
+    with assert_raises(RuntimeError):
+        sndi.generic_filter(
+            arr, _GENERIC_MEAN, footprint=cp.zeros((3, 3), dtype=bool)
+        )
 
 
 # def test_gh_5430():
@@ -2,9 +2,11 @@
 import itertools
 
 import cupy as cp
+import numpy as np
 import pytest
 
 from cupyimg.scipy.ndimage import correlate, convolve, correlate1d, convolve1d
+from cupyimg.scipy.ndimage import filters
 
 try:
     import scipy.ndimage  # NOQA
@@ -77,3 +79,219 @@ def test_convolve1d_precision(dtype, func):
 
     # not identical due to differing internal precision used above
     cp.testing.assert_allclose(y1, y2, rtol=1e-4)
+
+
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.int8, cp.uint16, cp.int16])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "wrap"])
+@pytest.mark.parametrize("rank", [1, 12, 24, 47])
+@pytest.mark.parametrize("origin", [0, (-1, 2)])
+def test_rank_filter_histogram(dtype, mode, rank, origin):
+    rstate = cp.random.RandomState(5)
+    info = np.iinfo(dtype)
+    # several runs of the sliding histogram along the last axis
+    x = rstate.randint(info.min, info.max + 1, (40, 150)).astype(dtype)
+    footprint = cp.ones((7, 7), dtype=bool)
+    footprint[0, 0] = footprint[-1, 2] = footprint[3, 4] = False
+    kwargs = dict(footprint=footprint, mode=mode, cval=3, origin=origin)
+    expected = filters._rank_filter(
+        x, lambda fs: rank, algorithm="sort", **kwargs
+    )
+    result = filters._rank_filter(
+        x, lambda fs: rank, algorithm="histogram", **kwargs
+    )
+    assert result.dtype == x.dtype
+    cp.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.uint16])
+def test_median_filter_histogram_large_footprint(dtype):
+    rstate = cp.random.RandomState(5)
+    x = rstate.randint(0, 256, (24, 25, 26)).astype(dtype)
+    result = filters.median_filter(x, size=9)
+    expected = scipy.ndimage.median_filter(cp.asnumpy(x), size=9)
+    cp.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("dtype", [cp.int8, cp.uint16])
+@pytest.mark.parametrize("shape", [(300,), (9, 11, 140)])
+def test_rank_filter_histogram_nd(dtype, shape):
+    rstate = cp.random.RandomState(5)
+    info = np.iinfo(dtype)
+    x = rstate.randint(info.min, info.max + 1, shape).astype(dtype)
+    footprint = cp.asarray(np.random.RandomState(5).rand(*(5,) * len(shape)))
+    footprint = footprint > 0.3
+    expected = filters._rank_filter(
+        x, lambda fs: fs // 3, footprint=footprint, algorithm="sort"
+    )
+    # in-place filtering goes through a temporary output
+    result = filters._rank_filter(
+        x,
+        lambda fs: fs // 3,
+        footprint=footprint,
+        output=x,
+        algorithm="histogram",
+    )
+    assert result is x
+    cp.testing.assert_array_equal(result, expected)
+
+
+def test_rank_filter_histogram_invalid_dtype():
+    x = cp.zeros((8, 8), dtype=cp.float32)
+    with pytest.raises(ValueError):
+        filters._rank_filter(
+            x, lambda fs: fs // 2, size=3, algorithm="histogram"
+        )
+
+
+@pytest.mark.parametrize("func", ["min", "max"])
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.int16, cp.float32, cp.float64])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "mirror"])
+@pytest.mark.parametrize("size, origin", [(2, 0), (13, 0), (13, -6), (24, 5)])
+@pytest.mark.parametrize("axis", [0, 1, -1])
+def test_min_or_max_1d_van_herk(func, dtype, mode, size, origin, axis):
+    rstate = cp.random.RandomState(5)
+    x = (100 * rstate.rand(17, 30, 9)).astype(dtype)
+    kwargs = dict(mode=mode, cval=3, origin=origin, func=func)
+    expected = filters._min_or_max_1d(
+        x, size, axis, algorithm="direct", **kwargs
+    )
+    result = filters._min_or_max_1d(
+        x, size, axis, algorithm="van_herk", **kwargs
+    )
+    assert result.dtype == expected.dtype
+    cp.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("func", ["minimum_filter", "maximum_filter"])
+def test_min_or_max_filter_large_box(func):
+    rstate = cp.random.RandomState(5)
+    x = rstate.randint(0, 256, (64, 48)).astype(cp.uint8)
+    result = getattr(filters, func)(x, size=(25, 31))
+    expected = getattr(scipy.ndimage, func)(cp.asnumpy(x), size=(25, 31))
+    cp.testing.assert_array_equal(result, expected)
+
+
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.int16, cp.float32, cp.float64])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "mirror"])
+@pytest.mark.parametrize(
+    "size, origin", [(2, 0), (13, 0), (13, -6), (24, 5), (301, 0)]
+)
+@pytest.mark.parametrize("axis", [0, 1, -1])
+def test_uniform_filter1d_running_sum(dtype, mode, size, origin, axis):
+    rstate = cp.random.RandomState(5)
+    # the middle axis is longer than the chunk processed by each thread
+    x = (100 * rstate.rand(17, 600, 9)).astype(dtype)
+    kwargs = dict(mode=mode, cval=3, origin=origin, output=cp.float64)
+    expected = scipy.ndimage.uniform_filter1d(
+        cp.asnumpy(x), size, axis, **kwargs
+    )
+    result = filters._uniform_filter1d(
+        x, size, axis, algorithm="running_sum", **kwargs
+    )
+    cp.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_uniform_filter_running_sum_large_box():
+    rstate = cp.random.RandomState(5)
+    x = rstate.randint(0, 256, (64, 48)).astype(cp.float32)
+    result = filters.uniform_filter(x, size=(25, 31))
+    expected = scipy.ndimage.uniform_filter(cp.asnumpy(x), size=(25, 31))
+    cp.testing.assert_allclose(result, expected, rtol=1e-5)
+
+
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.float32, cp.float64])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "mirror"])
+@pytest.mark.parametrize("sigma", [3, 8])
+@pytest.mark.parametrize("order", [0, 1, 2])
+@pytest.mark.parametrize("axis", [0, 1, -1])
+def test_gaussian_filter1d_recursive(dtype, mode, sigma, order, axis):
+    rstate = cp.random.RandomState(5)
+    x = (100 * rstate.rand(17, 120, 9)).astype(dtype)
+    kwargs = dict(order=order, mode=mode, cval=50, output=cp.float64)
+    expected = scipy.ndimage.gaussian_filter1d(
+        cp.asnumpy(x), sigma, axis, **kwargs
+    )
+    result = filters.gaussian_filter1d(
+        x, sigma, axis, method="recursive", **kwargs
+    )
+    # the recursive filter approximates the sampled Gaussian kernel
+    cp.testing.assert_allclose(result, expected, atol=0.1)
+
+
+def test_gaussian_filter_recursive_inplace():
+    rstate = cp.random.RandomState(5)
+    x = rstate.rand(48, 64)
+    expected = scipy.ndimage.gaussian_filter(cp.asnumpy(x), (10, 4))
+    filters.gaussian_filter(x, (10, 4), output=x, method="recursive")
+    cp.testing.assert_allclose(x, expected, atol=1e-3)
+
+
+def test_gaussian_filter1d_recursive_invalid():
+    x = cp.ones((8, 8), dtype=cp.float32)
+    with pytest.raises(ValueError):
+        filters.gaussian_filter1d(x, 4, order=3, method="recursive")
+    with pytest.raises(TypeError):
+        filters.gaussian_filter1d(
+            x.astype(cp.complex64), 4, method="recursive"
+        )
+    with pytest.raises(ValueError):
+        filters.gaussian_filter1d(x, 4, method="fir")
+
+
+@pytest.mark.parametrize("shape", [(37, 70), (13, 20, 45), (9, 1, 40)])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "nearest", "mirror"])
+@pytest.mark.parametrize("output", [cp.float64, cp.uint8])
+@pytest.mark.parametrize("reverse", [False, True])
+def test_correlate1d_fused(shape, mode, output, reverse):
+    rstate = cp.random.RandomState(5)
+    x = 200 * rstate.rand(*shape)
+    ndim = x.ndim
+    axes = list(range(ndim))[::-1] if reverse else list(range(ndim))
+    weights = [rstate.rand(size) - 0.3 for size in (3, 9, 5)[:ndim]]
+    origins = (1, -1, 0)[:ndim]
+    modes = [mode] * ndim
+    modes[0] = "nearest"
+    expected = x
+    for axis, w in zip(axes, weights):
+        expected = filters.correlate1d(
+            expected,
+            w,
+            axis,
+            output=output,
+            mode=modes[axis],
+            cval=7,
+            origin=origins[axis],
+        )
+    result = cp.empty(shape, dtype=output)
+    assert (
+        filters._correlate1d_fused(
+            x, axes, weights, result, modes, 7, origins, "float"
+        )
+        is result
+    )
+    cp.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize("shape", [(48, 70), (13, 20, 45)])
+@pytest.mark.parametrize("mode", ["reflect", "constant", "mirror"])
+@pytest.mark.parametrize(
+    "func, kwargs",
+    [
+        ("gaussian_filter", dict(sigma=1.5)),
+        ("gaussian_filter", dict(sigma=(1, 0, 2), order=1)),
+        ("uniform_filter", dict(size=5)),
+        ("sobel", dict(axis=0)),
+        ("prewitt", dict(axis=-1)),
+        ("gaussian_gradient_magnitude", dict(sigma=1)),
+    ],
+)
+def test_separable_filters_fused(shape, mode, func, kwargs):
+    rstate = cp.random.RandomState(5)
+    x = rstate.rand(*shape)
+    kwargs = dict(kwargs)
+    if "sigma" in kwargs and isinstance(kwargs["sigma"], tuple):
+        kwargs["sigma"] = kwargs["sigma"][: x.ndim]
+    kwargs["mode"] = mode
+    result = getattr(filters, func)(x, **kwargs)
+    expected = getattr(scipy.ndimage, func)(cp.asnumpy(x), **kwargs)
+    cp.testing.assert_allclose(result, expected, rtol=1e-5, atol=1e-7)
@@ -11,6 +11,7 @@ from numpy.testing import (
 from cupy.testing import assert_array_equal, assert_array_almost_equal
 from numpy.testing import suppress_warnings
 import pytest
+import scipy.ndimage as cpu_ndimage
 
 import cupyimg.scipy.ndimage as ndimage
 
@@ -378,86 +379,125 @@ def test_label_default_dtype():
     test_array = cp.random.rand(10, 10)
     label, no_features = ndimage.label(test_array > 0.5)
     assert_(label.dtype in (cp.int32, cp.int64))
-    # TODO: uncomment once find_objects is implemented
     # Shouldn't raise an exception
-    # ndimage.find_objects(label)
+    ndimage.find_objects(label)
 
 
-# def test_find_objects01():
-#     data = cp.ones([], dtype=int)
-#     out = ndimage.find_objects(data)
-#     assert_(out == [()])
+@pytest.mark.parametrize("shape", [(200,), (31, 47), (9, 13, 11)])
+@pytest.mark.parametrize("dtype", [cp.int32, cp.int64, cp.uint32, cp.uint64])
+def test_label_random(shape, dtype):
+    rstate = np.random.RandomState(0)
+    data = rstate.rand(*shape) > 0.55
+    for connectivity in range(1, len(shape) + 1):
+        structure = cpu_ndimage.generate_binary_structure(
+            len(shape), connectivity
+        )
+        expected, expected_n = cpu_ndimage.label(data, structure)
+        output, n = ndimage.label(cp.asarray(data), structure, output=dtype)
+        assert output.dtype == dtype
+        assert_equal(n, expected_n)
+        assert_array_equal(output, expected)
+
+
+@pytest.mark.parametrize("shape", [(64, 48), (12, 17, 10)])
+def test_label_nd(shape):
+    data = np.random.RandomState(5).rand(*shape) > 0.5
+    expected, expected_n = cpu_ndimage.label(data)
+    output, n = ndimage.label(cp.asarray(data))
+    assert output.shape == shape
+    assert_equal(n, expected_n)
+    assert_array_equal(output, expected)
+
+
+def test_label_output_noncontiguous():
+    data = cp.asarray([[1, 1, 0, 1], [0, 0, 0, 1], [1, 0, 1, 1]])
+    output = cp.zeros((4, 3), dtype=cp.int32).T
+    n = ndimage.label(data, output=output)
+    assert_equal(n, 3)
+    assert_array_equal(output, [[1, 1, 0, 2], [0, 0, 0, 2], [3, 0, 2, 2]])
+
+
+def test_label_output_insufficient_bit_depth():
+    data = cp.arange(600) % 2
+    with pytest.raises(RuntimeError):
+        ndimage.label(data, output=cp.uint8)
+
 
+def test_find_objects01():
+    data = cp.ones([], dtype=int)
+    out = ndimage.find_objects(data)
+    assert_(out == [()])
 
-# def test_find_objects02():
-#     data = cp.zeros([], dtype=int)
-#     out = ndimage.find_objects(data)
-#     assert_(out == [])
 
+def test_find_objects02():
+    data = cp.zeros([], dtype=int)
+    out = ndimage.find_objects(data)
+    assert_(out == [])
 
-# def test_find_objects03():
-#     data = cp.ones([1], dtype=int)
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [(slice(0, 1, None),)])
 
+def test_find_objects03():
+    data = cp.ones([1], dtype=int)
+    out = ndimage.find_objects(data)
+    assert_equal(out, [(slice(0, 1, None),)])
 
-# def test_find_objects04():
-#     data = cp.zeros([1], dtype=int)
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [])
 
+def test_find_objects04():
+    data = cp.zeros([1], dtype=int)
+    out = ndimage.find_objects(data)
+    assert_equal(out, [])
 
-# def test_find_objects05():
-#     data = cp.ones([5], dtype=int)
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [(slice(0, 5, None),)])
 
+def test_find_objects05():
+    data = cp.ones([5], dtype=int)
+    out = ndimage.find_objects(data)
+    assert_equal(out, [(slice(0, 5, None),)])
 
-# def test_find_objects06():
-#     data = cp.asarray([1, 0, 2, 2, 0, 3])
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [(slice(0, 1, None),),
-#                        (slice(2, 4, None),),
-#                        (slice(5, 6, None),)])
 
+def test_find_objects06():
+    data = cp.asarray([1, 0, 2, 2, 0, 3])
+    out = ndimage.find_objects(data)
+    assert_equal(out, [(slice(0, 1, None),),
+                       (slice(2, 4, None),),
+                       (slice(5, 6, None),)])
 
-# def test_find_objects07():
-#     data = cp.asarray([[0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0]])
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [])
 
+def test_find_objects07():
+    data = cp.asarray([[0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0]])
+    out = ndimage.find_objects(data)
+    assert_equal(out, [])
 
-# def test_find_objects08():
-#     data = cp.asarray([[1, 0, 0, 0, 0, 0],
-#                        [0, 0, 2, 2, 0, 0],
-#                        [0, 0, 2, 2, 2, 0],
-#                        [3, 3, 0, 0, 0, 0],
-#                        [3, 3, 0, 0, 0, 0],
-#                        [0, 0, 0, 4, 4, 0]])
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [(slice(0, 1, None), slice(0, 1, None)),
-#                        (slice(1, 3, None), slice(2, 5, None)),
-#                        (slice(3, 5, None), slice(0, 2, None)),
-#                        (slice(5, 6, None), slice(3, 5, None))])
 
+def test_find_objects08():
+    data = cp.asarray([[1, 0, 0, 0, 0, 0],
+                       [0, 0, 2, 2, 0, 0],
+                       [0, 0, 2, 2, 2, 0],
+                       [3, 3, 0, 0, 0, 0],
+                       [3, 3, 0, 0, 0, 0],
+                       [0, 0, 0, 4, 4, 0]])
+    out = ndimage.find_objects(data)
+    assert_equal(out, [(slice(0, 1, None), slice(0, 1, None)),
+                       (slice(1, 3, None), slice(2, 5, None)),
+                       (slice(3, 5, None), slice(0, 2, None)),
+                       (slice(5, 6, None), slice(3, 5, None))])
 
-# def test_find_objects09():
-#     data = cp.asarray([[1, 0, 0, 0, 0, 0],
-#                        [0, 0, 2, 2, 0, 0],
-#                        [0, 0, 2, 2, 2, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 0, 0, 0],
-#                        [0, 0, 0, 4, 4, 0]])
-#     out = ndimage.find_objects(data)
-#     assert_equal(out, [(slice(0, 1, None), slice(0, 1, None)),
-#                        (slice(1, 3, None), slice(2, 5, None)),
-#                        None,
-#                        (slice(5, 6, None), slice(3, 5, None))])
+
+def test_find_objects09():
+    data = cp.asarray([[1, 0, 0, 0, 0, 0],
+                       [0, 0, 2, 2, 0, 0],
+                       [0, 0, 2, 2, 2, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 0, 0, 0],
+                       [0, 0, 0, 4, 4, 0]])
+    out = ndimage.find_objects(data)
+    assert_equal(out, [(slice(0, 1, None), slice(0, 1, None)),
+                       (slice(1, 3, None), slice(2, 5, None)),
+                       None,
+                       (slice(5, 6, None), slice(3, 5, None))])
 
 
 def test_sum01():
@@ -1037,6 +1077,169 @@ def test_center_of_mass09():
     assert_array_almost_equal(output, expected)
 
 
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.int16, cp.float32])
+@pytest.mark.parametrize("remap", [False, True])
+def test_labeled_statistics_many_labels(dtype, remap):
+    rstate = np.random.RandomState(5)
+    shape = (64, 96)
+    labels = rstate.randint(0, 2000, shape)
+    if remap:
+        # labels larger than the number of elements are remapped internally
+        labels = labels * 1000 - 50
+    x = (rstate.standard_normal(shape) * 20 + 100).astype(dtype)
+    index = np.concatenate((np.unique(labels)[::3], [labels.max() + 1]))
+    x_gpu, labels_gpu, index_gpu = map(cp.asarray, (x, labels, index))
+    for func in ["sum", "mean", "variance", "minimum", "maximum"]:
+        expected = getattr(cpu_ndimage, func)(x, labels, index)
+        result = getattr(ndimage, func)(x_gpu, labels_gpu, index_gpu)
+        if func in ["mean", "variance"]:
+            # the last label is absent
+            expected, result = expected[:-1], result[:-1]
+        assert_array_almost_equal(result, expected, decimal=3)
+    expected = cpu_ndimage.center_of_mass(x, labels, index[:-1])
+    result = ndimage.center_of_mass(x_gpu, labels_gpu, index_gpu[:-1])
+    assert_array_almost_equal(result, expected)
+
+
+def test_labeled_positions_first_of_ties():
+    x = cp.asarray([[3, 1, 1], [1, 5, 5], [0, 5, 2]])
+    labels = cp.asarray([[1, 1, 1], [1, 1, 2], [2, 2, 2]])
+    assert_equal(
+        ndimage.minimum_position(x, labels, cp.asarray([1, 2])),
+        [(0, 1), (2, 0)],
+    )
+    assert_equal(
+        ndimage.maximum_position(x, labels, cp.asarray([1, 2])),
+        [(1, 1), (1, 2)],
+    )
+
+
+_lc_data = np.array([[1, 2, 0, 0], [5, 3, 0, 4], [0, 0, 0, 7], [9, 3, 0, 0]])
+
+
+@pytest.mark.parametrize(
+    "func, cpu_func",
+    [
+        ("count", np.size),
+        ("sum", np.sum),
+        ("mean", np.mean),
+        ("variance", np.var),
+        ("standard_deviation", np.std),
+        ("minimum", np.min),
+        ("maximum", np.max),
+        ("median", np.median),
+        (cp.mean, np.mean),
+        (np.amax, np.amax),
+    ],
+)
+def test_labeled_comprehension_reduction(func, cpu_func):
+    labels, n = cpu_ndimage.label(_lc_data)
+    index = np.arange(1, n + 2)  # the last label is absent
+    expected = cpu_ndimage.labeled_comprehension(
+        _lc_data, labels, index, cpu_func, float, -1
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data), cp.asarray(labels), index, func, float, -1
+    )
+    assert isinstance(result, np.ndarray)
+    assert_array_almost_equal(result, expected)
+
+    # scalar index and index=None
+    expected = cpu_ndimage.labeled_comprehension(
+        _lc_data, labels, 2, cpu_func, float, -1
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data), cp.asarray(labels), 2, func, float, -1
+    )
+    assert_almost_equal(float(result), expected)
+    expected = cpu_ndimage.labeled_comprehension(
+        _lc_data, labels, None, cpu_func, float, -1
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data), cp.asarray(labels), None, func, float, -1
+    )
+    assert_almost_equal(float(result), expected)
+
+
+@pytest.mark.parametrize(
+    "func, cpu_func", [("mean", np.mean), (cp.max, np.max)]
+)
+def test_labeled_comprehension_default_none(func, cpu_func):
+    labels, n = cpu_ndimage.label(_lc_data)
+    index = np.arange(1, n + 2)  # the last label is absent
+    expected = cpu_ndimage.labeled_comprehension(
+        _lc_data, labels, index, cpu_func, float, None
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data), cp.asarray(labels), index, func, float, None
+    )
+    assert np.isnan(result[-1])
+    assert_array_almost_equal(result, expected)
+
+
+def test_labeled_comprehension_custom_reduction():
+    labels, n = cpu_ndimage.label(_lc_data)
+    index = cp.arange(1, n + 2)
+    sum_of_squares = dict(map_expr="x * x", reduce_expr="a + b", identity=0)
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data),
+        cp.asarray(labels),
+        index,
+        sum_of_squares,
+        float,
+        -1,
+    )
+    assert_array_almost_equal(result, [39, 65, 90, -1])
+
+    max_over_count = dict(
+        reduce_expr="max(a, b)", post_map_expr="a / count", identity=-1e300
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data),
+        cp.asarray(labels),
+        index,
+        max_over_count,
+        float,
+        0,
+    )
+    assert_array_almost_equal(result, [1.25, 3.5, 4.5, 0])
+
+    with pytest.raises(ValueError):
+        ndimage.labeled_comprehension(
+            cp.asarray(_lc_data), cp.asarray(labels), index, "mode", float, 0
+        )
+    with pytest.raises(ValueError):
+        ndimage.labeled_comprehension(
+            cp.asarray(_lc_data),
+            cp.asarray(labels),
+            index,
+            dict(reduce_expr="a + b"),
+            float,
+            0,
+        )
+
+
+def test_labeled_comprehension_callable():
+    labels, n = cpu_ndimage.label(_lc_data)
+    index = np.arange(1, n + 2)
+
+    def func(vals):
+        return vals.max() - vals.min()
+
+    expected = cpu_ndimage.labeled_comprehension(
+        _lc_data, labels, index, func, float, -1
+    )
+    result = ndimage.labeled_comprehension(
+        cp.asarray(_lc_data),
+        cp.asarray(labels),
+        cp.asarray(index),
+        func,
+        float,
+        -1,
+    )
+    assert_array_almost_equal(result, expected)
+
+
 def test_histogram01():
     expected = cp.ones(10)
     input = cp.arange(10)
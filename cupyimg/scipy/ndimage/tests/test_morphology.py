@@ -1,4 +1,6 @@
 import cupy
+import numpy
+import pytest
 from pytest import raises as assert_raises
 
 import cupyimg.scipy.ndimage as sndi
@@ -44,7 +46,192 @@ def test_binary_closing_noninteger_brute_force_passes_when_true():
     assert sndi.binary_erosion(
         data, iterations=2, brute_force=1.5
     ) == sndi.binary_erosion(data, iterations=2, brute_force=bool(1.5))
-    # TODO: restore this test case if brute_force=False case is implemented
-    # assert sndi.binary_erosion(
-    #     data, iterations=2, brute_force=0.0
-    # ) == sndi.binary_erosion(data, iterations=2, brute_force=bool(0.0))
+    assert sndi.binary_erosion(
+        data, iterations=2, brute_force=0.0
+    ) == sndi.binary_erosion(data, iterations=2, brute_force=bool(0.0))
+
+
+@pytest.mark.parametrize("iterations", [2, 3, 5, -1])
+@pytest.mark.parametrize("invert", [False, True])
+@pytest.mark.parametrize("masked", [False, True])
+@pytest.mark.parametrize("border_value", [0, 1])
+def test_binary_erosion_front_matches_brute_force(
+    iterations, invert, masked, border_value
+):
+    rng = numpy.random.default_rng(123)
+    data = cupy.asarray(rng.random((48, 40)) > 0.3)
+    mask = cupy.asarray(rng.random((48, 40)) > 0.1) if masked else None
+    structure = cupy.asarray([[0, 1, 1], [1, 1, 1], [0, 1, 0]], dtype=bool)
+    func = sndi.binary_dilation if invert else sndi.binary_erosion
+    kwargs = dict(
+        structure=structure,
+        iterations=iterations,
+        mask=mask,
+        border_value=border_value,
+    )
+    expected = func(data, brute_force=True, **kwargs)
+    result = func(data, brute_force=False, **kwargs)
+    assert (result == expected).all()
+
+
+def test_binary_propagation_long_path():
+    # propagation along a serpentine path needs many iterations to converge
+    mask = cupy.zeros((41, 41), dtype=bool)
+    mask[::4, :] = True
+    mask[1::8, -1] = mask[2::8, -1] = mask[3::8, -1] = True
+    mask[5::8, 0] = mask[6::8, 0] = mask[7::8, 0] = True
+    seed = cupy.zeros_like(mask)
+    seed[0, 0] = True
+    result = sndi.binary_propagation(seed, mask=mask)
+    assert (result == mask).all()
+
+
+def _distance_transform_input(shape, density):
+    rng = numpy.random.default_rng(0)
+    data = rng.random(shape) > density
+    data.flat[0] = False
+    return data
+
+
+def _check_indices(data, distances, indices, metric, sampling=None):
+    # ties may be broken differently than by SciPy: check that the indices
+    # point to background elements at the right distance
+    data = cupy.asnumpy(data)
+    indices = cupy.asnumpy(indices)
+    assert indices.dtype == numpy.int32
+    assert not data[tuple(indices)].any()
+    delta = indices - numpy.indices(data.shape)
+    if sampling is not None:
+        delta = delta * numpy.reshape(sampling, (-1,) + (1,) * data.ndim)
+    if metric == "euclidean":
+        expected = numpy.sqrt((delta ** 2).sum(0))
+    elif metric == "taxicab":
+        expected = numpy.abs(delta).sum(0)
+    else:
+        expected = numpy.abs(delta).max(0)
+    numpy.testing.assert_allclose(cupy.asnumpy(distances), expected)
+
+
+@pytest.mark.parametrize(
+    "shape", [(50,), (31, 47), (12, 17, 9), (1, 20), (6, 5, 4, 3)]
+)
+@pytest.mark.parametrize("density", [0.02, 0.3, 0.9])
+@pytest.mark.parametrize("sampling", [None, 0.7, "anisotropic"])
+def test_distance_transform_edt(shape, density, sampling):
+    from scipy import ndimage
+
+    if sampling == "anisotropic":
+        sampling = tuple(numpy.linspace(0.5, 2.5, len(shape)))
+    data = _distance_transform_input(shape, density)
+    expected = ndimage.distance_transform_edt(data, sampling=sampling)
+    distances, indices = sndi.distance_transform_edt(
+        cupy.asarray(data), sampling=sampling, return_indices=True
+    )
+    assert distances.dtype == numpy.float64
+    cupy.testing.assert_allclose(distances, expected)
+    _check_indices(data, distances, indices, "euclidean", sampling)
+
+
+def test_distance_transform_edt_float32():
+    data = _distance_transform_input((64, 48), 0.1)
+    expected = sndi.distance_transform_edt(cupy.asarray(data))
+    distances = sndi.distance_transform_edt(
+        cupy.asarray(data), float64_distances=False
+    )
+    assert distances.dtype == numpy.float32
+    cupy.testing.assert_allclose(distances, expected, rtol=1e-6)
+
+
+def test_distance_transform_edt_outputs():
+    data = cupy.asarray(_distance_transform_input((20, 30), 0.2))
+    expected_dt, expected_ft = sndi.distance_transform_edt(
+        data, return_indices=True
+    )
+    dt = cupy.empty(data.shape, dtype=cupy.float64)
+    # non-contiguous indices
+    ft = cupy.empty((2, 30, 20), dtype=cupy.int32).transpose(0, 2, 1)
+    result = sndi.distance_transform_edt(
+        data, return_indices=True, distances=dt, indices=ft
+    )
+    assert result is None
+    cupy.testing.assert_array_equal(dt, expected_dt)
+    cupy.testing.assert_array_equal(ft, expected_ft)
+    ft = sndi.distance_transform_edt(
+        data, return_distances=False, return_indices=True
+    )
+    cupy.testing.assert_array_equal(ft, expected_ft)
+    with assert_raises(RuntimeError):
+        sndi.distance_transform_edt(data, return_distances=False)
+    with assert_raises(RuntimeError):
+        sndi.distance_transform_edt(data, indices=ft)
+    with assert_raises(RuntimeError):
+        sndi.distance_transform_edt(
+            data, distances=cupy.empty(data.shape, dtype=cupy.float32)
+        )
+
+
+@pytest.mark.parametrize(
+    "func",
+    [
+        sndi.distance_transform_bf,
+        sndi.distance_transform_cdt,
+        sndi.distance_transform_edt,
+    ],
+)
+def test_distance_transform_0d(func):
+    with assert_raises(RuntimeError):
+        func(cupy.asarray(1))
+
+
+@pytest.mark.parametrize("shape", [(50,), (31, 47), (12, 17, 9)])
+@pytest.mark.parametrize("density", [0.02, 0.3, 0.9])
+@pytest.mark.parametrize("metric", ["chessboard", "taxicab"])
+def test_distance_transform_cdt(shape, density, metric):
+    from scipy import ndimage
+
+    data = _distance_transform_input(shape, density)
+    expected = ndimage.distance_transform_cdt(data, metric=metric)
+    distances, indices = sndi.distance_transform_cdt(
+        cupy.asarray(data), metric=metric, return_indices=True
+    )
+    assert distances.dtype == numpy.int32
+    cupy.testing.assert_array_equal(distances, expected)
+    _check_indices(data, distances, indices, metric)
+
+
+def test_distance_transform_cdt_structure():
+    data = cupy.asarray(_distance_transform_input((20, 30), 0.2))
+    for connectivity, metric in [(1, "taxicab"), (2, "chessboard")]:
+        structure = sndi.generate_binary_structure(2, connectivity)
+        cupy.testing.assert_array_equal(
+            sndi.distance_transform_cdt(data, metric=structure),
+            sndi.distance_transform_cdt(data, metric=metric),
+        )
+    with assert_raises(ValueError):
+        sndi.distance_transform_cdt(data, metric="euclidean")
+    with assert_raises(ValueError):
+        sndi.distance_transform_cdt(data, metric=numpy.ones((3, 5)))
+
+
+@pytest.mark.parametrize("shape", [(50,), (15, 21), (6, 7, 5)])
+@pytest.mark.parametrize("metric", ["euclidean", "taxicab", "chessboard"])
+@pytest.mark.parametrize("sampling", [None, (1.5,)])
+def test_distance_transform_bf(shape, metric, sampling):
+    from scipy import ndimage
+
+    if sampling is not None:
+        sampling = sampling * len(shape)
+    data = _distance_transform_input(shape, 0.3)
+    expected = ndimage.distance_transform_bf(
+        data, metric=metric, sampling=sampling
+    )
+    distances, indices = sndi.distance_transform_bf(
+        cupy.asarray(data),
+        metric=metric,
+        sampling=sampling,
+        return_indices=True,
+    )
+    assert distances.dtype == expected.dtype
+    cupy.testing.assert_allclose(distances, expected)
+    if metric == "euclidean":
+        _check_indices(data, distances, indices, metric, sampling)
@@ -52,7 +52,7 @@ from cupyimg.scipy import ndimage
 
 
 eps = 1e-12
-brute_force_implemented = False  # used to skip tests for missing feature
+brute_force_implemented = True  # used to skip tests for missing feature
 
 
 def sumsq(a, b):
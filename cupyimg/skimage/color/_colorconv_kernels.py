@@ -0,0 +1,425 @@
+"""Fused elementwise kernels for the color space conversions.
+
+A conversion is described by a chain of steps, each acting on the three
+channels of a single pixel. The whole chain is compiled into one elementwise
+kernel, so that e.g. RGB -> Lab reads and writes the image once instead of
+allocating a temporary array per intermediate operation. The arithmetic is
+done in single precision for float32 (and float16) images and in double
+precision otherwise.
+
+Steps are hashable tuples whose first element is the name of the step:
+
+* ``("affine", matrix, offset)``: ``c = matrix @ c + offset``, with the
+  matrix and offset flattened to tuples of floats. The conversion kernels
+  read them from an array argument (see `_parametrize_steps`), so that user
+  supplied matrices do not each require a new kernel.
+* ``("srgb_to_linear",)``, ``("linear_to_srgb",)``: sRGB gamma expansion
+  and compression (the latter clips to [0, 1]).
+* ``("xyz2lab", white)``, ``("lab2xyz", white)``, ``("xyz2luv", white)``,
+  ``("luv2xyz", white)``: CIE conversions for the reference white ``white``.
+* ``("lab2lch",)``, ``("lch2lab",)``, ``("rgb2hsv",)``, ``("hsv2rgb",)``.
+* ``("stains_log",)``, ``("stains_exp",)``: the nonlinear parts of the
+  stain separation and combination.
+"""
+import math
+from warnings import warn
+
+import cupy as cp
+import numpy as np
+
+from cupyimg import memoize
+
+
+def _affine(matrix, offset=(0, 0, 0)):
+    """Step applying ``matrix @ c + offset`` to the channels ``c``."""
+    matrix = tuple(float(m) for m in np.asarray(matrix, dtype=float).ravel())
+    offset = tuple(float(o) for o in np.asarray(offset, dtype=float).ravel())
+    if len(matrix) != 9 or len(offset) != 3:
+        raise ValueError("expected a 3x3 matrix and 3 offsets")
+    return ("affine", matrix, offset)
+
+
+def _fold_steps(steps):
+    """Merge consecutive affine steps into a single one."""
+    folded = []
+    for step in steps:
+        if step[0] == "affine" and folded and folded[-1][0] == "affine":
+            m1 = np.reshape(folded[-1][1], (3, 3))
+            o1 = np.asarray(folded[-1][2])
+            m2 = np.reshape(step[1], (3, 3))
+            folded[-1] = _affine(m2 @ m1, m2 @ o1 + np.asarray(step[2]))
+        else:
+            folded.append(step)
+    return tuple(folded)
+
+
+def _parametrize_steps(steps):
+    """Move the coefficients of the affine steps to a parameter array.
+
+    Each affine step is replaced by ``("affine", base)``, where ``base`` is
+    the index of its 9 matrix and 3 offset coefficients in the returned
+    float64 array.
+    """
+    kinds = []
+    params = []
+    for step in steps:
+        if step[0] == "affine":
+            kinds.append(("affine", len(params)))
+            params += step[1] + step[2]
+        else:
+            kinds.append(step)
+    return tuple(kinds), np.asarray(params, dtype=np.float64)
+
+
+def _affine_code(step, f):
+    if len(step) == 2:
+        # coefficients read from the parameter array p
+        base = step[1]
+        matrix = ["(T)p[{}]".format(base + m) for m in range(9)]
+        offset = ["(T)p[{}]".format(base + 9 + j) for j in range(3)]
+    else:
+        matrix = [f(m) for m in step[1]]
+        offset = [f(o) for o in step[2]]
+    code = []
+    for j in range(3):
+        # zero coefficients are kept so that NaN and inf values propagate
+        terms = ["{} * c{}".format(matrix[3 * j + k], k) for k in range(3)]
+        terms.append(offset[j])
+        code.append("T t{} = {};".format(j, " + ".join(terms)))
+    code.append("c0 = t0; c1 = t1; c2 = t2;")
+    return code
+
+
+def _srgb_to_linear_code(step, f):
+    return [
+        "c{j} = c{j} > {a} ? pow((c{j} + {b}) / {c}, {g}) : c{j} / {d};"
+        "".format(
+            j=j, a=f(0.04045), b=f(0.055), c=f(1.055), g=f(2.4), d=f(12.92)
+        )
+        for j in range(3)
+    ]
+
+
+def _linear_to_srgb_code(step, f):
+    code = []
+    for j in range(3):
+        code.append(
+            "c{j} = c{j} > {a} ? {c} * pow(c{j}, {g}) - {b} : c{j} * {d};"
+            "".format(
+                j=j,
+                a=f(0.0031308),
+                b=f(0.055),
+                c=f(1.055),
+                g=f(1 / 2.4),
+                d=f(12.92),
+            )
+        )
+        # written so that NaN values are kept, as with cupy.clip
+        code.append(
+            "c{j} = c{j} < 0 ? {z} : (c{j} > 1 ? {o} : c{j});".format(
+                j=j, z=f(0), o=f(1)
+            )
+        )
+    return code
+
+
+def _xyz2lab_code(step, f):
+    white = step[1]
+    code = [
+        "c{j} = c{j} / {w};".format(j=j, w=f(white[j])) for j in range(3)
+    ]
+    code += [
+        "c{j} = c{j} > {a} ? cbrt(c{j}) : {b} * c{j} + {c};".format(
+            j=j, a=f(0.008856), b=f(7.787), c=f(16.0 / 116.0)
+        )
+        for j in range(3)
+    ]
+    code.append(
+        "T t0 = {a} * c1 - {b}; T t1 = {c} * (c0 - c1); "
+        "T t2 = {d} * (c1 - c2);".format(
+            a=f(116.0), b=f(16.0), c=f(500.0), d=f(200.0)
+        )
+    )
+    code.append("c0 = t0; c1 = t1; c2 = t2;")
+    return code
+
+
+def _lab2xyz_code(step, f):
+    white = step[1]
+    code = [
+        "T t1 = (c0 + {a}) / {b};".format(a=f(16.0), b=f(116.0)),
+        "T t0 = c1 / {a} + t1;".format(a=f(500.0)),
+        "T t2 = t1 - c2 / {a};".format(a=f(200.0)),
+        "if (t2 < 0) {{ t2 = {z}; atomicAdd(&invalid[0], 1); }}".format(
+            z=f(0)
+        ),
+        "c0 = t0; c1 = t1; c2 = t2;",
+    ]
+    code += [
+        "c{j} = (c{j} > {a} ? c{j} * c{j} * c{j} : (c{j} - {b}) / {c}) * {w};"
+        "".format(
+            j=j,
+            a=f(0.2068966),
+            b=f(16.0 / 116.0),
+            c=f(7.787),
+            w=f(white[j]),
+        )
+        for j in range(3)
+    ]
+    return code
+
+
+def _white_uv(white):
+    denom = white[0] + 15 * white[1] + 3 * white[2]
+    return 4 * white[0] / denom, 9 * white[1] / denom
+
+
+_EPS = np.finfo(np.float64).eps
+
+
+def _xyz2luv_code(step, f):
+    white = step[1]
+    u0, v0 = _white_uv(white)
+    return [
+        "T t0 = c1 / {w};".format(w=f(white[1])),
+        "t0 = t0 > {a} ? {b} * cbrt(t0) - {c} : {d} * t0;".format(
+            a=f(0.008856), b=f(116.0), c=f(16.0), d=f(903.3)
+        ),
+        "T d = c0 + {a} * c1 + {b} * c2 + {e};".format(
+            a=f(15.0), b=f(3.0), e=f(_EPS)
+        ),
+        "T t1 = {a} * t0 * ({b} * c0 / d - {u0});".format(
+            a=f(13.0), b=f(4.0), u0=f(u0)
+        ),
+        "T t2 = {a} * t0 * ({b} * c1 / d - {v0});".format(
+            a=f(13.0), b=f(9.0), v0=f(v0)
+        ),
+        "c0 = t0; c1 = t1; c2 = t2;",
+    ]
+
+
+def _luv2xyz_code(step, f):
+    white = step[1]
+    u0, v0 = _white_uv(white)
+    return [
+        "T t1 = (c0 + {a}) / {b};".format(a=f(16.0), b=f(116.0)),
+        "t1 = (c0 > {a} ? t1 * t1 * t1 : c0 / {d}) * {w};".format(
+            a=f(7.999625), d=f(903.3), w=f(white[1])
+        ),
+        "T a = {u0} + c1 / ({k} * c0 + {e});".format(
+            u0=f(u0), k=f(13.0), e=f(_EPS)
+        ),
+        "T b = {v0} + c2 / ({k} * c0 + {e});".format(
+            v0=f(v0), k=f(13.0), e=f(_EPS)
+        ),
+        "T c = {a} * t1 * ({b} * b - {a});".format(a=f(3.0), b=f(5.0)),
+        "T t2 = ((a - {a}) * c - {b} * a * b * t1) / ({c} * b);".format(
+            a=f(4.0), b=f(15.0), c=f(12.0)
+        ),
+        "c0 = -(c / b + {a} * t2); c1 = t1; c2 = t2;".format(a=f(3.0)),
+    ]
+
+
+def _lab2lch_code(step, f):
+    return [
+        "T t1 = hypot(c1, c2);",
+        "T t2 = atan2(c2, c1);",
+        "if (t2 < 0) t2 += {};".format(f(2 * math.pi)),
+        "c1 = t1; c2 = t2;",
+    ]
+
+
+def _lch2lab_code(step, f):
+    return ["T t1 = c1 * cos(c2);", "c2 = c1 * sin(c2); c1 = t1;"]
+
+
+def _rgb2hsv_code(step, f):
+    return [
+        """
+    if (isnan(c0) || isnan(c1) || isnan(c2)) {{
+        c0 = {z}; c1 = {z}; c2 = {z};
+    }} else {{
+        T v = max(c0, max(c1, c2));
+        T delta = v - min(c0, min(c1, c2));
+        T h = {z}, s = {z};
+        if (delta != 0) {{
+            s = delta / v;
+            // the last channel equal to the maximum sets the hue
+            if (c2 == v) {{
+                h = {four} + (c0 - c1) / delta;
+            }} else if (c1 == v) {{
+                h = {two} + (c2 - c0) / delta;
+            }} else {{
+                h = (c1 - c2) / delta;
+            }}
+            h /= {six};
+            h -= floor(h);
+        }}
+        c0 = h; c1 = s; c2 = v;
+    }}""".format(
+            z=f(0), two=f(2.0), four=f(4.0), six=f(6.0)
+        )
+    ]
+
+
+def _hsv2rgb_code(step, f):
+    return [
+        """
+    {{
+        T h6 = c0 * {six};
+        T hi_ = floor(h6);
+        T fr = h6 - hi_;
+        T v = c2;
+        T p = v * ({one} - c1);
+        T q = v * ({one} - fr * c1);
+        T t = v * ({one} - ({one} - fr) * c1);
+        int hi = ((int)hi_) % 6;
+        if (hi < 0) hi += 6;
+        switch (hi) {{
+            case 0: c0 = v; c1 = t; c2 = p; break;
+            case 1: c0 = q; c1 = v; c2 = p; break;
+            case 2: c0 = p; c1 = v; c2 = t; break;
+            case 3: c0 = p; c1 = q; c2 = v; break;
+            case 4: c0 = t; c1 = p; c2 = v; break;
+            default: c0 = v; c1 = p; c2 = q; break;
+        }}
+    }}""".format(
+            six=f(6.0), one=f(1.0)
+        )
+    ]
+
+
+def _stains_log_code(step, f):
+    return [
+        "c{j} = -log10(c{j} + {two});".format(j=j, two=f(2.0))
+        for j in range(3)
+    ]
+
+
+def _stains_exp_code(step, f):
+    code = []
+    for j in range(3):
+        code.append(
+            "c{j} = pow({ten}, -c{j}) - {two};".format(
+                j=j, ten=f(10.0), two=f(2.0)
+            )
+        )
+        code.append(
+            "c{j} = c{j} < {m} ? {m} : (c{j} > {o} ? {o} : c{j});".format(
+                j=j, m=f(-1.0), o=f(1.0)
+            )
+        )
+    return code
+
+
+_STEP_CODE = {
+    "affine": _affine_code,
+    "srgb_to_linear": _srgb_to_linear_code,
+    "linear_to_srgb": _linear_to_srgb_code,
+    "xyz2lab": _xyz2lab_code,
+    "lab2xyz": _lab2xyz_code,
+    "xyz2luv": _xyz2luv_code,
+    "luv2xyz": _luv2xyz_code,
+    "lab2lch": _lab2lch_code,
+    "lch2lab": _lch2lab_code,
+    "rgb2hsv": _rgb2hsv_code,
+    "hsv2rgb": _hsv2rgb_code,
+    "stains_log": _stains_log_code,
+    "stains_exp": _stains_exp_code,
+}
+
+
+def _float_literal(double):
+    """Formatter of the float constants for the compute type T."""
+    if double:
+        return lambda x: "({!r})".format(float(x))
+    return lambda x: "({!r}f)".format(float(x))
+
+
+def _steps_code(steps, double):
+    """Code applying ``steps`` to the channels ``c0, c1, c2`` of type T."""
+    f = _float_literal(double)
+    code = []
+    for step in steps:
+        code.append("{")
+        code += _STEP_CODE[step[0]](step, f)
+        code.append("}")
+    return code
+
+
+@memoize(for_each_device=True)
+def _get_convert_kernel(steps, double):
+    """Kernel applying ``steps`` to each pixel of a (..., nc) array.
+
+    The first three of the ``nc`` input channels of a pixel are converted and
+    written to the first three of the ``ny`` output channels. The affine steps
+    must have been parametrized by `_parametrize_steps`, with the coefficients
+    passed as ``p``.
+    """
+    code = [
+        "typedef {} T;".format("double" if double else "float"),
+        "ptrdiff_t j = (ptrdiff_t)i * nc;",
+        "T c0 = (T)x[j], c1 = (T)x[j + 1], c2 = (T)x[j + 2];",
+    ]
+    code += _steps_code(steps, double)
+    code.append("j = (ptrdiff_t)i * ny;")
+    code.append("y[j] = (F)c0; y[j + 1] = (F)c1; y[j + 2] = (F)c2;")
+    out_params = "raw F y"
+    if any(step[0] == "lab2xyz" for step in steps):
+        out_params += ", raw int32 invalid"
+    return cp.ElementwiseKernel(
+        "raw F x, int32 nc, int32 ny, raw float64 p",
+        out_params,
+        "\n".join(code),
+        "cupyimg_skimage_color_convert",
+    )
+
+
+def _apply_steps(arr, steps, inplace=False):
+    """Convert the floating point image ``arr`` with a single kernel.
+
+    Parameters
+    ----------
+    arr : (..., nc) ndarray
+        The image to convert, with ``nc >= 3``. Only the first three channels
+        are converted.
+    steps : sequence of tuple
+        The conversion steps, applied in order.
+    inplace : bool, optional
+        If True, the result is written to ``arr`` (which must then be C
+        contiguous). Otherwise a new array with three channels is returned.
+
+    Returns
+    -------
+    out : ndarray
+        The converted image.
+    """
+    steps = _fold_steps(steps)
+    if inplace:
+        if not arr.flags.c_contiguous:
+            raise ValueError(
+                "in-place conversion requires a C contiguous array"
+            )
+        out = arr
+    else:
+        arr = cp.ascontiguousarray(arr)
+        out = cp.empty(arr.shape[:-1] + (3,), dtype=arr.dtype)
+    nc, ny = arr.shape[-1], out.shape[-1]
+    steps, params = _parametrize_steps(steps)
+    kern = _get_convert_kernel(steps, arr.dtype == np.float64)
+    if arr.size == 0:
+        return out
+    # dummy coefficient when there is no affine step
+    params = cp.asarray(params if params.size else np.zeros(1))
+    if any(step[0] == "lab2xyz" for step in steps):
+        invalid = cp.zeros(1, dtype=np.int32)
+        kern(arr, nc, ny, params, out, invalid, size=arr.size // nc)
+        invalid = int(invalid[0])
+        if invalid:
+            warn(
+                "Color data out of range: Z < 0 in %s pixels" % invalid,
+                stacklevel=3,
+            )
+    else:
+        kern(arr, nc, ny, params, out, size=arr.size // nc)
+    return out
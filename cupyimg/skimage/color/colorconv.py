@@ -56,6 +56,7 @@ import cupy as cp
 import numpy as np
 from scipy import linalg
 from ..util import dtype, dtype_limits
+from ._colorconv_kernels import _affine, _apply_steps
 
 
 def guess_spatial_dimensions(image):
@@ -116,7 +117,9 @@ def convert_colorspace(arr, fromspace, tospace):
     -----
     Conversion is performed through the "central" RGB color space,
     i.e. conversion from XYZ to HSV is implemented as ``XYZ -> RGB -> HSV``
-    instead of directly.
+    instead of directly. The whole chain is evaluated by a single kernel,
+    in the floating point precision of the input (float32 images stay
+    float32).
 
     Examples
     --------
@@ -124,39 +127,23 @@ def convert_colorspace(arr, fromspace, tospace):
     >>> img = data.astronaut()
     >>> img_hsv = convert_colorspace(img, 'RGB', 'HSV')
     """
-    fromdict = {
-        "rgb": lambda im: im,
-        "hsv": hsv2rgb,
-        "rgb cie": rgbcie2rgb,
-        "xyz": xyz2rgb,
-        "yuv": yuv2rgb,
-        "yiq": yiq2rgb,
-        "ypbpr": ypbpr2rgb,
-        "ycbcr": ycbcr2rgb,
-        "ydbdr": ydbdr2rgb,
-    }
-    todict = {
-        "rgb": lambda im: im,
-        "hsv": rgb2hsv,
-        "rgb cie": rgb2rgbcie,
-        "xyz": rgb2xyz,
-        "yuv": rgb2yuv,
-        "yiq": rgb2yiq,
-        "ypbpr": rgb2ypbpr,
-        "ycbcr": rgb2ycbcr,
-        "ydbdr": rgb2ydbdr,
-    }
-
     fromspace = fromspace.lower()
     tospace = tospace.lower()
-    if fromspace not in fromdict:
-        msg = "`fromspace` has to be one of {}".format(fromdict.keys())
+    if fromspace not in _steps_to_rgb:
+        msg = "`fromspace` has to be one of {}".format(_steps_to_rgb.keys())
         raise ValueError(msg)
-    if tospace not in todict:
-        msg = "`tospace` has to be one of {}".format(todict.keys())
+    if tospace not in _steps_from_rgb:
+        msg = "`tospace` has to be one of {}".format(_steps_from_rgb.keys())
         raise ValueError(msg)
 
-    return todict[tospace](fromdict[fromspace](arr))
+    if fromspace == "ycbcr":
+        arr, steps = _prepare_ycbcr_array(arr)
+    else:
+        steps = _steps_to_rgb[fromspace]
+    steps = steps + _steps_from_rgb[tospace]
+    if not steps:
+        return arr
+    return _apply_steps(_prepare_colorarray(arr), steps)
 
 
 def _prepare_colorarray(arr, force_copy=False):
@@ -173,6 +160,24 @@ def _prepare_colorarray(arr, force_copy=False):
     return dtype.img_as_float(arr, force_copy=force_copy)
 
 
+def _prepare_ycbcr_array(ycbcr):
+    """Remove the YCbCr offsets of integer arrays.
+
+    As in scikit-image, the offsets of integer inputs are subtracted in the
+    input dtype, before the conversion to floating point rescales the values.
+
+    Returns the array and the steps converting it to RGB.
+    """
+    arr = cp.asarray(ycbcr)
+    if arr.dtype.kind == "f" or arr.shape[-1] != 3:
+        return arr, _steps_to_rgb["ycbcr"]
+    arr = arr.copy()
+    arr[..., 0] -= 16
+    arr[..., 1] -= 128
+    arr[..., 2] -= 128
+    return arr, (_affine(rgb_from_ycbcr),)
+
+
 def rgba2rgb(rgba, background=(1, 1, 1)):
     """RGBA to RGB conversion using alpha blending [1]_.
 
@@ -272,66 +277,7 @@ def rgb2hsv(rgb):
     >>> img = data.astronaut()
     >>> img_hsv = color.rgb2hsv(img)
     """
-    input_is_one_pixel = rgb.ndim == 1
-    if input_is_one_pixel:
-        rgb = rgb[np.newaxis, ...]
-
-    arr = _prepare_colorarray(rgb)
-    out = cp.empty_like(arr)
-
-    # -- V channel
-    out_v = arr.max(-1)
-
-    # -- S channel
-    try:
-        delta = arr.ptp(-1)
-    except AttributeError:
-        # only pre-release CuPy has .ptp() so fall back to max/min
-        delta = arr.max(-1) - arr.min(-1)
-    # Ignore warning for zero divided by zero
-    old_settings = np.seterr(invalid="ignore")
-    out_s = delta / out_v
-    out_s[delta == 0.0] = 0.0
-
-    # -- H channel
-    # red is max
-    idx = arr[..., 0] == out_v
-    if False:
-        # TODO: grlee77: CuPy doesn't support indexing like this
-        out[idx, 0] = (arr[idx, 1] - arr[idx, 2]) / delta[idx]
-    else:
-        tmp = out[..., 0]
-        tmp[idx] = (arr[..., 1][idx] - arr[..., 2][idx]) / delta[idx]
-        out[..., 0] = tmp
-
-    # green is max
-    idx = arr[..., 1] == out_v
-    tmp = out[..., 0]
-    tmp[idx] = 2.0 + (arr[..., 2][idx] - arr[..., 0][idx]) / delta[idx]
-    out[..., 0] = tmp
-
-    # blue is max
-    idx = arr[..., 2] == out_v
-    tmp = out[..., 0]
-    tmp[idx] = 4.0 + (arr[..., 0][idx] - arr[..., 1][idx]) / delta[idx]
-    out[..., 0] = tmp
-    out_h = (out[..., 0] / 6.0) % 1.0
-    out_h[delta == 0.0] = 0.0
-
-    np.seterr(**old_settings)
-
-    # -- output
-    out[..., 0] = out_h
-    out[..., 1] = out_s
-    out[..., 2] = out_v
-
-    # remove NaN
-    out[cp.isnan(out)] = 0
-
-    if input_is_one_pixel:
-        out = cp.squeeze(out, axis=0)
-
-    return out
+    return _apply_steps(_prepare_colorarray(rgb), _steps_from_rgb["hsv"])
 
 
 def hsv2rgb(hsv):
@@ -368,32 +314,7 @@ def hsv2rgb(hsv):
     >>> img_hsv = rgb2hsv(img)
     >>> img_rgb = hsv2rgb(img_hsv)
     """
-    arr = _prepare_colorarray(hsv)
-
-    hi = cp.floor(arr[..., 0] * 6)
-    f = arr[..., 0] * 6 - hi
-    p = arr[..., 2] * (1 - arr[..., 1])
-    q = arr[..., 2] * (1 - f * arr[..., 1])
-    t = arr[..., 2] * (1 - (1 - f) * arr[..., 1])
-    v = arr[..., 2]
-
-    hi = cp.stack([hi, hi, hi], axis=-1).astype(np.uint8) % 6
-    out = cp.choose(
-        hi,
-        cp.stack(
-            [
-                cp.stack((v, t, p), axis=-1),
-                cp.stack((q, v, p), axis=-1),
-                cp.stack((p, v, t), axis=-1),
-                cp.stack((p, q, v), axis=-1),
-                cp.stack((t, p, v), axis=-1),
-                cp.stack((v, p, q), axis=-1),
-            ],
-            axis=0,
-        ),
-    )
-
-    return out
+    return _apply_steps(_prepare_colorarray(hsv), _steps_to_rgb["hsv"])
 
 
 # ---------------------------------------------------------------
@@ -572,9 +493,14 @@ def get_xyz_coords(illuminant, observer, dtype=float):
     ----------
     .. [1] https://en.wikipedia.org/wiki/Standard_illuminant
     """
+    return cp.asarray(_xyz_coords(illuminant, observer), dtype=dtype)
+
+
+def _xyz_coords(illuminant, observer):
+    """Host version of `get_xyz_coords`, as a tuple of floats."""
     illuminant = illuminant.upper()
     try:
-        return cp.asarray(illuminants[illuminant][observer], dtype=dtype)
+        return tuple(float(c) for c in illuminants[illuminant][observer])
     except KeyError:
         raise ValueError(
             "Unknown illuminant/observer combination\
@@ -717,6 +643,36 @@ rgb_from_hpx[2, :] = np.cross(rgb_from_hpx[0, :], rgb_from_hpx[1, :])
 hpx_from_rgb = linalg.inv(rgb_from_hpx)
 # fmt: on
 
+# -------------------------------------------------------------
+# Conversions to and from RGB as steps of the fused kernels
+# -------------------------------------------------------------
+
+_ycbcr_offset = np.array([16, 128, 128])
+
+_steps_from_rgb = {
+    "rgb": (),
+    "hsv": (("rgb2hsv",),),
+    "rgb cie": (_affine(rgbcie_from_rgb),),
+    "xyz": (("srgb_to_linear",), _affine(xyz_from_rgb)),
+    "yuv": (_affine(yuv_from_rgb),),
+    "yiq": (_affine(yiq_from_rgb),),
+    "ypbpr": (_affine(ypbpr_from_rgb),),
+    "ycbcr": (_affine(ycbcr_from_rgb, _ycbcr_offset),),
+    "ydbdr": (_affine(ydbdr_from_rgb),),
+}
+
+_steps_to_rgb = {
+    "rgb": (),
+    "hsv": (("hsv2rgb",),),
+    "rgb cie": (_affine(rgb_from_rgbcie),),
+    "xyz": (_affine(rgb_from_xyz), ("linear_to_srgb",)),
+    "yuv": (_affine(rgb_from_yuv),),
+    "yiq": (_affine(rgb_from_yiq),),
+    "ypbpr": (_affine(rgb_from_ypbpr),),
+    "ycbcr": (_affine(rgb_from_ycbcr, -rgb_from_ycbcr @ _ycbcr_offset),),
+    "ydbdr": (_affine(rgb_from_ydbdr),),
+}
+
 # -------------------------------------------------------------
 # The conversion functions that make use of the matrices above
 # -------------------------------------------------------------
@@ -737,10 +693,7 @@ def _convert(matrix, arr):
     out : (..., 3) ndarray
         The converted array. Same dimensions as input.
     """
-    arr = _prepare_colorarray(arr)
-    matrix = cp.asarray(matrix, dtype=arr.dtype)
-
-    return arr @ matrix.T
+    return _apply_steps(_prepare_colorarray(arr), [_affine(matrix)])
 
 
 def xyz2rgb(xyz):
@@ -780,12 +733,7 @@ def xyz2rgb(xyz):
     """
     # Follow the algorithm from http://www.easyrgb.com/index.php
     # except we don't multiply/divide by 100 in the conversion
-    arr = _convert(rgb_from_xyz, xyz)
-    mask = arr > 0.0031308
-    arr[mask] = 1.055 * cp.power(arr[mask], 1 / 2.4) - 0.055
-    arr[~mask] *= 12.92
-    cp.clip(arr, 0, 1, out=arr)
-    return arr
+    return _apply_steps(_prepare_colorarray(xyz), _steps_to_rgb["xyz"])
 
 
 def rgb2xyz(rgb):
@@ -823,11 +771,7 @@ def rgb2xyz(rgb):
     """
     # Follow the algorithm from http://www.easyrgb.com/index.php
     # except we don't multiply/divide by 100 in the conversion
-    arr = _prepare_colorarray(rgb).copy()
-    mask = arr > 0.04045
-    arr[mask] = cp.power((arr[mask] + 0.055) / 1.055, 2.4)
-    arr[~mask] /= 12.92
-    return _convert(xyz_from_rgb, arr)
+    return _apply_steps(_prepare_colorarray(rgb), _steps_from_rgb["xyz"])
 
 
 def rgb2rgbcie(rgb):
@@ -1147,25 +1091,8 @@ def xyz2lab(xyz, illuminant="D65", observer="2"):
     >>> img_lab = xyz2lab(img_xyz)
     """
     arr = _prepare_colorarray(xyz)
-
-    xyz_ref_white = get_xyz_coords(illuminant, observer, arr.dtype)
-
-    # scale by CIE XYZ tristimulus values of the reference white point
-    arr = arr / xyz_ref_white
-
-    # Nonlinear distortion and linear transformation
-    mask = arr > 0.008856
-    arr[mask] = cp.cbrt(arr[mask])
-    arr[~mask] = 7.787 * arr[~mask] + 16.0 / 116.0
-
-    x, y, z = arr[..., 0], arr[..., 1], arr[..., 2]
-
-    # Vector scaling
-    L = (116.0 * y) - 16.0
-    a = 500.0 * (x - y)
-    b = 200.0 * (y - z)
-
-    return cp.concatenate([x[..., np.newaxis] for x in [L, a, b]], axis=-1)
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    return _apply_steps(arr, [("xyz2lab", xyz_ref_white)])
 
 
 def lab2xyz(lab, illuminant="D65", observer="2"):
@@ -1206,31 +1133,9 @@ def lab2xyz(lab, illuminant="D65", observer="2"):
     .. [1] http://www.easyrgb.com/index.php?X=MATH&H=07
     .. [2] https://en.wikipedia.org/wiki/Lab_color_space
     """
-    arr = _prepare_colorarray(lab).copy()
-
-    L, a, b = arr[..., 0], arr[..., 1], arr[..., 2]
-    y = (L + 16.0) / 116.0
-    x = (a / 500.0) + y
-    z = y - (b / 200.0)
-
-    if cp.any(z < 0):
-        invalid = cp.nonzero(z < 0)
-        warn(
-            "Color data out of range: Z < 0 in %s pixels" % invalid[0].size,
-            stacklevel=2,
-        )
-        z[invalid] = 0
-
-    out = cp.stack([x, y, z], axis=-1)
-
-    mask = out > 0.2068966
-    out[mask] = cp.power(out[mask], 3.0)
-    out[~mask] = (out[~mask] - 16.0 / 116.0) / 7.787
-
-    # rescale to the reference white (illuminant)
-    xyz_ref_white = get_xyz_coords(illuminant, observer, arr.dtype)
-    out *= xyz_ref_white
-    return out
+    arr = _prepare_colorarray(lab)
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    return _apply_steps(arr, [("lab2xyz", xyz_ref_white)])
 
 
 def rgb2lab(rgb, illuminant="D65", observer="2"):
@@ -1266,7 +1171,10 @@ def rgb2lab(rgb, illuminant="D65", observer="2"):
     ----------
     .. [1] https://en.wikipedia.org/wiki/Standard_illuminant
     """
-    return xyz2lab(rgb2xyz(rgb), illuminant, observer)
+    arr = _prepare_colorarray(rgb)
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    steps = _steps_from_rgb["xyz"] + (("xyz2lab", xyz_ref_white),)
+    return _apply_steps(arr, steps)
 
 
 def lab2rgb(lab, illuminant="D65", observer="2"):
@@ -1302,7 +1210,10 @@ def lab2rgb(lab, illuminant="D65", observer="2"):
     ----------
     .. [1] https://en.wikipedia.org/wiki/Standard_illuminant
     """
-    return xyz2rgb(lab2xyz(lab, illuminant, observer))
+    arr = _prepare_colorarray(lab)
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    steps = (("lab2xyz", xyz_ref_white),) + _steps_to_rgb["xyz"]
+    return _apply_steps(arr, steps)
 
 
 def xyz2luv(xyz, illuminant="D65", observer="2"):
@@ -1350,45 +1261,9 @@ def xyz2luv(xyz, illuminant="D65", observer="2"):
     >>> img_xyz = rgb2xyz(img)
     >>> img_luv = xyz2luv(img_xyz)
     """
-    input_is_one_pixel = xyz.ndim == 1
-    if input_is_one_pixel:
-        xyz = xyz[np.newaxis, ...]
-
     arr = _prepare_colorarray(xyz)
-
-    # extract channels
-    x, y, z = arr[..., 0], arr[..., 1], arr[..., 2]
-
-    eps = np.finfo(np.float).eps
-
-    # compute y_r and L
-    xyz_ref_white = cp.asarray(get_xyz_coords(illuminant, observer, arr.dtype))
-    L = y / xyz_ref_white[1]
-    mask = L > 0.008856
-    L[mask] = 116.0 * cp.cbrt(L[mask]) - 16.0
-    L[~mask] = 903.3 * L[~mask]
-
-    tmp = cp.asarray([1, 15, 3], dtype=arr.dtype)
-    u0 = 4 * xyz_ref_white[0] / (tmp @ xyz_ref_white)
-    v0 = 9 * xyz_ref_white[1] / (tmp @ xyz_ref_white)
-
-    # u' and v' helper functions
-    def fu(X, Y, Z):
-        return (4.0 * X) / (X + 15.0 * Y + 3.0 * Z + eps)
-
-    def fv(X, Y, Z):
-        return (9.0 * Y) / (X + 15.0 * Y + 3.0 * Z + eps)
-
-    # compute u and v using helper functions
-    u = 13.0 * L * (fu(x, y, z) - u0)
-    v = 13.0 * L * (fv(x, y, z) - v0)
-
-    out = cp.stack([L, u, v], axis=-1)
-
-    if input_is_one_pixel:
-        out = cp.squeeze(out, axis=0)
-
-    return out
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    return _apply_steps(arr, [("xyz2luv", xyz_ref_white)])
 
 
 def luv2xyz(luv, illuminant="D65", observer="2"):
@@ -1427,35 +1302,9 @@ def luv2xyz(luv, illuminant="D65", observer="2"):
     .. [1] http://www.easyrgb.com/index.php?X=MATH&H=16#text16
     .. [2] https://en.wikipedia.org/wiki/CIELUV
     """
-    arr = _prepare_colorarray(luv).copy()
-
-    L, u, v = arr[..., 0], arr[..., 1], arr[..., 2]
-
-    eps = np.finfo(np.float).eps
-
-    # compute y
-    y = L.copy()
-    mask = y > 7.999625
-    y[mask] = cp.power((y[mask] + 16.0) / 116.0, 3.0)
-    y[~mask] = y[~mask] / 903.3
-    xyz_ref_white = get_xyz_coords(illuminant, observer, arr.dtype)
-    y *= xyz_ref_white[1]
-
-    # reference white x,z
-    uv_weights = cp.asarray([1, 15, 3], dtype=arr.dtype)
-    u0 = 4 * xyz_ref_white[0] / (uv_weights @ xyz_ref_white)
-    v0 = 9 * xyz_ref_white[1] / (uv_weights @ xyz_ref_white)
-
-    # compute intermediate values
-    a = u0 + u / (13.0 * L + eps)
-    b = v0 + v / (13.0 * L + eps)
-    c = 3 * y * (5 * b - 3)
-
-    # compute x and z
-    z = ((a - 4) * c - 15 * a * b * y) / (12 * b)
-    x = -(c / b + 3.0 * z)
-
-    return cp.concatenate([q[..., np.newaxis] for q in [x, y, z]], axis=-1)
+    arr = _prepare_colorarray(luv)
+    xyz_ref_white = _xyz_coords(illuminant, observer)
+    return _apply_steps(arr, [("luv2xyz", xyz_ref_white)])
 
 
 def rgb2luv(rgb):
@@ -1486,7 +1335,10 @@ def rgb2luv(rgb):
     .. [2] http://www.easyrgb.com/index.php?X=MATH&H=02#text2
     .. [3] https://en.wikipedia.org/wiki/CIELUV
     """
-    return xyz2luv(rgb2xyz(rgb))
+    arr = _prepare_colorarray(rgb)
+    xyz_ref_white = _xyz_coords("D65", "2")
+    steps = _steps_from_rgb["xyz"] + (("xyz2luv", xyz_ref_white),)
+    return _apply_steps(arr, steps)
 
 
 def luv2rgb(luv):
@@ -1511,7 +1363,10 @@ def luv2rgb(luv):
     -----
     This function uses luv2xyz and xyz2rgb.
     """
-    return xyz2rgb(luv2xyz(luv))
+    arr = _prepare_colorarray(luv)
+    xyz_ref_white = _xyz_coords("D65", "2")
+    steps = (("luv2xyz", xyz_ref_white),) + _steps_to_rgb["xyz"]
+    return _apply_steps(arr, steps)
 
 
 def rgb2hed(rgb):
@@ -1634,11 +1489,9 @@ def separate_stains(rgb, conv_matrix):
     >>> ihc = data.immunohistochemistry()
     >>> ihc_hdx = separate_stains(ihc, hdx_from_rgb)
     """
-    rgb = _prepare_colorarray(rgb, force_copy=True)
-    rgb += 2
-    conv_matrix = cp.asarray(conv_matrix)
-    stains = cp.reshape(-cp.log10(rgb), (-1, 3)) @ conv_matrix
-    return cp.reshape(stains, rgb.shape)
+    rgb = _prepare_colorarray(rgb)
+    conv_matrix = cp.asnumpy(conv_matrix)
+    return _apply_steps(rgb, [("stains_log",), _affine(conv_matrix.T)])
 
 
 def combine_stains(stains, conv_matrix):
@@ -1692,15 +1545,11 @@ def combine_stains(stains, conv_matrix):
     >>> ihc_hdx = separate_stains(ihc, hdx_from_rgb)
     >>> ihc_rgb = combine_stains(ihc_hdx, rgb_from_hdx)
     """
-    from ..exposure import rescale_intensity
-
-    conv_matrix = cp.asarray(conv_matrix)
     stains = _prepare_colorarray(stains)
-    logrgb2 = -cp.reshape(stains, (-1, 3)) @ conv_matrix
-    rgb2 = cp.power(10, logrgb2)
-    return rescale_intensity(
-        cp.reshape(rgb2 - 2, stains.shape), in_range=(-1, 1)
-    )
+    conv_matrix = cp.asnumpy(conv_matrix)
+    # the final clipping to [-1, 1] corresponds to
+    # rescale_intensity(rgb, in_range=(-1, 1))
+    return _apply_steps(stains, [_affine(conv_matrix.T), ("stains_exp",)])
 
 
 def lab2lch(lab):
@@ -1737,11 +1586,8 @@ def lab2lch(lab):
     >>> img_lab = rgb2lab(img)
     >>> img_lch = lab2lch(img_lab)
     """
-    lch = _prepare_lab_array(lab)
-
-    a, b = lch[..., 1], lch[..., 2]
-    lch[..., 1], lch[..., 2] = _cart2polar_2pi(a, b)
-    return lch
+    lch = cp.ascontiguousarray(_prepare_lab_array(lab))
+    return _apply_steps(lch, [("lab2lch",)], inplace=True)
 
 
 def _cart2polar_2pi(x, y):
@@ -1785,11 +1631,8 @@ def lch2lab(lch):
     >>> img_lch = lab2lch(img_lab)
     >>> img_lab2 = lch2lab(img_lch)
     """
-    lch = _prepare_lab_array(lch)
-
-    c, h = lch[..., 1], lch[..., 2]
-    lch[..., 1], lch[..., 2] = c * cp.cos(h), c * cp.sin(h)
-    return lch
+    lab = cp.ascontiguousarray(_prepare_lab_array(lch))
+    return _apply_steps(lab, [("lch2lab",)], inplace=True)
 
 
 def _prepare_lab_array(arr, force_copy=True):
@@ -1908,11 +1751,7 @@ def rgb2ycbcr(rgb):
     ----------
     .. [1] https://en.wikipedia.org/wiki/YCbCr
     """
-    arr = _convert(ycbcr_from_rgb, rgb)
-    arr[..., 0] += 16
-    arr[..., 1] += 128
-    arr[..., 2] += 128
-    return arr
+    return _apply_steps(_prepare_colorarray(rgb), _steps_from_rgb["ycbcr"])
 
 
 def rgb2ydbdr(rgb):
@@ -2044,11 +1883,8 @@ def ycbcr2rgb(ycbcr):
     ----------
     .. [1] https://en.wikipedia.org/wiki/YCbCr
     """
-    arr = ycbcr.copy()
-    arr[..., 0] -= 16
-    arr[..., 1] -= 128
-    arr[..., 2] -= 128
-    return _convert(rgb_from_ycbcr, arr)
+    arr, steps = _prepare_ycbcr_array(ycbcr)
+    return _apply_steps(_prepare_colorarray(arr), steps)
 
 
 def ydbdr2rgb(ydbdr):
@@ -18,15 +18,247 @@ https://en.wikipedia.org/wiki/Color_difference
 
 """
 
+import math
 import warnings
 
 import cupy as cp
 import numpy as np
 
-from .colorconv import lab2lch, _cart2polar_2pi
+from cupyimg import memoize
+from ..util import dtype
+from ._colorconv_kernels import _steps_code
+from .colorconv import _steps_from_rgb, _xyz_coords
+
+
+# Per-pixel formulas of the color differences. They compute ``dE2`` (of type
+# T) from the Lab coordinates ``L1, a1, b1, L2, a2, b2``, with the scale
+# factors of each formula as kernel parameters.
+_DELTA_E_PARAMS = {
+    "cie76": (),
+    "ciede94": ("kH", "kC", "kL", "k1", "k2"),
+    "ciede2000": ("kL", "kC", "kH"),
+    "cmc": ("kL", "kC"),
+}
+
+_DELTA_E_CODE = {}
+
+_DELTA_E_CODE[
+    "cie76"
+] = """
+    T dL = L2 - L1, da = a2 - a1, db = b2 - b1;
+    T dE2 = dL * dL + da * da + db * db;
+"""
+
+# squared hue difference of deltaE_ciede94 and deltaE_cmc (see get_dH2)
+_DH2 = """
+    T C1 = hypot(a1, b1);
+    T C2 = hypot(a2, b2);
+    T dH2 = 2 * ((C1 * C2) - (a1 * a2 + b1 * b2));
+    T dL = L1 - L2;
+    T dC = C1 - C2;
+"""
+
+_DELTA_E_CODE["ciede94"] = (
+    _DH2
+    + """
+    T SC = 1 + (T)k1 * C1;
+    T SH = 1 + (T)k2 * C1;
+    T tL = dL / (T)kL;
+    T tC = dC / ((T)kC * SC);
+    T tH = (T)kH * SH;
+    T dE2 = tL * tL + tC * tC + dH2 / (tH * tH);
+"""
+)
+
+_DELTA_E_CODE["cmc"] = (
+    _DH2
+    + """
+    T h1 = atan2(b1, a1);
+    if (h1 < 0) h1 += (T){two_pi};
+    T h1_deg = h1 * (T){rad2deg};
+    T Tw;
+    if (h1_deg >= 164 && h1_deg <= 345) {{
+        Tw = (T)0.56 + (T)0.2 * fabs(cos(h1 + (T){deg168}));
+    }} else {{
+        Tw = (T)0.36 + (T)0.4 * fabs(cos(h1 + (T){deg35}));
+    }}
+    T c1_4 = C1 * C1 * C1 * C1;
+    T Fw = sqrt(c1_4 / (c1_4 + 1900));
+    T SL = L1 < 16 ? (T)0.511 : (T)0.040975 * L1 / (1 + (T)0.01765 * L1);
+    T SC = (T)0.638 + (T)0.0638 * C1 / (1 + (T)0.0131 * C1);
+    T SH = SC * (Fw * Tw + 1 - Fw);
+    T tL = dL / ((T)kL * SL);
+    T tC = dC / ((T)kC * SC);
+    T dE2 = tL * tL + tC * tC + dH2 / (SH * SH);
+""".format(
+        two_pi=repr(2 * math.pi),
+        rad2deg=repr(180 / math.pi),
+        deg168=repr(math.radians(168)),
+        deg35=repr(math.radians(35)),
+    )
+)
+
+_DELTA_E_CODE[
+    "ciede2000"
+] = """
+    const T pi = (T){pi};
+    const T c25_7 = (T){c25_7};
+    // distort `a` based on average chroma, then convert to polar
+    // coordinates (the "prime" quantities of the literature)
+    T Cbar = (T)0.5 * (hypot(a1, b1) + hypot(a2, b2));
+    T c7 = pow(Cbar, (T)7);
+    T scale = 1 + (T)0.5 * (1 - sqrt(c7 / (c7 + c25_7)));
+    T C1 = hypot(a1 * scale, b1);
+    T h1 = atan2(b1, a1 * scale);
+    if (h1 < 0) h1 += 2 * pi;
+    T C2 = hypot(a2 * scale, b2);
+    T h2 = atan2(b2, a2 * scale);
+    if (h2 < 0) h2 += 2 * pi;
+
+    // lightness term
+    T tmp = (T)0.5 * (L1 + L2) - 50;
+    tmp *= tmp;
+    T SL = 1 + (T)0.015 * tmp / sqrt(20 + tmp);
+    T L_term = (L2 - L1) / ((T)kL * SL);
+
+    // chroma term
+    Cbar = (T)0.5 * (C1 + C2);
+    T SC = 1 + (T)0.045 * Cbar;
+    T C_term = (C2 - C1) / ((T)kC * SC);
+
+    // hue term
+    T h_diff = h2 - h1;
+    T h_sum = h1 + h2;
+    T CC = C1 * C2;
+    T dH = h_diff;
+    if (h_diff > pi) {{
+        dH -= 2 * pi;
+    }} else if (h_diff < -pi) {{
+        dH += 2 * pi;
+    }}
+    if (CC == 0) dH = 0;  // if r == 0, dtheta == 0
+    T dH_term = 2 * sqrt(CC) * sin(dH / 2);
+
+    T Hbar = h_sum;
+    if (CC != 0 && fabs(h_diff) > pi) {{
+        Hbar += h_sum < 2 * pi ? 2 * pi : -2 * pi;
+    }}
+    if (CC == 0) Hbar *= 2;
+    Hbar *= (T)0.5;
+
+    T Tw = (1 - (T)0.17 * cos(Hbar - (T){deg30})
+           + (T)0.24 * cos(2 * Hbar)
+           + (T)0.32 * cos(3 * Hbar + (T){deg6})
+           - (T)0.20 * cos(4 * Hbar - (T){deg63}));
+    T SH = 1 + (T)0.015 * Cbar * Tw;
+    T H_term = dH_term / ((T)kH * SH);
+
+    // hue rotation
+    c7 = pow(Cbar, (T)7);
+    T Rc = 2 * sqrt(c7 / (c7 + c25_7));
+    tmp = (Hbar * (T){rad2deg} - 275) / 25;
+    tmp *= tmp;
+    T dtheta = (T){deg30} * exp(-tmp);
+    T R_term = -sin(2 * dtheta) * Rc * C_term * H_term;
+
+    T dE2 = L_term * L_term + C_term * C_term + H_term * H_term + R_term;
+""".format(
+    pi=repr(math.pi),
+    c25_7=repr(25 ** 7.0),
+    deg30=repr(math.radians(30)),
+    deg6=repr(math.radians(6)),
+    deg63=repr(math.radians(63)),
+    rad2deg=repr(180 / math.pi),
+)
+
+
+@memoize(for_each_device=True)
+def _get_delta_e_kernel(formula, double, rgb_scales=None):
+    """Elementwise kernel for the color difference ``formula``.
+
+    The inputs are the three channels of each image. If ``rgb_scales`` is
+    given, the inputs are sRGB images (scaled to [0, 1] by the given
+    factors) and they are converted to Lab (D65 illuminant, 2 degree
+    observer) in the kernel.
+    """
+    float_type = "float64" if double else "float32"
+    code = ["typedef {} T;".format("double" if double else "float")]
+    for k, (x, p) in enumerate([("x", "1"), ("y", "2")]):
+        if rgb_scales is None:
+            code.append(
+                "T L{p} = (T){x}0, a{p} = (T){x}1, b{p} = (T){x}2;".format(
+                    x=x, p=p
+                )
+            )
+            continue
+        scale = "(T){!r}".format(float(rgb_scales[k]))
+        code.append("T L{p}, a{p}, b{p};".format(p=p))
+        code.append("{")
+        code.append(
+            "T c0 = {s} * {x}0, c1 = {s} * {x}1, c2 = {s} * {x}2;".format(
+                s=scale, x=x
+            )
+        )
+        white = _xyz_coords("D65", "2")
+        steps = _steps_from_rgb["xyz"] + (("xyz2lab", white),)
+        code += _steps_code(steps, double)
+        code.append("L{p} = c0; a{p} = c1; b{p} = c2;".format(p=p))
+        code.append("}")
+    code.append(_DELTA_E_CODE[formula])
+    # written so that NaN values are kept, as with cupy.maximum
+    code.append("dE = dE2 < 0 ? 0 : sqrt(dE2);")
+    in_params = "X x0, X x1, X x2, Y y0, Y y1, Y y2"
+    for param in _DELTA_E_PARAMS[formula]:
+        in_params += ", {} {}".format(float_type, param)
+    return cp.ElementwiseKernel(
+        in_params,
+        "F dE",
+        "\n".join(code),
+        "cupyimg_skimage_delta_e_{}".format(formula),
+    )
 
 
-def deltaE_cie76(lab1, lab2):
+def _delta_e(formula, lab1, lab2, colorspace, *params):
+    """Compute the color difference ``formula`` with a single kernel."""
+    lab1 = cp.asarray(lab1)
+    lab2 = cp.asarray(lab2)
+    if colorspace == "lab":
+        rgb_scales = None
+    elif colorspace == "rgb":
+        # unsigned integer images are scaled to [0, 1] in the kernel
+        rgb_scales = []
+        images = []
+        for image in [lab1, lab2]:
+            if image.dtype.kind == "u":
+                rgb_scales.append(1 / np.iinfo(image.dtype).max)
+            else:
+                image = dtype.img_as_float(image)
+                rgb_scales.append(1.0)
+            images.append(image)
+        lab1, lab2 = images
+        rgb_scales = tuple(rgb_scales)
+    else:
+        raise ValueError("colorspace must be 'lab' or 'rgb'")
+    for image in [lab1, lab2]:
+        if image.shape[-1] < 3:
+            raise ValueError("Input array has less than 3 color channels")
+    float_dtype = np.result_type(
+        *[
+            image.dtype if image.dtype.kind == "f" else np.float64
+            for image in [lab1, lab2]
+        ]
+    )
+    shape = cp.broadcast(lab1[..., 0], lab2[..., 0]).shape
+    out = cp.empty(shape, dtype=float_dtype)
+    kern = _get_delta_e_kernel(
+        formula, float_dtype == np.float64, rgb_scales
+    )
+    channels = [lab1[..., c] for c in range(3)]
+    channels += [lab2[..., c] for c in range(3)]
+    return kern(*channels, *params, out)
+
+
+def deltaE_cie76(lab1, lab2, *, colorspace="lab"):
     """Euclidean distance between two points in Lab color space
 
     Parameters
@@ -35,6 +267,10 @@ def deltaE_cie76(lab1, lab2):
         reference color (Lab colorspace)
     lab2 : array_like
         comparison color (Lab colorspace)
+    colorspace : {'lab', 'rgb'}, optional
+        Color space of the inputs. With 'rgb', `lab1` and `lab2` are sRGB
+        images and their conversion to Lab (as done by `rgb2lab` with the
+        default illuminant and observer) is fused into the computation.
 
     Returns
     -------
@@ -47,17 +283,12 @@ def deltaE_cie76(lab1, lab2):
     .. [2] A. R. Robertson, "The CIE 1976 color-difference formulae,"
            Color Res. Appl. 2, 7-11 (1977).
     """
-    lab1 = cp.asarray(lab1)
-    lab2 = cp.asarray(lab2)
-    L1, a1, b1 = cp.rollaxis(lab1, -1)[:3]
-    L2, a2, b2 = cp.rollaxis(lab2, -1)[:3]
-    out = (L2 - L1) * (L2 - L1)
-    out += (a2 - a1) * (a2 - a1)
-    out += (b2 - b1) * (b2 - b1)
-    return cp.sqrt(out, out=out)
+    return _delta_e("cie76", lab1, lab2, colorspace)
 
 
-def deltaE_ciede94(lab1, lab2, kH=1, kC=1, kL=1, k1=0.045, k2=0.015):
+def deltaE_ciede94(
+    lab1, lab2, kH=1, kC=1, kL=1, k1=0.045, k2=0.015, *, colorspace="lab"
+):
     """Color difference according to CIEDE 94 standard
 
     Accommodates perceptual non-uniformities through the use of application
@@ -79,6 +310,10 @@ def deltaE_ciede94(lab1, lab2, kH=1, kC=1, kL=1, k1=0.045, k2=0.015):
         first scale parameter
     k2 : float, optional
         second scale parameter
+    colorspace : {'lab', 'rgb'}, optional
+        Color space of the inputs. With 'rgb', `lab1` and `lab2` are sRGB
+        images and their conversion to Lab (as done by `rgb2lab` with the
+        default illuminant and observer) is fused into the computation.
 
     Returns
     -------
@@ -108,29 +343,10 @@ def deltaE_ciede94(lab1, lab2, kH=1, kC=1, kL=1, k1=0.045, k2=0.015):
     .. [1] https://en.wikipedia.org/wiki/Color_difference
     .. [2] http://www.brucelindbloom.com/index.html?Eqn_DeltaE_CIE94.html
     """
-    L1, C1 = cp.rollaxis(lab2lch(lab1), -1)[:2]
-    L2, C2 = cp.rollaxis(lab2lch(lab2), -1)[:2]
+    return _delta_e("ciede94", lab1, lab2, colorspace, kH, kC, kL, k1, k2)
 
-    dL = L1 - L2
-    dC = C1 - C2
-    dH2 = get_dH2(lab1, lab2)
 
-    SL = 1
-    SC = 1 + k1 * C1
-    SH = 1 + k2 * C1
-
-    dE2 = dL / (kL * SL)
-    dE2 *= dE2
-    tmp = dC / (kC * SC)
-    tmp *= tmp
-    dE2 += tmp
-    tmp = kH * SH
-    tmp *= tmp
-    dE2 += dH2 / tmp
-    return cp.sqrt(cp.maximum(dE2, 0, out=dE2), out=dE2)
-
-
-def deltaE_ciede2000(lab1, lab2, kL=1, kC=1, kH=1):
+def deltaE_ciede2000(lab1, lab2, kL=1, kC=1, kH=1, *, colorspace="lab"):
     """Color difference as given by the CIEDE 2000 standard.
 
     CIEDE 2000 is a major revision of CIDE94.  The perceptual calibration is
@@ -149,6 +365,10 @@ def deltaE_ciede2000(lab1, lab2, kL=1, kC=1, kH=1):
         chroma scale factor, usually 1
     kH : float (range), optional
         hue scale factor, usually 1
+    colorspace : {'lab', 'rgb'}, optional
+        Color space of the inputs. With 'rgb', `lab1` and `lab2` are sRGB
+        images and their conversion to Lab (as done by `rgb2lab` with the
+        default illuminant and observer) is fused into the computation.
 
     Returns
     -------
@@ -173,97 +393,10 @@ def deltaE_ciede2000(lab1, lab2, kL=1, kC=1, kH=1):
         "The numerical accuracy of this function on the GPU is reduced "
         "relative to the CPU version"
     )
-    lab1 = cp.asarray(lab1)
-    lab2 = cp.asarray(lab2)
-    unroll = False
-    if lab1.ndim == 1 and lab2.ndim == 1:
-        unroll = True
-        if lab1.ndim == 1:
-            lab1 = lab1[None, :]
-        if lab2.ndim == 1:
-            lab2 = lab2[None, :]
-    L1, a1, b1 = cp.rollaxis(lab1, -1)[:3]
-    L2, a2, b2 = cp.rollaxis(lab2, -1)[:3]
-
-    # distort `a` based on average chroma
-    # then convert to lch coordines from distorted `a`
-    # all subsequence calculations are in the new coordiantes
-    # (often denoted "prime" in the literature)
-    Cbar = 0.5 * (cp.hypot(a1, b1) + cp.hypot(a2, b2))
-    c7 = Cbar ** 7
-    G = 0.5 * (1 - cp.sqrt(c7 / (c7 + 25 ** 7.0)))
-    scale = 1 + G
-    C1, h1 = _cart2polar_2pi(a1 * scale, b1)
-    C2, h2 = _cart2polar_2pi(a2 * scale, b2)
-    # recall that c, h are polar coordiantes.  c==r, h==theta
-
-    # cide2000 has four terms to delta_e:
-    # 1) Luminance term
-    # 2) Hue term
-    # 3) Chroma term
-    # 4) hue Rotation term
-
-    # lightness term
-    Lbar = 0.5 * (L1 + L2)
-    tmp = Lbar - 50
-    tmp *= tmp
-    SL = 1 + 0.015 * tmp / cp.sqrt(20 + tmp)
-    L_term = (L2 - L1) / (kL * SL)
-
-    # chroma term
-    Cbar = 0.5 * (C1 + C2)  # new coordiantes
-    SC = 1 + 0.045 * Cbar
-    C_term = (C2 - C1) / (kC * SC)
-
-    # hue term
-    h_diff = h2 - h1
-    h_sum = h1 + h2
-    CC = C1 * C2
-
-    dH = h_diff.copy()
-    dH[h_diff > np.pi] -= 2 * np.pi
-    dH[h_diff < -np.pi] += 2 * np.pi
-    dH[CC == 0.0] = 0.0  # if r == 0, dtheta == 0
-    dH_term = 2 * cp.sqrt(CC) * cp.sin(dH / 2)
-
-    Hbar = h_sum.copy()
-    mask = cp.logical_and(CC != 0.0, cp.abs(h_diff) > np.pi)
-    Hbar[mask * (h_sum < 2 * np.pi)] += 2 * np.pi
-    Hbar[mask * (h_sum >= 2 * np.pi)] -= 2 * np.pi
-    Hbar[CC == 0.0] *= 2
-    Hbar *= 0.5
-
-    T = (
-        1
-        - 0.17 * cp.cos(Hbar - np.deg2rad(30))
-        + 0.24 * cp.cos(2 * Hbar)
-        + 0.32 * cp.cos(3 * Hbar + np.deg2rad(6))
-        - 0.20 * cp.cos(4 * Hbar - np.deg2rad(63))
-    )
-    SH = 1 + 0.015 * Cbar * T
-
-    H_term = dH_term / (kH * SH)
-
-    # hue rotation
-    c7 = Cbar ** 7
-    Rc = 2 * cp.sqrt(c7 / (c7 + 25 ** 7))
-    tmp = (cp.rad2deg(Hbar) - 275) / 25
-    tmp *= tmp
-    dtheta = np.deg2rad(30) * cp.exp(-tmp)
-    R_term = -cp.sin(2 * dtheta) * Rc * C_term * H_term
-
-    # put it all together
-    dE2 = L_term * L_term
-    dE2 += C_term * C_term
-    dE2 += H_term * H_term
-    dE2 += R_term
-    cp.sqrt(cp.maximum(dE2, 0, out=dE2), out=dE2)
-    if unroll:
-        dE2 = dE2[0]
-    return dE2
-
-
-def deltaE_cmc(lab1, lab2, kL=1, kC=1):
+    return _delta_e("ciede2000", lab1, lab2, colorspace, kL, kC, kH)
+
+
+def deltaE_cmc(lab1, lab2, kL=1, kC=1, *, colorspace="lab"):
     """Color difference from the  CMC l:c standard.
 
     This color difference was developed by the Colour Measurement Committee
@@ -282,6 +415,14 @@ def deltaE_cmc(lab1, lab2, kL=1, kC=1):
         reference color (Lab colorspace)
     lab2 : array_like
         comparison color (Lab colorspace)
+    kL : float, optional
+        lightness scale factor
+    kC : float, optional
+        chroma scale factor
+    colorspace : {'lab', 'rgb'}, optional
+        Color space of the inputs. With 'rgb', `lab1` and `lab2` are sRGB
+        images and their conversion to Lab (as done by `rgb2lab` with the
+        default illuminant and observer) is fused into the computation.
 
     Returns
     -------
@@ -302,29 +443,7 @@ def deltaE_cmc(lab1, lab2, kL=1, kC=1):
            JPC79 colour-difference formula," J. Soc. Dyers Colour. 100, 128-132
            (1984).
     """
-    L1, C1, h1 = cp.rollaxis(lab2lch(lab1), -1)[:3]
-    L2, C2, h2 = cp.rollaxis(lab2lch(lab2), -1)[:3]
-
-    dC = C1 - C2
-    dL = L1 - L2
-    dH2 = get_dH2(lab1, lab2)
-
-    T = cp.where(
-        cp.logical_and(cp.rad2deg(h1) >= 164, cp.rad2deg(h1) <= 345),
-        0.56 + 0.2 * cp.abs(cp.cos(h1 + np.deg2rad(168))),
-        0.36 + 0.4 * cp.abs(cp.cos(h1 + np.deg2rad(35))),
-    )
-    c1_4 = C1 ** 4
-    F = cp.sqrt(c1_4 / (c1_4 + 1900))
-
-    SL = cp.where(L1 < 16, 0.511, 0.040975 * L1 / (1.0 + 0.01765 * L1))
-    SC = 0.638 + 0.0638 * C1 / (1.0 + 0.0131 * C1)
-    SH = SC * (F * T + 1 - F)
-
-    dE2 = (dL / (kL * SL)) ** 2
-    dE2 += (dC / (kC * SC)) ** 2
-    dE2 += dH2 / (SH ** 2)
-    return cp.sqrt(cp.maximum(dE2, 0, out=dE2), out=dE2)
+    return _delta_e("cmc", lab1, lab2, colorspace, kL, kC)
 
 
 def get_dH2(lab1, lab2):
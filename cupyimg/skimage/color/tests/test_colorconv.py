@@ -290,6 +290,15 @@ class TestColorconv(TestCase):
         )
         assert_array_almost_equal(conv, img_rgb)
 
+    # user matrices with zero coefficients, NaN values must still propagate
+    def test_combine_stains_user_matrix(self):
+        stains = np.random.RandomState(0).rand(4, 5, 3)
+        stains[1, 2, 0] = np.nan
+        for conv_matrix in [np.diag([0.5, 1.0, 2.0]), np.eye(3)[::-1]]:
+            expected = np.clip(10 ** -(stains @ conv_matrix) - 2, -1, 1)
+            result = combine_stains(cp.asarray(stains), conv_matrix)
+            assert_array_almost_equal(result, expected)
+
     # RGB to RGB CIE
     def test_rgb2rgbcie_conversion(self):
         # ftm: off
@@ -375,6 +384,33 @@ class TestColorconv(TestCase):
             ValueError, convert_colorspace, self.colbars_array, "RGB", "nokey"
         )
 
+    def test_convert_colorspace_chain(self):
+        colspaces = ["HSV", "RGB CIE", "XYZ", "YUV", "YIQ", "YCbCr", "YDbDr"]
+        img = img_as_float(self.img_rgb[::8, ::8])
+        for dtype in [np.float32, np.float64]:
+            for fromspace in colspaces:
+                arr = convert_colorspace(img, "RGB", fromspace).astype(dtype)
+                for tospace in colspaces:
+                    # composed in a single kernel vs. through RGB
+                    out = convert_colorspace(arr, fromspace, tospace)
+                    rgb = convert_colorspace(arr, fromspace, "RGB")
+                    expected = convert_colorspace(rgb, "RGB", tospace)
+                    assert out.dtype == dtype
+                    if tospace == "HSV":
+                        # hue is ill-defined for the gray pixels
+                        expected = expected[..., 1:]
+                        out = out[..., 1:]
+                    decimal = 3 if dtype == np.float32 else 6
+                    assert_array_almost_equal(out, expected, decimal=decimal)
+
+    def test_float32_conversions(self):
+        img32 = img_as_float32(self.img_rgb[::8, ::8])
+        img = img32.astype(np.float64)
+        for func in [rgb2lab, rgb2luv, rgb2hed, rgb2hsv, rgb2ycbcr]:
+            out32 = func(img32)
+            assert out32.dtype == np.float32
+            assert_array_almost_equal(out32, func(img), decimal=3)
+
     def test_rgb2gray(self):
         x = cp.asarray([1, 1, 1]).reshape((1, 1, 3)).astype(np.float)
         g = rgb2gray(x)
@@ -777,6 +813,20 @@ class TestColorconv(TestCase):
         assert yuv2rgb(img).dtype == img.dtype
         assert yuv2rgb(img32).dtype == img32.dtype
 
+    def test_ycbcr2rgb_integer_input(self):
+        from skimage.color import ycbcr2rgb as ycbcr2rgb_cpu
+
+        ycbcr = rgb2ycbcr(img_as_float(self.img_rgb)[::16, ::16])
+        for dtype in [np.uint8, np.int16]:
+            ycbcr_int = ycbcr.astype(dtype)
+            expected = ycbcr2rgb_cpu(cp.asnumpy(ycbcr_int))
+            assert_array_almost_equal(ycbcr2rgb(ycbcr_int), expected)
+            assert_array_almost_equal(
+                convert_colorspace(ycbcr_int, "YCbCr", "RGB"), expected
+            )
+            # the input is not modified
+            assert_array_equal(ycbcr_int, ycbcr.astype(dtype))
+
     def test_rgb2yiq_conversion(self):
         rgb = img_as_float(self.img_rgb)[::16, ::16]
         yiq = rgb2yiq(rgb).reshape(-1, 3)
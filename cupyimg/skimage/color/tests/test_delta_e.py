@@ -1,4 +1,5 @@
 """Test for correctness of color distance functions"""
+import warnings
 from os.path import abspath, dirname, join as pjoin
 
 import cupy as cp
@@ -10,12 +11,14 @@ from cupy.testing import (
     assert_array_equal,
 )
 
+from cupyimg.skimage.color import rgb2lab
 from cupyimg.skimage.color.delta_e import (
     deltaE_cie76,
     deltaE_ciede94,
     deltaE_ciede2000,
     deltaE_cmc,
 )
+from cupyimg.skimage.util import img_as_ubyte
 
 try:
     from skimage._shared.testing import fetch
@@ -217,3 +220,53 @@ def test_single_color_cmc():
     lab1 = (0.5, 0.5, 0.5)
     lab2 = (0.4, 0.4, 0.4)
     deltaE_cmc(lab1, lab2)
+
+
+@pytest.mark.parametrize(
+    "func", [deltaE_cie76, deltaE_ciede94, deltaE_ciede2000, deltaE_cmc]
+)
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32, np.float64])
+def test_delta_e_from_rgb(func, dtype):
+    rstate = cp.random.RandomState(0)
+    rgb1 = rstate.rand(16, 12, 3)
+    rgb2 = rstate.rand(16, 12, 3)
+    if dtype == np.uint8:
+        rgb1 = img_as_ubyte(rgb1)
+        rgb2 = img_as_ubyte(rgb2)
+    else:
+        rgb1 = rgb1.astype(dtype)
+        rgb2 = rgb2.astype(dtype)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        dE = func(rgb1, rgb2, colorspace="rgb")
+        expected = func(rgb2lab(rgb1), rgb2lab(rgb2))
+    assert dE.shape == rgb1.shape[:-1]
+    assert dE.dtype == expected.dtype
+    rtol = 1e-4 if dE.dtype == np.float32 else 1e-10
+    assert_allclose(dE, expected, rtol=rtol, atol=rtol)
+
+    # a single reference color is broadcast against the image
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        dE = func(rgb1, rgb2[0, 0], colorspace="rgb")
+    assert dE.shape == rgb1.shape[:-1]
+
+
+@pytest.mark.parametrize(
+    "func", [deltaE_cie76, deltaE_ciede94, deltaE_ciede2000, deltaE_cmc]
+)
+def test_delta_e_float32(func):
+    rstate = cp.random.RandomState(0)
+    lab1 = rgb2lab(rstate.rand(16, 12, 3))
+    lab2 = rgb2lab(rstate.rand(16, 12, 3))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        dE = func(lab1.astype(np.float32), lab2.astype(np.float32))
+        expected = func(lab1, lab2)
+    assert dE.dtype == np.float32
+    assert_allclose(dE, expected, rtol=1e-3, atol=1e-3)
+
+
+def test_delta_e_invalid_colorspace():
+    with pytest.raises(ValueError):
+        deltaE_cie76((0.5, 0.5, 0.5), (0.4, 0.4, 0.4), colorspace="xyz")
@@ -13,11 +13,7 @@ Gems - authors, editors, publishers, or webmasters - are to be held
 responsible.  Basically, don't be a jerk, and remember that anything free
 comes with no guarantee.
 """
-import functools
-import itertools
-import math
 import numbers
-import operator
 
 import cupy as cp
 import numpy as np
@@ -25,8 +21,8 @@ import numpy as np
 from ..util import img_as_float, img_as_uint
 from ..color.adapt_rgb import adapt_rgb, hsv_value
 from ..exposure import rescale_intensity
+from cupyimg import memoize
 from cupyimg._misc import _prod
-from cupyimg import numpy as cnp
 
 
 NR_OF_GRAY = 2 ** 14  # number of grayscale levels to use in CLAHE algorithm
@@ -131,152 +127,334 @@ def _clahe(image, kernel_size, clip_limit, nbins):
     an output image of good quality. The output image will have the same
     minimum and maximum value as the input image. A clip limit smaller than 1
     results in standard (non-contrast limited) AHE.
-    """
-    ndim = image.ndim
-    dtype = image.dtype
-
-    # pad the image such that the shape in each dimension
-    # - is a multiple of the kernel_size and
-    # - is preceded by half a kernel size
-    pad_start_per_dim = [k // 2 for k in kernel_size]
-
-    pad_end_per_dim = [
-        (k - s % k) % k + math.ceil(k / 2.0)
-        for k, s in zip(kernel_size, image.shape)
-    ]
-
-    image = cp.pad(
-        image,
-        [(p_i, p_f) for p_i, p_f in zip(pad_start_per_dim, pad_end_per_dim)],
-        mode="reflect",
-    )
-
-    bin_size = 1 + NR_OF_GRAY // nbins
-    if True:
-        lut = cp.arange(NR_OF_GRAY)
-        lut //= bin_size
 
-        image = lut[image]
-    else:
-        lut = np.arange(NR_OF_GRAY)
-        lut //= bin_size
-        image = cp.asarray(lut[image.get()])
-
-    # calculate graylevel mappings for each contextual region
-    # rearrange image into flattened contextual regions
-    ns_hist = [int(s / k) - 1 for s, k in zip(image.shape, kernel_size)]
-    hist_blocks_shape = functools.reduce(
-        operator.add, [(s, k) for s, k in zip(ns_hist, kernel_size)]
-    )
-    hist_blocks_axis_order = tuple(range(0, ndim * 2, 2)) + tuple(
-        range(1, ndim * 2, 2)
-    )
-    hist_slices = [
-        slice(k // 2, k // 2 + n * k) for k, n in zip(kernel_size, ns_hist)
-    ]
-    hist_blocks = image[tuple(hist_slices)].reshape(hist_blocks_shape)
-    hist_blocks = hist_blocks.transpose(hist_blocks_axis_order)
-    hist_block_assembled_shape = hist_blocks.shape
-    hist_blocks = hist_blocks.reshape((_prod(ns_hist), -1))
+    The image is processed in two kernels: the first computes the graylevel
+    mapping of each contextual region (see ``_clahe_maps``) and the second
+    interpolates the mappings of the neighboring regions at each pixel. The
+    image is not padded; the contextual regions extending past the end of
+    the image read its mirror image, as with ``cp.pad(mode='reflect')``.
+    """
+    image = cp.ascontiguousarray(image, dtype=cp.uint16)
 
     # Calculate actual clip limit
     if clip_limit > 0.0:
         clim = int(max(clip_limit * _prod(kernel_size), 1))
     else:
         clim = NR_OF_GRAY  # Large value, do not clip (AHE)
-    if True:
-        # faster to loop over the arrays on the host
-        hist_blocks = cp.asnumpy(hist_blocks)
-        hist = np.apply_along_axis(
-            np.bincount, -1, hist_blocks, minlength=nbins
-        )
-        hist = np.apply_along_axis(
-            clip_histogram, -1, hist, clip_limit=clim, xp=np
-        )
-        hist = cp.asarray(hist)
-    else:
-        hist = cnp.apply_along_axis(
-            cp.bincount, -1, hist_blocks, minlength=nbins
-        )
-        hist = cnp.apply_along_axis(clip_histogram, -1, hist, clip_limit=clim)
-    hist = map_histogram(hist, 0, NR_OF_GRAY - 1, _prod(kernel_size))
-    hist = hist.reshape(hist_block_assembled_shape[:ndim] + (-1,))
-
-    # duplicate leading mappings in each dim
-    map_array = cp.pad(
-        hist, [(1, 1) for _ in range(ndim)] + [(0, 0)], mode="edge"
-    )
+    maps = _clahe_maps(image, kernel_size, clim, nbins)
 
     # Perform multilinear interpolation of graylevel mappings
     # using the convention described here:
     # https://en.wikipedia.org/w/index.php?title=Adaptive_histogram_
     # equalization&oldid=936814673#Efficient_computation_by_interpolation
-
-    # rearrange image into blocks for vectorized processing
-    ns_proc = [int(s / k) for s, k in zip(image.shape, kernel_size)]
-    blocks_shape = functools.reduce(
-        operator.add, [(s, k) for s, k in zip(ns_proc, kernel_size)]
+    result = cp.empty_like(image)
+    kern = _get_clahe_interp_kernel(image.ndim)
+    kern(
+        image,
+        maps,
+        _clahe_dims(image.shape, kernel_size),
+        nbins,
+        1 + NR_OF_GRAY // nbins,
+        result,
     )
-    blocks_axis_order = hist_blocks_axis_order
+    return result
 
-    blocks = image.reshape(blocks_shape)
-    blocks = blocks.transpose(blocks_axis_order)
-    blocks_flattened_shape = blocks.shape
-    blocks = blocks.reshape((_prod(ns_proc), _prod(blocks.shape[ndim:])))
 
-    # calculate interpolation coefficients
-    coeffs = cp.meshgrid(
-        *tuple([cp.arange(k) / k for k in kernel_size[::-1]]), indexing="ij"
+def _clahe_dims(shape, kernel_size):
+    """The image shape, the shape of the contextual regions and the number
+    of regions along each dimension, concatenated in a device array.
+
+    The last region along each dimension may extend past the end of the
+    image.
+    """
+    ns_hist = [-(-s // k) for s, k in zip(shape, kernel_size)]
+    return cp.asarray(
+        tuple(shape) + tuple(kernel_size) + tuple(ns_hist), dtype=cp.int32
     )
-    coeffs = [cp.transpose(c).flatten() for c in coeffs]
-    inv_coeffs = [1 - c for c in coeffs]
-
-    # sum over contributions of neighboring contextual
-    # regions in each direction
-    result = cp.zeros(blocks.shape, dtype=cp.float32)
-    for iedge, edge in enumerate(itertools.product(*((range(2),) * ndim))):
-        edge_maps = map_array[
-            tuple([slice(e, e + n) for e, n in zip(edge, ns_proc)])
-        ]
-        edge_maps = edge_maps.reshape((_prod(ns_proc), -1))
-        # apply map
-        # edge_mapped = cp.asarray(np.take_along_axis(edge_maps.get(), blocks.get(), axis=-1))
-        edge_mapped = cp.take_along_axis(edge_maps, blocks, axis=-1)
-
-        # interpolate
-        edge_coeffs = functools.reduce(
-            operator.mul,
-            [[inv_coeffs, coeffs][e][d] for d, e in enumerate(edge[::-1])],
-        )
 
-        result += (edge_mapped * edge_coeffs).astype(result.dtype)
 
-    result = result.astype(dtype)
+# threads per contextual region in the mapping kernel
+_CLAHE_BLOCK_SIZE = 256
+
+# largest number of bins for which the histograms are kept in shared memory
+_CLAHE_MAX_SHARED_BINS = 8192
+
+_CLAHE_MAPS_PREAMBLE = """
+__device__ long long _block_sum(long long v, long long* buf)
+{
+    buf[threadIdx.x] = v;
+    __syncthreads();
+    for (int s = blockDim.x / 2; s > 0; s >>= 1) {
+        if (threadIdx.x < s) {
+            buf[threadIdx.x] += buf[threadIdx.x + s];
+        }
+        __syncthreads();
+    }
+    long long r = buf[0];
+    __syncthreads();
+    return r;
+}
+"""
+
+
+@memoize(for_each_device=True)
+def _get_clahe_maps_kernel(ndim, shared):
+    """Kernel computing the graylevel mapping of each contextual region.
 
-    # rebuild result image from blocks
-    result = result.reshape(blocks_flattened_shape)
-    blocks_axis_rebuild_order = functools.reduce(
-        operator.add,
-        [(s, k) for s, k in zip(range(0, ndim), range(ndim, ndim * 2))],
+    Each block handles one region: it builds the histogram of the region,
+    clips it and redistributes the excess counts as ``clip_histogram`` does
+    and finally accumulates it as ``map_histogram`` does. The histogram is
+    kept in shared memory when ``shared`` is True and in ``maps`` (which is
+    then overwritten by the mapping) otherwise.
+    """
+    name = "cupyimg_skimage_clahe_maps_{}d".format(ndim)
+    if shared:
+        hist_init = """
+    extern __shared__ int _smem[];
+    int* hist = _smem;"""
+    else:
+        name += "_global"
+        hist_init = """
+    int* hist = out;"""
+    code = """
+{preamble}
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const unsigned short* image, int* maps, const int* dims,
+            const int nbins, const int bin_size, const int clim,
+            const double scale, const double max_val)
+{{
+    __shared__ long long buf[{block_size}];
+    const int* shape = dims;
+    const int* ksize = dims + {ndim};
+    const int tid = threadIdx.x;
+    int* out = maps + (long long)blockIdx.x * nbins;
+    {hist_init}
+
+    // origin of the region and number of elements
+    int origin[{ndim}];
+    long long n_region = 1;
+    int rem = blockIdx.x;
+    for (int d = {ndim} - 1; d >= 0; d--) {{
+        int n = dims[2 * {ndim} + d];
+        origin[d] = (rem % n) * ksize[d];
+        rem /= n;
+        n_region *= ksize[d];
+    }}
+
+    // histogram (regions past the end of the image are mirrored)
+    for (int j = tid; j < nbins; j += blockDim.x) {{
+        hist[j] = 0;
+    }}
+    __syncthreads();
+    for (long long e = tid; e < n_region; e += blockDim.x) {{
+        long long r = e, idx = 0, stride = 1;
+        for (int d = {ndim} - 1; d >= 0; d--) {{
+            int c = origin[d] + (int)(r % ksize[d]);
+            r /= ksize[d];
+            int s = shape[d];
+            if (c >= s) {{
+                int period = 2 * (s - 1);
+                c = (period > 0) ? c % period : 0;
+                if (c >= s) {{
+                    c = period - c;
+                }}
+            }}
+            idx += c * stride;
+            stride *= s;
+        }}
+        atomicAdd(&hist[image[idx] / bin_size], 1);
+    }}
+    __syncthreads();
+
+    // clip the histogram
+    long long excess = 0;
+    for (int j = tid; j < nbins; j += blockDim.x) {{
+        if (hist[j] > clim) {{
+            excess += hist[j] - clim;
+            hist[j] = clim;
+        }}
+    }}
+    long long n_excess = _block_sum(excess, buf);
+
+    // redistribute the excess evenly
+    long long bin_incr = n_excess / nbins;
+    long long upper = clim - bin_incr;
+    long long delta = 0;
+    for (int j = tid; j < nbins; j += blockDim.x) {{
+        long long h = hist[j];
+        if (h < upper) {{
+            h += bin_incr;
+            delta -= bin_incr;
+        }}
+        if (h >= upper && h < clim) {{
+            delta += h - clim;
+            h = clim;
+        }}
+        hist[j] = (int)h;
+    }}
+    n_excess += _block_sum(delta, buf);
+
+    // redistribute the remaining excess with a stride
+    long long under = 0;
+    if (n_excess > 0) {{
+        for (int j = tid; j < nbins; j += blockDim.x) {{
+            under += hist[j] < clim;
+        }}
+        under = _block_sum(under, buf);
+    }}
+    while (n_excess > 0 && under > 0) {{
+        long long prev_n_excess = n_excess;
+        for (int index = 0; index < nbins && under > 0; index++) {{
+            long long step = max(1LL, under / n_excess);
+            long long added = 0, filled = 0;
+            for (long long j = index + tid * step; j < nbins;
+                 j += blockDim.x * step) {{
+                if (hist[j] < clim) {{
+                    hist[j]++;
+                    added++;
+                    filled += hist[j] == clim;
+                }}
+            }}
+            n_excess -= _block_sum(added, buf);
+            under -= _block_sum(filled, buf);
+            if (n_excess <= 0) {{
+                break;
+            }}
+        }}
+        if (prev_n_excess == n_excess) {{
+            break;
+        }}
+    }}
+
+    // cumulative histogram (each thread scans a contiguous chunk of bins)
+    int chunk = (nbins + blockDim.x - 1) / blockDim.x;
+    int j0 = min(tid * chunk, nbins);
+    int j1 = min(j0 + chunk, nbins);
+    long long partial = 0;
+    for (int j = j0; j < j1; j++) {{
+        partial += hist[j];
+    }}
+    buf[tid] = partial;
+    __syncthreads();
+    for (int offset = 1; offset < blockDim.x; offset <<= 1) {{
+        long long v = (tid >= offset) ? buf[tid - offset] : 0;
+        __syncthreads();
+        buf[tid] += v;
+        __syncthreads();
+    }}
+    long long cum = buf[tid] - partial;
+    for (int j = j0; j < j1; j++) {{
+        cum += hist[j];
+        out[j] = (int)fmin((double)cum * scale, max_val);
+    }}
+}}
+""".format(
+        preamble=_CLAHE_MAPS_PREAMBLE,
+        block_size=_CLAHE_BLOCK_SIZE,
+        name=name,
+        ndim=ndim,
+        hist_init=hist_init,
     )
-    result = result.transpose(blocks_axis_rebuild_order)
-    result = result.reshape(image.shape)
-
-    # undo padding
-    unpad_slices = tuple(
-        [
-            slice(p_i, s - p_f)
-            for p_i, p_f, s in zip(
-                pad_start_per_dim, pad_end_per_dim, image.shape
-            )
-        ]
+    return cp.RawKernel(code, name)
+
+
+def _clahe_maps(image, kernel_size, clim, nbins):
+    """Calculate the graylevel mappings of all contextual regions.
+
+    Parameters
+    ----------
+    image : (N1,...,NN) ndarray
+        C-contiguous uint16 image with values in ``[0, NR_OF_GRAY)``.
+    kernel_size: N-tuple of int
+        Shape of the contextual regions.
+    clim : int
+        Maximum allowed bin count.
+    nbins : int
+        Number of gray bins for histogram.
+
+    Returns
+    -------
+    maps : (M1,...,MN, nbins) ndarray
+        Mapped intensity LUT of each contextual region (int32).
+    """
+    ndim = image.ndim
+    ns_hist = [-(-s // k) for s, k in zip(image.shape, kernel_size)]
+    shared = nbins <= _CLAHE_MAX_SHARED_BINS
+    maps = cp.empty(tuple(ns_hist) + (nbins,), dtype=cp.int32)
+    kern = _get_clahe_maps_kernel(ndim, shared)
+    kern(
+        (_prod(ns_hist),),
+        (_CLAHE_BLOCK_SIZE,),
+        (
+            image,
+            maps,
+            _clahe_dims(image.shape, kernel_size),
+            np.int32(nbins),
+            np.int32(1 + NR_OF_GRAY // nbins),
+            np.int32(clim),
+            np.float64((NR_OF_GRAY - 1) / _prod(kernel_size)),
+            np.float64(NR_OF_GRAY - 1),
+        ),
+        shared_mem=4 * nbins if shared else 0,
     )
-    result = result[unpad_slices]
+    return maps
 
-    return result
+
+@memoize(for_each_device=True)
+def _get_clahe_interp_kernel(ndim):
+    """Kernel interpolating the mappings of the neighboring regions.
+
+    The mappings are applied and summed in the same order and precision as
+    the blockwise computation of scikit-image, so that the results match.
+    """
+    code = """
+    const int* shape = &dims[0];
+    const int* ksize = &dims[{ndim}];
+    const int* n_hist = &dims[2 * {ndim}];
+    int h0[{ndim}], h1[{ndim}];
+    double w0[{ndim}], w1[{ndim}];
+    ptrdiff_t rem = i;
+    for (int d = {ndim} - 1; d >= 0; d--) {{
+        // position in the image padded by half a region
+        int p = (int)(rem % shape[d]) + ksize[d] / 2;
+        rem /= shape[d];
+        int b = p / ksize[d];
+        double coef = (double)(p % ksize[d]) / ksize[d];
+        w0[d] = 1.0 - coef;
+        w1[d] = coef;
+        h0[d] = min(max(b - 1, 0), n_hist[d] - 1);
+        h1[d] = min(b, n_hist[d] - 1);
+    }}
+    int v = x / bin_size;
+    float acc = 0.0f;
+    for (int e = 0; e < (1 << {ndim}); e++) {{
+        long long region = 0;
+        double w = 1.0;
+        for (int d = 0; d < {ndim}; d++) {{
+            bool upper = (e >> ({ndim} - 1 - d)) & 1;
+            region = region * n_hist[d] + (upper ? h1[d] : h0[d]);
+        }}
+        for (int d = {ndim} - 1; d >= 0; d--) {{
+            bool upper = (e >> ({ndim} - 1 - d)) & 1;
+            w *= upper ? w1[d] : w0[d];
+        }}
+        acc += (float)(maps[region * nbins + v] * w);
+    }}
+    y = (unsigned short)acc;
+    """.format(
+        ndim=ndim
+    )
+    return cp.ElementwiseKernel(
+        "uint16 x, raw int32 maps, raw int32 dims, int32 nbins, "
+        "int32 bin_size",
+        "uint16 y",
+        code,
+        "cupyimg_skimage_clahe_interp_{}d".format(ndim),
+    )
 
 
-# TODO: refactor this clip_histogram bottleneck.
 def clip_histogram(hist, clip_limit, xp=cp):
     """Perform clipping of the histogram and redistribution of bins.
 
@@ -356,6 +534,6 @@ def map_histogram(hist, min_val, max_val, n_pixels, xp=cp):
     out = xp.cumsum(hist, axis=-1).astype(float)
     out *= (max_val - min_val) / n_pixels
     out += min_val
-    cp.clip(out, a_min=None, a_max=max_val, out=out)
+    xp.clip(out, a_min=None, a_max=max_val, out=out)
 
     return out.astype(int)
@@ -1,7 +1,9 @@
 import cupy as cp
 import numpy as np
 
+from cupyimg import memoize
 from cupyimg import numpy as cnp
+from cupyimg._misc import get_typename
 
 from ..color import rgb2gray, rgba2rgb
 from ..util.dtype import dtype_range, dtype_limits
@@ -32,30 +34,163 @@ DTYPE_RANGE.update(
 )
 
 
-def _offset_array(arr, low_boundary, high_boundary):
-    """Offset the array to get the lowest value at 0 if negative."""
-    if low_boundary < 0:
-        offset = low_boundary
-        dyn_range = high_boundary - low_boundary
-        # get smallest dtype that can hold both minimum and offset maximum
-        offset_dtype = np.promote_types(
-            np.min_scalar_type(dyn_range), np.min_scalar_type(low_boundary)
+_BINCOUNT_BLOCK_SIZE = 256
+
+# largest number of bins accumulated in shared memory by each block
+_BINCOUNT_MAX_SHARED_BINS = 8192
+
+
+@memoize(for_each_device=True)
+def _max_blocks():
+    """Number of blocks keeping all multiprocessors busy."""
+    return 8 * cp.cuda.Device().attributes["MultiProcessorCount"]
+
+
+@memoize(for_each_device=True)
+def _get_min_max_kernel(x_type):
+    """Kernel reducing an integer image to its minimum and maximum.
+
+    Each block reduces its part of the image in shared memory and updates
+    ``out = [min, max]`` with atomics, so that the image is read once.
+    """
+    name = "cupyimg_skimage_min_max"
+    code = """
+typedef {x_type} X;
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const X* x, long long* out, const long long n)
+{{
+    __shared__ long long lo_buf[{block_size}];
+    __shared__ long long hi_buf[{block_size}];
+    long long lo = 0x7fffffffffffffffLL;
+    long long hi = -lo - 1;
+    for (long long i = (long long)blockIdx.x * blockDim.x + threadIdx.x;
+         i < n; i += (long long)blockDim.x * gridDim.x) {{
+        long long v = (long long)x[i];
+        lo = min(lo, v);
+        hi = max(hi, v);
+    }}
+    lo_buf[threadIdx.x] = lo;
+    hi_buf[threadIdx.x] = hi;
+    __syncthreads();
+    for (int s = blockDim.x / 2; s > 0; s >>= 1) {{
+        if (threadIdx.x < s) {{
+            lo_buf[threadIdx.x] = min(lo_buf[threadIdx.x],
+                                      lo_buf[threadIdx.x + s]);
+            hi_buf[threadIdx.x] = max(hi_buf[threadIdx.x],
+                                      hi_buf[threadIdx.x + s]);
+        }}
+        __syncthreads();
+    }}
+    if (threadIdx.x == 0) {{
+        atomicMin(&out[0], lo_buf[0]);
+        atomicMax(&out[1], hi_buf[0]);
+    }}
+}}
+""".format(
+        x_type=x_type, block_size=_BINCOUNT_BLOCK_SIZE, name=name
+    )
+    return cp.RawKernel(code, name)
+
+
+def _min_max(image):
+    """Minimum and maximum of an integer image, with a single read of the
+    image and a single synchronization."""
+    if image.size == 0:
+        raise ValueError(
+            "zero-size array to reduction operation which has no identity"
         )
-        if arr.dtype != offset_dtype:
-            # prevent overflow errors when offsetting
-            arr = arr.astype(offset_dtype)
-        arr = arr - offset
+    info = np.iinfo(np.int64)
+    out = cp.asarray([info.max, info.min], dtype=cp.int64)
+    kern = _get_min_max_kernel(get_typename(image.dtype))
+    n_blocks = min(-(-image.size // _BINCOUNT_BLOCK_SIZE), _max_blocks())
+    kern(
+        (n_blocks,),
+        (_BINCOUNT_BLOCK_SIZE,),
+        (image, out, np.int64(image.size)),
+    )
+    image_min, image_max = out.get()  # synchronize!
+    return int(image_min), int(image_max)
+
+
+@memoize(for_each_device=True)
+def _get_bincount_kernel(x_type, rebin, shared):
+    """Kernel counting the values of an integer image from ``low`` on.
+
+    The offset of the values by ``low`` (and their grouping by ``bin_size``
+    consecutive values when ``rebin`` is True) is done on the fly, without
+    any copy of the image. Values outside of the ``n_bins`` bins are
+    ignored. When ``shared`` is True, each block accumulates a private
+    histogram in shared memory that is merged into ``hist`` by atomics.
+    """
+    name = "cupyimg_skimage_bincount"
+    if rebin:
+        name += "_rebin"
+        bin_expr = "v / bin_size"
     else:
-        offset = 0
-    return arr, offset
+        bin_expr = "v"
+    if shared:
+        hist_init = """
+    extern __shared__ unsigned int _smem[];
+    unsigned int* h = _smem;
+    for (int j = threadIdx.x; j < n_bins; j += blockDim.x) {
+        h[j] = 0;
+    }
+    __syncthreads();"""
+        hist_merge = """
+    __syncthreads();
+    for (int j = threadIdx.x; j < n_bins; j += blockDim.x) {
+        if (h[j] != 0) {
+            atomicAdd(&hist[j], (unsigned long long)h[j]);
+        }
+    }"""
+    else:
+        name += "_global"
+        hist_init = """
+    unsigned long long* h = hist;"""
+        hist_merge = ""
+    code = """
+typedef {x_type} X;
+
+extern "C" __global__
+__launch_bounds__({block_size})
+void {name}(const X* x, unsigned long long* hist, const long long n,
+            const long long low, const long long bin_size,
+            const long long n_bins)
+{{
+    {hist_init}
+    for (long long i = (long long)blockIdx.x * blockDim.x + threadIdx.x;
+         i < n; i += (long long)blockDim.x * gridDim.x) {{
+        long long v = (long long)x[i] - low;
+        if (v >= 0) {{
+            long long b = {bin_expr};
+            if (b < n_bins) {{
+                atomicAdd(&h[b], 1);
+            }}
+        }}
+    }}
+    {hist_merge}
+}}
+""".format(
+        x_type=x_type,
+        block_size=_BINCOUNT_BLOCK_SIZE,
+        name=name,
+        bin_expr=bin_expr,
+        hist_init=hist_init,
+        hist_merge=hist_merge,
+    )
+    return cp.RawKernel(code, name)
 
 
-def _bincount_histogram(image, source_range):
+def _bincount_histogram(image, source_range, nbins=None):
     """
     Efficient histogram calculation for an image of integers.
 
     This function is significantly more efficient than cupy.histogram but
-    works only on images of integers. It is based on cupy.bincount.
+    works only on images of integers. The offset of the values by the
+    minimum is fused with the counting, so that the image is read once
+    (twice when the range is determined from the image) and never copied.
 
     Parameters
     ----------
@@ -65,6 +200,10 @@ def _bincount_histogram(image, source_range):
         'image' determines the range from the input image.
         'dtype' determines the range from the expected range of the images
         of that data type.
+    nbins : int, optional
+        If given, consecutive integer values are grouped in bins of equal
+        width so that at most `nbins` bins are used. By default, each
+        integer value has its own bin.
 
     Returns
     -------
@@ -79,26 +218,57 @@ def _bincount_histogram(image, source_range):
                 source_range
             )
         )
+    image = cp.ascontiguousarray(image)
     if source_range == "image":
-        image_min = int(image.min().astype(np.int64))
-        image_max = int(image.max().astype(np.int64))
+        image_min, image_max = _min_max(image)
     elif source_range == "dtype":
         image_min, image_max = dtype_limits(image, clip_negative=False)
-    image, offset = _offset_array(image, image_min, image_max)
-    hist = cp.bincount(image.ravel(), minlength=image_max - image_min + 1)
-    bin_centers = cp.arange(image_min, image_max + 1)
-    if source_range == "image":
-        idx = max(image_min, 0)
-        hist = hist[idx:]
+    n_values = image_max - image_min + 1
+    if nbins is None or n_values <= nbins:
+        bin_size = 1
+    else:
+        bin_size = -(-n_values // nbins)
+    n_bins = -(-n_values // bin_size)
+    hist = cp.zeros(n_bins, dtype=cp.int64)
+    if image.size > 0:
+        shared = n_bins <= _BINCOUNT_MAX_SHARED_BINS
+        kern = _get_bincount_kernel(
+            get_typename(image.dtype), bin_size > 1, shared
+        )
+        n_blocks = min(-(-image.size // _BINCOUNT_BLOCK_SIZE), _max_blocks())
+        kern(
+            (n_blocks,),
+            (_BINCOUNT_BLOCK_SIZE,),
+            (
+                image,
+                hist,
+                np.int64(image.size),
+                np.int64(image_min),
+                np.int64(bin_size),
+                np.int64(n_bins),
+            ),
+            shared_mem=4 * n_bins if shared else 0,
+        )
+    if bin_size == 1:
+        bin_centers = cp.arange(image_min, image_max + 1)
+    else:
+        bin_centers = cp.arange(n_bins, dtype=cp.float64) * bin_size
+        bin_centers += image_min + (bin_size - 1) / 2
     return hist, bin_centers
 
 
-def histogram(image, nbins=256, source_range="image", normalize=False):
+def histogram(
+    image,
+    nbins=256,
+    source_range="image",
+    normalize=False,
+    rebin_integers=False,
+):
     """Return histogram of image.
 
     Unlike `numpy.histogram`, this function returns the centers of bins and
-    does not rebin integer arrays. For integer arrays, each integer value has
-    its own bin, which improves speed and intensity-resolution.
+    does not rebin integer arrays by default. For integer arrays, each integer
+    value has its own bin, which improves speed and intensity-resolution.
 
     The histogram is computed on the flattened image: for color images, the
     function should be used separately on each channel to obtain a histogram
@@ -110,13 +280,17 @@ def histogram(image, nbins=256, source_range="image", normalize=False):
         Input image.
     nbins : int, optional
         Number of bins used to calculate histogram. This value is ignored for
-        integer arrays.
+        integer arrays, unless `rebin_integers` is True.
     source_range : string, optional
         'image' (default) determines the range from the input image.
         'dtype' determines the range from the expected range of the images
         of that data type.
     normalize : bool, optional
         If True, normalize the histogram by the sum of its values.
+    rebin_integers : bool, optional
+        If True, the values of integer arrays whose range spans more than
+        `nbins` values are grouped in at most `nbins` bins of equal integer
+        width (e.g. for 16-bit or 32-bit volumes).
 
     Returns
     -------
@@ -147,10 +321,12 @@ def histogram(image, nbins=256, source_range="image", normalize=False):
             "apply this function to each color channel."
         )
 
-    image = image.flatten()
+    image = image.ravel()
     # For integer types, histogramming with bincount is more efficient.
     if np.issubdtype(image.dtype, np.integer):
-        hist, bin_centers = _bincount_histogram(image, source_range)
+        hist, bin_centers = _bincount_histogram(
+            image, source_range, nbins if rebin_integers else None
+        )
     else:
         if source_range == "image":
             hist_range = None
@@ -158,12 +334,8 @@ def histogram(image, nbins=256, source_range="image", normalize=False):
             hist_range = dtype_limits(image, clip_negative=False)
         else:
             ValueError("Wrong value for the `source_range` argument")
-        try:
-            # use upstream version if range argument is available
-            hist, bin_edges = cp.histogram(image, bins=nbins, range=hist_range)
-        except TypeError:
-            # fall back to the version in this library
-            hist, bin_edges = cnp.histogram(image, bins=nbins, range=hist_range)
+        # the uniform bins are accumulated in shared memory by cnp.histogram
+        hist, bin_edges = cnp.histogram(image, bins=nbins, range=hist_range)
         bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2.0
 
     if normalize:
@@ -171,6 +343,127 @@ def histogram(image, nbins=256, source_range="image", normalize=False):
     return hist, bin_centers
 
 
+@memoize(for_each_device=True)
+def _get_lut_kernel():
+    """Kernel looking up the value of each integer in a table starting at
+    ``first[0]``.
+
+    Values outside of the table take the value of its nearest end.
+    """
+    code = """
+    long long k = (long long)x - (long long)first[0];
+    y = lut[k < 0 ? 0 : (k >= n ? n - 1 : k)];
+    """
+    return cp.ElementwiseKernel(
+        "T x, raw float64 lut, raw U first, int64 n",
+        "float64 y",
+        code,
+        "cupyimg_skimage_lut",
+    )
+
+
+def _interp_integer(image, bin_centers, fp):
+    """Same as ``cnp.interp(image, bin_centers, fp)`` for integer images,
+    where ``bin_centers`` are consecutive integers (as in the histogram of
+    an integer image).
+
+    Every value of the image either is one of the bin centers or lies past
+    an end, so the interpolation reduces to a table lookup.
+    """
+    fp = cp.ascontiguousarray(fp, dtype=cp.float64)
+    return _get_lut_kernel()(image, fp, bin_centers, fp.size)
+
+
+@memoize(for_each_device=True)
+def _get_batch_bin_kernel():
+    """Kernel computing the flat bin index of each value of a stack of images.
+
+    The bins of each image are ``nbins`` equal bins from ``lo`` to ``hi``,
+    with the edges rounded to the image dtype as in ``cupy.histogram``.
+    """
+    code = """
+    double step = (hi - lo) / nbins;
+    int b = (int)((x - lo) / step);
+    b = min(max(b, 0), nbins - 1);
+    while (b > 0 && x < (T)(lo + b * step)) {
+        b--;
+    }
+    while (b < nbins - 1 && x >= (T)(lo + (b + 1) * step)) {
+        b++;
+    }
+    idx = offset + b;
+    """
+    return cp.ElementwiseKernel(
+        "T x, float64 lo, float64 hi, int32 nbins, int64 offset",
+        "int64 idx",
+        code,
+        "cupyimg_skimage_batch_bin",
+    )
+
+
+def _histogram_batch(image, nbins=256):
+    """Histograms of each image of a stack, computed with a single bincount.
+
+    The range of each histogram is determined from its own image, as for
+    ``histogram(image[i], nbins, source_range='image')``.
+
+    Parameters
+    ----------
+    image : (N, ...) array
+        Stack of images.
+    nbins : int, optional
+        Number of bins used to calculate the histograms. This value is
+        ignored for integer arrays.
+
+    Returns
+    -------
+    hist : (N, B) array
+        The values of the histograms.
+    bin_centers : (N, B) or (1, B) array
+        The values at the center of the bins. For integer arrays, all
+        histograms share the same bins, spanning the range of the whole
+        stack, and bins outside of the range of an image are empty.
+    image_min, image_max : (N,) array
+        The range of each image.
+    """
+    n = image.shape[0]
+    image = image.reshape(n, -1)
+    image_min = image.min(axis=1)
+    image_max = image.max(axis=1)
+    if np.issubdtype(image.dtype, np.integer):
+        low = int(image_min.min())  # synchronize!
+        high = int(image_max.max())
+        nbins = high - low + 1
+        offsets = cp.arange(0, n * nbins, nbins) - low
+        idx = image.astype(cp.int64) + offsets[:, np.newaxis]
+        bin_centers = cp.arange(low, high + 1, dtype=cp.float64)
+        bin_centers = bin_centers[np.newaxis, :]
+    else:
+        lo = image_min.astype(cp.float64)
+        hi = image_max.astype(cp.float64)
+        # expand empty ranges as in cupy.histogram
+        empty = lo == hi
+        lo = cp.where(empty, lo - 0.5, lo)
+        hi = cp.where(empty, hi + 0.5, hi)
+        offsets = cp.arange(0, n * nbins, nbins, dtype=cp.int64)
+        idx = _get_batch_bin_kernel()(
+            image,
+            lo[:, np.newaxis],
+            hi[:, np.newaxis],
+            nbins,
+            offsets[:, np.newaxis],
+        )
+        step = (hi - lo) / nbins
+        bin_edges = lo[:, np.newaxis] + step[:, np.newaxis] * cp.arange(
+            nbins + 1
+        )
+        bin_edges[:, -1] = hi
+        bin_edges = bin_edges.astype(image.dtype)
+        bin_centers = (bin_edges[:, :-1] + bin_edges[:, 1:]) / 2.0
+    hist = cp.bincount(idx.ravel(), minlength=n * nbins)
+    return hist.reshape(n, nbins), bin_centers, image_min, image_max
+
+
 def cumulative_distribution(image, nbins=256):
     """Return cumulative distribution function (cdf) for the given image.
 
@@ -247,14 +540,10 @@ def equalize_hist(image, nbins=256, mask=None):
         cdf, bin_centers = cumulative_distribution(image[mask], nbins)
     else:
         cdf, bin_centers = cumulative_distribution(image, nbins)
-    if False:
-        out = cp.interp(image.flat, bin_centers, cdf)
-    else:
-        # TODO: grlee77: no cp.interp, so have to transfer
-        out = cp.asarray(
-            np.interp(image.get().flat, bin_centers.get(), cdf.get())
-        )
-    return out.reshape(image.shape)
+    if np.issubdtype(image.dtype, np.integer):
+        # each integer is its own bin
+        return _interp_integer(image, bin_centers, cdf)
+    return cnp.interp(image, bin_centers, cdf)
 
 
 def intensity_range(image, range_values="image", clip_negative=False):
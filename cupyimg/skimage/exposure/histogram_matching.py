@@ -1,5 +1,23 @@
 import cupy as cp
-import numpy as np
+
+from cupyimg import numpy as cnp
+
+from .exposure import _bincount_histogram, _interp_integer
+
+
+def _use_bincount(image):
+    # the number of bins is bounded for 8 and 16-bit integers
+    return image.dtype.kind in "iu" and image.dtype.itemsize <= 2
+
+
+def _unique_counts(image):
+    """Sorted unique values of an image and their number of occurrences."""
+    if _use_bincount(image):
+        # a histogram with one bin per integer avoids sorting the image
+        counts, values = _bincount_histogram(image.ravel(), "image")
+        present = cp.nonzero(counts)[0]
+        return values[present], counts[present]
+    return cp.unique(image.ravel(), return_counts=True)
 
 
 def _match_cumulative_cdf(source, template):
@@ -7,25 +25,24 @@ def _match_cumulative_cdf(source, template):
     Return modified source array so that the cumulative density function of
     its values matches the cumulative density function of the template.
     """
+    tmpl_values, tmpl_counts = _unique_counts(template)
+    tmpl_quantiles = cp.cumsum(tmpl_counts) / template.size
+
+    if _use_bincount(source):
+        # interpolate a table with one entry per integer in the source range
+        src_counts, src_values = _bincount_histogram(source.ravel(), "image")
+        src_quantiles = cp.cumsum(src_counts) / source.size
+        interp_a_values = cnp.interp(src_quantiles, tmpl_quantiles, tmpl_values)
+        return _interp_integer(source, src_values, interp_a_values)
+
     src_values, src_unique_indices, src_counts = cp.unique(
         source.ravel(), return_inverse=True, return_counts=True
     )
-    tmpl_values, tmpl_counts = cp.unique(template.ravel(), return_counts=True)
 
     # calculate normalized quantiles for each array
     src_quantiles = cp.cumsum(src_counts) / source.size
-    tmpl_quantiles = cp.cumsum(tmpl_counts) / template.size
 
-    # TODO: grlee77: cp.interp does not exist, so have to transfer to CPU
-    if not hasattr(cp, "interp"):
-        src_quantiles = src_quantiles.get()
-        tmpl_quantiles = tmpl_quantiles.get()
-        tmpl_values = tmpl_values.get()
-        interp_a_values = cp.asarray(
-            np.interp(src_quantiles, tmpl_quantiles, tmpl_values)
-        )
-    else:
-        interp_a_values = cp.interp(src_quantiles, tmpl_quantiles, tmpl_values)
+    interp_a_values = cnp.interp(src_quantiles, tmpl_quantiles, tmpl_values)
     return interp_a_values[src_unique_indices].reshape(source.shape)
 
 
@@ -10,6 +10,7 @@ from skimage._shared._warnings import expected_warnings
 
 from cupyimg.skimage import util
 from cupyimg.skimage import exposure
+from cupyimg.skimage.exposure import _adapthist
 from cupyimg.skimage.exposure.exposure import intensity_range
 from cupyimg.skimage.color import rgb2gray
 from cupyimg.skimage.util.dtype import dtype_range
@@ -85,6 +86,40 @@ def test_flat_int_range_dtype():
     assert frequencies.shape == (256,)
 
 
+@pytest.mark.parametrize("dtype", [np.int8, np.uint16, np.int32])
+@pytest.mark.parametrize("low, high", [(-100, 100), (3, 20000)])
+def test_int_histogram_vs_bincount(dtype, low, high):
+    info = np.iinfo(dtype)
+    low, high = max(low, info.min), min(high, info.max)
+    im = np.random.RandomState(0).randint(low, high + 1, (64, 64, 16))
+    im = im.astype(dtype)
+    frequencies, bin_centers = exposure.histogram(cp.asarray(im))
+    image_min = int(im.min())
+    expected = np.bincount((im.astype(np.int64) - image_min).ravel())
+    assert frequencies.dtype == np.int64
+    assert_array_equal(frequencies, expected)
+    assert_array_equal(bin_centers, np.arange(image_min, int(im.max()) + 1))
+
+
+def test_int_histogram_rebin():
+    im = cp.asarray([-1000, -999, 0, 1000, 1000], dtype=np.int16)
+    frequencies, bin_centers = exposure.histogram(
+        im, nbins=100, rebin_integers=True
+    )
+    # 2001 values in bins of 21 consecutive values
+    assert frequencies.shape == (96,)
+    assert_array_equal(bin_centers, -990 + 21 * cp.arange(96))
+    assert frequencies[0] == 2
+    assert frequencies[1000 // 21] == 1
+    assert frequencies[-1] == 2
+    assert int(frequencies.sum()) == 5
+    # ranges spanning less than nbins values are not rebinned
+    frequencies, bin_centers = exposure.histogram(
+        im, nbins=4096, rebin_integers=True
+    )
+    assert_array_equal(bin_centers, cp.arange(-1000, 1001))
+
+
 def test_peak_float_out_of_range_image():
     im = cp.asarray([10, 100], dtype=np.float16)
     frequencies, bin_centers = exposure.histogram(im, nbins=90)
@@ -168,6 +203,24 @@ def test_equalize_masked():
     assert not (img_eq == img_mask_eq).all()
 
 
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16])
+def test_equalize_integer_masked(dtype):
+    # integer images are equalized with a lookup table
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 200, (60, 70)).astype(dtype)
+    if dtype == np.int16:
+        img -= 100
+    img = cp.asarray(img)
+    mask = cp.zeros(img.shape, dtype=bool)
+    mask[10:40, 20:50] = True
+    img_eq = exposure.equalize_hist(img, mask=mask)
+
+    # values outside of the range of the masked values are clipped
+    cdf, bin_centers = exposure.cumulative_distribution(img[mask])
+    expected = np.interp(img.get(), bin_centers.get(), cdf.get())
+    assert_array_almost_equal(img_eq, expected)
+
+
 def check_cdf_slope(cdf):
     """Slope of cdf which should equal 1 for an equalized histogram."""
     norm_intensity = np.linspace(0, 1, len(cdf))
@@ -475,6 +528,33 @@ def test_adapthist_borders():
         )
 
 
+@pytest.mark.parametrize("nbins", [128, 16384])
+@pytest.mark.parametrize("clip_limit", [0.0, 0.01, 0.2])
+def test_adapthist_maps(nbins, clip_limit):
+    """Compare the mappings of the contextual regions to a blockwise
+    computation on the host.
+    """
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, _adapthist.NR_OF_GRAY, (50, 43)).astype(np.uint16)
+    kernel_size = (12, 9)
+    clim = int(max(clip_limit * 12 * 9, 1)) if clip_limit else 2 ** 14
+    maps = _adapthist._clahe_maps(cp.asarray(img), kernel_size, clim, nbins)
+    assert maps.shape == (5, 5, nbins)
+
+    # the regions past the end of the image are mirrored
+    padded = np.pad(img, [(0, 10), (0, 2)], mode="reflect")
+    padded //= 1 + _adapthist.NR_OF_GRAY // nbins
+    for i in range(5):
+        for j in range(5):
+            block = padded[12 * i : 12 * (i + 1), 9 * j : 9 * (j + 1)]
+            hist = np.bincount(block.ravel(), minlength=nbins)
+            hist = _adapthist.clip_histogram(hist, clim, xp=np)
+            expected = _adapthist.map_histogram(
+                hist, 0, _adapthist.NR_OF_GRAY - 1, 12 * 9, xp=np
+            )
+            assert_array_equal(maps[i, j], expected)
+
+
 def test_adapthist_clip_limit():
     img_u = data.moon()
     img_f = util.img_as_float(img_u)
@@ -1,3 +1,4 @@
+import cupy as cp
 import numpy as np
 
 from skimage.exposure import histogram_matching
@@ -11,6 +12,10 @@ from skimage._shared.testing import (
 
 import pytest
 
+from cupyimg.skimage.exposure import (
+    histogram_matching as cupyimg_histogram_matching,
+)
+
 
 @pytest.mark.parametrize(
     "array, template, expected_array",
@@ -27,6 +32,20 @@ def test_match_array_values(array, template, expected_array):
     assert_array_almost_equal(matched, expected_array)
 
 
+@pytest.mark.parametrize("dtype", [np.uint8, np.int16, np.float32])
+def test_match_cumulative_cdf_device(dtype):
+    rng = np.random.RandomState(0)
+    source = (rng.randn(64, 48) * 60 + 100).clip(0, 255).astype(dtype)
+    template = (rng.randn(30, 70) * 40 + 50).clip(0, 255).astype(dtype)
+    if dtype == np.int16:
+        source -= 128
+    expected = histogram_matching._match_cumulative_cdf(source, template)
+    matched = cupyimg_histogram_matching._match_cumulative_cdf(
+        cp.asarray(source), cp.asarray(template)
+    )
+    assert_array_almost_equal(matched.get(), expected)
+
+
 class TestMatchHistogram:
 
     image_rgb = data.chelsea()
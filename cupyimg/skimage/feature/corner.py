@@ -6,8 +6,9 @@ import cupy as cp
 import numpy as np
 from scipy import spatial  # TODO: use RAPIDS cuSpatial?
 
-import cupyimg.numpy as cnp
+from cupyimg import memoize
 from cupyimg.scipy import ndimage as ndi
+from cupyimg.scipy.ndimage import _util
 from .peak import peak_local_max
 from .util import _prepare_grayscale_input_2D
 
@@ -95,14 +96,151 @@ def structure_tensor(image, sigma=1, mode="constant", cval=0):
 
     imx, imy = _compute_derivatives(image, mode=mode, cval=cval)
 
-    # structure tensore
-    Axx = ndi.gaussian_filter(imx * imx, sigma, mode=mode, cval=cval)
-    Axy = ndi.gaussian_filter(imx * imy, sigma, mode=mode, cval=cval)
-    Ayy = ndi.gaussian_filter(imy * imy, sigma, mode=mode, cval=cval)
+    # structure tensor: smooth the stacked products in a single pass
+    products = cp.empty((3,) + imx.shape, dtype=imx.dtype)
+    cp.multiply(imx, imx, out=products[0])
+    cp.multiply(imx, imy, out=products[1])
+    cp.multiply(imy, imy, out=products[2])
+    Axx, Axy, Ayy = ndi.gaussian_filter(
+        products, (0,) + (sigma,) * imx.ndim, mode=mode, cval=cval
+    )
 
     return Axx, Axy, Ayy
 
 
+_GRADIENT_TAPS = """
+// taps of numpy.gradient at position k of an axis of length n
+template <typename I>
+__device__ void _gradient_taps(I k, I n, I* o, double* w) {
+    if (k == 0) {
+        o[0] = 1; w[0] = 1.0; o[1] = 0; w[1] = -1.0;
+    } else if (k == n - 1) {
+        o[0] = 0; w[0] = 1.0; o[1] = -1; w[1] = -1.0;
+    } else {
+        o[0] = 1; w[0] = 0.5; o[1] = -1; w[1] = -0.5;
+    }
+}
+"""
+
+
+@memoize(for_each_device=True)
+def _get_derivatives_kernel(ndim, derivatives, int_type):
+    """Kernel for the finite differences of ``_gaussian_derivatives``.
+
+    Each entry of ``derivatives`` is expanded into nested loops over the
+    taps of ``numpy.gradient``, from the last (outermost) axis to the first.
+    """
+    code = ["{} _i = i;".format(int_type)]
+    for j in range(ndim - 1, -1, -1):
+        code.append(
+            "{t} n_{j} = f.shape()[{j}], p_{j} = _i % n_{j}; _i /= n_{j};"
+            "".format(t=int_type, j=j)
+        )
+    for k, axes in enumerate(derivatives):
+        coords = ["p_{}".format(j) for j in range(ndim)]
+        loops = []
+        weight = "scale"
+        for level, axis in enumerate(reversed(axes)):
+            loops.append(
+                """
+        {t} o{l}[2];
+        double w{l}[2];
+        _gradient_taps({c}, n_{a}, o{l}, w{l});
+        for (int t{l} = 0; t{l} < 2; t{l}++) {{
+        {t} q{l} = {c} + o{l}[t{l}];""".format(
+                    t=int_type, l=level, c=coords[axis], a=axis
+                )
+            )
+            coords[axis] = "q{}".format(level)
+            weight += " * w{l}[t{l}]".format(l=level)
+        index = coords[0]
+        for j in range(1, ndim):
+            index = "({}) * n_{} + {}".format(index, j, coords[j])
+        code.append(
+            """
+    {{
+        double s = 0.0;
+        {loops}
+        s += {weight} * (double)f[{index}];
+        {end}
+        y{k} = (F)s;
+    }}""".format(
+                loops="".join(loops),
+                weight=weight,
+                index=index,
+                end="}" * len(axes),
+                k=k,
+            )
+        )
+    out_params = ", ".join("F y{}".format(k) for k in range(len(derivatives)))
+    name = "cupyimg_skimage_derivatives_{}d_{}".format(
+        ndim,
+        "_".join("".join(str(a) for a in axes) or "s" for axes in derivatives),
+    )
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cp.ElementwiseKernel(
+        "raw F f, float64 scale",
+        out_params,
+        "\n".join(code),
+        name,
+        preamble=_GRADIENT_TAPS,
+    )
+
+
+def _gaussian_derivatives(
+    image, sigma, derivatives, mode="constant", cval=0, scale=1
+):
+    """Gaussian smoothing followed by a bank of finite differences.
+
+    Parameters
+    ----------
+    image : ndarray
+        Input image of floating point dtype.
+    sigma : float or sequence of float
+        Standard deviation of the Gaussian kernel.
+    derivatives : sequence of tuple of int
+        The axes of the finite differences for each output. ``()`` gives the
+        smoothed image, ``(a,)`` its gradient along axis ``a`` and
+        ``(a, b)`` the gradient along ``b`` of the gradient along ``a``.
+    mode : {'constant', 'reflect', 'wrap', 'nearest', 'mirror'}, optional
+        How to handle values outside the image borders.
+    cval : float, optional
+        Used in conjunction with mode 'constant', the value outside
+        the image boundaries.
+    scale : float, optional
+        Factor applied to all outputs.
+
+    Returns
+    -------
+    out : list of ndarray
+        One array per entry of ``derivatives``.
+
+    Notes
+    -----
+    The image is smoothed once and all outputs are computed by a single
+    kernel using the differences of ``numpy.gradient`` (central in the
+    interior and one-sided at the edges), instead of one ``gradient`` call
+    per axis and per output.
+    """
+    derivatives = tuple(tuple(int(a) for a in axes) for axes in derivatives)
+    for axes in derivatives:
+        for axis in axes:
+            if image.shape[axis] < 2:
+                raise ValueError(
+                    "Shape of array too small to calculate a numerical "
+                    "gradient, at least 2 elements are required."
+                )
+    smoothed = ndi.gaussian_filter(image, sigma=sigma, mode=mode, cval=cval)
+    kernel = _get_derivatives_kernel(
+        image.ndim, derivatives, _util._get_inttype(smoothed)
+    )
+    out = kernel(smoothed, float(scale), size=smoothed.size)
+    if len(derivatives) == 1:
+        out = (out,)
+    return [y.reshape(image.shape) for y in out]
+
+
 def hessian_matrix(image, sigma=1, mode="constant", cval=0, order="rc"):
     """Compute Hessian matrix.
 
@@ -158,20 +296,19 @@ def hessian_matrix(image, sigma=1, mode="constant", cval=0, order="rc"):
 
     image = img_as_float(image)
 
-    gaussian_filtered = ndi.gaussian_filter(
-        image, sigma=sigma, mode=mode, cval=cval
-    )
-
-    gradients = cnp.gradient(gaussian_filtered)
     axes = range(image.ndim)
 
     if order == "rc":
         axes = reversed(axes)
 
-    H_elems = [
-        cnp.gradient(gradients[ax0], axis=ax1)
-        for ax0, ax1 in combinations_with_replacement(axes, 2)
-    ]
+    # element (ax0, ax1) is gradient(gradient(smoothed, axis=ax0), axis=ax1)
+    H_elems = _gaussian_derivatives(
+        image,
+        sigma,
+        combinations_with_replacement(axes, 2),
+        mode=mode,
+        cval=cval,
+    )
 
     return H_elems
 
@@ -243,45 +380,167 @@ def hessian_matrix_det(image, sigma=1, approximate=True):
         # integral = integral_image(image)
         # return np.array(_hessian_matrix_det(integral, sigma))
     else:  # slower brute-force implementation for nD images
-        hessian_mat_array = _hessian_matrix_image(hessian_matrix(image, sigma))
-        return np.linalg.det(hessian_mat_array)
+        # the determinant does not depend on the order of the axes
+        H_elems = _gaussian_derivatives(
+            image, sigma, combinations_with_replacement(range(image.ndim), 2)
+        )
+        if image.ndim <= 3:
+            return _get_symmetric_det_kernel(image.ndim)(*H_elems)
+        return cp.linalg.det(_hessian_matrix_image(H_elems))
 
 
-def _image_orthogonal_matrix22_eigvals(M00, M01, M11):
-    """
-    analytical formula below optimized for in-place computations.
-    It corresponds to::
+_SYMMETRIC_DETS = {
+    1: "m00",
+    2: "m00 * m11 - m01 * m01",
+    3: """m00 * (m11 * m22 - m12 * m12)
+            - m01 * (m01 * m22 - m12 * m02)
+            + m02 * (m01 * m12 - m11 * m02)""",
+}
+
 
-    l1 = (M00 + M11) / 2 + cp.sqrt(4 * M01 ** 2 + (M00 - M11) ** 2) / 2
-    l2 = (M00 + M11) / 2 - cp.sqrt(4 * M01 ** 2 + (M00 - M11) ** 2) / 2
+@memoize(for_each_device=True)
+def _get_symmetric_det_kernel(ndim):
+    """Kernel for the determinant of a field of symmetric matrices.
+
+    The inputs are the upper-diagonal elements in the order of
+    `_hessian_matrix_image`.
     """
-    tmp1 = M01 * M01
-    tmp1 *= 4
-
-    tmp2 = M00 - M11
-    tmp2 *= tmp2
-    tmp2 += tmp1
-    cp.sqrt(tmp2, out=tmp2)
-    tmp2 /= 2
-
-    tmp1 = M00 + M11
-    tmp1 /= 2
-    l1 = tmp1 + tmp2
-    l2 = tmp1 - tmp2
-    return l1, l2
+    elems = [
+        "m{}{}".format(row, col)
+        for row, col in combinations_with_replacement(range(ndim), 2)
+    ]
+    code = "\n".join("double {0} = _{0};".format(m) for m in elems)
+    code += "\ndet = (F)({});".format(_SYMMETRIC_DETS[ndim])
+    return cp.ElementwiseKernel(
+        ", ".join("F _{}".format(m) for m in elems),
+        "F det",
+        code,
+        "cupyimg_skimage_symmetric_det_{}d".format(ndim),
+    )
 
 
+_SYMMETRIC_EIGVALS_2D = """
+    double a00 = m00, a01 = m01, a11 = m11;
+    double h = (a00 + a11) / 2.0;
+    double d = hypot((a00 - a11) / 2.0, a01);
+    double l[2] = {h + d, h - d};
 """
-TODO: add an _image_symmetric_real33_eigvals() based on:
-Oliver K. Smith. 1961.
-Eigenvalues of a symmetric 3 × 3 matrix.
-Commun. ACM 4, 4 (April 1961), 168.
-DOI:https://doi.org/10.1145/355578.366316
-
-def _image_symmetric_real33_eigvals(M00, M01, M02, M11, M12, M22):
 
+# closed form of Smith, O. K. "Eigenvalues of a symmetric 3 x 3 matrix".
+# Commun. ACM 4, 4 (April 1961), 168. DOI:10.1145/355578.366316
+_SYMMETRIC_EIGVALS_3D = """
+    double a00 = m00, a01 = m01, a02 = m02;
+    double a11 = m11, a12 = m12, a22 = m22;
+    double l[3];
+    double p1 = a01 * a01 + a02 * a02 + a12 * a12;
+    if (p1 == 0.0) {
+        l[0] = a00; l[1] = a11; l[2] = a22;
+    } else {
+        double q = (a00 + a11 + a22) / 3.0;
+        double b00 = a00 - q, b11 = a11 - q, b22 = a22 - q;
+        double p = sqrt((b00 * b00 + b11 * b11 + b22 * b22 + 2.0 * p1) / 6.0);
+        double r = (b00 * (b11 * b22 - a12 * a12)
+                    - a01 * (a01 * b22 - a12 * a02)
+                    + a02 * (a01 * a12 - b11 * a02)) / (2.0 * p * p * p);
+        r = fmin(fmax(r, -1.0), 1.0);
+        double phi = acos(r) / 3.0;
+        l[0] = q + 2.0 * p * cos(phi);
+        l[2] = q + 2.0 * p * cos(phi + 2.0943951023931957);  // + 2 pi / 3
+        l[1] = 3.0 * q - l[0] - l[2];
+    }
 """
 
+_EIGVALS_SORT_KEYS = {"desc": "-({})", "val": "{}", "abs": "fabs({})"}
+
+
+@memoize(for_each_device=True)
+def _get_symmetric_eigvals_kernel(ndim, sorting):
+    """Kernel for the eigenvalues of a field of symmetric 2x2 or 3x3 matrices.
+
+    The eigenvalues are ordered by a bubble sort network on the key given by
+    ``sorting`` ('desc': decreasing, 'val': increasing, 'abs': increasing
+    absolute value). Ties keep the decreasing order of the closed forms.
+    """
+    if ndim == 2:
+        in_params = "F m00, F m01, F m11"
+        code = [_SYMMETRIC_EIGVALS_2D]
+    elif ndim == 3:
+        in_params = "F m00, F m01, F m02, F m11, F m12, F m22"
+        code = [_SYMMETRIC_EIGVALS_3D]
+    else:
+        raise ValueError("only 2x2 and 3x3 matrices are supported")
+    key = _EIGVALS_SORT_KEYS[sorting]
+    for n in range(ndim - 1, 0, -1):
+        for j in range(n):
+            code.append(
+                "if ({a} > {b}) {{ double t = l[{j}]; l[{j}] = l[{k}]; "
+                "l[{k}] = t; }}".format(
+                    a=key.format("l[{}]".format(j)),
+                    b=key.format("l[{}]".format(j + 1)),
+                    j=j,
+                    k=j + 1,
+                )
+            )
+    for j in range(ndim):
+        code.append("l{j} = (F)l[{j}];".format(j=j))
+    out_params = ", ".join("F l{}".format(j) for j in range(ndim))
+    return cp.ElementwiseKernel(
+        in_params,
+        out_params,
+        "\n".join(code),
+        "cupyimg_skimage_symmetric_eigvals_{}d_{}".format(ndim, sorting),
+    )
+
+
+def _symmetric_eigvals(M_elems, sorting="desc"):
+    """Eigenvalues of a field of symmetric 2x2 or 3x3 matrices.
+
+    Parameters
+    ----------
+    M_elems : list of ndarray
+        The upper-diagonal elements of the matrices, in the order of
+        `hessian_matrix`.
+    sorting : {'desc', 'val', 'abs'}, optional
+        Order of the eigenvalues: decreasing values ('desc'), increasing
+        values ('val') or increasing absolute values ('abs').
+
+    Returns
+    -------
+    eigs : ndarray
+        The eigenvalues stacked along the leading dimension.
+
+    Notes
+    -----
+    The eigenvalues are computed per element in closed form, without
+    forming the stack of matrices.
+    """
+    ndim = {3: 2, 6: 3}.get(len(M_elems))
+    if ndim is None:
+        raise ValueError("only 2x2 and 3x3 matrices are supported")
+    if sorting not in _EIGVALS_SORT_KEYS:
+        raise ValueError("unknown sorting: {}".format(sorting))
+    dtype = cp.result_type(*M_elems)
+    if dtype.kind != "f":
+        dtype = np.dtype(np.float64)
+    M_elems = [cp.asarray(m, dtype=dtype) for m in M_elems]
+    shape = cp.broadcast(*M_elems).shape
+    eigvals = cp.empty((ndim,) + shape, dtype=dtype)
+    kern = _get_symmetric_eigvals_kernel(ndim, sorting)
+    kern(*M_elems, *eigvals)
+    return eigvals
+
+
+def _image_orthogonal_matrix22_eigvals(M00, M01, M11):
+    """Larger and smaller eigenvalues of a field of 2x2 symmetric matrices."""
+    l1, l2 = _symmetric_eigvals([M00, M01, M11])
+    return l1, l2
+
+
+def _image_symmetric_real33_eigvals(M00, M01, M02, M11, M12, M22):
+    """Decreasing eigenvalues of a field of 3x3 symmetric matrices."""
+    l1, l2, l3 = _symmetric_eigvals([M00, M01, M02, M11, M12, M22])
+    return l1, l2, l3
+
 
 def structure_tensor_eigvals(Axx, Axy, Ayy):
     """Compute Eigen values of structure tensor.
@@ -350,8 +609,8 @@ def hessian_matrix_eigvals(H_elems):
            [ 0.,  1.,  0.,  1.,  0.],
            [ 0.,  0.,  2.,  0.,  0.]])
     """
-    if len(H_elems) == 3:  # Use fast Cython code for 2D
-        eigvals = cp.stack(_image_orthogonal_matrix22_eigvals(*H_elems), axis=0)
+    if len(H_elems) in (3, 6):  # closed form for 2D and 3D
+        eigvals = _symmetric_eigvals(H_elems)
     else:
         # TODO: grlee77: avoid host/device transfer.
         #                (currently cp.linalg.eigvalsh doesn't handle nd data)
@@ -636,17 +895,7 @@ def corner_shi_tomasi(image, sigma=1):
     Axx, Axy, Ayy = structure_tensor(image, sigma)
 
     # minimum eigenvalue of A
-
-    # response = ((Axx + Ayy) - np.sqrt((Axx - Ayy) ** 2 + 4 * Axy ** 2)) / 2
-    tmp = Axx - Ayy
-    tmp *= tmp
-    tmp2 = 4 * Axy
-    tmp2 *= Axy
-    tmp += tmp2
-    cp.sqrt(tmp, out=tmp)
-    tmp /= 2
-    response = Axx + Ayy
-    response -= tmp
+    response = _symmetric_eigvals([Axx, Axy, Ayy])[1]
 
     return response
 
@@ -3,7 +3,6 @@ import warnings
 import cupy as cp
 import numpy as np
 from skimage import measure as cpu_measure
-from scipy.ndimage import find_objects as cpu_find_objects
 from cupyimg.skimage import measure
 
 import cupyimg.scipy.ndimage as ndi
@@ -12,7 +11,6 @@ import cupyimg.scipy.ndimage as ndi
 from ..filters import rank_order
 
 # TODO: update if GPU implementations of the following are completed/improved
-# scipy.ndimage.find_objects
 # skimage.measure.regionprops
 
 
@@ -239,10 +237,7 @@ def peak_local_max(
         # For each label, extract a smaller image enclosing the object of
         # interest, identify num_peaks_per_label peaks and mark them in
         # variable out.
-        warnings.warn(
-            "host/device transfers necessary: ndimage.find_objects unimplemented on the GPU"
-        )
-        objects = cpu_find_objects(cp.asnumpy(labels))
+        objects = ndi.find_objects(labels)
         for label_idx, obj in enumerate(objects):
             img_object = image[obj] * (labels[obj] == label_idx + 1)
             mask = _get_peak_mask(
@@ -155,6 +155,28 @@ def test_hessian_matrix_3d():
     # fmt: on
 
 
+@pytest.mark.parametrize("shape", [(7, 9), (5, 6, 8)])
+def test_gaussian_derivatives(shape):
+    from cupyimg.scipy import ndimage as ndi
+    from cupyimg.skimage.feature.corner import _gaussian_derivatives
+
+    rstate = cp.random.RandomState(5)
+    image = rstate.standard_normal(shape)
+    ndim = len(shape)
+    derivatives = [(), (0,), (ndim - 1, 0), (1, 1)]
+    out = _gaussian_derivatives(
+        image, 1.5, derivatives, mode="reflect", scale=2.0
+    )
+    smoothed = ndi.gaussian_filter(image, 1.5, mode="reflect")
+    assert len(out) == len(derivatives)
+    for result, axes in zip(out, derivatives):
+        expected = smoothed
+        for axis in axes:
+            expected = cp.gradient(expected, axis=axis)
+        assert result.shape == image.shape
+        assert_array_almost_equal(result, 2.0 * expected)
+
+
 def test_structure_tensor_eigvals():
     square = cp.zeros((5, 5))
     square[2, 2] = 1
@@ -251,6 +273,56 @@ def test_hessian_matrix_det():
     assert_array_almost_equal(det, 0, decimal=3)
 
 
+@pytest.mark.parametrize("shape", [(9,), (7, 8), (6, 7, 5), (4, 5, 3, 4)])
+def test_hessian_matrix_det_vs_linalg(shape):
+    from cupyimg.skimage.feature.corner import _hessian_matrix_image
+
+    image = cp.random.RandomState(0).standard_normal(shape)
+    H_elems = hessian_matrix(image, sigma=1.5, order="xy")
+    expected = np.linalg.det(cp.asnumpy(_hessian_matrix_image(H_elems)))
+    det = hessian_matrix_det(image, 1.5, approximate=False)
+    assert isinstance(det, cp.ndarray)
+    assert_array_almost_equal(det, expected, decimal=10)
+
+
+@pytest.mark.parametrize("ndim", [2, 3])
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_symmetric_eigvals(ndim, dtype):
+    from cupyimg.skimage.feature.corner import (
+        _hessian_matrix_image,
+        _symmetric_eigvals,
+    )
+
+    rstate = cp.random.RandomState(7)
+    shape = (6, 7, 5)[:ndim]
+    M_elems = [rstate.standard_normal(shape).astype(dtype) for _ in range(6)]
+    M_elems = M_elems[: ndim * (ndim + 1) // 2]
+    # diagonal matrices on the first row, multiples of identity on the next
+    diagonal = [0, 2] if ndim == 2 else [0, 3, 5]
+    for idx, m in enumerate(M_elems):
+        if idx not in diagonal:
+            m[0] = 0
+        m[1] = 1.5 if idx in diagonal else 0
+    matrices = cp.asnumpy(_hessian_matrix_image(M_elems))
+    expected = np.moveaxis(np.linalg.eigvalsh(matrices), -1, 0)
+    decimal = 4 if dtype == np.float32 else 10
+
+    eigvals = _symmetric_eigvals(M_elems)
+    assert eigvals.dtype == dtype
+    assert_array_almost_equal(eigvals, expected[::-1], decimal=decimal)
+    assert_array_almost_equal(
+        _symmetric_eigvals(M_elems, "val"), expected, decimal=decimal
+    )
+    order = np.argsort(np.abs(expected), axis=0, kind="stable")
+    assert_array_almost_equal(
+        _symmetric_eigvals(M_elems, "abs"),
+        np.take_along_axis(expected, order, axis=0),
+        decimal=decimal,
+    )
+    with pytest.raises(ValueError):
+        _symmetric_eigvals(M_elems, "unknown")
+
+
 def test_hessian_matrix_det_3d(im3d):
     D = hessian_matrix_det(im3d)
     D = cp.asnumpy(D)
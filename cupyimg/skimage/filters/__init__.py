@@ -36,6 +36,7 @@ from .thresholding import (
     threshold_niblack,
     threshold_sauvola,
     threshold_multiotsu,
+    threshold_batch,
     try_all_threshold,
     apply_hysteresis_threshold,
 )
@@ -86,6 +87,7 @@ __all__ = [
     "threshold_sauvola",
     "threshold_triangle",
     "threshold_multiotsu",
+    "threshold_batch",
     "apply_hysteresis_threshold",
     # "rank",
     "unsharp_mask",
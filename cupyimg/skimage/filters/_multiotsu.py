@@ -0,0 +1,219 @@
+"""Device implementation of the multi-Otsu threshold search.
+
+The between-class variance of a class spanning the histogram bins
+``[i, j]`` is ``(M1[j] - M1[i - 1])**2 / (M0[j] - M0[i - 1])``, where ``M0``
+and ``M1`` are the cumulative zeroth and first moments of the histogram.
+Both tables are computed on the GPU and the search for the thresholds that
+maximize the sum of the class variances is done either exhaustively (all
+threshold combinations in parallel) or by dynamic programming over the
+number of classes.
+"""
+import cupy as cp
+import numpy as np
+
+from cupyimg import memoize
+
+# largest number of (possibly invalid) threshold combinations evaluated by
+# the exhaustive search
+_MAX_BRUTE_SIZE = 1 << 22
+
+_VAR_BTWCLS = """
+template<typename A>
+__device__ double _var_btwcls(const A& m0, const A& m1, int i, int j)
+{
+    double w, m;
+    if (i == 0) {
+        w = m0[j];
+        m = m1[j];
+    } else {
+        w = m0[j] - m0[i - 1];
+        m = m1[j] - m1[i - 1];
+    }
+    return w > 0 ? m * m / w : 0.0;
+}
+"""
+
+
+def _get_moments(prob):
+    """Cumulative zeroth and first moments of the histogram ``prob``."""
+    prob = prob.astype(cp.float64, copy=False)
+    m0 = cp.cumsum(prob)
+    m1 = cp.cumsum(prob * cp.arange(prob.size, dtype=cp.float64))
+    return m0, m1
+
+
+@memoize(for_each_device=True)
+def _get_brute_kernel(thresh_count):
+    """Kernel evaluating the sum of class variances for all combinations.
+
+    The flat index is decoded as ``thresh_count`` digits in base ``nbins``,
+    the first threshold being the most significant digit so that the first
+    maximum in flat order is also the first one in lexicographic order.
+    Combinations that are not strictly increasing are given a variance of
+    -1.
+    """
+    code = """
+    int t[{k}];
+    ptrdiff_t rem = i;
+    for (int k = {k} - 1; k >= 0; k--) {{
+        t[k] = rem % nbins;
+        rem /= nbins;
+    }}
+    bool valid = t[{k} - 1] < nbins - 1;
+    for (int k = 1; k < {k}; k++) {{
+        valid &= t[k] > t[k - 1];
+    }}
+    if (valid) {{
+        double s = _var_btwcls(m0, m1, 0, t[0]);
+        s += _var_btwcls(m0, m1, t[{k} - 1] + 1, nbins - 1);
+        for (int k = 0; k < {k} - 1; k++) {{
+            s += _var_btwcls(m0, m1, t[k] + 1, t[k + 1]);
+        }}
+        sigma = s;
+    }} else {{
+        sigma = -1.0;
+    }}
+    """.format(
+        k=thresh_count
+    )
+    return cp.ElementwiseKernel(
+        "raw float64 m0, raw float64 m1, int32 nbins",
+        "float64 sigma",
+        code,
+        "cupyimg_skimage_multiotsu_brute_{}".format(thresh_count),
+        preamble=_VAR_BTWCLS,
+    )
+
+
+@memoize(for_each_device=True)
+def _get_dp_kernel():
+    """Kernel for one step of the dynamic programming threshold search.
+
+    Given the best sum of variances ``s_prev[k]`` of the first ``c - 1``
+    classes covering bins ``[0, k]``, computes the best sum ``s`` of ``c``
+    classes covering bins ``[0, j]`` and the end ``arg`` of class ``c - 1``,
+    for ``j = i + offset``. ``first`` is the smallest valid value of ``k``.
+    """
+    code = """
+    int j = i + offset;
+    double best = -1.0;
+    int best_k = -1;
+    for (int k = first; k < j; k++) {
+        double v = s_prev[k] + _var_btwcls(m0, m1, k + 1, j);
+        if (v > best) {
+            best = v;
+            best_k = k;
+        }
+    }
+    s = best;
+    arg = best_k;
+    """
+    return cp.ElementwiseKernel(
+        "raw float64 s_prev, raw float64 m0, raw float64 m1, int32 first, "
+        "int32 offset",
+        "float64 s, int32 arg",
+        code,
+        "cupyimg_skimage_multiotsu_dp",
+        preamble=_VAR_BTWCLS,
+    )
+
+
+def _get_multiotsu_thresh_indices_brute(prob, thresh_count):
+    """Finds the indices of Otsu thresholds by testing all combinations.
+
+    All ``nbins**thresh_count`` candidate combinations are evaluated in
+    parallel, so this is only practical for few bins and thresholds.
+
+    Parameters
+    ----------
+    prob : array
+        Value occurence probabilities.
+    thresh_count : int
+        The desired number of thresholds (classes-1).
+
+    Returns
+    -------
+    thresh_idx : array
+        The indices of the desired thresholds.
+    """
+    nbins = prob.size
+    m0, m1 = _get_moments(prob)
+    sigma = cp.empty(nbins ** thresh_count, dtype=cp.float64)
+    kern = _get_brute_kernel(thresh_count)
+    kern(m0, m1, nbins, sigma)
+    flat_idx = cp.argmax(sigma)
+    strides = cp.asarray(nbins ** np.arange(thresh_count - 1, -1, -1))
+    return (flat_idx // strides) % nbins
+
+
+def _get_multiotsu_thresh_indices_dp(prob, thresh_count):
+    """Finds the indices of Otsu thresholds by dynamic programming.
+
+    The best partition of the bins ``[0, j]`` in ``c`` classes is obtained
+    from the best partitions in ``c - 1`` classes for all ``j`` in
+    parallel, for an overall complexity of
+    :math:`O\\left(C h^2\\right)` instead of
+    :math:`O\\left(h^{C-1}\\right)`.
+
+    Parameters
+    ----------
+    prob : array
+        Value occurence probabilities.
+    thresh_count : int
+        The desired number of thresholds (classes-1).
+
+    Returns
+    -------
+    thresh_idx : array
+        The indices of the desired thresholds.
+    """
+    nbins = prob.size
+    m0, m1 = _get_moments(prob)
+    # best sum of variances of a single class covering bins [0, j]
+    s = cp.where(m0 > 0, m1 * m1 / cp.where(m0 > 0, m0, 1), 0)
+    kern = _get_dp_kernel()
+    args = []
+    for c in range(2, thresh_count + 1):
+        s_next = cp.empty(nbins, dtype=cp.float64)
+        arg = cp.empty(nbins, dtype=cp.int32)
+        kern(s, m0, m1, c - 2, 0, s_next, arg)
+        s = s_next
+        args.append(arg)
+    # only the partition of all bins is needed for the last class
+    s_last = cp.empty(1, dtype=cp.float64)
+    arg = cp.empty(1, dtype=cp.int32)
+    kern(s, m0, m1, thresh_count - 1, nbins - 1, s_last, arg)
+    thresh_idx = [arg]
+    for arg in reversed(args):
+        thresh_idx.append(arg[thresh_idx[-1]])
+    return cp.concatenate(thresh_idx[::-1])
+
+
+def _get_multiotsu_thresh_indices(prob, thresh_count):
+    """Finds the indices of Otsu thresholds according to the values
+    occurence probabilities.
+
+    The exhaustive search is used when the number of combinations is at most
+    ``_MAX_BRUTE_SIZE`` and the dynamic programming search otherwise (e.g.
+    for 16-bit histograms or many classes). Both maximize the same sum of
+    class variances, but they may return different thresholds when several
+    combinations (nearly) reach the maximum: the exhaustive search returns
+    the lexicographically smallest one, while the dynamic programming search
+    picks the smallest last threshold and then backtracks, and accumulates
+    the variances in a different order.
+
+    Parameters
+    ----------
+    prob : array
+        Value occurence probabilities.
+    thresh_count : int
+        The desired number of thresholds (classes-1).
+
+    Returns
+    -------
+    thresh_idx : array
+        The indices of the desired thresholds.
+    """
+    if prob.size ** thresh_count <= _MAX_BRUTE_SIZE:
+        return _get_multiotsu_thresh_indices_brute(prob, thresh_count)
+    return _get_multiotsu_thresh_indices_dp(prob, thresh_count)
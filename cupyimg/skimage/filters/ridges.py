@@ -9,6 +9,7 @@ perpendicular but not along the structure.
 """
 
 from functools import reduce
+from itertools import combinations_with_replacement
 from warnings import warn
 
 import cupy as cp
@@ -142,21 +143,30 @@ def compute_hessian_eigenvalues(
     """
 
     # Import has to be here due to circular import error
-    from ..feature import hessian_matrix, hessian_matrix_eigvals
+    from ..feature import hessian_matrix_eigvals
+    from ..feature.corner import _gaussian_derivatives, _symmetric_eigvals
 
     # Convert image to float
     image = img_as_float(image)
 
-    # Make nD hessian
-    hessian_elements = hessian_matrix(
-        image, sigma=sigma, order="rc", mode=mode, cval=cval
+    # Make nD hessian (as hessian_matrix with order="rc"), corrected for
+    # scale
+    axes = reversed(range(image.ndim))
+    hessian_elements = _gaussian_derivatives(
+        image,
+        sigma,
+        combinations_with_replacement(axes, 2),
+        mode=mode,
+        cval=cval,
+        scale=sigma ** 2,
     )
 
-    # Correct for scale
-    hessian_elements = [(sigma ** 2) * e for e in hessian_elements]
-
     # Compute Hessian eigenvalues
-    # hessian_eigenvalues = np.array(hessian_matrix_eigvals(hessian_elements))
+    if image.ndim in (2, 3):
+        # closed form, sorted in the same kernel
+        return _symmetric_eigvals(
+            hessian_elements, "desc" if sorting == "none" else sorting
+        )
     hessian_eigenvalues = hessian_matrix_eigvals(hessian_elements)
 
     if sorting == "abs":
@@ -254,7 +264,6 @@ def meijering(
         eigenvalues = compute_hessian_eigenvalues(
             image, sigma, sorting="abs", mode=mode, cval=cval
         )
-        eigenvalues = cp.asnumpy(eigenvalues)
 
         if ndim > 1:
 
@@ -264,19 +273,15 @@ def meijering(
 
             # Compute normalized eigenvalues l_i = e_i + sum_{j!=i} alpha * e_j
             auxiliary = [
-                np.sum(
-                    [
-                        eigenvalues[i] * np.roll(coefficients, j)[i]
-                        for j in range(ndim)
-                    ],
-                    axis=0,
+                sum(
+                    eigenvalues[i] * np.roll(coefficients, j)[i]
+                    for j in range(ndim)
                 )
                 for i in range(ndim)
             ]
 
             # Get maximum eigenvalues by magnitude
             auxiliary = auxiliary[-1]
-            auxiliary = cp.asarray(auxiliary)
 
             # Rescale image intensity and avoid ZeroDivisionError
             filtered = _divide_nonzero(auxiliary, cp.min(auxiliary))
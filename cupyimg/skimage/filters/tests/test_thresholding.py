@@ -12,7 +12,7 @@ from cupyimg.skimage import util
 
 from cupyimg.skimage.color import rgb2gray
 
-# from cupyimg.skimage.exposure import histogram
+from cupyimg.skimage.exposure import histogram
 from cupyimg.skimage.filters.thresholding import (
     threshold_local,
     threshold_otsu,
@@ -25,13 +25,16 @@ from cupyimg.skimage.filters.thresholding import (
     threshold_triangle,
     threshold_minimum,
     threshold_multiotsu,
+    threshold_batch,
     # try_all_threshold,
     # _mean_std,
     _cross_entropy,
 )
 
-# from skimage.filters._multiotsu import (_get_multiotsu_thresh_indices_lut,
-#                                         _get_multiotsu_thresh_indices)
+from cupyimg.skimage.filters._multiotsu import (
+    _get_multiotsu_thresh_indices_brute,
+    _get_multiotsu_thresh_indices_dp,
+)
 from skimage._shared import testing
 from cupy.testing import assert_array_equal, assert_array_almost_equal
 
@@ -173,6 +176,12 @@ class TestSimpleImage:
         out = threshold_local(self.image, 3, method="mean")
         assert_array_equal(ref, self.image > out)
 
+    def test_threshold_local_generic(self):
+        mean = dict(reduce_expr="a + b", post_map_expr="a / count", identity=0)
+        out = threshold_local(self.image, 3, method="generic", param=mean)
+        ref = threshold_local(self.image, 3, method="mean")
+        assert_array_almost_equal(ref, out)
+
     def test_threshold_local_median(self):
         # fmt: off
         ref = cp.asarray(
@@ -667,6 +676,93 @@ def test_multiotsu_output():
     assert_array_equal(thresholds, threshold_multiotsu(image, classes=4))
 
 
+_BATCH_METHODS = {
+    "otsu": threshold_otsu,
+    "yen": threshold_yen,
+    "isodata": threshold_isodata,
+    "li": threshold_li,
+    "minimum": threshold_minimum,
+    "triangle": threshold_triangle,
+}
+
+
+@pytest.mark.parametrize("method", sorted(_BATCH_METHODS))
+@pytest.mark.parametrize("dtype", [cp.uint8, cp.float32, cp.float64])
+def test_threshold_batch(method, dtype):
+    tiles = camerad.reshape(4, 128, 4, 128).transpose(0, 2, 1, 3)
+    tiles = tiles.reshape(16, 128, 128)
+    if dtype != cp.uint8:
+        tiles = util.img_as_float(tiles).astype(dtype)
+    expected = []
+    for tile in tiles:
+        try:
+            expected.append(float(_BATCH_METHODS[method](tile)))
+        except RuntimeError:
+            expected.append(np.nan)
+    thresholds = threshold_batch(tiles, method)
+    assert thresholds.shape == (16,)
+    if method == "li" and dtype != cp.uint8:
+        # computed from the histogram: accurate to within the bin width
+        atol = 1 / 256
+    else:
+        atol = 1e-6
+    cp.testing.assert_allclose(thresholds, expected, rtol=1e-5, atol=atol)
+
+
+def test_threshold_batch_single_value():
+    image = cp.stack([camerad[:64, :64], cp.full((64, 64), 7, cp.uint8)])
+    thresholds = threshold_batch(image, "otsu")
+    assert thresholds[0] == threshold_otsu(camerad[:64, :64])
+    assert thresholds[1] == 7
+
+
+def test_threshold_batch_invalid():
+    with testing.raises(ValueError):
+        threshold_batch(camerad, method="mean")
+    with testing.raises(ValueError):
+        threshold_batch(camerad[0], method="otsu")
+
+
+def test_multiotsu_brute_dp():
+    def sum_of_variances(prob, thresh_idx):
+        # ties may be broken differently, so the maximized sum is compared
+        prob = cp.asnumpy(prob).astype(np.float64)
+        bounds = np.concatenate(([-1], cp.asnumpy(thresh_idx), [prob.size - 1]))
+        bins = np.arange(prob.size)
+        total = 0.0
+        for start, stop in zip(bounds[:-1] + 1, bounds[1:] + 1):
+            w = prob[start:stop].sum()
+            m = (prob[start:stop] * bins[start:stop]).sum()
+            if w > 0:
+                total += m * m / w
+        return total
+
+    for classes in [2, 3, 4]:
+        for name in ["camera", "moon", "coins", "text", "clock", "page"]:
+            img = util.img_as_float(cp.asarray(getattr(data, name)()))
+            prob, bin_centers = histogram(
+                img.ravel(), nbins=64, source_range="image", normalize=True
+            )
+            result_brute = _get_multiotsu_thresh_indices_brute(
+                prob, classes - 1
+            )
+            result_dp = _get_multiotsu_thresh_indices_dp(prob, classes - 1)
+            np.testing.assert_allclose(
+                sum_of_variances(prob, result_brute),
+                sum_of_variances(prob, result_dp),
+                rtol=1e-10,
+            )
+
+
+def test_multiotsu_uint16():
+    image = cp.zeros((100, 100), dtype=cp.uint16)
+    image[:, 30:] = 20000
+    image[:, 60:] = 40000
+    image[:, 90:] = 65535
+    thresholds = threshold_multiotsu(image, classes=4)
+    assert_array_equal(thresholds, [0, 20000, 40000])
+
+
 def test_multiotsu_astro_image():
     img = util.img_as_ubyte(astronautd)
     with expected_warnings(["grayscale"]):
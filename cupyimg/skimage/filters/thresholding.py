@@ -5,13 +5,16 @@ import math
 
 import cupy as cp
 import numpy as np
+from cupyimg import memoize
 from cupyimg.scipy import ndimage as ndi
 from cupyimg import numpy as cnp
 
 from ..exposure import histogram
+from ..exposure.exposure import _histogram_batch
 from .._shared.utils import check_nD, warn
 from ..transform import integral_image
 from ..util import crop, dtype_limits
+from ._multiotsu import _get_multiotsu_thresh_indices
 
 
 __all__ = [
@@ -28,6 +31,7 @@ __all__ = [
     "threshold_triangle",
     "apply_hysteresis_threshold",
     "threshold_multiotsu",
+    "threshold_batch",
 ]
 
 
@@ -198,11 +202,13 @@ def threshold_local(
         The mode parameter determines how the array borders are handled, where
         cval is the value when mode is equal to 'constant'.
         Default is 'reflect'.
-    param : {int, function}, optional
-        Either specify sigma for 'gaussian' method or function object for
-        'generic' method. This functions takes the flat array of local
-        neighbourhood as a single argument and returns the calculated
-        threshold for the centre pixel.
+    param : {int, str, dict}, optional
+        Either specify sigma for 'gaussian' method or the CUDA function for
+        'generic' method. The function is either a string of CUDA code or a
+        dict describing a reduction, as accepted by
+        ``cupyimg.scipy.ndimage.generic_filter``, and calculates the
+        threshold for the centre pixel from the values of its neighbourhood.
+        Python callables are not supported.
     cval : float, optional
         Value to fill past edges of input if mode is 'constant'.
 
@@ -221,7 +227,8 @@ def threshold_local(
     >>> from skimage.data import camera
     >>> image = camera()[:50, :50]
     >>> binary_image1 = image > threshold_local(image, 15, 'mean')
-    >>> func = lambda arr: arr.mean()
+    >>> func = dict(reduce_expr="a + b", post_map_expr="a / count",
+    ...             identity=0)
     >>> binary_image2 = image > threshold_local(image, 15, 'generic',
     ...                                         param=func)
     """
@@ -233,7 +240,6 @@ def threshold_local(
     check_nD(image, 2)
     thresh_image = cp.zeros(image.shape, "double")
     if method == "generic":
-        raise NotImplementedError("TODO: implement generic_filter")
         ndi.generic_filter(
             image, param, block_size, output=thresh_image, mode=mode, cval=cval
         )
@@ -247,18 +253,8 @@ def threshold_local(
             image, sigma, output=thresh_image, mode=mode, cval=cval
         )
     elif method == "mean":
-        mask = 1.0 / block_size * cp.ones((block_size,))
-        # separation of filters to speedup convolution
-        ndi.convolve1d(
-            image, mask, axis=0, output=thresh_image, mode=mode, cval=cval
-        )
-        ndi.convolve1d(
-            thresh_image,
-            mask,
-            axis=1,
-            output=thresh_image,
-            mode=mode,
-            cval=cval,
+        ndi.uniform_filter(
+            image, block_size, output=thresh_image, mode=mode, cval=cval
         )
     elif method == "median":
         ndi.median_filter(
@@ -1192,10 +1188,12 @@ def threshold_multiotsu(image, classes=3, nbins=256):
 
     Notes
     -----
-    This implementation relies on a Cython function whose complexity
-    is :math:`O\left(\frac{Ch^{C-1}}{(C-1)!}\right)`, where :math:`h`
-    is the number of histogram bins and :math:`C` is the number of
-    classes desired.
+    The threshold search runs on the GPU. When there are few combinations
+    of thresholds, they are all evaluated in parallel. Otherwise (e.g. for
+    16-bit images with up to 65536 bins or for many classes), a dynamic
+    programming search of complexity :math:`O\left(Ch^2\right)` is used,
+    where :math:`h` is the number of histogram bins and :math:`C` is the
+    number of classes desired.
 
     The input image must be grayscale.
 
@@ -1221,17 +1219,6 @@ def threshold_multiotsu(image, classes=3, nbins=256):
     >>> regions_colorized = label2rgb(regions)
 
     """
-    try:
-        from skimage.filters._multiotsu import (
-            _get_multiotsu_thresh_indices,
-            _get_multiotsu_thresh_indices_lut,
-        )
-    except ImportError:
-        raise ImportError(
-            "could not the required (private) multi-otsu helper functions "
-            "from scikit-image"
-        )
-
     if len(image.shape) > 2 and image.shape[-1] in (3, 4):
         msg = (
             "threshold_multiotsu is expected to work correctly only for "
@@ -1254,22 +1241,316 @@ def threshold_multiotsu(image, classes=3, nbins=256):
     elif nvalues == classes:
         thresh_idx = np.where(prob > 0)[0][:-1]
     else:
-        # Need probabilities on the CPU to use the Cython code
-        # (prob is typically small, so CPU computations should be faster)
-        prob = cp.asnumpy(prob)  # synchronization!
-        prob = prob.astype("float32")
-
-        # Get threshold indices
-        try:
-            thresh_idx = _get_multiotsu_thresh_indices_lut(prob, classes - 1)
-        except MemoryError:
-            # Don't use LUT if the number of bins is too large (if the
-            # image is uint16 for example): in this case, the
-            # allocated memory is too large.
-            thresh_idx = _get_multiotsu_thresh_indices(prob, classes - 1)
-        # transfer indices back to the GPU if the input was on the GPU
-        thresh_idx = cp.asarray(thresh_idx)  # synchronization!
+        thresh_idx = _get_multiotsu_thresh_indices(prob, classes - 1)
 
     thresh = bin_centers[thresh_idx]
 
     return thresh
+
+
+@memoize(for_each_device=True)
+def _get_li_batch_kernel():
+    """Kernel for Li's iterative method on each row of a stack of histograms.
+
+    The means of the background and foreground are computed from the bin
+    centers and the tolerance is half the smallest distance between the
+    centers of two populated bins.
+    """
+    code = """
+    ptrdiff_t h0 = i * nbins;
+    ptrdiff_t c0 = i * stride;
+    int first = -1;
+    double vmin = 0, prev = 0, gap = INFINITY, n = 0, s = 0;
+    for (int k = 0; k < nbins; k++) {
+        double h = hist[h0 + k];
+        if (h > 0) {
+            double c = centers[c0 + k];
+            if (first < 0) {
+                first = k;
+                vmin = c;
+            } else {
+                gap = min(gap, c - prev);
+            }
+            prev = c;
+            n += h;
+            s += h * (c - vmin);
+        }
+    }
+    double tol = gap / 2;
+    double t_next = s / n;
+    double t_curr = -2 * tol;
+    for (int it = 0; it < max_iter && fabs(t_next - t_curr) > tol; it++) {
+        t_curr = t_next;
+        double nb = 0, sb = 0;
+        for (int k = first; k < nbins; k++) {
+            double c = centers[c0 + k] - vmin;
+            if (c > t_curr) {
+                break;
+            }
+            nb += hist[h0 + k];
+            sb += hist[h0 + k] * c;
+        }
+        double mean_back = sb / nb;
+        double mean_fore = (s - sb) / (n - nb);
+        t_next = (mean_back - mean_fore) / (log(mean_back) - log(mean_fore));
+    }
+    thresh = t_next + vmin;
+    """
+    return cp.ElementwiseKernel(
+        "raw float64 hist, raw C centers, int32 nbins, int32 stride, "
+        "int32 max_iter",
+        "float64 thresh",
+        code,
+        "cupyimg_skimage_threshold_li_batch",
+    )
+
+
+@memoize(for_each_device=True)
+def _get_minimum_batch_kernel():
+    """Kernel for the minimum method on each row of a stack of histograms.
+
+    The populated range of each histogram is smoothed in place (alternating
+    between the two halves of the corresponding row of ``buf``) with the
+    same arithmetic as ``uniform_filter1d(hist, 3)``, until it has fewer
+    than three local maxima.
+    """
+    code = """
+    ptrdiff_t h0 = i * nbins;
+    int first = -1, last = -1;
+    for (int k = 0; k < nbins; k++) {
+        if (hist[h0 + k] > 0) {
+            if (first < 0) {
+                first = k;
+            }
+            last = k;
+        }
+    }
+    ptrdiff_t a = 2 * h0, b = 2 * h0 + nbins;
+    for (int k = first; k <= last; k++) {
+        buf[a + k] = hist[h0 + k];
+    }
+    const double w = 1.0 / 3.0;
+    int count = 0, max0 = -1, max1 = -1, it;
+    for (it = 0; it < max_iter; it++) {
+        for (int k = first; k <= last; k++) {
+            double sum = 0;
+            sum += buf[a + (k > first ? k - 1 : first)] * w;
+            sum += buf[a + k] * w;
+            sum += buf[a + (k < last ? k + 1 : last)] * w;
+            buf[b + k] = sum;
+        }
+        ptrdiff_t tmp = a;
+        a = b;
+        b = tmp;
+        // local maxima, counting plateaus once
+        int direction = 1;
+        count = 0;
+        for (int k = first; k < last; k++) {
+            if (direction > 0) {
+                if (buf[a + k + 1] < buf[a + k]) {
+                    direction = -1;
+                    if (count == 0) {
+                        max0 = k;
+                    } else if (count == 1) {
+                        max1 = k;
+                    }
+                    count++;
+                }
+            } else if (buf[a + k + 1] > buf[a + k]) {
+                direction = 1;
+            }
+        }
+        if (count < 3) {
+            break;
+        }
+    }
+    ok = (count == 2) && (it < max_iter - 1);
+    level = -1;
+    if (ok) {
+        level = max0;
+        for (int k = max0 + 1; k <= max1; k++) {
+            if (buf[a + k] < buf[a + level]) {
+                level = k;
+            }
+        }
+    }
+    """
+    return cp.ElementwiseKernel(
+        "raw float64 hist, int32 nbins, int32 max_iter",
+        "raw float64 buf, int32 level, bool ok",
+        code,
+        "cupyimg_skimage_threshold_minimum_batch",
+    )
+
+
+def _take_rows(a, idx):
+    """``a[i, idx[i]]`` for each row ``i``, with ``a`` broadcast to the rows."""
+    a = cp.broadcast_to(a, (idx.size, a.shape[1]))
+    return a[cp.arange(idx.size), idx]
+
+
+def _otsu_batch(hist, bin_centers, candidates):
+    hist = hist.astype(float)
+    weight1 = cp.cumsum(hist, axis=1)
+    weight2 = cp.cumsum(hist[:, ::-1], axis=1)[:, ::-1]
+    mean1 = cp.cumsum(hist * bin_centers, axis=1) / weight1
+    mean2 = cp.cumsum((hist * bin_centers)[:, ::-1], axis=1)
+    mean2 = (mean2 / weight2[:, ::-1])[:, ::-1]
+    variance12 = (
+        weight1[:, :-1] * weight2[:, 1:] * (mean1[:, :-1] - mean2[:, 1:]) ** 2
+    )
+    return cp.argmax(cp.where(candidates, variance12, -1), axis=1)
+
+
+def _yen_batch(hist, bin_centers, candidates):
+    hist = hist.astype(cp.float32)
+    pmf = hist / hist.sum(axis=1, keepdims=True)
+    P1 = cp.cumsum(pmf, axis=1)
+    P1_sq = cp.cumsum(pmf * pmf, axis=1)
+    P2_sq = cp.cumsum(pmf[:, ::-1] ** 2, axis=1)[:, ::-1]
+    crit = cp.log(
+        ((P1_sq[:, :-1] * P2_sq[:, 1:]) ** -1)
+        * (P1[:, :-1] * (1.0 - P1[:, :-1])) ** 2
+    )
+    return cp.argmax(cp.where(candidates, crit, -cp.inf), axis=1)
+
+
+def _isodata_batch(hist, bin_centers, candidates):
+    hist = hist.astype(cp.float32)
+    csuml = cp.cumsum(hist, axis=1)
+    csumh = csuml[:, -1:] - csuml
+    csum_intensity = cp.cumsum(hist * bin_centers, axis=1)
+    lower = csum_intensity[:, :-1] / csuml[:, :-1]
+    higher = (csum_intensity[:, -1:] - csum_intensity[:, :-1]) / csumh[:, :-1]
+    all_mean = (lower + higher) / 2.0
+    bin_width = bin_centers[:, 1:2] - bin_centers[:, :1]
+    distances = all_mean - bin_centers[:, :-1]
+    valid = candidates & (distances >= 0) & (distances < bin_width)
+    return cp.argmax(valid, axis=1), valid.any(axis=1)
+
+
+def _triangle_batch(hist, first, last):
+    nbins = hist.shape[1]
+    rows = cp.arange(hist.shape[0])
+    arg_peak_height = cp.argmax(hist, axis=1)
+    peak_height = hist[rows, arg_peak_height].astype(float)
+    # Flip is True if left tail is shorter.
+    flip = arg_peak_height - first < last - arg_peak_height
+    width = cp.where(flip, last - arg_peak_height, arg_peak_height - first)
+    # Distance x from the low level (the high level when flipped).
+    x = cp.arange(nbins)
+    level = cp.where(
+        flip[:, np.newaxis], last[:, np.newaxis] - x, first[:, np.newaxis] + x
+    )
+    y = hist[rows[:, np.newaxis], cp.clip(level, 0, nbins - 1)]
+    inside = x < width[:, np.newaxis]
+    # Normalize.
+    norm = cp.sqrt(peak_height ** 2 + width ** 2)
+    peak_height /= norm
+    width = width / norm
+    # Maximize the length.
+    length = peak_height[:, np.newaxis] * x - width[:, np.newaxis] * y
+    length = cp.where(inside, length, -cp.inf)
+    return _take_rows(level, cp.argmax(length, axis=1))
+
+
+def threshold_batch(image, method="otsu", *, nbins=256, max_iter=10000):
+    """Return the threshold of each image of a stack.
+
+    The histograms of all images are computed at once and the threshold of
+    each image is found independently, without synchronizing the device for
+    each image.
+
+    Parameters
+    ----------
+    image : (N, ...) ndarray
+        Stack of ``N`` grayscale images.
+    method : {'otsu', 'yen', 'isodata', 'li', 'minimum', 'triangle'}
+        Thresholding method, as in the corresponding ``threshold_*``
+        function.
+    nbins : int, optional
+        Number of bins used to calculate the histograms. This value is
+        ignored for integer arrays.
+    max_iter : int, optional
+        Maximum number of iterations of the 'li' and 'minimum' methods.
+
+    Returns
+    -------
+    thresholds : (N,) ndarray
+        Threshold of each image, or NaN if the method failed for that image
+        (the 'minimum' method could not find two maxima in the histogram or
+        the 'isodata' method found no threshold).
+
+    Notes
+    -----
+    Each threshold is the one found by the corresponding ``threshold_*``
+    function on ``image[i]``, with the following differences:
+
+    - Images containing a single value have this value as threshold
+      instead of raising an error.
+    - The 'li' method is computed from the histogram, so that the result
+      is the same as ``threshold_li`` for integer images but only
+      approximates it within the bin width for floating point images.
+    - The 'isodata' method only returns the lowest threshold.
+
+    For integer images, the histograms of all images span the range of the
+    whole stack, so a stack of images with very different ranges requires
+    more memory.
+
+    Examples
+    --------
+    >>> import cupy as cp
+    >>> from skimage import data
+    >>> image = cp.asarray(data.camera())
+    >>> tiles = image.reshape(4, 128, 4, 128).transpose(0, 2, 1, 3)
+    >>> tiles = tiles.reshape(16, 128, 128)
+    >>> thresh = threshold_batch(tiles, method="otsu")
+    >>> binary = tiles > thresh[:, cp.newaxis, cp.newaxis]
+    """
+    if method not in ("otsu", "yen", "isodata", "li", "minimum", "triangle"):
+        raise ValueError("unknown method: {}".format(method))
+    if image.ndim < 2:
+        raise ValueError("expected a stack of images")
+
+    hist, bin_centers, image_min, image_max = _histogram_batch(image, nbins)
+    n, nbins = hist.shape
+
+    # The lowest and highest populated bins of each histogram. Thresholds
+    # are searched from the lowest bin up to the bin before the highest.
+    populated = hist > 0
+    first = cp.argmax(populated, axis=1)
+    last = nbins - 1 - cp.argmax(populated[:, ::-1], axis=1)
+    k = cp.arange(nbins - 1)
+    candidates = (k >= first[:, np.newaxis]) & (k < last[:, np.newaxis])
+
+    found = None
+    if method == "li":
+        thresh = cp.empty(n, dtype=cp.float64)
+        stride = 0 if bin_centers.shape[0] == 1 else nbins
+        hist = hist.astype(cp.float64)
+        kern = _get_li_batch_kernel()
+        kern(hist, bin_centers, nbins, stride, max_iter, thresh)
+        thresh = thresh.astype(bin_centers.dtype, copy=False)
+    else:
+        if method == "otsu":
+            idx = _otsu_batch(hist, bin_centers, candidates)
+        elif method == "yen":
+            idx = _yen_batch(hist, bin_centers, candidates)
+        elif method == "isodata":
+            idx, found = _isodata_batch(hist, bin_centers, candidates)
+        elif method == "triangle":
+            idx = _triangle_batch(hist, first, last)
+        elif method == "minimum":
+            buf = cp.empty((n, 2 * nbins), dtype=cp.float64)
+            idx = cp.empty(n, dtype=cp.int32)
+            found = cp.empty(n, dtype=cp.bool_)
+            hist = hist.astype(cp.float64)
+            kern = _get_minimum_batch_kernel()
+            kern(hist, nbins, max_iter, buf, idx, found)
+            idx = cp.maximum(idx, 0)
+        thresh = _take_rows(bin_centers, idx)
+    if found is not None:
+        thresh = cp.where(found, thresh, cp.nan)
+    # images with a single value
+    single = image_min == image_max
+    return cp.where(single, image_min.astype(thresh.dtype), thresh)
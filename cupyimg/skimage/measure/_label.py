@@ -3,7 +3,7 @@ import warnings
 import cupy as cp
 import scipy.ndimage as cpu_ndi
 
-from cupyimg.scipy.ndimage.measurements import _label
+from cupyimg.scipy.ndimage.measurements import _get_label_dtype, _label
 
 
 def _get_structure(ndim, neighbors, connectivity):
@@ -37,8 +37,6 @@ def _get_structure(ndim, neighbors, connectivity):
     return cpu_ndi.generate_binary_structure(ndim, connectivity)
 
 
-# TODO: grlee77
-#       currently uses int32 for the labels. should add int64 option as well
 def label(
     input, neighbors=None, background=None, return_num=False, connectivity=None
 ):
@@ -103,9 +101,9 @@ def label(
 
     Notes
     -----
-    Currently the cupyimg implementation of this function always uses 32-bit
-    integers for the label array. This is done for performance. In the future
-    64-bit integer support may also be added for better skimage compatibility.
+    The cupyimg implementation of this function uses 32-bit integers for the
+    label array unless ``input`` has more than ``2**31 - 1`` elements, in
+    which case 64-bit integers are used. This is done for performance.
 
     Examples
     --------
@@ -148,7 +146,9 @@ def label(
         # same here for non-integer dtypes.
         input = input.astype(cp.intp)
 
-    labels = cp.empty(input.shape, order="C", dtype=cp.int32)
+    labels = cp.empty(
+        input.shape, order="C", dtype=_get_label_dtype(input.size)
+    )
     num = _label(input, structure, labels, greyscale_mode=True)
 
     if return_num:
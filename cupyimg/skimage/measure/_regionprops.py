@@ -4,11 +4,14 @@ from warnings import warn
 
 import cupy as cp
 import numpy as np
-from scipy.ndimage import find_objects as cpu_find_objects
 from ._label import label
 
 from cupyimg.scipy import ndimage as ndi
 from . import _moments
+from ._regionprops_batched import (
+    _batched_props_supported,
+    _regionprops_batched,
+)
 
 
 __all__ = ["regionprops", "perimeter"]
@@ -548,6 +551,39 @@ def _props_to_dict(regions, properties=("label", "bbox"), separator="-"):
     return out
 
 
+def _batched_props_to_dict(values, properties, separator="-"):
+    """Column dictionary equivalent to `_props_to_dict` for batched values.
+
+    Parameters
+    ----------
+    values : dict
+        Dictionary mapping property names to arrays whose first axis
+        enumerates the regions, as returned by `_regionprops_batched`.
+    properties : tuple or list of str
+        Properties that will be included in the resulting dictionary.
+    separator : str, optional
+        Separator between the property name and the element indices of
+        non-scalar properties (see `_props_to_dict`).
+
+    Returns
+    -------
+    out_dict : dict
+        Dictionary mapping column names to an array of values, one value per
+        region.
+    """
+    out = {}
+    for prop in properties:
+        dtype = COL_DTYPES[prop]
+        val = values[prop]
+        if val.ndim == 1:
+            out[prop] = val.astype(dtype)
+        else:
+            for ind in np.ndindex(val.shape[1:]):
+                modified_prop = separator.join(map(str, (prop,) + ind))
+                out[modified_prop] = val[(slice(None),) + ind].astype(dtype)
+    return out
+
+
 def regionprops_table(
     label_image,
     intensity_image=None,
@@ -618,6 +654,16 @@ def regionprops_table(
     size), an object array will be used, with the corresponding property name
     as the key.
 
+    When all requested properties are among ``label``, ``area``, ``bbox``,
+    ``bbox_area``, ``centroid``, ``local_centroid``, ``equivalent_diameter``,
+    ``extent``, ``moments``, ``moments_central``, ``moments_normalized``,
+    ``inertia_tensor``, ``min_intensity``, ``mean_intensity`` and
+    ``max_intensity`` (plus, for 2D images, ``inertia_tensor_eigvals``,
+    ``major_axis_length``, ``minor_axis_length``, ``eccentricity`` and
+    ``orientation``), they are computed for all regions at once with a fixed
+    number of kernel launches, without creating any `RegionProperties`
+    objects. In this case, `cache` has no effect.
+
     Examples
     --------
     >>> from skimage import data, util, measure
@@ -648,6 +694,13 @@ def regionprops_table(
     [5 rows x 7 columns]
 
     """
+    if _batched_props_supported(properties, label_image.ndim):
+        _check_label_image(label_image)
+        values = _regionprops_batched(
+            label_image, intensity_image, properties
+        )
+        return _batched_props_to_dict(values, properties, separator)
+
     regions = regionprops(
         label_image, intensity_image=intensity_image, cache=cache
     )
@@ -671,6 +724,23 @@ def regionprops_table(
     return _props_to_dict(regions, properties=properties, separator=separator)
 
 
+def _check_label_image(label_image):
+    if label_image.ndim not in (2, 3):
+        raise TypeError("Only 2-D and 3-D images supported.")
+
+    if not cp.issubdtype(label_image.dtype, cp.integer):
+        if cp.issubdtype(label_image.dtype, cp.bool):
+            raise TypeError(
+                "Non-integer image types are ambiguous: "
+                "use skimage.measure.label to label the connected"
+                "components of label_image,"
+                "or label_image.astype(np.uint8) to interpret"
+                "the True values as a single label."
+            )
+        else:
+            raise TypeError("Non-integer label_image types are ambiguous")
+
+
 def regionprops(
     label_image, intensity_image=None, cache=True, coordinates=None
 ):
@@ -880,21 +950,7 @@ def regionprops(
     (22.72987986048314, 81.91228523446583)
 
     """
-
-    if label_image.ndim not in (2, 3):
-        raise TypeError("Only 2-D and 3-D images supported.")
-
-    if not cp.issubdtype(label_image.dtype, cp.integer):
-        if cp.issubdtype(label_image.dtype, cp.bool):
-            raise TypeError(
-                "Non-integer image types are ambiguous: "
-                "use skimage.measure.label to label the connected"
-                "components of label_image,"
-                "or label_image.astype(np.uint8) to interpret"
-                "the True values as a single label."
-            )
-        else:
-            raise TypeError("Non-integer label_image types are ambiguous")
+    _check_label_image(label_image)
 
     if coordinates is not None:
         if coordinates == "rc":
@@ -918,9 +974,7 @@ def regionprops(
 
     regions = []
 
-    # warn("host/device transfer required: ndimage.find_objects not implemented "
-    #     " on the GPU.")
-    objects = cpu_find_objects(cp.asnumpy(label_image))
+    objects = ndi.find_objects(label_image)
     for i, sl in enumerate(objects):
         if sl is None:
             continue
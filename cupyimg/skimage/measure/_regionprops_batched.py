@@ -0,0 +1,488 @@
+"""Batched computation of region properties for all labels at once.
+
+Rather than building a `RegionProperties` object per label (each launching
+its own kernels on a slice of the label image), the properties supported
+here are derived from a fixed number of segmented reductions over the whole
+label image. Every pixel accumulates its contribution to the statistics of
+its label via atomics. When all 32 lanes of a warp belong to the same label
+(the common case inside large regions), the contributions are first reduced
+within the warp so that a single atomic per warp is issued.
+"""
+import itertools
+import math
+
+import cupy as cp
+import numpy as np
+
+from cupyimg import memoize
+from cupyimg.scipy.ndimage import _util
+
+
+# properties that can be computed in batch for any dimension
+_BATCHED_PROPS = {
+    "label",
+    "area",
+    "bbox",
+    "bbox_area",
+    "centroid",
+    "local_centroid",
+    "equivalent_diameter",
+    "extent",
+    "moments",
+    "moments_central",
+    "moments_normalized",
+    "inertia_tensor",
+    "max_intensity",
+    "mean_intensity",
+    "min_intensity",
+}
+
+# properties relying on the eigenvalues of the inertia tensor (2D only)
+_BATCHED_PROPS_2D = {
+    "inertia_tensor_eigvals",
+    "major_axis_length",
+    "minor_axis_length",
+    "eccentricity",
+    "orientation",
+}
+
+_INTENSITY_PROPS = {"max_intensity", "mean_intensity", "min_intensity"}
+
+# order of the central moments needed by each property
+_MOMENT_ORDER = {
+    "moments": 3,
+    "moments_central": 3,
+    "moments_normalized": 3,
+    "inertia_tensor": 2,
+    "inertia_tensor_eigvals": 2,
+    "major_axis_length": 2,
+    "minor_axis_length": 2,
+    "eccentricity": 2,
+    "orientation": 2,
+}
+
+
+def _batched_props_supported(properties, ndim):
+    """Whether all `properties` can be computed by `_regionprops_batched`."""
+    supported = _BATCHED_PROPS
+    if ndim == 2:
+        supported = supported | _BATCHED_PROPS_2D
+    return all(prop in supported for prop in properties)
+
+
+_preamble = """
+#define FULL_MASK 0xffffffffu
+
+__device__ double warp_sum(double v) {
+    for (int o = 16; o > 0; o >>= 1) v += __shfl_down_sync(FULL_MASK, v, o);
+    return v;
+}
+
+__device__ int warp_min(int v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = min(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+__device__ int warp_max(int v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = max(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+__device__ double warp_min(double v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = fmin(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+__device__ double warp_max(double v) {
+    for (int o = 16; o > 0; o >>= 1)
+        v = fmax(v, __shfl_down_sync(FULL_MASK, v, o));
+    return v;
+}
+
+__device__ void atomic_min_double(double* address, double val) {
+    unsigned long long* addr = (unsigned long long*)address;
+    unsigned long long old = *addr, assumed;
+    while (val < __longlong_as_double(old)) {
+        assumed = old;
+        old = atomicCAS(addr, assumed, __double_as_longlong(val));
+        if (old == assumed) break;
+    }
+}
+
+__device__ void atomic_max_double(double* address, double val) {
+    unsigned long long* addr = (unsigned long long*)address;
+    unsigned long long old = *addr, assumed;
+    while (val > __longlong_as_double(old)) {
+        assumed = old;
+        old = atomicCAS(addr, assumed, __double_as_longlong(val));
+        if (old == assumed) break;
+    }
+}
+"""
+
+
+def _unravel_and_label(ndim, int_type):
+    """Code computing the coordinates and label of pixel `i`.
+
+    Sets ``uniform`` when all lanes of the warp are active and share the
+    same label, in which case warp-level reductions can be used.
+    """
+    code = ["{int_t} _i = i;".format(int_t=int_type)]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "const int ind_{j} = _i % labels.shape()[{j}];"
+            " _i /= labels.shape()[{j}];".format(j=j)
+        )
+    code.append("const int ind_0 = _i;")
+    code.append(
+        """
+        const long long lab = (long long)labels[i];
+        const unsigned int active = __activemask();
+        const long long lab0 = __shfl_sync(active, lab, __ffs(active) - 1);
+        const bool uniform = (active == FULL_MASK
+                              && __all_sync(FULL_MASK, lab == lab0));
+        const bool lane0 = (threadIdx.x & 31) == 0;
+        if (lab0 <= 0 && uniform) continue;
+        if (lab <= 0 && !uniform) continue;
+        const long long j = lab;"""
+    )
+    return code
+
+
+@memoize(for_each_device=True)
+def _get_region_stats_kernel(ndim, int_type, has_intensity):
+    """Kernel accumulating area, coordinate sums, bbox and intensity stats.
+
+    Per label ``j`` it accumulates
+
+    - ``area[j]``: the number of pixels
+    - ``csum[j * ndim + d]``: the sum of the coordinates along axis ``d``
+    - ``bbox[j * 2 * ndim + d]``: the minimum coordinate along axis ``d``
+    - ``bbox[j * 2 * ndim + ndim + d]``: the maximum coordinate along ``d``
+    - ``istats[3 * j + (0, 1, 2)]``: the intensity sum, minimum and maximum
+    """
+    code = _unravel_and_label(ndim, int_type)
+    if has_intensity:
+        code.append("const double v = (double)intensity[i];")
+    # warp-aggregated path
+    code.append("if (uniform) {")
+    code.append("    const double wcount = warp_sum(1.0);")
+    for d in range(ndim):
+        code.append(
+            "    const double wc{d} = warp_sum((double)ind_{d});".format(d=d)
+        )
+        code.append("    const int wmin{d} = warp_min(ind_{d});".format(d=d))
+        code.append("    const int wmax{d} = warp_max(ind_{d});".format(d=d))
+    if has_intensity:
+        code.append("    const double wsum = warp_sum(v);")
+        code.append("    const double wvmin = warp_min(v);")
+        code.append("    const double wvmax = warp_max(v);")
+    code.append("    if (lane0) {")
+    code.append(
+        "        atomicAdd(&area[j], (unsigned long long)wcount);"
+    )
+    for d in range(ndim):
+        code.append(
+            """
+        atomicAdd(&csum[j * {ndim} + {d}], wc{d});
+        atomicMin(&bbox[j * {nbox} + {d}], wmin{d});
+        atomicMax(&bbox[j * {nbox} + {ndim} + {d}], wmax{d});""".format(
+                ndim=ndim, nbox=2 * ndim, d=d
+            )
+        )
+    if has_intensity:
+        code.append(
+            """
+        atomicAdd(&istats[3 * j], wsum);
+        atomic_min_double(&istats[3 * j + 1], wvmin);
+        atomic_max_double(&istats[3 * j + 2], wvmax);"""
+        )
+    code.append("    }")
+    # per-pixel path
+    code.append("} else {")
+    code.append("    atomicAdd(&area[j], (unsigned long long)1);")
+    for d in range(ndim):
+        code.append(
+            """
+    atomicAdd(&csum[j * {ndim} + {d}], (double)ind_{d});
+    atomicMin(&bbox[j * {nbox} + {d}], ind_{d});
+    atomicMax(&bbox[j * {nbox} + {ndim} + {d}], ind_{d});""".format(
+                ndim=ndim, nbox=2 * ndim, d=d
+            )
+        )
+    if has_intensity:
+        code.append(
+            """
+    atomicAdd(&istats[3 * j], v);
+    atomic_min_double(&istats[3 * j + 1], v);
+    atomic_max_double(&istats[3 * j + 2], v);"""
+        )
+    code.append("}")
+
+    in_params = "raw L labels"
+    out_params = "raw uint64 area, raw float64 csum, raw int32 bbox"
+    if has_intensity:
+        in_params += ", raw T intensity"
+        out_params += ", raw float64 istats"
+    name = "cupyimg_skimage_regionprops_stats_{}d".format(ndim)
+    if has_intensity:
+        name += "_intensity"
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cp.ElementwiseKernel(
+        in_params, out_params, "\n".join(code), name, preamble=_preamble
+    )
+
+
+@memoize(for_each_device=True)
+def _get_central_moments_kernel(ndim, order, int_type):
+    """Kernel accumulating the central moments of all labels.
+
+    ``mu[j * (order + 1)**ndim + k]`` receives the central moment of label
+    ``j`` whose powers are the ``k``-th entry of
+    ``itertools.product(range(order + 1), repeat=ndim)`` (i.e. the moments
+    array of label ``j`` in C order).
+    """
+    code = _unravel_and_label(ndim, int_type)
+    for d in range(ndim):
+        code.append(
+            "const double d{d}_1 = ind_{d} - centroid[j * {ndim} + {d}];"
+            "".format(d=d, ndim=ndim)
+        )
+        for p in range(2, order + 1):
+            code.append(
+                "const double d{d}_{p} = d{d}_{q} * d{d}_1;".format(
+                    d=d, p=p, q=p - 1
+                )
+            )
+    n_moments = (order + 1) ** ndim
+    for k, powers in enumerate(
+        itertools.product(range(order + 1), repeat=ndim)
+    ):
+        factors = [
+            "d{d}_{p}".format(d=d, p=p) for d, p in enumerate(powers) if p
+        ]
+        term = " * ".join(factors) if factors else "1.0"
+        code.append(
+            """
+        {{
+            double t = {term};
+            if (uniform) t = warp_sum(t);
+            if (!uniform || lane0) atomicAdd(&mu[j * {n} + {k}], t);
+        }}""".format(
+                term=term, n=n_moments, k=k
+            )
+        )
+    name = "cupyimg_skimage_regionprops_moments_{}d_order{}".format(
+        ndim, order
+    )
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cp.ElementwiseKernel(
+        "raw L labels, raw float64 centroid",
+        "raw float64 mu",
+        "\n".join(code),
+        name,
+        preamble=_preamble,
+    )
+
+
+def _comb(n, k):
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+def _raw_moments_from_central(mu, offsets, order):
+    """Raw moments about `offsets` from central moments.
+
+    Uses the binomial expansion of ``(x - o)**p = ((x - c) + (c - o))**p``
+    where ``c`` is the centroid. `mu` has shape ``(n,) + (order + 1,) * ndim``
+    and `offsets` holds ``c - o`` with shape ``(n, ndim)``.
+    """
+    ndim = offsets.shape[1]
+    M = cp.zeros_like(mu)
+    for powers in itertools.product(range(order + 1), repeat=ndim):
+        total = 0
+        for sub in itertools.product(*[range(p + 1) for p in powers]):
+            coef = 1.0
+            for d, (p, s) in enumerate(zip(powers, sub)):
+                if p > s:
+                    coef = coef * _comb(p, s) * offsets[:, d] ** (p - s)
+            total = total + coef * mu[(slice(None),) + sub]
+        M[(slice(None),) + powers] = total
+    return M
+
+
+def _inertia_tensor(mu, ndim):
+    """Batched equivalent of `_moments.inertia_tensor`."""
+    n = mu.shape[0]
+    mu0 = mu[(slice(None),) + (0,) * ndim]
+    corners2 = [
+        mu[(slice(None),) + tuple(2 * np.eye(ndim, dtype=int)[d])]
+        for d in range(ndim)
+    ]
+    total = sum(corners2)
+    result = cp.empty((n, ndim, ndim), dtype=cp.float64)
+    for d in range(ndim):
+        result[:, d, d] = (total - corners2[d]) / mu0
+    for d0, d1 in itertools.combinations(range(ndim), 2):
+        mu_index = np.zeros(ndim, dtype=int)
+        mu_index[[d0, d1]] = 1
+        val = -mu[(slice(None),) + tuple(mu_index)] / mu0
+        result[:, d0, d1] = val
+        result[:, d1, d0] = val
+    return result
+
+
+def _inertia_tensor_eigvals_2d(T):
+    """Eigenvalues of the 2x2 symmetric tensors `T` in descending order."""
+    a = T[:, 0, 0]
+    b = T[:, 0, 1]
+    c = T[:, 1, 1]
+    mean = (a + c) / 2
+    radius = cp.sqrt(((a - c) / 2) ** 2 + b * b)
+    eigvals = cp.stack((mean + radius, mean - radius), axis=1)
+    # clip tiny negative values due to floating point errors (as in
+    # `_moments.inertia_tensor_eigvals`)
+    return cp.clip(eigvals, 0, None, out=eigvals)
+
+
+def _regionprops_batched(label_image, intensity_image, properties):
+    """Compute `properties` for all labels.
+
+    Returns a dictionary mapping each property name to an array whose first
+    axis enumerates the labels present in `label_image` in increasing order
+    (the order used by `regionprops`).
+    """
+    ndim = label_image.ndim
+    properties = tuple(properties)
+    if intensity_image is None:
+        if any(prop in _INTENSITY_PROPS for prop in properties):
+            raise AttributeError("No intensity image specified.")
+    elif intensity_image.shape != label_image.shape:
+        raise ValueError("Label and intensity image must have the same shape.")
+    has_intensity = intensity_image is not None and any(
+        prop in _INTENSITY_PROPS for prop in properties
+    )
+    order = max([_MOMENT_ORDER.get(prop, -1) for prop in properties] + [-1])
+
+    labels = cp.ascontiguousarray(label_image)
+    max_label = int(labels.max()) if labels.size else 0  # synchronize!
+    max_label = max(max_label, 0)
+    n_slots = max_label + 1
+    int_type = _util._get_inttype(labels)
+
+    area = cp.zeros(n_slots, dtype=cp.uint64)
+    csum = cp.zeros((n_slots, ndim), dtype=cp.float64)
+    bbox = cp.empty((n_slots, 2 * ndim), dtype=cp.int32)
+    bbox[:, :ndim] = np.iinfo(np.int32).max
+    bbox[:, ndim:] = -1
+    args = [labels]
+    outputs = [area, csum, bbox]
+    if has_intensity:
+        intensity = cp.ascontiguousarray(intensity_image)
+        istats = cp.zeros((n_slots, 3), dtype=cp.float64)
+        istats[:, 1] = np.inf
+        istats[:, 2] = -np.inf
+        args.append(intensity)
+        outputs.append(istats)
+    if max_label > 0:
+        kern = _get_region_stats_kernel(ndim, int_type, has_intensity)
+        kern(*args, *outputs, size=labels.size)
+
+    # labels present in the image (as in find_objects, absent ones are
+    # skipped)
+    present = cp.nonzero(area[1:])[0] + 1
+    area = area[present].astype(cp.float64)
+    centroid = csum[present] / area[:, cp.newaxis]
+    bbox = bbox[present]
+    bbox[:, ndim:] += 1  # half-open interval as for slices
+    bbox_area = cp.prod(bbox[:, ndim:] - bbox[:, :ndim], axis=1)
+    local_centroid = centroid - bbox[:, :ndim]
+
+    if order >= 0:
+        n_moments = (order + 1) ** ndim
+        centroid_all = cp.zeros((n_slots, ndim), dtype=cp.float64)
+        centroid_all[present] = centroid
+        mu = cp.zeros((n_slots, n_moments), dtype=cp.float64)
+        if max_label > 0:
+            kern = _get_central_moments_kernel(ndim, order, int_type)
+            kern(labels, centroid_all, mu, size=labels.size)
+        mu = mu[present].reshape((-1,) + (order + 1,) * ndim)
+
+    values = {}
+
+    def _get(prop):
+        if prop in values:
+            return values[prop]
+        if prop == "label":
+            val = present
+        elif prop == "area":
+            val = area
+        elif prop == "bbox":
+            val = bbox
+        elif prop == "bbox_area":
+            val = bbox_area
+        elif prop == "centroid":
+            val = centroid
+        elif prop == "local_centroid":
+            val = local_centroid
+        elif prop == "equivalent_diameter":
+            if ndim == 2:
+                val = cp.sqrt(4 * area / math.pi)
+            else:
+                val = cp.cbrt(6 * area / math.pi)
+        elif prop == "extent":
+            val = area / bbox_area
+        elif prop == "moments_central":
+            val = mu
+        elif prop == "moments":
+            val = _raw_moments_from_central(mu, local_centroid, order)
+        elif prop == "moments_normalized":
+            val = cp.empty_like(mu)
+            mu0 = mu[(slice(None),) + (0,) * ndim]
+            for powers in itertools.product(range(order + 1), repeat=ndim):
+                idx = (slice(None),) + powers
+                if sum(powers) < 2:
+                    val[idx] = cp.nan
+                else:
+                    val[idx] = mu[idx] / mu0 ** (sum(powers) / ndim + 1)
+        elif prop == "inertia_tensor":
+            val = _inertia_tensor(mu, ndim)
+        elif prop == "inertia_tensor_eigvals":
+            val = _inertia_tensor_eigvals_2d(_get("inertia_tensor"))
+        elif prop == "major_axis_length":
+            val = 4 * cp.sqrt(_get("inertia_tensor_eigvals")[:, 0])
+        elif prop == "minor_axis_length":
+            val = 4 * cp.sqrt(_get("inertia_tensor_eigvals")[:, -1])
+        elif prop == "eccentricity":
+            ev = _get("inertia_tensor_eigvals")
+            l1 = ev[:, 0]
+            l2 = ev[:, 1]
+            nonzero = l1 != 0
+            ratio = l2 / cp.where(nonzero, l1, 1)
+            val = cp.where(nonzero, cp.sqrt(1 - ratio), 0)
+        elif prop == "orientation":
+            T = _get("inertia_tensor")
+            a = T[:, 0, 0]
+            b = T[:, 0, 1]
+            c = T[:, 1, 1]
+            val = cp.where(
+                a - c == 0,
+                cp.where(b < 0, -math.pi / 4.0, math.pi / 4.0),
+                0.5 * cp.arctan2(-2 * b, c - a),
+            )
+        elif prop == "mean_intensity":
+            val = istats[present, 0] / area
+        elif prop == "min_intensity":
+            val = istats[present, 1]
+        elif prop == "max_intensity":
+            val = istats[present, 2]
+        else:
+            raise ValueError("unsupported property: {}".format(prop))
+        values[prop] = val
+        return val
+
+    return {prop: _get(prop) for prop in properties}
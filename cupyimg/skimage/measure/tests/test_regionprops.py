@@ -587,6 +587,56 @@ def test_regionprops_table():
     assert len(out["bbox+3"]) == 0
 
 
+BATCHED_PROPS = (
+    "label",
+    "area",
+    "bbox",
+    "bbox_area",
+    "centroid",
+    "local_centroid",
+    "equivalent_diameter",
+    "extent",
+    "moments",
+    "moments_central",
+    "moments_normalized",
+    "inertia_tensor",
+    "mean_intensity",
+    "min_intensity",
+    "max_intensity",
+)
+
+
+@pytest.mark.parametrize("ndim", [2, 3])
+def test_regionprops_table_batched(ndim):
+    rstate = cp.random.RandomState(0)
+    shape = (48, 40) if ndim == 2 else (16, 14, 12)
+    labels = cp.asarray(rstate.randint(0, 20, shape))
+    labels[labels > 12] = 0
+    labels[labels == 5] = 0  # a missing label
+    intensity = rstate.standard_normal(shape)
+    properties = BATCHED_PROPS
+    if ndim == 2:
+        properties += (
+            "inertia_tensor_eigvals",
+            "major_axis_length",
+            "minor_axis_length",
+            "eccentricity",
+            "orientation",
+        )
+    out = regionprops_table(labels, intensity, properties=properties)
+    regions = regionprops(labels, intensity_image=intensity)
+    expected = _props_to_dict(regions, properties=properties)
+    assert out.keys() == expected.keys()
+    for key in expected:
+        assert out[key].dtype == expected[key].dtype
+        assert_array_almost_equal(out[key], expected[key])
+
+
+def test_regionprops_table_batched_no_intensity():
+    with pytest.raises(AttributeError):
+        regionprops_table(SAMPLE, properties=("label", "mean_intensity"))
+
+
 def test_props_dict_complete():
     region = regionprops(SAMPLE)[0]
     properties = [s for s in dir(region) if not s.startswith("_")]
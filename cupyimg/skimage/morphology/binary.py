@@ -4,6 +4,40 @@ Binary morphological operations
 import cupy as cp
 from cupyimg.scipy import ndimage as ndi
 from .misc import default_selem
+from .selem import _selem_is_sequence
+
+
+def _iterate_binary_func(binary_func, image, selems, out, **kwargs):
+    """Apply `binary_func` for each element of a decomposed selem.
+
+    `binary_func` is a binary morphology function accepting `structure`,
+    `output` and `iterations` keyword arguments (e.g.
+    ``ndi.binary_erosion``). Each ``(selem, num_iter)`` pair in `selems` is
+    applied via ``iterations=num_iter``.
+    """
+    # iterations=0 means "until convergence" in ndimage, so skip those
+    selems = [(s, num_iter) for s, num_iter in selems if num_iter > 0]
+    if not selems:
+        out[...] = image
+        return out
+    selem, num_iter = selems[0]
+    binary_func(
+        image,
+        structure=cp.asarray(selem),
+        output=out,
+        iterations=num_iter,
+        **kwargs
+    )
+    for selem, num_iter in selems[1:]:
+        # Note: out.copy() because the computation cannot be in-place!
+        binary_func(
+            out.copy(),
+            structure=cp.asarray(selem),
+            output=out,
+            iterations=num_iter,
+            **kwargs
+        )
+    return out
 
 
 # The default_selem decorator provides a diamond structuring element as default
@@ -23,9 +57,10 @@ def binary_erosion(image, selem=None, out=None):
     ----------
     image : ndarray
         Binary input image.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use a cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray of bool, optional
         The array to store the result of the morphology. If None is
         passed, a new array will be allocated.
@@ -39,6 +74,10 @@ def binary_erosion(image, selem=None, out=None):
     """
     if out is None:
         out = cp.empty(image.shape, dtype=cp.bool)
+    if _selem_is_sequence(selem):
+        return _iterate_binary_func(
+            ndi.binary_erosion, image, selem, out, border_value=True
+        )
     ndi.binary_erosion(image, structure=selem, output=out, border_value=True)
     return out
 
@@ -59,9 +98,10 @@ def binary_dilation(image, selem=None, out=None):
 
     image : ndarray
         Binary input image.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use a cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray of bool, optional
         The array to store the result of the morphology. If None is
         passed, a new array will be allocated.
@@ -74,6 +114,8 @@ def binary_dilation(image, selem=None, out=None):
     """
     if out is None:
         out = cp.empty(image.shape, dtype=cp.bool)
+    if _selem_is_sequence(selem):
+        return _iterate_binary_func(ndi.binary_dilation, image, selem, out)
     ndi.binary_dilation(image, structure=selem, output=out)
     return out
 
@@ -94,9 +136,10 @@ def binary_opening(image, selem=None, out=None):
     ----------
     image : ndarray
         Binary input image.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use a cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray of bool, optional
         The array to store the result of the morphology. If None
         is passed, a new array will be allocated.
@@ -128,9 +171,10 @@ def binary_closing(image, selem=None, out=None):
     ----------
     image : ndarray
         Binary input image.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use a cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray of bool, optional
         The array to store the result of the morphology. If None,
         is passed, a new array will be allocated.
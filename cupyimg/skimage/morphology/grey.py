@@ -6,6 +6,7 @@ import cupy as cp
 from cupyimg.scipy import ndimage as ndi
 
 from .misc import default_selem
+from .selem import _selem_is_sequence, _shape_from_sequence
 from ..util import crop
 
 __all__ = [
@@ -88,6 +89,49 @@ def _invert_selem(selem):
     return inverted
 
 
+def _iterate_grey_func(grey_func, image, selems, out):
+    """Apply `grey_func` repeatedly for a decomposed structuring element.
+
+    Parameters
+    ----------
+    grey_func : callable
+        A greyscale morphology function accepting `footprint` and `output`
+        keyword arguments (e.g. ``ndi.grey_erosion``).
+    image : ndarray
+        Image array.
+    selems : sequence of tuple of (ndarray, int)
+        The decomposed structuring element. Each ``(selem, num_iter)``
+        pair is applied ``num_iter`` times in turn.
+    out : ndarray
+        The array to store the result in.
+
+    Returns
+    -------
+    out : ndarray
+        The result of the morphology.
+    """
+    n_total = sum(num_iter for _, num_iter in selems)
+    if n_total == 0:
+        out[...] = image
+        return out
+    if out is image:
+        image = image.copy()
+    # The computation cannot be done in-place, so intermediate results
+    # alternate between `out` and a temporary array, starting with the one
+    # for which the final iteration ends up in `out`.
+    buffers = [out, cp.empty_like(out) if n_total > 1 else None]
+    src = image
+    k = 0
+    for selem, num_iter in selems:
+        selem = cp.asarray(selem)
+        for _ in range(num_iter):
+            dst = buffers[(n_total - 1 - k) % 2]
+            grey_func(src, footprint=selem, output=dst)
+            src = dst
+            k += 1
+    return out
+
+
 def pad_for_eccentric_selems(func):
     """Pad input images for certain morphological operations.
 
@@ -115,7 +159,11 @@ def pad_for_eccentric_selems(func):
         padding = False
         if out is None:
             out = cp.empty_like(image)
-        for axis_len in selem.shape:
+        if _selem_is_sequence(selem):
+            selem_shape = _shape_from_sequence(selem)
+        else:
+            selem_shape = selem.shape
+        for axis_len in selem_shape:
             if axis_len % 2 == 0:
                 axis_pad_width = axis_len - 1
                 padding = True
@@ -149,9 +197,12 @@ def erosion(image, selem=None, out=None, shift_x=False, shift_y=False):
     ----------
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as an array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element (a sequence of
+        ``(selem, num_iter)`` tuples, see `decomposition` in
+        :func:`~cupyimg.skimage.morphology.disk`) is also accepted.
     out : ndarrays, optional
         The array to store the result of the morphology. If None is
         passed, a new array will be allocated.
@@ -188,10 +239,16 @@ def erosion(image, selem=None, out=None, shift_x=False, shift_y=False):
            [0, 0, 0, 0, 0]], dtype=uint8)
 
     """
-    selem = cp.asarray(selem)
-    selem = _shift_selem(selem, shift_x, shift_y)
     if out is None:
         out = cp.empty_like(image)
+    if _selem_is_sequence(selem):
+        selems = tuple(
+            (_shift_selem(cp.asarray(s), shift_x, shift_y), num_iter)
+            for s, num_iter in selem
+        )
+        return _iterate_grey_func(ndi.grey_erosion, image, selems, out)
+    selem = cp.asarray(selem)
+    selem = _shift_selem(selem, shift_x, shift_y)
     ndi.grey_erosion(image, footprint=selem, output=out)
     return out
 
@@ -209,9 +266,12 @@ def dilation(image, selem=None, out=None, shift_x=False, shift_y=False):
 
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element (a sequence of
+        ``(selem, num_iter)`` tuples, see `decomposition` in
+        :func:`~cupyimg.skimage.morphology.disk`) is also accepted.
     out : ndarray, optional
         The array to store the result of the morphology. If None, is
         passed, a new array will be allocated.
@@ -248,16 +308,27 @@ def dilation(image, selem=None, out=None, shift_x=False, shift_y=False):
            [0, 0, 0, 0, 0]], dtype=uint8)
 
     """
-    selem = cp.asarray(selem)
-    selem = _shift_selem(selem, shift_x, shift_y)
+    if out is None:
+        out = cp.empty_like(image)
     # Inside ndimage.grey_dilation, the structuring element is inverted,
     # eg. `selem = selem[::-1, ::-1]` for 2D [1]_, for reasons unknown to
     # this author (@jni). To "patch" this behaviour, we invert our own
     # selem before passing it to `ndi.grey_dilation`.
     # [1] https://github.com/scipy/scipy/blob/ec20ababa400e39ac3ffc9148c01ef86d5349332/scipy/ndimage/morphology.py#L1285
+    if _selem_is_sequence(selem):
+        selems = tuple(
+            (
+                _invert_selem(
+                    _shift_selem(cp.asarray(s), shift_x, shift_y)
+                ),
+                num_iter,
+            )
+            for s, num_iter in selem
+        )
+        return _iterate_grey_func(ndi.grey_dilation, image, selems, out)
+    selem = cp.asarray(selem)
+    selem = _shift_selem(selem, shift_x, shift_y)
     selem = _invert_selem(selem)
-    if out is None:
-        out = cp.empty_like(image)
     ndi.grey_dilation(image, footprint=selem, output=out)
     return out
 
@@ -276,9 +347,10 @@ def opening(image, selem=None, out=None):
     ----------
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as an array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray, optional
         The array to store the result of the morphology. If None
         is passed, a new array will be allocated.
@@ -326,9 +398,10 @@ def closing(image, selem=None, out=None):
     ----------
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as an array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray, optional
         The array to store the result of the morphology. If None,
         is passed, a new array will be allocated.
@@ -374,9 +447,10 @@ def white_tophat(image, selem=None, out=None):
     ----------
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as an array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray, optional
         The array to store the result of the morphology. If None
         is passed, a new array will be allocated.
@@ -412,6 +486,16 @@ def white_tophat(image, selem=None, out=None):
            [0, 0, 0, 0, 0]], dtype=uint8)
 
     """
+    if _selem_is_sequence(selem):
+        # no fused top-hat for decomposed structuring elements
+        if out is image:
+            image = image.copy()
+        out = opening(image, selem, out=out)
+        if cp.issubdtype(out.dtype, cp.bool_):
+            cp.logical_xor(image, out, out=out)
+        else:
+            cp.subtract(image, out, out=out)
+        return out
     selem = cp.asarray(selem)
     if out is image:
         opened = opening(image, selem)
@@ -449,9 +533,10 @@ def black_tophat(image, selem=None, out=None):
     ----------
     image : ndarray
         Image array.
-    selem : ndarray, optional
+    selem : ndarray or tuple, optional
         The neighborhood expressed as a 2-D array of 1's and 0's.
         If None, use cross-shaped structuring element (connectivity=1).
+        A decomposed structuring element is also accepted.
     out : ndarray, optional
         The array to store the result of the morphology. If None
         is passed, a new array will be allocated.
@@ -12,10 +12,136 @@ Original author: Lee Kamentsky
 import cupy as cp
 import numpy as np
 
+from cupyimg import memoize
+from cupyimg.scipy.ndimage import _util
 from ..filters._rank_order import rank_order
 
+# number of in-place propagation sweeps launched between host reads of the
+# convergence flag
+_SWEEPS_PER_CHECK = 16
 
-def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
+
+@memoize(for_each_device=True)
+def _get_reconstruction_kernel(nb_offsets, method, int_type):
+    """Kernel performing one in-place geodesic dilation/erosion sweep.
+
+    Each pixel pulls the extreme value over its neighborhood (as given by
+    ``nb_offsets``) and clips it by the mask. Updates are written in-place, so
+    a single sweep may propagate values over more than one pixel. As the
+    update is monotonic and bounded by the mask, concurrent reads of either
+    the old or the new neighbor values converge to the same fixed point as
+    the sequential algorithm.
+
+    Whenever a pixel is modified, the sweep number ``it`` is stored in
+    ``changed``. Comparing it to the number of the last sweep launched thus
+    tells whether the last sweep was a no-op (i.e. convergence) without
+    having to reset the flag between sweeps.
+    """
+    ndim = len(nb_offsets[0])
+    better = ">" if method == "dilation" else "<"
+
+    code = ["{int_t} _i = i;".format(int_t=int_type)]
+    for j in range(ndim - 1, 0, -1):
+        code.append(
+            "{int_t} ind_{j} = _i % rec.shape()[{j}]; _i /= rec.shape()[{j}];"
+            "".format(int_t=int_type, j=j)
+        )
+    code.append("{int_t} ind_0 = _i;".format(int_t=int_type))
+    code.append(
+        """
+        const T m = mask[i];
+        const T cur = rec[i];
+        if (cur == m) continue;  // already at the bound set by the mask
+        T v = cur;
+        {int_t} nb;""".format(
+            int_t=int_type
+        )
+    )
+    for offs in nb_offsets:
+        conds = []
+        idx = []
+        stride = []
+        for j in range(ndim - 1, -1, -1):
+            # pixel i pulls from i - offset (the host loop pushes to i + offset)
+            nj = "(ind_{j} - ({o}))".format(j=j, o=offs[j])
+            if offs[j] > 0:
+                conds.append("ind_{j} >= {o}".format(j=j, o=offs[j]))
+            elif offs[j] < 0:
+                conds.append(
+                    "ind_{j} < rec.shape()[{j}] + ({o})".format(j=j, o=offs[j])
+                )
+            term = nj
+            for s in stride:
+                term += " * " + s
+            idx.append(term)
+            stride.append("rec.shape()[{j}]".format(j=j))
+        cond = " && ".join(conds) if conds else "true"
+        code.append(
+            """
+        if ({cond}) {{
+            nb = {idx};
+            if (rec[nb] {better} v) v = rec[nb];
+        }}""".format(
+                cond=cond, idx=" + ".join(idx), better=better
+            )
+        )
+    code.append(
+        """
+        if (v {better} m) v = m;
+        if (v {better} cur) {{
+            rec[i] = v;
+            changed[0] = it;  // benign race: all writers store the same value
+        }}""".format(
+            better=better
+        )
+    )
+    name = "cupyimg_skimage_reconstruction_{}_{}d_{}nb".format(
+        method, ndim, len(nb_offsets)
+    )
+    if int_type == "ptrdiff_t":
+        name += "_i64"
+    return cp.ElementwiseKernel(
+        "raw T mask, int32 it",
+        "raw T rec, raw int32 changed",
+        "\n".join(code),
+        name,
+    )
+
+
+def _reconstruction_device(seed, mask, method, selem, offset):
+    """Iterate in-place geodesic sweeps on the device until convergence."""
+    images_dtype = np.promote_types(seed.dtype, mask.dtype)
+    rec = cp.array(seed, dtype=images_dtype, order="C", copy=True)
+    mask = cp.ascontiguousarray(mask, dtype=images_dtype)
+
+    selem_mgrid = np.mgrid[
+        [slice(-o, d - o) for d, o in zip(selem.shape, offset)]
+    ]
+    nb_offsets = tuple(
+        tuple(int(o) for o in offs)
+        for offs in selem_mgrid[:, selem].transpose()
+    )
+    if rec.size == 0 or len(nb_offsets) == 0:
+        return rec
+
+    kern = _get_reconstruction_kernel(
+        nb_offsets, method, _util._get_inttype(rec)
+    )
+    changed = cp.zeros((1,), dtype=cp.int32)
+    it = 0
+    while True:
+        for _ in range(_SWEEPS_PER_CHECK):
+            it += 1
+            kern(mask, it, rec, changed, size=rec.size)
+        if int(changed[0]) < it:  # synchronize!
+            # the last sweep did not modify any pixel
+            break
+    return rec
+
+
+def reconstruction(
+    seed, mask, method="dilation", selem=None, offset=None, *, host_loop=False
+):
     """Perform a morphological reconstruction of an image.
 
     Morphological reconstruction by dilation is similar to basic morphological
@@ -57,6 +183,11 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
         The coordinates of the center of the structuring element.
         Default is located on the geometrical center of the selem, in that case
         selem dimensions must be odd.
+    host_loop : bool, optional
+        If True, transfer the data to the host and run scikit-image's
+        sequential (Cython) reconstruction loop. By default, the
+        reconstruction is computed on the device by iterated in-place geodesic
+        dilation (or erosion) until convergence.
 
     Returns
     -------
@@ -111,7 +242,8 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
 
     Notes
     -----
-    The algorithm is taken from [1]_. Applications for greyscale reconstruction
+    When ``host_loop`` is True, the algorithm is taken from [1]_. Otherwise,
+    the parallel iterative algorithm described in [2]_ is used. Applications for greyscale reconstruction
     are discussed in [2]_ and [3]_.
 
     References
@@ -135,11 +267,6 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
             "Intensity of seed image must be greater than that "
             "of the mask image for reconstruction by erosion."
         )
-    try:
-        from skimage.morphology._greyreconstruct import reconstruction_loop
-    except ImportError:
-        raise ImportError("_greyreconstruct extension not available.")
-
     if selem is None:
         selem = np.ones([3] * seed.ndim, dtype=bool)
     else:
@@ -162,6 +289,20 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
     # Cross out the center of the selem
     selem[tuple(slice(d, d + 1) for d in offset)] = False
 
+    if method not in ["dilation", "erosion"]:
+        raise ValueError(
+            "Reconstruction method can be one of 'erosion' "
+            "or 'dilation'. Got '%s'." % method
+        )
+
+    if not host_loop:
+        return _reconstruction_device(seed, mask, method, selem, offset)
+
+    try:
+        from skimage.morphology._greyreconstruct import reconstruction_loop
+    except ImportError:
+        raise ImportError("_greyreconstruct extension not available.")
+
     # Make padding for edges of reconstructed image so we can ignore boundaries
     dims = np.zeros(seed.ndim + 1, dtype=int)
     dims[1:] = np.array(seed.shape) + (np.array(selem.shape) - 1)
@@ -173,11 +314,6 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
         pad_value = int(cp.min(seed))
     elif method == "erosion":
         pad_value = int(cp.max(seed))
-    else:
-        raise ValueError(
-            "Reconstruction method can be one of 'erosion' "
-            "or 'dilation'. Got '%s'." % method
-        )
 
     # TODO: potentially allow int64 if seed image is too large for int32
     #       skimage currently only supports int32, though
@@ -224,7 +360,6 @@ def reconstruction(seed, mask, method="dilation", selem=None, offset=None):
         value_rank, value_map = rank_order(-images)
         value_map = -value_map
 
-    # TODO: implement reconstruction_loop on the GPU? For now, run it on host.
     start = index_sorted[0]
 
     value_rank = cp.asnumpy(value_rank)
@@ -1,9 +1,175 @@
+import functools
+from numbers import Integral
+
 import cupy as cp
 import numpy as np
 from cupyimg.scipy import ndimage as ndi
 
 
-def square(width, dtype=np.uint8):
+def _selem_is_sequence(selem):
+    """Determine whether `selem` is a decomposed structuring element.
+
+    A decomposed structuring element is a sequence of ``(selem, num_iter)``
+    tuples where ``selem`` is an array and ``num_iter`` is a non-negative
+    integer. Applying a morphological operation ``num_iter`` times with each
+    ``selem`` in turn is equivalent to applying it once with the
+    structuring element returned by :func:`selem_from_sequence`.
+    """
+    if isinstance(selem, (cp.ndarray, np.ndarray)):
+        return False
+    if not isinstance(selem, (tuple, list)) or len(selem) == 0:
+        return False
+    for t in selem:
+        if not (
+            isinstance(t, tuple)
+            and len(t) == 2
+            and isinstance(t[0], (cp.ndarray, np.ndarray))
+            and isinstance(t[1], Integral)
+            and t[1] >= 0
+        ):
+            return False
+    return True
+
+
+def _shape_from_sequence(selems):
+    """Shape of the structuring element equivalent to a sequence."""
+    if not _selem_is_sequence(selems):
+        raise ValueError("expected a sequence of (selem, num_iter) tuples")
+    ndim = selems[0][0].ndim
+    if any(s.ndim != ndim for s, _ in selems):
+        raise ValueError(
+            "all structuring elements in the sequence must have the same "
+            "number of dimensions"
+        )
+    shape = [1] * ndim
+    for s, num_iter in selems:
+        for d in range(ndim):
+            shape[d] += num_iter * (s.shape[d] - 1)
+    return tuple(shape)
+
+
+def selem_from_sequence(selems):
+    """Convert a decomposed structuring element into a single array.
+
+    Parameters
+    ----------
+    selems : sequence of tuple of (ndarray, int)
+        A sequence of ``(selem, num_iter)`` tuples as returned by the
+        structuring element functions when a `decomposition` is requested.
+
+    Returns
+    -------
+    selem : ndarray
+        A single array equivalent to applying each ``selem`` in `selems`
+        ``num_iter`` times in succession.
+
+    """
+    shape = _shape_from_sequence(selems)
+    selem = cp.zeros(shape, dtype=bool)
+    selem[tuple(s // 2 for s in shape)] = 1
+    for s, num_iter in selems:
+        if num_iter > 0:
+            selem = ndi.binary_dilation(
+                selem, cp.asarray(s), iterations=num_iter
+            )
+    return selem.astype(selems[0][0].dtype, copy=False)
+
+
+def _line_sequence(lengths, dtype):
+    """Separable decomposition of a box into one line per axis."""
+    ndim = len(lengths)
+    sequence = []
+    for axis, length in enumerate(lengths):
+        if length > 1:
+            shape = [1] * ndim
+            shape[axis] = length
+            sequence.append((cp.ones(tuple(shape), dtype=dtype), 1))
+    if not sequence:
+        sequence.append((cp.ones((1,) * ndim, dtype=dtype), 1))
+    return tuple(sequence)
+
+
+def _decompose_size(size, kernel_size=3):
+    """Number of repeats of a `kernel_size` element spanning `size` pixels."""
+    if kernel_size % 2 != 1:
+        raise ValueError("only odd length kernel_size is supported")
+    return 1 + (size - kernel_size) // (kernel_size - 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _nsphere_decomposition_counts(radius, ndim):
+    """Repeat counts approximating an n-sphere by elementary selems.
+
+    The candidate elements are ``generate_binary_structure(ndim, c)`` for
+    connectivity ``c = 1, ..., ndim`` (the cross and the box of size 3 and
+    the intermediate neighborhoods in between). Dilating ``n_c`` times by
+    each of them gives the set of integer points whose ``j`` largest
+    absolute coordinates sum to at most ``sum_c n_c * min(j, c)`` for every
+    ``j``. Among all counts with ``sum_c n_c == radius`` (so the bounding box
+    matches the n-sphere) the one minimizing the number of mismatched pixels
+    is returned.
+
+    The bound for ``j = 1`` is ``radius`` for all candidates, so the mismatch
+    only depends on the bounds for ``j >= 2``. The pixels are counted once
+    into a histogram over these partial sums, whose cumulative sum then gives
+    the mismatch of each candidate by a single lookup.
+
+    Returns
+    -------
+    counts : tuple of int
+        The number of repeats of the element of connectivity ``c`` at index
+        ``c - 1``.
+    exact : bool
+        Whether the decomposition reproduces the n-sphere exactly.
+    """
+    if ndim == 1:
+        return (radius,), True
+    coords = np.indices((radius + 1,) * ndim).reshape(ndim, -1)
+    # each point of the first orthant stands for 2**(nonzero coords) pixels
+    weights = np.prod(np.where(coords > 0, 2, 1), axis=0)
+    target = (coords * coords).sum(axis=0) <= radius * radius
+    partial_sums = np.cumsum(-np.sort(-coords, axis=0), axis=0)[1:]
+    # the mismatch of a candidate with bounds b is the weight of the target
+    # pixels plus the signed weights below (outside (+) or inside (-) of the
+    # target) of all pixels with partial sums at most b
+    shape = tuple(j * radius + 1 for j in range(2, ndim + 1))
+    mismatch = np.bincount(
+        np.ravel_multi_index(partial_sums, shape),
+        weights=np.where(target, -weights, weights),
+        minlength=int(np.prod(shape)),
+    ).reshape(shape)
+    for axis in range(ndim - 1):
+        mismatch = np.cumsum(mismatch, axis=axis)
+    mismatch += weights[target].sum()
+    # all counts with sum_c n_c == radius, as rows
+    counts = np.indices((radius + 1,) * (ndim - 1)).reshape(ndim - 1, -1).T
+    n_full = radius - counts.sum(axis=1, keepdims=True)
+    counts = np.concatenate((counts, n_full), axis=1)[n_full[:, 0] >= 0]
+    conn = np.arange(1, ndim + 1)
+    bounds = counts @ np.minimum(conn[:, None], conn[None, 1:])
+    mismatch = np.rint(mismatch[tuple(bounds.T)]).astype(np.int64)
+    best = int(np.argmin(mismatch))
+    return tuple(int(n) for n in counts[best]), bool(mismatch[best] == 0)
+
+
+def _nsphere_sequence(radius, ndim, dtype, approximate, dense_func):
+    if radius == 0:
+        return ((cp.ones((1,) * ndim, dtype=dtype), 1),)
+    counts, exact = _nsphere_decomposition_counts(int(radius), ndim)
+    if not (exact or approximate):
+        return ((dense_func(radius, dtype=dtype), 1),)
+    sequence = []
+    if counts[-1] > 0:
+        # the box part is decomposed further into one line per axis
+        sequence += _line_sequence((2 * counts[-1] + 1,) * ndim, dtype)
+    for c, num_iter in enumerate(counts[:-1], 1):
+        if num_iter > 0:
+            structure = ndi.generate_binary_structure(ndim, c)
+            sequence.append((structure.astype(dtype), num_iter))
+    return tuple(sequence)
+
+
+def square(width, dtype=np.uint8, *, decomposition=None):
     """Generates a flat, square-shaped structuring element.
 
     Every pixel along the perimeter has a chessboard distance
@@ -18,18 +184,41 @@ def square(width, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'separable', 'sequence'}, optional
+        If None, a single array is returned. For 'separable', a line is
+        returned for each axis. For 'sequence', a 3x3 square is repeated
+        ``width // 2`` times (even widths use the 'separable' form). See
+        Notes for more details.
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         A structuring element consisting only of ones, i.e. every
-        pixel belongs to the neighborhood.
+        pixel belongs to the neighborhood. When `decomposition` is not
+        None, a tuple of ``(ndarray, num_iter)`` pairs is returned instead.
+
+    Notes
+    -----
+    A decomposed structuring element can be passed to ``erosion``,
+    ``dilation``, ``binary_erosion`` and ``binary_dilation`` (and the
+    openings, closings and top-hats built on them). Applying each element
+    ``num_iter`` times in turn gives the same result as applying the full
+    structuring element once, at a much lower cost for large widths.
+    :func:`selem_from_sequence` converts it back into a single array.
 
     """
-    return cp.ones((width, width), dtype=dtype)
-
-
-def rectangle(width, height, dtype=np.uint8):
+    if decomposition is None:
+        return cp.ones((width, width), dtype=dtype)
+    if decomposition == "separable" or (
+        decomposition == "sequence" and width % 2 == 0
+    ):
+        return _line_sequence((width, width), dtype)
+    elif decomposition == "sequence":
+        return ((cp.ones((3, 3), dtype=dtype), _decompose_size(width, 3)),)
+    raise ValueError("Unrecognized decomposition: {}".format(decomposition))
+
+
+def rectangle(width, height, dtype=np.uint8, *, decomposition=None):
     """Generates a flat, rectangular-shaped structuring element.
 
     Every pixel in the rectangle generated for a given width and given height
@@ -46,18 +235,26 @@ def rectangle(width, height, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'separable'}, optional
+        If None, a single array is returned. For 'separable', a line is
+        returned for each axis as a tuple of ``(ndarray, num_iter)``
+        pairs (see :func:`square`).
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         A structuring element consisting only of ones, i.e. every
         pixel belongs to the neighborhood.
 
     """
-    return cp.ones((width, height), dtype=dtype)
+    if decomposition is None:
+        return cp.ones((width, height), dtype=dtype)
+    elif decomposition == "separable":
+        return _line_sequence((width, height), dtype)
+    raise ValueError("Unrecognized decomposition: {}".format(decomposition))
 
 
-def diamond(radius, dtype=np.uint8):
+def diamond(radius, dtype=np.uint8, *, decomposition=None):
     """Generates a flat, diamond-shaped structuring element.
 
     A pixel is part of the neighborhood (i.e. labeled 1) if
@@ -73,14 +270,26 @@ def diamond(radius, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'sequence'}, optional
+        If None, a single array is returned. For 'sequence', the 3x3
+        cross is repeated `radius` times, which is exact (see
+        :func:`square`).
 
     Returns
     -------
 
-    selem : ndarray
+    selem : ndarray or tuple
         The structuring element where elements of the neighborhood
         are 1 and 0 otherwise.
     """
+    if decomposition == "sequence":
+        if radius == 0:
+            return ((cp.ones((1, 1), dtype=dtype), 1),)
+        return ((diamond(1, dtype=dtype), radius),)
+    elif decomposition is not None:
+        raise ValueError(
+            "Unrecognized decomposition: {}".format(decomposition)
+        )
     # as the grid is usually small, it should be faster to generate it in NumPy
     L = np.arange(0, radius * 2 + 1)
     I, J = np.meshgrid(L, L, sparse=True)
@@ -89,7 +298,7 @@ def diamond(radius, dtype=np.uint8):
     )
 
 
-def disk(radius, dtype=np.uint8):
+def disk(radius, dtype=np.uint8, *, decomposition=None, approximate=False):
     """Generates a flat, disk-shaped structuring element.
 
     A pixel is within the neighborhood if the Euclidean distance between
@@ -104,13 +313,35 @@ def disk(radius, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'sequence'}, optional
+        If None, a single array is returned. For 'sequence', a chain of
+        horizontal and vertical lines and 3x3 crosses is returned (see
+        :func:`square`). Such a chain can only represent octagons, so it
+        is exact only for ``radius <= 2``.
+    approximate : bool, optional
+        Only used when `decomposition` is 'sequence'. If True, the octagon
+        closest to the disk is returned even when it is not exact. If
+        False, a single-element sequence holding the full disk is returned
+        whenever no exact decomposition exists.
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         The structuring element where elements of the neighborhood
         are 1 and 0 otherwise.
+
+    Notes
+    -----
+    The approximate decomposition has the same extent as the disk and
+    differs from it only close to the diagonals, while the cost per pixel
+    drops from ``O(radius**2)`` to ``O(radius)``.
     """
+    if decomposition == "sequence":
+        return _nsphere_sequence(radius, 2, dtype, approximate, disk)
+    elif decomposition is not None:
+        raise ValueError(
+            "Unrecognized decomposition: {}".format(decomposition)
+        )
     # as the grid is usually small, it should be faster to generate it in NumPy
     L = np.arange(-radius, radius + 1)
     X, Y = np.meshgrid(L, L, sparse=True)
@@ -164,7 +395,7 @@ def ellipse(width, height, dtype=np.uint8):
     return cp.asarray(selem)
 
 
-def cube(width, dtype=np.uint8):
+def cube(width, dtype=np.uint8, *, decomposition=None):
     """ Generates a cube-shaped structuring element.
 
     This is the 3D equivalent of a square.
@@ -180,18 +411,31 @@ def cube(width, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'separable', 'sequence'}, optional
+        If None, a single array is returned. For 'separable', a line is
+        returned for each axis. For 'sequence', a 3x3x3 cube is repeated
+        ``width // 2`` times (even widths use the 'separable' form). See
+        :func:`square`.
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         A structuring element consisting only of ones, i.e. every
         pixel belongs to the neighborhood.
 
     """
-    return cp.ones((width, width, width), dtype=dtype)
-
-
-def octahedron(radius, dtype=np.uint8):
+    if decomposition is None:
+        return cp.ones((width, width, width), dtype=dtype)
+    if decomposition == "separable" or (
+        decomposition == "sequence" and width % 2 == 0
+    ):
+        return _line_sequence((width, width, width), dtype)
+    elif decomposition == "sequence":
+        return ((cp.ones((3, 3, 3), dtype=dtype), _decompose_size(width, 3)),)
+    raise ValueError("Unrecognized decomposition: {}".format(decomposition))
+
+
+def octahedron(radius, dtype=np.uint8, *, decomposition=None):
     """Generates a octahedron-shaped structuring element.
 
     This is the 3D equivalent of a diamond.
@@ -208,14 +452,26 @@ def octahedron(radius, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'sequence'}, optional
+        If None, a single array is returned. For 'sequence', the 3x3x3
+        cross is repeated `radius` times, which is exact for integer radii
+        (see :func:`square`).
 
     Returns
     -------
 
-    selem : ndarray
+    selem : ndarray or tuple
         The structuring element where elements of the neighborhood
         are 1 and 0 otherwise.
     """
+    if decomposition == "sequence":
+        if radius == 0:
+            return ((cp.ones((1, 1, 1), dtype=dtype), 1),)
+        return ((octahedron(1, dtype=dtype), int(radius)),)
+    elif decomposition is not None:
+        raise ValueError(
+            "Unrecognized decomposition: {}".format(decomposition)
+        )
     # note that in contrast to diamond(), this method allows non-integer radii
     n = 2 * radius + 1
     Z, Y, X = np.ogrid[
@@ -227,7 +483,7 @@ def octahedron(radius, dtype=np.uint8):
     return cp.asarray(s <= radius, dtype=dtype)
 
 
-def ball(radius, dtype=np.uint8):
+def ball(radius, dtype=np.uint8, *, decomposition=None, approximate=False):
     """Generates a ball-shaped structuring element.
 
     This is the 3D equivalent of a disk.
@@ -243,13 +499,29 @@ def ball(radius, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'sequence'}, optional
+        If None, a single array is returned. For 'sequence', a chain of
+        lines along each axis and the 6- and 18-connected neighborhoods is
+        returned (see :func:`square`). Such a chain only represents
+        polyhedra, so it is exact only for small radii.
+    approximate : bool, optional
+        Only used when `decomposition` is 'sequence'. If True, the
+        polyhedron closest to the ball is returned even when it is not
+        exact. If False, a single-element sequence holding the full ball is
+        returned whenever no exact decomposition exists.
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         The structuring element where elements of the neighborhood
         are 1 and 0 otherwise.
     """
+    if decomposition == "sequence":
+        return _nsphere_sequence(radius, 3, dtype, approximate, ball)
+    elif decomposition is not None:
+        raise ValueError(
+            "Unrecognized decomposition: {}".format(decomposition)
+        )
     n = 2 * radius + 1
     Z, Y, X = np.ogrid[
         -radius : radius : n * 1j,
@@ -260,7 +532,7 @@ def ball(radius, dtype=np.uint8):
     return cp.asarray(s <= radius * radius, dtype=dtype)
 
 
-def octagon(m, n, dtype=np.uint8):
+def octagon(m, n, dtype=np.uint8, *, decomposition=None):
     """Generates an octagon shaped structuring element.
 
     For a given size of (m) horizontal and vertical sides
@@ -279,14 +551,35 @@ def octagon(m, n, dtype=np.uint8):
     ----------------
     dtype : data-type
         The data type of the structuring element.
+    decomposition : {None, 'sequence'}, optional
+        If None, a single array is returned. For 'sequence', a horizontal
+        and a vertical line of length `m` followed by `n` repeats of the
+        3x3 cross is returned, which is exact (see :func:`square`).
 
     Returns
     -------
-    selem : ndarray
+    selem : ndarray or tuple
         The structuring element where elements of the neighborhood
         are 1 and 0 otherwise.
 
     """
+    if decomposition == "sequence":
+        # small octagons are cheaper to apply directly
+        if m <= 2 and n <= 2:
+            return ((octagon(m, n, dtype=dtype), 1),)
+        if m == 0:
+            m = 2
+            n -= 1
+        sequence = []
+        if m > 1:
+            sequence += list(_line_sequence((m, m), dtype))
+        if n > 0:
+            sequence.append((diamond(1, dtype=dtype), n))
+        return tuple(sequence)
+    elif decomposition is not None:
+        raise ValueError(
+            "Unrecognized decomposition: {}".format(decomposition)
+        )
     from skimage.morphology import convex_hull_image
 
     selem = np.zeros((m + 2 * n, m + 2 * n))
@@ -188,3 +188,32 @@ def test_binary_output_3d():
 
     np.testing.assert_equal(int_opened.dtype, cp.uint8)
     np.testing.assert_equal(int_closed.dtype, cp.uint8)
+
+
+@pytest.mark.parametrize(
+    "function",
+    [
+        binary.binary_erosion,
+        binary.binary_dilation,
+        binary.binary_opening,
+        binary.binary_closing,
+    ],
+)
+@pytest.mark.parametrize(
+    "strel_func, args",
+    [
+        (selem.square, (7,)),
+        (selem.diamond, (3,)),
+        (selem.octagon, (3, 2)),
+        (selem.ball, (1,)),
+    ],
+)
+def test_decomposed_selem(function, strel_func, args):
+    strel = strel_func(*args)
+    if strel.ndim == 3:
+        image = cp.random.RandomState(0).rand(16, 16, 16) > 0.3
+    else:
+        image = bw_img[:128, :128]
+    expected = function(image, strel)
+    sequence = strel_func(*args, decomposition="sequence")
+    testing.assert_array_equal(function(image, sequence), expected)
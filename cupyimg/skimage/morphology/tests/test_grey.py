@@ -328,3 +328,30 @@ def test_1d_erosion():
     expected = cp.array([1, 1, 2, 1, 1])
     eroded = grey.erosion(image)
     cp.testing.assert_array_equal(eroded, expected)
+
+
+@parametrize("function", grey_functions)
+@parametrize(
+    "strel_func, args",
+    [
+        (selem.square, (7,)),
+        (selem.diamond, (3,)),
+        (selem.octagon, (3, 2)),
+        (selem.disk, (2,)),
+    ],
+)
+def test_decomposed_selem(function, strel_func, args):
+    rstate = cp.random.RandomState(5)
+    image = rstate.randint(0, 256, (32, 40)).astype(cp.uint8)
+    expected = function(image, strel_func(*args))
+    sequence = strel_func(*args, decomposition="sequence")
+    cp.testing.assert_array_equal(function(image, sequence), expected)
+
+
+def test_decomposed_selem_out():
+    image = cp.random.RandomState(5).randint(0, 256, (16, 16))
+    image = image.astype(cp.uint8)
+    expected = grey.erosion(image, selem.square(5))
+    out = image.copy()
+    grey.erosion(out, selem.square(5, decomposition="sequence"), out=out)
+    cp.testing.assert_array_equal(out, expected)
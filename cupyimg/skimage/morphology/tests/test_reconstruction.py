@@ -156,3 +156,34 @@ def test_offset_not_none():
         ),
         expected,
     )
+
+
+@pytest.mark.parametrize("method", ["dilation", "erosion"])
+@pytest.mark.parametrize("shape", [(32, 48), (12, 16, 20)])
+@pytest.mark.parametrize("dtype", [np.uint8, np.float32, np.float64])
+def test_device_matches_host_loop(method, shape, dtype):
+    rng = np.random.default_rng(0)
+    mask = cp.asarray(rng.integers(0, 200, shape).astype(dtype))
+    if method == "dilation":
+        seed = mask.copy()
+        seed[..., 1:-1] = mask.min()
+    else:
+        seed = mask.copy()
+        seed[..., 1:-1] = mask.max()
+    expected = reconstruction(seed, mask, method=method, host_loop=True)
+    result = reconstruction(seed, mask, method=method)
+    assert result.dtype == expected.dtype
+    assert_array_almost_equal(result, expected)
+
+
+def test_device_offset_matches_host_loop():
+    rng = np.random.default_rng(5)
+    mask = cp.asarray(rng.standard_normal((40, 30)))
+    seed = mask - 0.5
+    selem = np.ones((3, 3), dtype=bool)
+    offset = np.array([0, 1])
+    expected = reconstruction(
+        seed, mask, selem=selem, offset=offset, host_loop=True
+    )
+    result = reconstruction(seed, mask, selem=selem, offset=offset)
+    assert_array_almost_equal(result, expected)
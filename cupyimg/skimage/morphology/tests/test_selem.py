@@ -6,8 +6,11 @@ Author: Damian Eads
 """
 
 
+import itertools
+
 import cupy as cp
 import numpy as np
+import pytest
 from cupy.testing import assert_array_equal
 
 from cupyimg.skimage.morphology import selem
@@ -191,3 +194,73 @@ class TestSElem:
         actual_mask2 = selem.star(1)
         assert_array_equal(expected_mask1, actual_mask1)
         assert_array_equal(expected_mask2, actual_mask2)
+
+
+@pytest.mark.parametrize(
+    "function, args, decomposition",
+    [
+        (selem.square, (7,), "separable"),
+        (selem.square, (7,), "sequence"),
+        (selem.square, (6,), "sequence"),
+        (selem.rectangle, (5, 8), "separable"),
+        (selem.cube, (5,), "sequence"),
+        (selem.diamond, (4,), "sequence"),
+        (selem.octahedron, (3,), "sequence"),
+        (selem.octagon, (5, 3), "sequence"),
+        (selem.octagon, (0, 4), "sequence"),
+        (selem.disk, (2,), "sequence"),
+        (selem.ball, (1,), "sequence"),
+    ],
+)
+def test_selem_decomposition_exact(function, args, decomposition):
+    expected = function(*args)
+    sequence = function(*args, decomposition=decomposition)
+    assert isinstance(sequence, tuple)
+    assert_array_equal(selem.selem_from_sequence(sequence), expected)
+
+
+@pytest.mark.parametrize("function, ndim", [(selem.disk, 2), (selem.ball, 3)])
+def test_selem_decomposition_approximate(function, ndim):
+    radius = 7
+    expected = function(radius)
+
+    # without approximate=True the full n-sphere is kept
+    sequence = function(radius, decomposition="sequence")
+    assert len(sequence) == 1
+    assert_array_equal(sequence[0][0], expected)
+
+    sequence = function(radius, decomposition="sequence", approximate=True)
+    assert all(s.ndim == ndim for s, _ in sequence)
+    approx = selem.selem_from_sequence(sequence)
+    assert approx.shape == expected.shape
+    mismatch = int(cp.count_nonzero(approx != expected))
+    assert 0 < mismatch < 0.15 * int(cp.count_nonzero(expected))
+
+
+@pytest.mark.parametrize("ndim, radii", [(2, range(1, 30)), (3, range(1, 12))])
+def test_nsphere_decomposition_counts(ndim, radii):
+    # compare with a brute force count of the mismatched pixels
+    def mismatch(radius, counts):
+        grid = np.indices((2 * radius + 1,) * ndim) - radius
+        target = (grid * grid).sum(axis=0) <= radius * radius
+        partial_sums = np.cumsum(-np.sort(-np.abs(grid), axis=0), axis=0)
+        inside = np.ones_like(target)
+        for j in range(1, ndim + 1):
+            bound = sum(n * min(j, c) for c, n in enumerate(counts, 1))
+            inside &= partial_sums[j - 1] <= bound
+        return np.count_nonzero(inside != target)
+
+    for radius in radii:
+        counts, exact = selem._nsphere_decomposition_counts(radius, ndim)
+        assert sum(counts) == radius
+        best = mismatch(radius, counts)
+        assert exact == (best == 0)
+        for other in itertools.product(range(radius + 1), repeat=ndim - 1):
+            if sum(other) <= radius:
+                other += (radius - sum(other),)
+                assert mismatch(radius, other) >= best
+
+
+def test_selem_decomposition_invalid():
+    with pytest.raises(ValueError):
+        selem.disk(3, decomposition="crosses")